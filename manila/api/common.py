@@ -24,6 +24,7 @@ import webob
 
 from manila.api.openstack import api_version_request as api_version
 from manila.api.openstack import versioned_method
+from manila.api.openstack import wsgi
 from manila.i18n import _
 
 api_common_opts = [
@@ -35,6 +36,13 @@ api_common_opts = [
     cfg.StrOpt(
         'osapi_share_base_URL',
         help='Base URL to be presented to users in links to the Share API'),
+    cfg.BoolOpt(
+        'osapi_stream_list_responses',
+        default=False,
+        help='Whether lists of shares and share snapshots are serialized '
+             'while they are sent, with chunked transfer encoding, instead '
+             'of being serialized in memory at once. Errors raised while a '
+             'list is sent can not be reported with an error status.'),
 ]
 
 CONF = cfg.CONF
@@ -211,6 +219,13 @@ class ViewBuilder(object):
                 {"rel": "bookmark",
                  "href": self._get_bookmark_link(request, identifier), }]
 
+    def _list_items(self, func, request, items, key):
+        """Returns views of the items, streamed if enabled."""
+        views = (func(request, item)[key] for item in items)
+        if CONF.osapi_stream_list_responses:
+            return wsgi.StreamedList(views)
+        return list(views)
+
     def _get_next_link(self, request, identifier):
         """Return href string with proper limit and marker params."""
         params = request.params.copy()
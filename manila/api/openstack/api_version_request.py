@@ -98,13 +98,14 @@ REST_API_VERSION_HISTORY = """
     * 2.30 - Added cast_rules_to_readonly field to share_instances.
     * 2.31 - Convert consistency groups to share groups.
     * 2.32 - Added mountable snapshots APIs.
+    * 2.33 - Added 'allow_access_bulk' and 'deny_access_bulk' share actions.
 """
 
 # The minimum and maximum versions of the API supported
 # The default api version request is defined to be the
 # minimum version of the API supported.
 _MIN_API_VERSION = "2.0"
-_MAX_API_VERSION = "2.32"
+_MAX_API_VERSION = "2.33"
 DEFAULT_API_VERSION = _MIN_API_VERSION
 
 
@@ -13,11 +13,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
 import functools
 import inspect
 import math
 import time
 
+from oslo_config import cfg
 from oslo_log import log
 from oslo_serialization import jsonutils
 from oslo_utils import strutils
@@ -28,11 +30,13 @@ import webob.exc
 from manila.api.openstack import api_version_request as api_version
 from manila.api.openstack import versioned_method
 from manila.common import constants
+from manila import context as manila_context
 from manila import exception
 from manila.i18n import _, _LE, _LI
 from manila import policy
 from manila import wsgi
 
+CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
 SUPPORTED_CONTENT_TYPES = (
@@ -294,12 +298,60 @@ class DictSerializer(ActionDispatcher):
         return ""
 
 
+class StreamedList(object):
+    """List of a response body serialized item by item while it is sent.
+
+    View builders return it instead of a list for collections that may be
+    too large to be serialized at once. Items are produced lazily, so only
+    the chunk being sent is held in memory. Serializers that do not stream
+    treat it as a plain iterable.
+    """
+
+    def __init__(self, items):
+        self._items = items
+
+    def __iter__(self):
+        return iter(self._items)
+
+
 class JSONDictSerializer(DictSerializer):
     """Default JSON request body serialization."""
 
+    # Size in bytes of the chunks streamed response bodies are sent in.
+    stream_chunk_size = 65536
+
     def default(self, data):
         return six.b(jsonutils.dumps(data))
 
+    def _iter_json(self, data):
+        yield '{'
+        for index, (key, value) in enumerate(data.items()):
+            if index:
+                yield ', '
+            yield jsonutils.dumps(key) + ': '
+            if not isinstance(value, StreamedList):
+                yield jsonutils.dumps(value)
+                continue
+            yield '['
+            for item_index, item in enumerate(value):
+                if item_index:
+                    yield ', '
+                yield jsonutils.dumps(item)
+            yield ']'
+        yield '}'
+
+    def serialize_iter(self, data):
+        """Yields JSON of the data in chunks, streaming its StreamedLists."""
+        chunk, size = [], 0
+        for part in self._iter_json(data):
+            chunk.append(part)
+            size += len(part)
+            if size >= self.stream_chunk_size:
+                yield six.b(''.join(chunk))
+                chunk, size = [], 0
+        if chunk:
+            yield six.b(''.join(chunk))
+
 
 def serializers(**serializers):
     """Attaches serializers to a method.
@@ -464,10 +516,21 @@ class ResponseObject(object):
             response.headers[hdr] = six.text_type(value)
         response.headers['Content-Type'] = six.text_type(content_type)
         if self.obj is not None:
-            response.body = serializer.serialize(self.obj)
+            if self._is_streamed(serializer):
+                # NOTE: without a Content-Length the body is sent with
+                # chunked transfer encoding while it is being serialized.
+                response.app_iter = serializer.serialize_iter(self.obj)
+            else:
+                response.body = serializer.serialize(self.obj)
 
         return response
 
+    def _is_streamed(self, serializer):
+        return (isinstance(self.obj, dict) and
+                hasattr(serializer, 'serialize_iter') and
+                any(isinstance(value, StreamedList)
+                    for value in self.obj.values()))
+
     @property
     def code(self):
         """Retrieve the response status."""
@@ -757,8 +820,9 @@ class Resource(wsgi.Application):
         #            function.  If we try to audit __call__(), we can
         #            run into troubles due to the @webob.dec.wsgify()
         #            decorator.
-        return self._process_stack(request, action, action_args,
-                                   content_type, body, accept)
+        with _request_cache(request):
+            return self._process_stack(request, action, action_args,
+                                       content_type, body, accept)
 
     def _process_stack(self, request, action, action_args,
                        content_type, body, accept):
@@ -1311,6 +1375,31 @@ def _set_request_id_header(req, headers):
         headers['x-compute-request-id'] = context.request_id
 
 
+@contextlib.contextmanager
+def _request_cache(req):
+    """Memoize DB API reads of the request context until it is served."""
+    context = req.environ.get('manila.context')
+    if (not context or getattr(context, 'request_cache', None) is not None or
+            not (CONF.api_request_cache_enabled or
+                 CONF.api_request_cache_debug)):
+        yield
+        return
+
+    context.request_cache = manila_context.RequestCache(
+        enabled=CONF.api_request_cache_enabled)
+    try:
+        yield
+    finally:
+        cache, context.request_cache = context.request_cache, None
+        if CONF.api_request_cache_debug:
+            for key, count in cache.get_duplicates().items():
+                LOG.debug("Request %(request_id)s read %(call)s%(args)s "
+                          "%(count)d times.",
+                          {'request_id': context.request_id,
+                           'call': key[0], 'args': key[4:],
+                           'count': count})
+
+
 class OverLimitFault(webob.exc.HTTPException):
     """Rate-limited request response."""
 
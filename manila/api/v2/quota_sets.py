@@ -171,6 +171,7 @@ class QuotaSetsMixin(object):
                                 user_id=user_id)
             except exception.AdminRequired:
                 raise webob.exc.HTTPForbidden()
+        QUOTAS.invalidate_limits_cache(project_id)
         return self._view_builder.detail_list(
             self._get_quotas(context, id, user_id=user_id))
 
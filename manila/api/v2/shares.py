@@ -14,10 +14,12 @@
 #    under the License.
 
 from oslo_log import log
+from oslo_utils import uuidutils
 import six
 import webob
 from webob import exc
 
+from manila.api import common
 from manila.api.openstack import api_version_request as api_version
 from manila.api.openstack import wsgi
 from manila.api.v1 import share_manage
@@ -358,6 +360,86 @@ class ShareController(shares.ShareMixin,
         """Remove share access rule."""
         return self._deny_access(req, id, body)
 
+    @wsgi.Controller.api_version('2.33')
+    @wsgi.action('allow_access_bulk')
+    @wsgi.Controller.authorize('allow_access')
+    def allow_access_bulk(self, req, id, body):
+        """Add many share access rules at once."""
+        context = req.environ['manila.context']
+        access_rules = (body.get('allow_access_bulk') or {}).get(
+            'access_rules')
+
+        if not access_rules or not isinstance(access_rules, list):
+            msg = _("A non-empty list of access rules must be provided in "
+                    "'access_rules'.")
+            raise exc.HTTPBadRequest(explanation=msg)
+
+        for access_rule in access_rules:
+            if (not isinstance(access_rule, dict) or
+                    'access_type' not in access_rule or
+                    'access_to' not in access_rule):
+                msg = _("Each access rule must specify 'access_type' and "
+                        "'access_to'.")
+                raise exc.HTTPBadRequest(explanation=msg)
+            common.validate_access(access_type=access_rule['access_type'],
+                                   access_to=access_rule['access_to'],
+                                   enable_ceph=True)
+
+        share = self.share_api.get(context, id)
+        try:
+            accesses = self.share_api.allow_access_bulk(
+                context, share, access_rules)
+        except (exception.ShareAccessExists,
+                exception.InvalidShareAccess) as e:
+            raise exc.HTTPBadRequest(explanation=e.msg)
+
+        return self._access_view_builder.detail_list_view(req, accesses)
+
+    @wsgi.Controller.api_version('2.33')
+    @wsgi.action('deny_access_bulk')
+    @wsgi.Controller.authorize('deny_access')
+    def deny_access_bulk(self, req, id, body):
+        """Remove many share access rules at once."""
+        context = req.environ['manila.context']
+        params = body.get('deny_access_bulk')
+        if not isinstance(params, dict):
+            msg = _("Malformed request body.")
+            raise exc.HTTPBadRequest(explanation=msg)
+        access_ids = params.get('access_ids')
+
+        if not access_ids or not isinstance(access_ids, list):
+            msg = _("A non-empty list of access rule IDs must be provided in "
+                    "'access_ids'.")
+            raise exc.HTTPBadRequest(explanation=msg)
+        if not all(isinstance(access_id, six.string_types) and
+                   uuidutils.is_uuid_like(access_id)
+                   for access_id in access_ids):
+            msg = _("Each item of 'access_ids' must be an access rule ID.")
+            raise exc.HTTPBadRequest(explanation=msg)
+
+        try:
+            share = self.share_api.get(context, id)
+        except exception.NotFound as error:
+            raise exc.HTTPNotFound(explanation=six.text_type(error))
+
+        # NOTE: Rules are loaded without the access_get_all policy check,
+        # the deny_access one is enough to deny them.
+        share_accesses = dict(
+            (access['id'], access)
+            for access in db.share_access_get_all_for_share(
+                context, share['id']))
+        missing_ids = set(access_ids) - set(share_accesses)
+        if missing_ids:
+            msg = _("Access rules %(ids)s not found for share "
+                    "%(share_id)s.") % {'ids': ', '.join(sorted(missing_ids)),
+                                        'share_id': id}
+            raise exc.HTTPNotFound(explanation=msg)
+
+        self.share_api.deny_access_bulk(
+            context, share,
+            [share_accesses[access_id] for access_id in set(access_ids)])
+        return webob.Response(status_int=202)
+
     @wsgi.Controller.api_version('2.0', '2.6')
     @wsgi.action('os-access_list')
     def access_list_legacy(self, req, id, body):
@@ -32,6 +32,11 @@ class ViewBuilder(common.ViewBuilder):
         return {'access_list': [self.summary_view(request, access)['access']
                                 for access in accesses]}
 
+    def detail_list_view(self, request, accesses):
+        """Detailed view of a list of share accesses."""
+        return {'access_list': [self.view(request, access)['access']
+                                for access in accesses]}
+
     def summary_view(self, request, access):
         """Summarized view of a single share access."""
         access_dict = {
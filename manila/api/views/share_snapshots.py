@@ -76,8 +76,8 @@ class ViewBuilder(common.ViewBuilder):
 
     def _list_view(self, func, request, snapshots):
         """Provide a view for a list of share snapshots."""
-        snapshots_list = [func(request, snapshot)['snapshot']
-                          for snapshot in snapshots]
+        snapshots_list = self._list_items(
+            func, request, snapshots, 'snapshot')
         snapshots_links = self._get_collection_links(request,
                                                      snapshots,
                                                      self._collection_name)
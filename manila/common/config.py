@@ -74,6 +74,18 @@ global_opts = [
     cfg.BoolOpt('api_rate_limit',
                 default=True,
                 help='Whether to rate limit the API.'),
+    cfg.BoolOpt('api_request_cache_enabled',
+                default=True,
+                help='Whether shares, share instances, share networks, '
+                     'share types and availability zones read from the '
+                     'database are reused for the rest of an API request. '
+                     'Any write of those resources within the request drops '
+                     'the reused reads.'),
+    cfg.BoolOpt('api_request_cache_debug',
+                default=False,
+                help='Whether to log the database reads repeated within an '
+                     'API request, whether they were served from the '
+                     'request cache or not.'),
     cfg.ListOpt('osapi_share_ext_list',
                 default=[],
                 help='Specify list of extensions to load when using osapi_'
@@ -120,6 +132,12 @@ global_opts = [
                help='Default share type to use.'),
     cfg.StrOpt('default_share_group_type',
                help='Default share group type to use.'),
+    cfg.BoolOpt('share_types_cache_enabled',
+                default=True,
+                help='Whether share types and their extra specs are cached '
+                     'in memory. Cached entries are dropped as soon as any '
+                     'share type, extra spec or share type access change is '
+                     'detected with a single lightweight query.'),
     cfg.ListOpt('memcached_servers',
                 help='Memcached servers or None for in process cache.'),
     cfg.StrOpt('share_usage_audit_period',
@@ -17,6 +17,7 @@
 
 """RequestContext: context for requests that persist through all of manila."""
 
+import collections
 import copy
 
 from oslo_context import context
@@ -27,6 +28,40 @@ from manila.i18n import _
 from manila import policy
 
 
+class RequestCache(object):
+    """Reads of the DB API memoized while serving a single API request.
+
+    Every read is counted, so that the reads repeated within the request can
+    be reported, and only served from memory if the cache is enabled.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.reads = collections.Counter()
+        self._entries = {}
+
+    def __deepcopy__(self, memo):
+        # NOTE: contexts made with elevated() serve the same request.
+        return self
+
+    def get(self, key, load):
+        self.reads[key] += 1
+        if not self.enabled:
+            return load()
+        try:
+            return self._entries[key]
+        except KeyError:
+            value = self._entries[key] = load()
+            return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_duplicates(self):
+        return dict((key, count) for key, count in self.reads.items()
+                    if count > 1)
+
+
 class RequestContext(context.RequestContext):
     """Security context and request information.
 
@@ -89,6 +124,12 @@ class RequestContext(context.RequestContext):
             self.service_catalog = []
 
         self.quota_class = quota_class
+        # NOTE: set by the API for the time of a request only, it is never
+        # sent over RPC.
+        self.request_cache = None
+        # NOTE: set once the request wrote to the database, its reads are
+        # then served by the primary database only.
+        self.db_written = False
 
     def _get_read_deleted(self):
         return self._read_deleted
@@ -133,6 +133,15 @@ def service_update(context, service_id, values):
     return IMPL.service_update(context, service_id, values)
 
 
+def service_heartbeat(context, service_id):
+    """Increment the report count of a service without reading it.
+
+    Raises NotFound if service does not exist.
+
+    """
+    return IMPL.service_heartbeat(context, service_id)
+
+
 ####################
 
 
@@ -157,6 +166,12 @@ def quota_get_all_by_project(context, project_id):
     return IMPL.quota_get_all_by_project(context, project_id)
 
 
+def quota_get_all_limits(context, project_id, user_id=None, quota_class=None):
+    """Retrieve project, user, class and default limits in one query."""
+    return IMPL.quota_get_all_limits(context, project_id, user_id=user_id,
+                                     quota_class=quota_class)
+
+
 def quota_get_all(context, project_id):
     """Retrieve all user quotas associated with a given project."""
     return IMPL.quota_get_all(context, project_id)
@@ -264,9 +279,13 @@ def quota_destroy_all_by_project(context, project_id):
     return IMPL.quota_destroy_all_by_project(context, project_id)
 
 
-def reservation_expire(context):
-    """Roll back any expired reservations."""
-    return IMPL.reservation_expire(context)
+def reservation_expire(context, batch_size=None):
+    """Roll back any expired reservations.
+
+    If batch_size is set, reservations are expired in separate
+    transactions of at most batch_size reservations each.
+    """
+    return IMPL.reservation_expire(context, batch_size=batch_size)
 
 
 ###################
@@ -418,6 +437,11 @@ def share_access_get_all_by_type_and_access(context, share_id, access_type,
         context, share_id, access_type, access)
 
 
+def share_access_create_all(context, share_id, values_list):
+    """Bulk create access rules of a share and map them to its instances."""
+    return IMPL.share_access_create_all(context, share_id, values_list)
+
+
 def share_instance_access_create(context, values, share_instance_id):
     """Allow access to share instance."""
     return IMPL.share_instance_access_create(
@@ -447,6 +471,17 @@ def share_instance_access_update(context, access_id, instance_id, updates):
         context, access_id, instance_id, updates)
 
 
+def share_instance_access_update_all(context, instance_id, filters=None,
+                                     updates=None, conditionally_change=None):
+    """Update all matching access rules of a share instance at once.
+
+    Returns a dict mapping IDs of the matched access rules to their states.
+    """
+    return IMPL.share_instance_access_update_all(
+        context, instance_id, filters=filters, updates=updates,
+        conditionally_change=conditionally_change)
+
+
 def share_instance_access_delete(context, mapping_id):
     """Deny access to share instance."""
     return IMPL.share_instance_access_delete(context, mapping_id)
@@ -847,10 +882,23 @@ def share_server_get_all_unused_deletable(context, host, updated_before):
                                                       updated_before)
 
 
-def share_server_backend_details_set(context, share_server_id, server_details):
-    """Create DB record with backend details."""
+def share_server_get_all_free_by_host_and_share_net(context, host,
+                                                    share_net_id):
+    """Get active share servers without shares, newest first."""
+    return IMPL.share_server_get_all_free_by_host_and_share_net(
+        context, host, share_net_id)
+
+
+def share_server_backend_details_set(context, share_server_id, server_details,
+                                     check_exists=True):
+    """Create or update DB records with backend details.
+
+    All details are written in a single transaction. Callers which already
+    hold the share server may pass check_exists=False to skip the lookup.
+    """
     return IMPL.share_server_backend_details_set(context, share_server_id,
-                                                 server_details)
+                                                 server_details,
+                                                 check_exists=check_exists)
 
 
 ##################
@@ -921,6 +969,11 @@ def share_type_destroy(context, id):
     return IMPL.share_type_destroy(context, id)
 
 
+def share_types_generation_get(context):
+    """Get the counter increased on every change of share types."""
+    return IMPL.share_types_generation_get(context)
+
+
 ####################
 
 
@@ -0,0 +1,62 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add 'share_types_generation' table.
+
+Revision ID: 4531fa7d0bb2
+Revises: d5db24264f5c
+Create Date: 2017-04-11 12:31:07.382712
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4531fa7d0bb2'
+down_revision = 'd5db24264f5c'
+
+from alembic import op
+from oslo_log import log
+import sqlalchemy as sa
+
+from manila.i18n import _LE
+
+LOG = log.getLogger(__name__)
+
+TABLE_NAME = 'share_types_generation'
+
+
+def upgrade():
+    try:
+        generation_table = op.create_table(
+            TABLE_NAME,
+            sa.Column('id', sa.Integer, primary_key=True, nullable=False),
+            sa.Column('created_at', sa.DateTime),
+            sa.Column('updated_at', sa.DateTime),
+            sa.Column('deleted_at', sa.DateTime),
+            sa.Column('deleted', sa.Integer),
+            sa.Column('generation', sa.Integer, nullable=False, default=0),
+            mysql_engine='InnoDB',
+            mysql_charset='utf8',
+        )
+    except Exception:
+        LOG.error(_LE("Table |%s| not created!"), TABLE_NAME)
+        raise
+
+    op.bulk_insert(generation_table,
+                   [{'id': 1, 'deleted': 0, 'generation': 0}])
+
+
+def downgrade():
+    try:
+        op.drop_table(TABLE_NAME)
+    except Exception:
+        LOG.error(_LE("%s table not dropped"), TABLE_NAME)
+        raise
@@ -0,0 +1,43 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add indexes for share metadata and extra specs filtering.
+
+Revision ID: 7b1c5f3e9a24
+Revises: 4531fa7d0bb2
+Create Date: 2017-04-18 10:42:51.226813
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '7b1c5f3e9a24'
+down_revision = '4531fa7d0bb2'
+
+from alembic import op
+
+INDEXES = (
+    ('share_metadata_key_value_share_id_idx', 'share_metadata',
+     ['key', 'value', 'share_id'], {'mysql_length': {'value': 255}}),
+    ('share_type_extra_specs_share_type_id_spec_key_spec_value_idx',
+     'share_type_extra_specs', ['share_type_id', 'spec_key', 'spec_value'],
+     {}),
+)
+
+
+def upgrade():
+    for name, table_name, columns, kwargs in INDEXES:
+        op.create_index(name, table_name, columns, **kwargs)
+
+
+def downgrade():
+    for name, table_name, columns, kwargs in INDEXES:
+        op.drop_index(name, table_name=table_name)
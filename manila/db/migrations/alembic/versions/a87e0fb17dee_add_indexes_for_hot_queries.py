@@ -0,0 +1,52 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add indexes used by periodic tasks and share manager lookups.
+
+Revision ID: a87e0fb17dee
+Revises: 7b1c5f3e9a24
+Create Date: 2017-04-24 14:03:18.571249
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a87e0fb17dee'
+down_revision = '7b1c5f3e9a24'
+
+from alembic import op
+
+INDEXES = (
+    ('share_instances_host_deleted_idx', 'share_instances',
+     ['host', 'deleted']),
+    ('share_instance_export_locations_share_instance_id_deleted_idx',
+     'share_instance_export_locations', ['share_instance_id', 'deleted']),
+    ('share_instance_access_map_share_instance_id_deleted_state_idx',
+     'share_instance_access_map', ['share_instance_id', 'deleted', 'state']),
+    ('share_servers_host_deleted_status_updated_at_idx', 'share_servers',
+     ['host', 'deleted', 'status', 'updated_at']),
+    ('share_snapshot_instances_snapshot_id_deleted_idx',
+     'share_snapshot_instances', ['snapshot_id', 'deleted']),
+    ('share_snapshot_instances_share_instance_id_deleted_idx',
+     'share_snapshot_instances', ['share_instance_id', 'deleted']),
+    ('network_allocations_ip_address_deleted_idx', 'network_allocations',
+     ['ip_address', 'deleted']),
+)
+
+
+def upgrade():
+    for name, table_name, columns in INDEXES:
+        op.create_index(name, table_name, columns)
+
+
+def downgrade():
+    for name, table_name, columns in INDEXES:
+        op.drop_index(name, table_name=table_name)
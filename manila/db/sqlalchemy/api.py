@@ -22,12 +22,14 @@ import copy
 import datetime
 from functools import wraps
 import sys
+import threading
 import warnings
 
 # NOTE(uglide): Required to override default oslo_db Query class
 import manila.db.sqlalchemy.query  # noqa
 
 from oslo_config import cfg
+from oslo_context import context as oslo_context
 from oslo_db import api as oslo_db_api
 from oslo_db import exception as db_exc
 from oslo_db import exception as db_exception
@@ -38,8 +40,13 @@ from oslo_log import log
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import six
+from sqlalchemy import and_
+from sqlalchemy import case
+from sqlalchemy import event
+from sqlalchemy import literal
 from sqlalchemy import MetaData
 from sqlalchemy import or_
+from sqlalchemy import orm
 from sqlalchemy.orm import joinedload
 from sqlalchemy.sql.expression import true
 from sqlalchemy.sql import func
@@ -48,6 +55,7 @@ from manila.common import constants
 from manila.db.sqlalchemy import models
 from manila import exception
 from manila.i18n import _, _LE, _LI, _LW
+from manila import utils
 
 CONF = cfg.CONF
 
@@ -58,6 +66,9 @@ PER_PROJECT_QUOTAS = []
 
 _FACADE = None
 
+# NOTE: greenthread local once eventlet has patched the threading module.
+_LOCAL = threading.local()
+
 _DEFAULT_SQL_CONNECTION = 'sqlite://'
 db_options.set_defaults(cfg.CONF,
                         connection=_DEFAULT_SQL_CONNECTION)
@@ -70,14 +81,36 @@ def _create_facade_lazily():
     return _FACADE
 
 
-def get_engine():
+def get_engine(use_slave=False):
     facade = _create_facade_lazily()
-    return facade.get_engine()
+    return facade.get_engine(use_slave=use_slave)
+
 
+def get_session(use_slave=None, **kwargs):
+    """Returns session to the database.
 
-def get_session(**kwargs):
+    :param use_slave: whether to connect to the slave database, if it is
+        configured. Defaults to True within DB API calls decorated with
+        :py:func:`read_from_slave` and to False otherwise.
+    """
+    if use_slave is None:
+        use_slave = getattr(_LOCAL, 'use_slave', False)
     facade = _create_facade_lazily()
-    return facade.get_session(**kwargs)
+    return facade.get_session(use_slave=use_slave, **kwargs)
+
+
+@event.listens_for(orm.Session, 'after_flush')
+@event.listens_for(orm.Session, 'after_bulk_update')
+@event.listens_for(orm.Session, 'after_bulk_delete')
+def _mark_context_written(*args):
+    """Marks the request context of the current greenthread as written.
+
+    Reads of this request are then served by the primary database, so that
+    they can see the writes not replicated to the slave database yet.
+    """
+    context = oslo_context.get_current()
+    if context is not None:
+        context.db_written = True
 
 
 def get_backend():
@@ -165,6 +198,83 @@ def require_context(f):
     return wrapper
 
 
+def _request_cached(f):
+    """Decorator to memoize a read in the request cache of the context.
+
+    The first argument to the wrapped function must be the context. Reads
+    within a session or with unhashable arguments are never memoized.
+
+    """
+    @wraps(f)
+    def wrapper(context, *args, **kwargs):
+        cache = getattr(context, 'request_cache', None)
+        if cache is None or kwargs.get('session') is not None:
+            return f(context, *args, **kwargs)
+        key = (f.__name__, context.is_admin, context.project_id,
+               context.read_deleted, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return f(context, *args, **kwargs)
+        return cache.get(key, lambda: f(context, *args, **kwargs))
+    return wrapper
+
+
+def _clears_request_cache(f):
+    """Decorator to drop reads memoized for the context after a write.
+
+    The first argument to the wrapped function must be the context.
+
+    """
+    @wraps(f)
+    def wrapper(context, *args, **kwargs):
+        try:
+            return f(context, *args, **kwargs)
+        finally:
+            cache = getattr(context, 'request_cache', None)
+            if cache is not None:
+                cache.clear()
+    return wrapper
+
+
+def read_from_slave(f):
+    """Decorator to run a read only DB API call on the slave database.
+
+    Sessions created within the call connect to the slave database set by
+    the [database]/slave_connection option. The primary database is still
+    used if a session is passed or if the request wrote to the database
+    already.
+
+    The first argument to the wrapped function must be the context.
+
+    """
+    code = six.get_function_code(f)
+    arg_names = code.co_varnames[:code.co_argcount]
+    # Position of the session argument in args passed after the context.
+    session_index = (arg_names.index('session') - 1
+                     if 'session' in arg_names else None)
+
+    def _get_session(args, kwargs):
+        if session_index is not None and len(args) > session_index:
+            return args[session_index]
+        return kwargs.get('session')
+
+    @wraps(f)
+    def wrapper(context, *args, **kwargs):
+        if (not CONF.database.slave_connection or
+                getattr(_LOCAL, 'use_slave', False) or
+                _get_session(args, kwargs) is not None or
+                getattr(context, 'db_written', False) or
+                getattr(oslo_context.get_current(), 'db_written', False)):
+            return f(context, *args, **kwargs)
+        _LOCAL.use_slave = True
+        try:
+            return f(context, *args, **kwargs)
+        finally:
+            _LOCAL.use_slave = False
+    return wrapper
+
+
 def require_share_exists(f):
     """Decorator to require the specified share to exist.
 
@@ -360,6 +470,7 @@ def service_get_all(context, disabled=None):
 
 
 @require_admin_context
+@read_from_slave
 def service_get_all_by_topic(context, topic):
     return model_query(
         context, models.Service, read_deleted="no").\
@@ -456,6 +567,22 @@ def service_update(context, service_id, values):
         service_ref.save(session=session)
 
 
+@require_admin_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def service_heartbeat(context, service_id):
+    session = get_session()
+    with session.begin():
+        updated = model_query(
+            context, models.Service, session=session,
+        ).filter_by(id=service_id).update({
+            'report_count': models.Service.report_count + 1,
+            'updated_at': timeutils.utcnow(),
+        }, synchronize_session=False)
+
+    if not updated:
+        raise exception.ServiceNotFound(service_id=service_id)
+
+
 ###################
 
 
@@ -506,6 +633,43 @@ def quota_get_all_by_project(context, project_id):
     return result
 
 
+@require_context
+def quota_get_all_limits(context, project_id, user_id=None, quota_class=None):
+    """Fetch every hard limit that applies to a project in one query.
+
+    Project, per-user, quota class and default quota class limits are
+    selected with a single UNION ALL statement instead of one query per
+    source.
+    """
+    authorize_project_context(context, project_id)
+    if quota_class:
+        authorize_quota_class_context(context, quota_class)
+
+    session = get_session()
+
+    def _limits_query(scope, model, **filters):
+        return model_query(
+            context, model, literal(scope), model.resource, model.hard_limit,
+            session=session, read_deleted="no").filter(
+                *[getattr(model, k) == v for k, v in filters.items()])
+
+    queries = [_limits_query('project', models.Quota, project_id=project_id),
+               _limits_query('default', models.QuotaClass,
+                             class_name=_DEFAULT_QUOTA_NAME)]
+    if user_id:
+        queries.append(_limits_query('user', models.ProjectUserQuota,
+                                     project_id=project_id, user_id=user_id))
+    if quota_class:
+        queries.append(_limits_query('class', models.QuotaClass,
+                                     class_name=quota_class))
+
+    result = {'project': {}, 'user': {}, 'class': {}, 'default': {}}
+    for scope, resource, hard_limit in queries[0].union_all(*queries[1:]):
+        result[scope][resource] = hard_limit
+
+    return result
+
+
 @require_context
 def quota_get_all(context, project_id):
     authorize_project_context(context, project_id)
@@ -996,7 +1160,51 @@ def _quota_reservations_query(session, context, reservations):
                        read_deleted="no",
                        session=session).\
         filter(models.Reservation.uuid.in_(reservations)).\
-        with_lockmode('update')
+        with_for_update()
+
+
+def _apply_reservations_to_usages(context, session, reservation_ids,
+                                  commit=False):
+    """Release reservations from their usages with one UPDATE per usage.
+
+    Deltas are summed per usage in the database, so the number of
+    statements depends on the number of affected usages rather than the
+    number of reservations.  Only positive deltas were added to
+    'reserved', so only those are released; committed reservations also
+    move their whole delta to 'in_use'.  The reservations are soft-deleted
+    with a single statement afterwards.
+    """
+    reservation_query = model_query(
+        context, models.Reservation, session=session, read_deleted="no").\
+        filter(models.Reservation.id.in_(reservation_ids))
+
+    reserved_delta = func.sum(case(
+        [(models.Reservation.delta >= 0, models.Reservation.delta)],
+        else_=0))
+    usage_deltas = reservation_query.with_entities(
+        models.Reservation.usage_id, reserved_delta,
+        func.sum(models.Reservation.delta)).\
+        group_by(models.Reservation.usage_id).\
+        order_by(models.Reservation.usage_id).\
+        all()
+
+    for usage_id, reserved, in_use in usage_deltas:
+        values = {'reserved': models.QuotaUsage.reserved - reserved}
+        if commit:
+            values['in_use'] = models.QuotaUsage.in_use + in_use
+        model_query(context, models.QuotaUsage, session=session,
+                    read_deleted="no").\
+            filter_by(id=usage_id).\
+            update(values, synchronize_session=False)
+
+    reservation_query.soft_delete(synchronize_session=False)
+
+
+def _lock_quota_reservations(session, context, reservations):
+    reservation_query = _quota_reservations_query(session, context,
+                                                  reservations)
+    return [row.id for row in
+            reservation_query.with_entities(models.Reservation.id).all()]
 
 
 @require_context
@@ -1004,15 +1212,11 @@ def _quota_reservations_query(session, context, reservations):
 def reservation_commit(context, reservations, project_id=None, user_id=None):
     session = get_session()
     with session.begin():
-        usages = _get_user_quota_usages(context, session, project_id, user_id)
-        reservation_query = _quota_reservations_query(session, context,
-                                                      reservations)
-        for reservation in reservation_query.all():
-            usage = usages[reservation.resource]
-            if reservation.delta >= 0:
-                usage.reserved -= reservation.delta
-            usage.in_use += reservation.delta
-        reservation_query.soft_delete(synchronize_session=False)
+        reservation_ids = _lock_quota_reservations(session, context,
+                                                   reservations)
+        if reservation_ids:
+            _apply_reservations_to_usages(context, session, reservation_ids,
+                                          commit=True)
 
 
 @require_context
@@ -1020,14 +1224,10 @@ def reservation_commit(context, reservations, project_id=None, user_id=None):
 def reservation_rollback(context, reservations, project_id=None, user_id=None):
     session = get_session()
     with session.begin():
-        usages = _get_user_quota_usages(context, session, project_id, user_id)
-        reservation_query = _quota_reservations_query(session, context,
-                                                      reservations)
-        for reservation in reservation_query.all():
-            usage = usages[reservation.resource]
-            if reservation.delta >= 0:
-                usage.reserved -= reservation.delta
-        reservation_query.soft_delete(synchronize_session=False)
+        reservation_ids = _lock_quota_reservations(session, context,
+                                                   reservations)
+        if reservation_ids:
+            _apply_reservations_to_usages(context, session, reservation_ids)
 
 
 @require_admin_context
@@ -1075,22 +1275,41 @@ def quota_destroy_all_by_project(context, project_id):
             soft_delete(synchronize_session=False)
 
 
-@require_admin_context
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
-def reservation_expire(context):
+def _reservation_expire_batch(context, current_time, batch_size):
     session = get_session()
     with session.begin():
-        current_time = timeutils.utcnow()
-        reservation_query = model_query(context, models.Reservation,
-                                        session=session, read_deleted="no").\
-            filter(models.Reservation.expire < current_time)
+        expired_query = model_query(context, models.Reservation,
+                                    models.Reservation.id,
+                                    session=session, read_deleted="no").\
+            filter(models.Reservation.expire < current_time).\
+            order_by(models.Reservation.id)
+        if batch_size:
+            expired_query = expired_query.limit(batch_size)
+        reservation_ids = [row.id for row in
+                           expired_query.with_for_update().all()]
+        if not reservation_ids:
+            return 0
+
+        _apply_reservations_to_usages(context, session, reservation_ids)
+
+    return len(reservation_ids)
 
-        for reservation in reservation_query.join(models.QuotaUsage).all():
-            if reservation.delta >= 0:
-                reservation.usage.reserved -= reservation.delta
-                session.add(reservation.usage)
 
-        reservation_query.soft_delete(synchronize_session=False)
+@require_admin_context
+def reservation_expire(context, batch_size=None):
+    """Roll back expired reservations in transactions of batch_size rows."""
+    current_time = timeutils.utcnow()
+    expired = 0
+    while True:
+        count = _reservation_expire_batch(context, current_time, batch_size)
+        expired += count
+        if not batch_size or count < batch_size:
+            break
+
+    if expired:
+        LOG.debug("Expired %d quota reservations.", expired)
+    return expired
 
 
 ################
@@ -1130,6 +1349,7 @@ def _extract_snapshot_instance_values(values):
 
 
 @require_context
+@_clears_request_cache
 def share_instance_create(context, share_id, values):
     session = get_session()
     with session.begin():
@@ -1150,6 +1370,7 @@ def _share_instance_create(context, share_id, values, session):
 
 
 @require_context
+@_clears_request_cache
 def share_instance_update(context, share_instance_id, values,
                           with_share_data=False):
     session = get_session()
@@ -1162,7 +1383,8 @@ def share_instance_update(context, share_instance_id, values,
             parent_share = share_get(context, instance_ref['share_id'],
                                      session=session)
             instance_ref.set_share_data(parent_share)
-        return instance_ref
+    utils.notify_resource_change('share_instance', share_instance_id)
+    return instance_ref
 
 
 def _share_instance_update(context, share_instance_id, values, session):
@@ -1174,6 +1396,7 @@ def _share_instance_update(context, share_instance_id, values, session):
 
 
 @require_context
+@_request_cached
 def share_instance_get(context, share_instance_id, session=None,
                        with_share_data=False):
     if session is None:
@@ -1207,6 +1430,7 @@ def share_instances_get_all(context):
 
 
 @require_context
+@_clears_request_cache
 def share_instance_delete(context, instance_id, session=None):
     if session is None:
         session = get_session()
@@ -1222,6 +1446,7 @@ def share_instance_delete(context, instance_id, session=None):
             session.query(models.ShareMetadata).filter_by(
                 share_id=share['id']).soft_delete()
             share.soft_delete(session=session)
+    utils.notify_resource_change('share_instance', instance_id)
 
 
 def _set_instances_share_data(context, instances, session):
@@ -1240,18 +1465,27 @@ def _set_instances_share_data(context, instances, session):
     return instances_with_share_data
 
 
+def _host_filter(column, host):
+    """Returns filter matching the host and all its pools.
+
+    Wildcard characters of the host name, such as '_', are escaped, so that
+    only the host itself and its pools match.
+    """
+    escaped_host = (host.replace('\\', '\\\\').replace('%', '\\%').
+                    replace('_', '\\_'))
+    return or_(column == host,
+               column.like(escaped_host + '#%', escape='\\'))
+
+
 @require_admin_context
+@read_from_slave
 def share_instances_get_all_by_host(context, host, with_share_data=False,
                                     session=None):
     """Retrieves all share instances hosted on a host."""
     session = session or get_session()
     instances = (
         model_query(context, models.ShareInstance).filter(
-            or_(
-                models.ShareInstance.host == host,
-                models.ShareInstance.host.like("{0}#%".format(host))
-            )
-        ).all()
+            _host_filter(models.ShareInstance.host, host)).all()
     )
 
     if with_share_data:
@@ -1351,6 +1585,7 @@ def _set_replica_share_data(context, replicas, session):
 
 
 @require_context
+@read_from_slave
 def share_replicas_get_all(context, with_share_data=False,
                            with_share_server=True, session=None):
     """Returns replica instances for all available replicated shares."""
@@ -1422,6 +1657,7 @@ def share_replica_get(context, replica_id, with_share_data=False,
 
 @require_context
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@_clears_request_cache
 def share_replica_update(context, share_replica_id, values,
                          with_share_data=False, session=None):
     """Updates a share replica with specified values."""
@@ -1441,6 +1677,7 @@ def share_replica_update(context, share_replica_id, values,
 
 
 @require_context
+@_clears_request_cache
 def share_replica_delete(context, share_replica_id, session=None):
     """Deletes a share replica."""
     session = session or get_session()
@@ -1472,6 +1709,7 @@ def _metadata_refs(metadata_dict, meta_class):
 
 
 @require_context
+@_clears_request_cache
 def share_create(context, share_values, create_share_instance=True):
     values = copy.deepcopy(share_values)
     values = ensure_model_dict_has_id(values)
@@ -1514,6 +1752,7 @@ def share_data_get_for_project(context, project_id, user_id, session=None):
 
 @require_context
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@_clears_request_cache
 def share_update(context, share_id, update_values):
     session = get_session()
     values = copy.deepcopy(update_values)
@@ -1535,6 +1774,7 @@ def share_update(context, share_id, update_values):
 
 
 @require_context
+@_request_cached
 def share_get(context, share_id, session=None):
     result = _share_get_query(context, session).filter_by(id=share_id).first()
 
@@ -1544,6 +1784,22 @@ def share_get(context, share_id, session=None):
     return result
 
 
+def _key_value_match_query(context, model, owner_column, key_values):
+    """Returns query of owners having all the given key/value pairs.
+
+    Matching rows are looked up through the (key, value) index of the
+    table and counted per owner, so that an owner is returned only if
+    every pair matched.
+    """
+    return model_query(
+        context, model, owner_column, read_deleted="no",
+    ).filter(
+        or_(*[and_(model.key == k, model.value == v)
+              for k, v in key_values.items()])
+    ).group_by(owner_column).having(
+        func.count(model.key.distinct()) == len(key_values))
+
+
 def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
                                 share_group_id=None, filters=None,
                                 is_public=False, sort_key=None,
@@ -1589,19 +1845,17 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
     # Apply filters
     if not filters:
         filters = {}
-    if 'metadata' in filters:
-        for k, v in filters['metadata'].items():
-            query = query.filter(
-                or_(models.Share.share_metadata.any(  # pylint: disable=E1101
-                    key=k, value=v)))
-    if 'extra_specs' in filters:
-        query = query.join(
-            models.ShareTypeExtraSpecs,
-            models.ShareTypeExtraSpecs.share_type_id ==
-            models.ShareInstance.share_type_id)
-        for k, v in filters['extra_specs'].items():
-            query = query.filter(or_(models.ShareTypeExtraSpecs.key == k,
-                                     models.ShareTypeExtraSpecs.value == v))
+    if filters.get('metadata'):
+        query = query.filter(models.Share.id.in_(
+            _key_value_match_query(
+                context, models.ShareMetadata,
+                models.ShareMetadata.share_id, filters['metadata'])))
+    if filters.get('extra_specs'):
+        query = query.filter(models.ShareInstance.share_type_id.in_(
+            _key_value_match_query(
+                context, models.ShareTypeExtraSpecs,
+                models.ShareTypeExtraSpecs.share_type_id,
+                filters['extra_specs'])))
 
     try:
         query = apply_sorting(models.Share, query, sort_key, sort_dir)
@@ -1619,6 +1873,7 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
 
 
 @require_admin_context
+@read_from_slave
 def share_get_all(context, filters=None, sort_key=None, sort_dir=None):
     query = _share_get_all_with_filters(
         context, filters=filters, sort_key=sort_key, sort_dir=sort_dir)
@@ -1626,6 +1881,7 @@ def share_get_all(context, filters=None, sort_key=None, sort_dir=None):
 
 
 @require_context
+@read_from_slave
 def share_get_all_by_project(context, project_id, filters=None,
                              is_public=False, sort_key=None, sort_dir=None):
     """Returns list of shares with given project ID."""
@@ -1660,6 +1916,7 @@ def share_get_all_by_share_server(context, share_server_id, filters=None,
 
 
 @require_context
+@_clears_request_cache
 def share_delete(context, share_id):
     session = get_session()
 
@@ -1723,6 +1980,45 @@ def share_access_create(context, values):
     return share_access_get(context, access_ref['id'])
 
 
+@require_context
+def share_access_create_all(context, share_id, values_list):
+    """Create access rules of a share with bulk inserts.
+
+    All the rules and their mappings to every instance of the share are
+    inserted within one transaction, with one statement per table.
+    """
+    session = get_session()
+    access_rows = []
+    instance_access_rows = []
+    with session.begin():
+        parent_share = share_get(context, share_id, session=session)
+
+        for values in values_list:
+            values = ensure_model_dict_has_id(copy.deepcopy(values))
+            values['share_id'] = share_id
+            if values.get('access_level') is None:
+                values['access_level'] = constants.ACCESS_LEVEL_RW
+            access_rows.append(values)
+
+            for instance in parent_share.instances:
+                instance_access_rows.append({
+                    'id': uuidutils.generate_uuid(),
+                    'share_instance_id': instance['id'],
+                    'access_id': values['id'],
+                })
+
+        session.bulk_insert_mappings(models.ShareAccessMapping, access_rows)
+        session.bulk_insert_mappings(models.ShareInstanceAccessMapping,
+                                     instance_access_rows)
+
+    if not access_rows:
+        return []
+
+    return _share_access_get_query(context, get_session(), {}).filter(
+        models.ShareAccessMapping.id.in_([r['id'] for r in access_rows])
+    ).all()
+
+
 @require_context
 def share_instance_access_create(context, values, share_instance_id):
     values = ensure_model_dict_has_id(values)
@@ -1930,6 +2226,76 @@ def share_instance_access_update(context, access_id, instance_id, updates):
 
         return access
 
+
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def share_instance_access_update_all(context, instance_id, filters=None,
+                                     updates=None, conditionally_change=None):
+    """Update access rules of a share instance with set-based statements.
+
+    State transitions from 'conditionally_change' are applied with a single
+    'UPDATE ... SET state = CASE state WHEN ... END' statement, so the
+    number of queries does not grow with the number of access rules.
+
+    :returns: dict mapping IDs of access rules that matched the filters to
+        their state after the update.
+    """
+    session = get_session()
+    filters = copy.deepcopy(filters) if filters else {}
+    updates = copy.deepcopy(updates) if updates else {}
+    conditionally_change = conditionally_change or {}
+    share_access_fields = ('access_type', 'access_to', 'access_key',
+                           'access_level')
+
+    share_access_map_updates, share_instance_access_map_updates = (
+        _extract_subdict_by_fields(updates, share_access_fields)
+    )
+    state = share_instance_access_map_updates.pop('state', None)
+    mapping_model = models.ShareInstanceAccessMapping
+
+    with session.begin():
+        query = _share_instance_access_query(
+            context, session, instance_id=instance_id)
+        query = exact_filter(query, mapping_model, filters,
+                             ('id', 'access_id', 'state'))
+        matched_rules = query.with_entities(
+            mapping_model.access_id, mapping_model.state).with_for_update(
+        ).all()
+
+        if not matched_rules:
+            return {}
+
+        access_ids = [rule.access_id for rule in matched_rules]
+        mapping_query = _share_instance_access_query(
+            context, session, instance_id=instance_id).filter(
+            mapping_model.access_id.in_(access_ids))
+
+        if conditionally_change:
+            if not (state or share_instance_access_map_updates):
+                # Only rules in one of the source states are going to change
+                mapping_query = mapping_query.filter(
+                    mapping_model.state.in_(list(conditionally_change)))
+            share_instance_access_map_updates['state'] = case(
+                conditionally_change, value=mapping_model.state,
+                else_=state if state else mapping_model.state)
+        elif state:
+            share_instance_access_map_updates['state'] = state
+
+        if share_instance_access_map_updates:
+            mapping_query.update(share_instance_access_map_updates,
+                                 synchronize_session=False)
+
+        if share_access_map_updates:
+            _share_access_get_query(context, session, {}).filter(
+                models.ShareAccessMapping.id.in_(access_ids)).update(
+                share_access_map_updates, synchronize_session=False)
+
+    return {
+        rule.access_id: conditionally_change.get(
+            rule.state, state or rule.state)
+        for rule in matched_rules
+    }
+
 ###################
 
 
@@ -2200,6 +2566,7 @@ def _share_snapshot_get_all_with_filters(context, project_id=None,
 
 
 @require_admin_context
+@read_from_slave
 def share_snapshot_get_all(context, filters=None, sort_key=None,
                            sort_dir=None):
     return _share_snapshot_get_all_with_filters(
@@ -2208,6 +2575,7 @@ def share_snapshot_get_all(context, filters=None, sort_key=None,
 
 
 @require_context
+@read_from_slave
 def share_snapshot_get_all_by_project(context, project_id, filters=None,
                                       sort_key=None, sort_dir=None):
     authorize_project_context(context, project_id)
@@ -2531,6 +2899,7 @@ def share_metadata_get(context, share_id):
 
 @require_context
 @require_share_exists
+@_clears_request_cache
 def share_metadata_delete(context, share_id, key):
     _share_metadata_get_query(context, share_id).\
         filter_by(key=key).soft_delete()
@@ -2538,6 +2907,7 @@ def share_metadata_delete(context, share_id, key):
 
 @require_context
 @require_share_exists
+@_clears_request_cache
 def share_metadata_update(context, share_id, metadata, delete):
     return _share_metadata_update(context, share_id, metadata, delete)
 
@@ -2702,6 +3072,7 @@ def share_export_location_get_by_uuid(context, export_location_uuid,
 
 @require_context
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@_clears_request_cache
 def share_export_locations_update(context, share_instance_id, export_locations,
                                   delete):
     # NOTE(u_glide):
@@ -2968,6 +3339,7 @@ def share_network_create(context, values):
 
 
 @require_context
+@_clears_request_cache
 def share_network_delete(context, id):
     session = get_session()
     with session.begin():
@@ -2976,6 +3348,7 @@ def share_network_delete(context, id):
 
 
 @require_context
+@_clears_request_cache
 def share_network_update(context, id, values):
     session = get_session()
     with session.begin():
@@ -2986,6 +3359,7 @@ def share_network_update(context, id, values):
 
 
 @require_context
+@_request_cached
 def share_network_get(context, id, session=None):
     result = _network_get_query(context, session).filter_by(id=id).first()
     if result is None:
@@ -2994,11 +3368,13 @@ def share_network_get(context, id, session=None):
 
 
 @require_context
+@read_from_slave
 def share_network_get_all(context):
     return _network_get_query(context).all()
 
 
 @require_context
+@read_from_slave
 def share_network_get_all_by_project(context, project_id, user_id=None,
                                      session=None):
     query = _network_get_query(context, session)
@@ -3020,6 +3396,7 @@ def share_network_get_all_by_security_service(context, security_service_id):
 
 
 @require_context
+@_clears_request_cache
 def share_network_add_security_service(context, id, security_service_id):
     session = get_session()
 
@@ -3049,6 +3426,7 @@ def share_network_add_security_service(context, id, security_service_id):
 
 
 @require_context
+@_clears_request_cache
 def share_network_remove_security_service(context, id, security_service_id):
     session = get_session()
 
@@ -3101,6 +3479,7 @@ def share_server_create(context, values):
 
 
 @require_context
+@_clears_request_cache
 def share_server_delete(context, id):
     session = get_session()
     with session.begin():
@@ -3110,6 +3489,7 @@ def share_server_delete(context, id):
 
 
 @require_context
+@_clears_request_cache
 def share_server_update(context, id, values):
     session = get_session()
     with session.begin():
@@ -3177,19 +3557,52 @@ def share_server_get_all_unused_deletable(context, host, updated_before):
 
 
 @require_context
-def share_server_backend_details_set(context, share_server_id, server_details):
-    share_server_get(context, share_server_id)
+def share_server_get_all_free_by_host_and_share_net(context, host,
+                                                    share_net_id):
+    return _server_get_query(context)\
+        .filter_by(host=host)\
+        .filter_by(share_network_id=share_net_id)\
+        .filter_by(status=constants.STATUS_ACTIVE)\
+        .filter(~models.ShareServer.share_groups.any())\
+        .filter(~models.ShareServer.share_instances.any())\
+        .order_by(models.ShareServer.created_at.desc()).all()
 
-    for meta_key, meta_value in server_details.items():
-        meta_ref = models.ShareServerBackendDetails()
-        meta_ref.update({
-            'key': meta_key,
-            'value': meta_value,
-            'share_server_id': share_server_id
-        })
-        session = get_session()
-        with session.begin():
-            meta_ref.save(session)
+
+@require_context
+def share_server_backend_details_set(context, share_server_id, server_details,
+                                     check_exists=True):
+    session = get_session()
+    with session.begin():
+        if check_exists:
+            server_exists = model_query(
+                context, models.ShareServer, models.ShareServer.id,
+                session=session).filter_by(id=share_server_id).first()
+            if server_exists is None:
+                raise exception.ShareServerNotFound(
+                    share_server_id=share_server_id)
+
+        new_details = dict(server_details)
+        if new_details:
+            existing_details = model_query(
+                context, models.ShareServerBackendDetails, session=session,
+                read_deleted="no").\
+                filter_by(share_server_id=share_server_id).\
+                filter(models.ShareServerBackendDetails.key.in_(
+                    list(new_details))).\
+                all()
+            for meta_ref in existing_details:
+                if meta_ref.key in new_details:
+                    meta_ref.value = new_details.pop(meta_ref.key)
+
+        # New rows are inserted together when the transaction is committed.
+        for meta_key, meta_value in new_details.items():
+            meta_ref = models.ShareServerBackendDetails()
+            meta_ref.update({
+                'key': meta_key,
+                'value': meta_value,
+                'share_server_id': share_server_id
+            })
+            session.add(meta_ref)
     return server_details
 
 
@@ -3251,29 +3664,36 @@ def driver_private_data_update(context, entity_id, details,
         session = get_session()
 
     with session.begin():
-        # Process existing data
-        # NOTE(u_glide): read_deleted=None means here 'read all'
-        original_data = _driver_private_data_query(
-            session, context, entity_id, read_deleted=None).all()
+        if delete_existing:
+            # Soft-delete all keys which are not going to be rewritten
+            # with a single statement.
+            query = _driver_private_data_query(session, context, entity_id)
+            if new_details:
+                query = query.filter(
+                    ~models.DriverPrivateData.key.in_(list(new_details)))
+            query.update({"deleted": 1, "deleted_at": timeutils.utcnow()},
+                         synchronize_session=False)
+
+        # Process existing data, only rows of the written keys are needed.
+        # Deleted rows are read too, they are revived instead of inserting
+        # rows violating the unique constraint.
+        original_data = []
+        if new_details:
+            original_data = _driver_private_data_query(
+                session, context, entity_id, key=list(new_details),
+                read_deleted="all").all()
 
         for data_ref in original_data:
-            in_new_details = data_ref['key'] in new_details
-
-            if in_new_details:
-                new_value = six.text_type(new_details.pop(data_ref['key']))
-                data_ref.update({
-                    "value": new_value,
-                    "deleted": 0,
-                    "deleted_at": None
-                })
-                data_ref.save(session=session)
-            elif delete_existing and data_ref['deleted'] != 1:
-                data_ref.update({
-                    "deleted": 1, "deleted_at": timeutils.utcnow()
-                })
-                data_ref.save(session=session)
+            if data_ref['key'] not in new_details:
+                continue
+            new_value = six.text_type(new_details.pop(data_ref['key']))
+            data_ref.update({
+                "value": new_value,
+                "deleted": 0,
+                "deleted_at": None
+            })
 
-        # Add new data
+        # Add new data, rows are flushed together on commit
         for key, value in new_details.items():
             data_ref = models.DriverPrivateData()
             data_ref.update({
@@ -3281,7 +3701,7 @@ def driver_private_data_update(context, entity_id, details,
                 "key": key,
                 "value": six.text_type(value)
             })
-            data_ref.save(session=session)
+            session.add(data_ref)
 
         return details
 
@@ -3396,6 +3816,38 @@ def _dict_with_specs(inst_type_query, specs_key='extra_specs'):
     return inst_type_dict
 
 
+_SHARE_TYPES_GENERATION_ID = 1
+
+
+def _share_types_generation_bump(context, session):
+    """Invalidate share type caches of all services.
+
+    Must be called in the transaction changing share types, their extra
+    specs or access lists.
+    """
+    updated = model_query(
+        context, models.ShareTypesGeneration, session=session,
+        read_deleted="no").\
+        filter_by(id=_SHARE_TYPES_GENERATION_ID).\
+        update({'generation': models.ShareTypesGeneration.generation + 1},
+               synchronize_session=False)
+    if not updated:
+        generation_ref = models.ShareTypesGeneration()
+        generation_ref.update({'id': _SHARE_TYPES_GENERATION_ID,
+                               'generation': 1})
+        session.add(generation_ref)
+
+
+@require_context
+def share_types_generation_get(context):
+    result = model_query(
+        context, models.ShareTypesGeneration,
+        models.ShareTypesGeneration.generation, read_deleted="no").\
+        filter_by(id=_SHARE_TYPES_GENERATION_ID).\
+        first()
+    return result.generation if result else 0
+
+
 @require_admin_context
 def share_type_create(context, values, projects=None):
     """Create a new share type.
@@ -3427,6 +3879,8 @@ def share_type_create(context, values, projects=None):
                                "project_id": project})
             access_ref.save(session=session)
 
+        _share_types_generation_bump(context, session)
+
         return share_type_ref
 
 
@@ -3519,6 +3973,7 @@ def _share_type_get(context, id, session=None, inactive=False,
 
 
 @require_context
+@_request_cached
 def share_type_get(context, id, inactive=False, expected_fields=None):
     """Return a dict describing specific share_type."""
     return _share_type_get(context, id,
@@ -3561,6 +4016,7 @@ def share_type_get_by_name_or_id(context, name_or_id):
 
 
 @require_admin_context
+@_clears_request_cache
 def share_type_destroy(context, id):
     session = get_session()
     with session.begin():
@@ -3582,6 +4038,7 @@ def share_type_destroy(context, id):
             filter_by(share_type_id=id).soft_delete()
         model_query(context, models.ShareTypes, session=session).\
             filter_by(id=id).soft_delete()
+        _share_types_generation_bump(context, session)
 
 
 def _share_type_access_query(context, session=None):
@@ -3597,6 +4054,7 @@ def share_type_access_get_all(context, type_id):
 
 
 @require_admin_context
+@_clears_request_cache
 def share_type_access_add(context, type_id, project_id):
     """Add given tenant to the share type access list."""
     share_type_id = _share_type_get_id_from_share_type(context, type_id)
@@ -3612,21 +4070,26 @@ def share_type_access_add(context, type_id, project_id):
         except db_exception.DBDuplicateEntry:
             raise exception.ShareTypeAccessExists(share_type_id=type_id,
                                                   project_id=project_id)
+        _share_types_generation_bump(context, session)
         return access_ref
 
 
 @require_admin_context
+@_clears_request_cache
 def share_type_access_remove(context, type_id, project_id):
     """Remove given tenant from the share type access list."""
     share_type_id = _share_type_get_id_from_share_type(context, type_id)
 
-    count = _share_type_access_query(context).\
-        filter_by(share_type_id=share_type_id).\
-        filter_by(project_id=project_id).\
-        soft_delete(synchronize_session=False)
-    if count == 0:
-        raise exception.ShareTypeAccessNotFound(
-            share_type_id=type_id, project_id=project_id)
+    session = get_session()
+    with session.begin():
+        count = _share_type_access_query(context, session).\
+            filter_by(share_type_id=share_type_id).\
+            filter_by(project_id=project_id).\
+            soft_delete(synchronize_session=False)
+        if count == 0:
+            raise exception.ShareTypeAccessNotFound(
+                share_type_id=type_id, project_id=project_id)
+        _share_types_generation_bump(context, session)
 
 ####################
 
@@ -3651,12 +4114,14 @@ def share_type_extra_specs_get(context, share_type_id):
 
 
 @require_context
+@_clears_request_cache
 def share_type_extra_specs_delete(context, share_type_id, key):
     session = get_session()
     with session.begin():
         _share_type_extra_specs_get_item(context, share_type_id, key, session)
         _share_type_extra_specs_query(context, share_type_id, session).\
             filter_by(key=key).soft_delete()
+        _share_types_generation_bump(context, session)
 
 
 def _share_type_extra_specs_get_item(context, share_type_id, key,
@@ -3675,6 +4140,7 @@ def _share_type_extra_specs_get_item(context, share_type_id, key,
 
 @require_context
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@_clears_request_cache
 def share_type_extra_specs_update_or_create(context, share_type_id, specs):
     session = get_session()
     with session.begin():
@@ -3690,6 +4156,8 @@ def share_type_extra_specs_update_or_create(context, share_type_id, specs):
                              "deleted": 0})
             spec_ref.save(session=session)
 
+        _share_types_generation_bump(context, session)
+
         return specs
 
 
@@ -3712,6 +4180,7 @@ def _ensure_availability_zone_exists(context, values, session, strict=True):
 
 
 @require_context
+@_request_cached
 def availability_zone_get(context, id_or_name, session=None):
     if session is None:
         session = get_session()
@@ -3733,6 +4202,7 @@ def availability_zone_get(context, id_or_name, session=None):
 
 @require_context
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@_clears_request_cache
 def availability_zone_create_if_not_exist(context, name, session=None):
     if session is None:
         session = get_session()
@@ -3888,6 +4358,7 @@ def _share_group_get_all(context, project_id=None, share_server_id=None,
 
 
 @require_admin_context
+@read_from_slave
 def share_group_get_all(context, detailed=True, filters=None, sort_key=None,
                         sort_dir=None):
     return _share_group_get_all(
@@ -3901,6 +4372,7 @@ def share_group_get_all_by_host(context, host, detailed=True):
 
 
 @require_context
+@read_from_slave
 def share_group_get_all_by_project(context, project_id, detailed=True,
                                    filters=None, sort_key=None, sort_dir=None):
     authorize_project_context(context, project_id)
@@ -330,6 +330,9 @@ class Share(BASE, ManilaBase):
 
 class ShareInstance(BASE, ManilaBase):
     __tablename__ = 'share_instances'
+    __table_args__ = (
+        schema.Index("share_instances_host_deleted_idx", "host", "deleted"),
+    )
 
     _extra_keys = ['name', 'export_location', 'availability_zone',
                    'replica_state']
@@ -423,6 +426,11 @@ class ShareInstance(BASE, ManilaBase):
 class ShareInstanceExportLocations(BASE, ManilaBase):
     """Represents export locations of share instances."""
     __tablename__ = 'share_instance_export_locations'
+    __table_args__ = (
+        schema.Index(
+            "share_instance_export_locations_share_instance_id_deleted_idx",
+            "share_instance_id", "deleted"),
+    )
 
     _extra_keys = ['el_metadata', ]
 
@@ -499,9 +507,24 @@ class ShareTypeProjects(BASE, ManilaBase):
                     'ShareTypeProjects.deleted == 0)')
 
 
+class ShareTypesGeneration(BASE, ManilaBase):
+    """Counter increased on every change of share types.
+
+    Covers share types, their extra specs and access lists, and lets
+    processes caching share types check whether their cache is stale.
+    """
+    __tablename__ = 'share_types_generation'
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+
 class ShareTypeExtraSpecs(BASE, ManilaBase):
     """Represents additional specs as key/value pairs for a share_type."""
     __tablename__ = 'share_type_extra_specs'
+    __table_args__ = (schema.Index(
+        "share_type_extra_specs_share_type_id_spec_key_spec_value_idx",
+        "share_type_id", "spec_key", "spec_value"),
+    )
     id = Column(Integer, primary_key=True)
     key = Column("spec_key", String(255))
     value = Column("spec_value", String(255))
@@ -520,6 +543,10 @@ class ShareTypeExtraSpecs(BASE, ManilaBase):
 class ShareMetadata(BASE, ManilaBase):
     """Represents a metadata key/value pair for a share."""
     __tablename__ = 'share_metadata'
+    __table_args__ = (schema.Index(
+        "share_metadata_key_value_share_id_idx", "key", "value", "share_id",
+        mysql_length={'value': 255}),
+    )
     id = Column(Integer, primary_key=True)
     key = Column(String(255), nullable=False)
     value = Column(String(1023), nullable=False)
@@ -570,6 +597,11 @@ class ShareInstanceAccessMapping(BASE, ManilaBase):
     """Represents access to individual share instances."""
 
     __tablename__ = 'share_instance_access_map'
+    __table_args__ = (
+        schema.Index(
+            "share_instance_access_map_share_instance_id_deleted_state_idx",
+            "share_instance_id", "deleted", "state"),
+    )
     _proxified_properties = ('share_id', 'access_type', 'access_key',
                              'access_to', 'access_level')
 
@@ -722,6 +754,14 @@ class ShareSnapshot(BASE, ManilaBase):
 class ShareSnapshotInstance(BASE, ManilaBase):
     """Represents a snapshot of a share."""
     __tablename__ = 'share_snapshot_instances'
+    __table_args__ = (
+        schema.Index(
+            "share_snapshot_instances_snapshot_id_deleted_idx",
+            "snapshot_id", "deleted"),
+        schema.Index(
+            "share_snapshot_instances_share_instance_id_deleted_idx",
+            "share_instance_id", "deleted"),
+    )
     _extra_keys = ['name', 'share_id', 'share_name']
 
     @property
@@ -905,6 +945,11 @@ class ShareNetwork(BASE, ManilaBase):
 class ShareServer(BASE, ManilaBase):
     """Represents share server used by share."""
     __tablename__ = 'share_servers'
+    __table_args__ = (
+        schema.Index(
+            "share_servers_host_deleted_status_updated_at_idx",
+            "host", "deleted", "status", "updated_at"),
+    )
     id = Column(String(36), primary_key=True, nullable=False)
     deleted = Column(String(36), default='False')
     share_network_id = Column(String(36), ForeignKey('share_networks.id'),
@@ -976,6 +1021,11 @@ class ShareNetworkSecurityServiceAssociation(BASE, ManilaBase):
 class NetworkAllocation(BASE, ManilaBase):
     """Represents network allocation data."""
     __tablename__ = 'network_allocations'
+    __table_args__ = (
+        schema.Index(
+            "network_allocations_ip_address_deleted_idx",
+            "ip_address", "deleted"),
+    )
     id = Column(String(36), primary_key=True, nullable=False)
     deleted = Column(String(36), default='False')
     label = Column(String(255), nullable=True)
@@ -51,21 +51,144 @@ This module provides Manager, a base class for managers.
 
 """
 
+import copy
+import random
+
+import eventlet
 from oslo_config import cfg
 from oslo_log import log
 from oslo_service import periodic_task
+from oslo_utils import timeutils
 
 from manila.db import base
+from manila.i18n import _LE, _LW
 from manila.scheduler import rpcapi as scheduler_rpcapi
+from manila.scheduler import utils as scheduler_utils
 from manila import version
 
 CONF = cfg.CONF
+CONF.import_opt('periodic_tasks_concurrency', 'manila.service')
+CONF.import_opt('periodic_task_jitter', 'manila.service')
+CONF.import_opt('capabilities_full_report_interval', 'manila.service')
 LOG = log.getLogger(__name__)
 
+# Shortest time the periodic tasks dispatcher sleeps between checks.
+MIN_PERIODIC_IDLE = 1
+
 
 class PeriodicTasks(periodic_task.PeriodicTasks):
     def __init__(self):
         super(PeriodicTasks, self).__init__(CONF)
+        self._periodic_pool = None
+        self._periodic_next_run = {}
+        self._periodic_running = set()
+        self._periodic_task_stats = {}
+
+    def run_periodic_tasks(self, context, raise_on_error=False):
+        """Run due periodic tasks.
+
+        If 'periodic_tasks_concurrency' is set, due tasks are spawned in a
+        bounded pool instead of being run one by one, and 'raise_on_error'
+        is ignored because errors are raised in the pool.
+
+        :returns: number of seconds until any periodic task is due.
+        """
+        if not CONF.periodic_tasks_concurrency:
+            return super(PeriodicTasks, self).run_periodic_tasks(
+                context, raise_on_error=raise_on_error)
+        return self._dispatch_periodic_tasks(context)
+
+    def get_periodic_task_stats(self):
+        """Return run statistics of periodic tasks run by the pool."""
+        return dict((name, dict(stats))
+                    for name, stats in self._periodic_task_stats.items())
+
+    def _get_periodic_task_stats(self, task_name):
+        return self._periodic_task_stats.setdefault(task_name, {
+            'runs': 0,
+            'skipped': 0,
+            'overruns': 0,
+            'last_duration': None,
+            'max_duration': 0,
+        })
+
+    def _get_next_periodic_run(self, current_time, spacing):
+        jitter = spacing * CONF.periodic_task_jitter * random.random()
+        return current_time + spacing + jitter
+
+    def _dispatch_periodic_tasks(self, context):
+        if self._periodic_pool is None:
+            self._periodic_pool = eventlet.GreenPool(
+                CONF.periodic_tasks_concurrency)
+
+        idle_for = periodic_task.DEFAULT_INTERVAL
+        for task_name, task in self._periodic_tasks:
+            if (task._periodic_external_ok and
+                    not CONF.run_external_periodic_tasks):
+                continue
+
+            spacing = self._periodic_spacing[task_name]
+            current_time = timeutils.now()
+            next_run = self._periodic_next_run.get(task_name)
+            if next_run is None:
+                last_run = self._periodic_last_run[task_name]
+                next_run = (current_time if last_run is None
+                            else last_run + spacing)
+                self._periodic_next_run[task_name] = next_run
+
+            if next_run > current_time:
+                idle_for = min(idle_for, next_run - current_time)
+                continue
+
+            if task_name in self._periodic_running:
+                self._get_periodic_task_stats(task_name)['skipped'] += 1
+                LOG.warning(_LW("Periodic task %s is still running, skipping "
+                                "its next run."), task_name)
+            elif not self._periodic_pool.free():
+                # Retry on the next check instead of waiting for a full
+                # interval.
+                LOG.debug("No free slot to run periodic task %s.", task_name)
+                idle_for = MIN_PERIODIC_IDLE
+                continue
+            else:
+                LOG.debug("Running periodic task %s.", task_name)
+                self._periodic_last_run[task_name] = current_time
+                self._periodic_running.add(task_name)
+                self._periodic_pool.spawn_n(
+                    self._run_periodic_task, context, task_name, task,
+                    spacing)
+
+            next_run = self._get_next_periodic_run(current_time, spacing)
+            self._periodic_next_run[task_name] = next_run
+            idle_for = min(idle_for, next_run - current_time)
+
+        return max(idle_for, MIN_PERIODIC_IDLE)
+
+    def _run_periodic_task(self, context, task_name, task, spacing):
+        start_time = timeutils.now()
+        try:
+            task(self, context)
+        except Exception:
+            LOG.exception(_LE("Error during periodic task %s."), task_name)
+        finally:
+            duration = timeutils.now() - start_time
+            self._periodic_running.discard(task_name)
+
+            stats = self._get_periodic_task_stats(task_name)
+            stats['runs'] += 1
+            stats['last_duration'] = duration
+            stats['max_duration'] = max(stats['max_duration'], duration)
+            if duration > spacing:
+                stats['overruns'] += 1
+                LOG.warning(_LW("Periodic task %(task)s took %(duration).1f "
+                                "seconds, longer than its interval of "
+                                "%(spacing)s seconds."),
+                            {'task': task_name, 'duration': duration,
+                             'spacing': spacing})
+            else:
+                LOG.debug("Periodic task %(task)s took %(duration).1f "
+                          "seconds.", {'task': task_name,
+                                       'duration': duration})
 
 
 class Manager(base.Base, PeriodicTasks):
@@ -129,6 +252,10 @@ class SchedulerDependentManager(Manager):
         self.last_capabilities = None
         self.service_name = service_name
         self.scheduler_rpcapi = scheduler_rpcapi.SchedulerAPI()
+        # Capabilities the last report sent to the schedulers was based on,
+        # and the sequence number of that report.
+        self._published_capabilities = None
+        self._capabilities_seq = 0
         super(SchedulerDependentManager, self).__init__(host, db_driver)
 
     def update_service_capabilities(self, capabilities):
@@ -136,12 +263,45 @@ class SchedulerDependentManager(Manager):
         self.last_capabilities = capabilities
 
     @periodic_task.periodic_task
-    def _publish_service_capabilities(self, context):
-        """Pass data back to the scheduler at a periodic interval."""
-        if self.last_capabilities:
+    def _publish_service_capabilities(self, context, full_report=False):
+        """Pass data back to the scheduler at a periodic interval.
+
+        If capabilities_full_report_interval is greater than 0, only the
+        changes since the previous report are sent, except for every
+        capabilities_full_report_interval-th report and for reports with
+        full_report set, which contain all the capabilities.
+        """
+        if not self.last_capabilities:
+            return
+
+        full_report_interval = CONF.capabilities_full_report_interval
+        if not full_report_interval:
             LOG.debug('Notifying Schedulers of capabilities ...')
             self.scheduler_rpcapi.update_service_capabilities(
                 context,
                 self.service_name,
                 self.host,
                 self.last_capabilities)
+            return
+
+        self._capabilities_seq += 1
+        if (full_report or self._published_capabilities is None or
+                self._capabilities_seq % full_report_interval == 0):
+            LOG.debug('Notifying Schedulers of capabilities ...')
+            capabilities = self.last_capabilities
+            is_delta = False
+        else:
+            capabilities = scheduler_utils.get_capabilities_delta(
+                self._published_capabilities, self.last_capabilities)
+            is_delta = True
+            LOG.debug('Notifying Schedulers of capabilities changes ...')
+
+        self.scheduler_rpcapi.update_service_capabilities(
+            context,
+            self.service_name,
+            self.host,
+            capabilities,
+            seq=self._capabilities_seq,
+            is_delta=is_delta)
+        # Drivers may reuse and modify their stats dict in place.
+        self._published_capabilities = copy.deepcopy(self.last_capabilities)
@@ -49,6 +49,13 @@ quota_opts = [
     cfg.IntOpt('reservation_expire',
                default=86400,
                help='Number of seconds until a reservation expires.'),
+    cfg.IntOpt('reservation_expire_batch_size',
+               default=1000,
+               min=0,
+               help='Maximum number of expired reservations rolled back in '
+                    'a single database transaction by the periodic '
+                    'reservation expiry task. 0 expires all of them in one '
+                    'transaction.'),
     cfg.IntOpt('until_refresh',
                default=0,
                help='Count of reservations until usage is refreshed.'),
@@ -57,7 +64,16 @@ quota_opts = [
                help='Number of seconds between subsequent usage refreshes.'),
     cfg.StrOpt('quota_driver',
                default='manila.quota.DbQuotaDriver',
-               help='Default driver to use for quota checks.'), ]
+               help='Default driver to use for quota checks.'),
+    cfg.IntOpt('quota_limits_cache_ttl',
+               default=0,
+               min=0,
+               help='Number of seconds resolved quota limits are cached '
+                    'per project, user and quota class when checking and '
+                    'reserving quotas. Quota changes made through the API '
+                    'service invalidate its cache immediately; other '
+                    'services pick them up once their cached entry '
+                    'expires. 0 disables the cache.'), ]
 
 CONF = cfg.CONF
 CONF.register_opts(quota_opts)
@@ -70,6 +86,12 @@ class DbQuotaDriver(object):
     quota information.  The default driver utilizes the local
     database.
     """
+
+    def __init__(self):
+        # Maps (project_id, user_id, quota_class) to a tuple of the
+        # expiration time and the limits returned by the database.
+        self._limits_cache = {}
+
     def get_by_project_and_user(self, context, project_id, user_id, resource):
         """Get a specific quota by project and user."""
 
@@ -305,7 +327,12 @@ class DbQuotaDriver(object):
                         resource, owned/created by different user)
         """
 
-        # Filter resources
+        sub_resources = self._filter_resources(resources, keys, has_sync)
+        limits = self._get_limits(context, project_id, user_id)
+        return self._resolve_limits(sub_resources, limits,
+                                    per_user=bool(user_id))
+
+    def _filter_resources(self, resources, keys, has_sync):
         if has_sync:
             sync_filt = lambda x: hasattr(x, 'sync')
         else:
@@ -319,19 +346,55 @@ class DbQuotaDriver(object):
             unknown = desired - set(sub_resources.keys())
             raise exception.QuotaResourceUnknown(unknown=sorted(unknown))
 
-        if user_id:
-            # Grab and return the quotas (without usages)
-            quotas = self.get_user_quotas(context, sub_resources,
-                                          project_id, user_id,
-                                          context.quota_class, usages=False)
-        else:
-            # Grab and return the quotas (without usages)
-            quotas = self.get_project_quotas(context, sub_resources,
-                                             project_id,
-                                             context.quota_class,
-                                             usages=False)
+        return sub_resources
 
-        return {k: v['limit'] for k, v in quotas.items()}
+    def _get_limits(self, context, project_id, user_id=None):
+        """Fetch the hard limits applying to a project and user.
+
+        Project, user, quota class and default limits are read with a
+        single database query and, if 'quota_limits_cache_ttl' is set,
+        cached for that many seconds.
+        """
+        ttl = CONF.quota_limits_cache_ttl
+        key = (project_id, user_id, context.quota_class)
+        # NOTE: cached limits are only served to contexts that would pass
+        # the project authorization check done by the database API.
+        if ttl and (context.is_admin or context.project_id == project_id):
+            cached = self._limits_cache.get(key)
+            if cached and cached[0] > timeutils.utcnow():
+                return cached[1]
+
+        limits = db.quota_get_all_limits(context, project_id,
+                                         user_id=user_id,
+                                         quota_class=context.quota_class)
+        if ttl:
+            now = timeutils.utcnow()
+            self._limits_cache = {k: v for k, v in self._limits_cache.items()
+                                  if v[0] > now}
+            self._limits_cache[key] = (
+                now + datetime.timedelta(seconds=ttl), limits)
+        return limits
+
+    @staticmethod
+    def _resolve_limits(resources, limits, per_user=False):
+        quotas = dict(limits['project'])
+        if per_user:
+            # User quotas override project quotas.
+            quotas.update(limits['user'])
+        return {
+            name: quotas.get(
+                name, limits['class'].get(
+                    name, limits['default'].get(name, resource.default)))
+            for name, resource in resources.items()
+        }
+
+    def invalidate_limits_cache(self, project_id=None):
+        """Drop cached limits of a project or, if not given, all of them."""
+        if project_id is None:
+            self._limits_cache = {}
+        else:
+            self._limits_cache = {k: v for k, v in self._limits_cache.items()
+                                  if k[0] != project_id}
 
     def limit_check(self, context, resources, values, project_id=None,
                     user_id=None):
@@ -376,11 +439,12 @@ class DbQuotaDriver(object):
             user_id = context.user_id
 
         # Get the applicable quotas
-        quotas = self._get_quotas(context, resources, values.keys(),
-                                  has_sync=False, project_id=project_id)
-        user_quotas = self._get_quotas(context, resources, values.keys(),
-                                       has_sync=False, project_id=project_id,
-                                       user_id=user_id)
+        sub_resources = self._filter_resources(resources, values.keys(),
+                                               has_sync=False)
+        limits = self._get_limits(context, project_id, user_id)
+        quotas = self._resolve_limits(sub_resources, limits)
+        user_quotas = self._resolve_limits(sub_resources, limits,
+                                           per_user=True)
 
         # Check the quotas and construct a list of the resources that
         # would be put over limit by the desired values
@@ -452,11 +516,12 @@ class DbQuotaDriver(object):
         # NOTE(Vek): We're not worried about races at this point.
         #            Yes, the admin may be in the process of reducing
         #            quotas, but that's a pretty rare thing.
-        quotas = self._get_quotas(context, resources, deltas.keys(),
-                                  has_sync=True, project_id=project_id)
-        user_quotas = self._get_quotas(context, resources, deltas.keys(),
-                                       has_sync=True, project_id=project_id,
-                                       user_id=user_id)
+        sub_resources = self._filter_resources(resources, deltas.keys(),
+                                               has_sync=True)
+        limits = self._get_limits(context, project_id, user_id)
+        quotas = self._resolve_limits(sub_resources, limits)
+        user_quotas = self._resolve_limits(sub_resources, limits,
+                                           per_user=True)
 
         # NOTE(Vek): Most of the work here has to be done in the DB
         #            API, because we have to do it in a transaction,
@@ -558,6 +623,7 @@ class DbQuotaDriver(object):
         """
 
         db.quota_destroy_all_by_project(context, project_id)
+        self.invalidate_limits_cache(project_id)
 
     def destroy_all_by_project_and_user(self, context, project_id, user_id):
         """Destroy metadata associated with a project and user.
@@ -571,6 +637,7 @@ class DbQuotaDriver(object):
         """
 
         db.quota_destroy_all_by_project_and_user(context, project_id, user_id)
+        self.invalidate_limits_cache(project_id)
 
     def expire(self, context):
         """Expire reservations.
@@ -581,7 +648,8 @@ class DbQuotaDriver(object):
         :param context: The request context, for access checks.
         """
 
-        db.reservation_expire(context)
+        db.reservation_expire(
+            context, batch_size=CONF.reservation_expire_batch_size)
 
 
 class BaseResource(object):
@@ -1072,6 +1140,19 @@ class QuotaEngine(object):
 
         self._driver.expire(context)
 
+    def invalidate_limits_cache(self, project_id=None):
+        """Drop cached quota limits after quotas have been changed.
+
+        :param project_id: The ID of the project whose quotas changed. If
+                           not specified, cached limits of every project
+                           are dropped, e.g. after a quota class update.
+        """
+
+        # NOTE: custom quota drivers are not required to cache limits.
+        invalidate = getattr(self._driver, 'invalidate_limits_cache', None)
+        if invalidate:
+            invalidate(project_id)
+
     @property
     def resources(self):
         return sorted(self._resources.keys())
@@ -20,6 +20,7 @@
 Manage hosts in the current zone.
 """
 
+import datetime
 import re
 try:
     from UserDict import IterableUserDict  # noqa
@@ -57,7 +58,16 @@ host_manager_opts = [
                     'CapacityWeigher',
                     'GoodnessWeigher',
                 ],
-                help='Which weigher class names to use for weighing hosts.')
+                help='Which weigher class names to use for weighing hosts.'),
+    cfg.IntOpt('scheduler_service_cache_ttl',
+               default=0,
+               min=0,
+               help='Number of seconds the scheduler reuses the share '
+                    'service records, with their latest heartbeats, instead '
+                    'of reading them from the database for every request. '
+                    'Services are seen as down or up with up to this delay, '
+                    'so it should be well below service_down_time. Value 0 '
+                    'reads the records for every request.'),
 ]
 
 CONF = cfg.CONF
@@ -434,6 +444,13 @@ class HostManager(object):
     def __init__(self):
         self.service_states = {}  # { <host>: {<service>: {cap k : v}}}
         self.host_state_map = {}
+        # Share service records and the time they are reused until.
+        self._share_services = None
+        self._share_services_expiry = None
+        # Sequence number of the last capability report applied for each
+        # host, and the reported capabilities following deltas are based on.
+        self.service_capabilities_seq = {}  # { <host>: <int> }
+        self.reported_capabilities = {}  # { <host>: {cap k : v} }
         self.filter_handler = base_host_filter.HostFilterHandler(
             'manila.scheduler.filters')
         self.filter_classes = self.filter_handler.get_all_classes()
@@ -518,29 +535,70 @@ class HostManager(object):
                                                        hosts,
                                                        weight_properties)
 
-    def update_service_capabilities(self, service_name, host, capabilities):
-        """Update the per-service capabilities based on this notification."""
+    def update_service_capabilities(self, service_name, host, capabilities,
+                                    seq=None, is_delta=False):
+        """Update the per-service capabilities based on this notification.
+
+        :param seq: sequence number of the report, None for services that
+            always report all of their capabilities.
+        :param is_delta: whether capabilities only hold the changes since
+            the report with sequence number seq - 1.
+        """
         if service_name not in ('share',):
             LOG.debug('Ignoring %(service_name)s service update '
                       'from %(host)s',
                       {'service_name': service_name, 'host': host})
             return
 
+        timestamp = timeutils.utcnow()  # Reported time
+
+        if is_delta:
+            last_seq = self.service_capabilities_seq.get(host)
+            if last_seq is None or seq != last_seq + 1:
+                # A report was missed, so capabilities are stale until the
+                # next full report.
+                LOG.debug('Ignoring %(service_name)s service capabilities '
+                          'changes %(seq)s from %(host)s, last applied '
+                          'report is %(last_seq)s.',
+                          {'service_name': service_name, 'host': host,
+                           'seq': seq, 'last_seq': last_seq})
+                return
+            capabilities = scheduler_utils.apply_capabilities_delta(
+                self.reported_capabilities[host], capabilities)
+
+        if seq is None:
+            self.service_capabilities_seq.pop(host, None)
+            self.reported_capabilities.pop(host, None)
+        else:
+            self.service_capabilities_seq[host] = seq
+            self.reported_capabilities[host] = capabilities
+
         # Copy the capabilities, so we don't modify the original dict
         capability_copy = dict(capabilities)
-        capability_copy["timestamp"] = timeutils.utcnow()  # Reported time
+        capability_copy["timestamp"] = timestamp
         self.service_states[host] = capability_copy
 
         LOG.debug("Received %(service_name)s service update from "
-                  "%(host)s: %(cap)s" %
+                  "%(host)s: %(cap)s",
                   {'service_name': service_name, 'host': host,
                    'cap': capabilities})
 
+    def _get_share_services(self, context):
+        """Returns share service records, cached for a configured time."""
+        now = timeutils.utcnow()
+        ttl = CONF.scheduler_service_cache_ttl
+        if (not ttl or self._share_services is None or
+                now >= self._share_services_expiry):
+            self._share_services = db.service_get_all_by_topic(
+                context, CONF.share_topic)
+            self._share_services_expiry = now + datetime.timedelta(
+                seconds=ttl)
+        return self._share_services
+
     def _update_host_state_map(self, context):
 
         # Get resource usage across the available share nodes:
-        topic = CONF.share_topic
-        share_services = db.service_get_all_by_topic(context, topic)
+        share_services = self._get_share_services(context)
 
         active_hosts = set()
         for service in share_services:
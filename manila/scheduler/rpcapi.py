@@ -40,9 +40,10 @@ class SchedulerAPI(object):
         1.6 - Add manage_share
         1.7 - Updated migrate_share_to_host method with new parameters
         1.8 - Rename create_consistency_group -> create_share_group method
+        1.9 - Add seq and is_delta to update_service_capabilities
     """
 
-    RPC_API_VERSION = '1.8'
+    RPC_API_VERSION = '1.9'
 
     def __init__(self):
         super(SchedulerAPI, self).__init__()
@@ -61,13 +62,23 @@ class SchedulerAPI(object):
 
     def update_service_capabilities(self, context,
                                     service_name, host,
-                                    capabilities):
-        call_context = self.client.prepare(fanout=True, version='1.0')
+                                    capabilities, seq=None, is_delta=False):
+        if seq is None:
+            call_context = self.client.prepare(fanout=True, version='1.0')
+            call_context.cast(context,
+                              'update_service_capabilities',
+                              service_name=service_name,
+                              host=host,
+                              capabilities=capabilities)
+            return
+        call_context = self.client.prepare(fanout=True, version='1.9')
         call_context.cast(context,
                           'update_service_capabilities',
                           service_name=service_name,
                           host=host,
-                          capabilities=capabilities)
+                          capabilities=capabilities,
+                          seq=seq,
+                          is_delta=is_delta)
 
     def get_pools(self, context, filters=None):
         call_context = self.client.prepare(version='1.1')
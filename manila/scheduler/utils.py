@@ -158,3 +158,97 @@ def capabilities_satisfied(capabilities, extra_specs):
                       {'key': key, 'req': req, 'cap': cap})
             return False
     return True
+
+
+def _pools_by_name(capabilities):
+    pools = capabilities.get('pools')
+    if not isinstance(pools, list):
+        return None
+    pools_by_name = {}
+    for pool in pools:
+        pool_name = (pool.get('pool_name')
+                     if isinstance(pool, dict) else None)
+        if pool_name is None or pool_name in pools_by_name:
+            return None
+        pools_by_name[pool_name] = pool
+    return pools_by_name
+
+
+def _get_dict_delta(old, new, ignore_keys=()):
+    changed = dict((key, value) for key, value in new.items()
+                   if key not in ignore_keys and
+                   (key not in old or old[key] != value))
+    removed = [key for key in old
+               if key not in ignore_keys and key not in new]
+    return changed, removed
+
+
+def get_capabilities_delta(old, new):
+    """Returns the difference between two share service capability reports.
+
+    Pools are matched by their 'pool_name', so that only the pools, and the
+    fields of pools, that have changed are part of the delta. If either
+    report has no list of uniquely named pools, 'pools' is compared as a
+    whole like any other capability.
+
+    :param old: capabilities previously sent to the scheduler.
+    :param new: current capabilities.
+    :returns: dict to be passed to apply_capabilities_delta.
+    """
+    old_pools = _pools_by_name(old)
+    new_pools = _pools_by_name(new)
+    diff_pools = old_pools is not None and new_pools is not None
+    ignore_keys = ('pools',) if diff_pools else ()
+
+    changed, removed = _get_dict_delta(old, new, ignore_keys=ignore_keys)
+    delta = {'changed': changed, 'removed': removed}
+    if diff_pools:
+        delta['pools'] = []
+        for pool in new['pools']:
+            pool_name = pool['pool_name']
+            pool_changed, pool_removed = _get_dict_delta(
+                old_pools.get(pool_name, {}), pool)
+            if pool_changed or pool_removed:
+                pool_changed['pool_name'] = pool_name
+                delta['pools'].append({'pool_name': pool_name,
+                                       'changed': pool_changed,
+                                       'removed': pool_removed})
+        delta['removed_pools'] = [name for name in old_pools
+                                  if name not in new_pools]
+    return delta
+
+
+def apply_capabilities_delta(base, delta):
+    """Returns new capabilities built from a base report and a delta.
+
+    :param base: capabilities the delta was computed against.
+    :param delta: result of get_capabilities_delta.
+    :returns: new dict, neither base nor its pools are modified.
+    """
+    capabilities = dict(base)
+    for key in delta['removed']:
+        capabilities.pop(key, None)
+    capabilities.update(delta['changed'])
+
+    if 'pools' in delta:
+        removed_pools = set(delta['removed_pools'])
+        pool_updates = dict((pool['pool_name'], pool)
+                            for pool in delta['pools'])
+        pools = []
+        for pool in base.get('pools') or []:
+            pool_name = pool.get('pool_name')
+            if pool_name in removed_pools:
+                continue
+            pool_update = pool_updates.pop(pool_name, None)
+            if pool_update:
+                pool = dict(pool)
+                for key in pool_update['removed']:
+                    pool.pop(key, None)
+                pool.update(pool_update['changed'])
+            pools.append(pool)
+        # Pools that are new since the base report.
+        for pool in delta['pools']:
+            if pool['pool_name'] in pool_updates:
+                pools.append(dict(pool['changed']))
+        capabilities['pools'] = pools
+    return capabilities
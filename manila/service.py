@@ -51,6 +51,42 @@ service_opts = [
                help='Range of seconds to randomly delay when starting the '
                     'periodic task scheduler to reduce stampeding. '
                     '(Disable by setting to 0)'),
+    cfg.BoolOpt('lightweight_service_heartbeat',
+                default=False,
+                help='If True, services report their state with a single '
+                     'conditional update of their database record instead '
+                     'of reading and then updating it. The availability '
+                     'zone of the service is then checked only at startup '
+                     'and when the storage_availability_zone option '
+                     'changes.'),
+    cfg.IntOpt('periodic_tasks_concurrency',
+               default=0,
+               min=0,
+               help='Maximum number of periodic tasks of a service that may '
+                    'run at the same time. If greater than 0, each periodic '
+                    'task is run on its own schedule in a pool of this '
+                    'size, so that a slow task does not delay the others, '
+                    'and a run of a task is skipped while its previous run '
+                    'is still in progress. If 0, all periodic tasks are run '
+                    'one after another.'),
+    cfg.FloatOpt('periodic_task_jitter',
+                 default=0.05,
+                 min=0,
+                 max=1,
+                 help='Maximum fraction of its interval by which each run '
+                      'of a periodic task is randomly delayed to keep tasks '
+                      'from synchronizing. Used only if '
+                      'periodic_tasks_concurrency is greater than 0.'),
+    cfg.IntOpt('capabilities_full_report_interval',
+               default=0,
+               min=0,
+               help='If greater than 0, share services send to the '
+                    'schedulers only the changes of their capabilities '
+                    'since the previous report, and all of their '
+                    'capabilities in every Nth report only. A scheduler '
+                    'that misses a report ignores the following changes '
+                    'until the next full report. If 0, all capabilities '
+                    'are sent in every report.'),
     cfg.StrOpt('osapi_share_listen',
                default="::",
                help='IP address for OpenStack Share API to listen on.'),
@@ -94,6 +130,8 @@ class Service(service.Service):
         self.saved_args, self.saved_kwargs = args, kwargs
         self.timers = []
         self.coordinator = coordination
+        # Availability zone last written to the service record, if known.
+        self.availability_zone = None
 
     def start(self):
         version_string = version.version_string()
@@ -134,10 +172,18 @@ class Service(service.Service):
             else:
                 initial_delay = None
 
-            periodic = loopingcall.FixedIntervalLoopingCall(
-                self.periodic_tasks)
-            periodic.start(interval=self.periodic_interval,
-                           initial_delay=initial_delay)
+            if CONF.periodic_tasks_concurrency:
+                # Periodic tasks are dispatched to a pool, so wake up as soon
+                # as the next one of them is due.
+                periodic = loopingcall.DynamicLoopingCall(
+                    self.periodic_tasks)
+                periodic.start(initial_delay=initial_delay,
+                               periodic_interval_max=self.periodic_interval)
+            else:
+                periodic = loopingcall.FixedIntervalLoopingCall(
+                    self.periodic_tasks)
+                periodic.start(interval=self.periodic_interval,
+                               initial_delay=initial_delay)
             self.timers.append(periodic)
 
     def _create_service_ref(self, context):
@@ -149,6 +195,7 @@ class Service(service.Service):
                                          'report_count': 0,
                                          'availability_zone': zone})
         self.service_id = service_ref['id']
+        self.availability_zone = zone
 
     def __getattr__(self, key):
         manager = self.__dict__.get('manager', None)
@@ -235,7 +282,15 @@ class Service(service.Service):
     def periodic_tasks(self, raise_on_error=False):
         """Tasks to be run at a periodic interval."""
         ctxt = context.get_admin_context()
-        self.manager.periodic_tasks(ctxt, raise_on_error=raise_on_error)
+        return self.manager.periodic_tasks(ctxt, raise_on_error=raise_on_error)
+
+    def _heartbeat(self, context):
+        try:
+            db.service_heartbeat(context, self.service_id)
+        except exception.NotFound:
+            LOG.debug('The service database object disappeared, '
+                      'Recreating it.')
+            self._create_service_ref(context)
 
     def report_state(self):
         """Update the state of this service in the datastore."""
@@ -243,20 +298,25 @@ class Service(service.Service):
         zone = CONF.storage_availability_zone
         state_catalog = {}
         try:
-            try:
-                service_ref = db.service_get(ctxt, self.service_id)
-            except exception.NotFound:
-                LOG.debug('The service database object disappeared, '
-                          'Recreating it.')
-                self._create_service_ref(ctxt)
-                service_ref = db.service_get(ctxt, self.service_id)
-
-            state_catalog['report_count'] = service_ref['report_count'] + 1
-            if zone != service_ref['availability_zone']['name']:
-                state_catalog['availability_zone'] = zone
-
-            db.service_update(ctxt,
-                              self.service_id, state_catalog)
+            if (CONF.lightweight_service_heartbeat and
+                    zone == self.availability_zone):
+                self._heartbeat(ctxt)
+            else:
+                try:
+                    service_ref = db.service_get(ctxt, self.service_id)
+                except exception.NotFound:
+                    LOG.debug('The service database object disappeared, '
+                              'Recreating it.')
+                    self._create_service_ref(ctxt)
+                    service_ref = db.service_get(ctxt, self.service_id)
+
+                state_catalog['report_count'] = service_ref['report_count'] + 1
+                if zone != service_ref['availability_zone']['name']:
+                    state_catalog['availability_zone'] = zone
+
+                db.service_update(ctxt,
+                                  self.service_id, state_catalog)
+                self.availability_zone = zone
 
             # TODO(termie): make this pattern be more elegant.
             if getattr(self, 'model_disconnected', False):
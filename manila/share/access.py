@@ -13,8 +13,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import copy
-
 from oslo_log import log
 
 from manila.common import constants
@@ -128,32 +126,21 @@ class ShareInstanceAccessDatabaseMixin(object):
             }
 
         """
-        instance_rules = self.db.share_access_get_all_for_instance(
-            context, share_instance_id, filters=filters)
+        if updates or conditionally_change:
+            # State transitions of all filtered rules are done with one
+            # set-based statement instead of one update per rule.
+            updated_rules = self.db.share_instance_access_update_all(
+                context, share_instance_id, filters=filters, updates=updates,
+                conditionally_change=conditionally_change)
 
-        if instance_rules and (updates or conditionally_change):
-            if not updates:
-                updates = {}
-            if not conditionally_change:
-                conditionally_change = {}
-            for rule in instance_rules:
-                mapping_state = rule['state']
-                rule_updates = copy.deepcopy(updates)
-                try:
-                    rule_updates['state'] = conditionally_change[mapping_state]
-                except KeyError:
-                    pass
-                if rule_updates:
-                    self.db.share_instance_access_update(
-                        context, rule['access_id'], share_instance_id,
-                        rule_updates)
+            if not updated_rules:
+                return []
 
             # Refresh the rules after the updates
-            rules_to_get = {
-                'access_id': tuple([i['access_id'] for i in instance_rules]),
-            }
-            instance_rules = self.db.share_access_get_all_for_instance(
-                context, share_instance_id, filters=rules_to_get)
+            filters = {'access_id': tuple(updated_rules)}
+
+        instance_rules = self.db.share_access_get_all_for_instance(
+            context, share_instance_id, filters=filters)
 
         return instance_rules
 
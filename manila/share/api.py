@@ -434,7 +434,7 @@ class API(base.Base):
 
         share_type = None
         if share_instance['share_type_id']:
-            share_type = self.db.share_type_get(
+            share_type = share_types.get_share_type(
                 context, share_instance['share_type_id'])
 
         request_spec = {
@@ -1639,6 +1639,54 @@ class API(base.Base):
 
         return access
 
+    def allow_access_bulk(self, ctx, share, access_rules):
+        """Allow many access rules to a share at once.
+
+        :param access_rules: list of dicts with 'access_type', 'access_to'
+            and optional 'access_level' keys.
+        :returns: list of created access rules.
+        """
+        existing_rules = set(
+            (rule['access_type'], rule['access_to'])
+            for rule in self.db.share_access_get_all_for_share(
+                ctx, share['id']))
+
+        values_list = []
+        for access_rule in access_rules:
+            access_type = access_rule['access_type']
+            access_to = access_rule['access_to']
+            access_level = access_rule.get('access_level')
+            if access_level not in constants.ACCESS_LEVELS + (None, ):
+                msg = _("Invalid share access level: %s.") % access_level
+                raise exception.InvalidShareAccess(reason=msg)
+            if (access_type, access_to) in existing_rules:
+                raise exception.ShareAccessExists(access_type=access_type,
+                                                  access=access_to)
+            existing_rules.add((access_type, access_to))
+            values_list.append({
+                'access_type': access_type,
+                'access_to': access_to,
+                'access_level': access_level,
+            })
+
+        if any(instance for instance in share.instances
+               if self._is_invalid_share_instance(instance)):
+            msg = _("New access rules cannot be applied while the share or "
+                    "any of its replicas or migration copies lacks a valid "
+                    "host or is in an invalid state.")
+            raise exception.InvalidShare(message=msg)
+
+        if not values_list:
+            return []
+
+        accesses = self.db.share_access_create_all(
+            ctx, share['id'], values_list)
+
+        for share_instance in share.instances:
+            self.allow_access_to_instance(ctx, share_instance)
+
+        return accesses
+
     def allow_access_to_instance(self, context, share_instance):
         self._conditionally_transition_share_instance_access_rules_status(
             context, share_instance)
@@ -1676,6 +1724,29 @@ class API(base.Base):
 
         self.share_rpcapi.update_access(context, share_instance)
 
+    def deny_access_bulk(self, ctx, share, accesses):
+        """Deny many access rules of a share at once."""
+
+        if any(instance for instance in share.instances if
+               self._is_invalid_share_instance(instance)):
+            msg = _("Access rules cannot be denied while the share, "
+                    "any of its replicas or migration copies lacks a valid "
+                    "host or is in an invalid state.")
+            raise exception.InvalidShare(message=msg)
+
+        if not accesses:
+            return
+
+        filters = {'access_id': tuple(access['id'] for access in accesses)}
+        updates = {'state': constants.ACCESS_STATE_QUEUED_TO_DENY}
+        for share_instance in share.instances:
+            self._conditionally_transition_share_instance_access_rules_status(
+                ctx, share_instance)
+            self.access_helper.get_and_update_share_instance_access_rules(
+                ctx, filters=filters, updates=updates,
+                share_instance_id=share_instance['id'])
+            self.share_rpcapi.update_access(ctx, share_instance)
+
     def access_get_all(self, context, share):
         """Returns all access rules for share."""
         policy.check_policy(context, 'share', 'access_get_all')
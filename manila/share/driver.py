@@ -18,11 +18,13 @@ Drivers for shares.
 
 """
 
-import six
+import sys
 import time
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log
+import six
 
 from manila import exception
 from manila.i18n import _, _LE, _LW
@@ -126,6 +128,15 @@ share_opts = [
              "replication between each other. If this option is not "
              "specified in the group, it means that replication is not "
              "enabled on the backend."),
+    cfg.IntOpt(
+        'share_group_member_operations_concurrency',
+        default=1,
+        min=1,
+        help="Maximum number of share snapshots, or shares, that are created "
+             "at the same time when a share group snapshot, or a share "
+             "group from a share group snapshot, is created one member at a "
+             "time. Used only by drivers without their own implementation "
+             "of these share group operations."),
     cfg.StrOpt('filter_function',
                help='String representation for an equation that will be '
                     'used to filter hosts.'),
@@ -298,6 +309,15 @@ class ShareDriver(object):
             return self.configuration.safe_get('driver_handles_share_servers')
         return CONF.driver_handles_share_servers
 
+    @property
+    def share_group_member_operations_concurrency(self):
+        if self.configuration:
+            concurrency = self.configuration.safe_get(
+                'share_group_member_operations_concurrency')
+        else:
+            concurrency = CONF.share_group_member_operations_concurrency
+        return max(int(concurrency or 1), 1)
+
     @property
     def replication_domain(self):
         if self.configuration:
@@ -1244,19 +1264,72 @@ class ShareDriver(object):
         LOG.debug('Creating share group from group snapshot %s.',
                   share_group_snapshot_dict['id'])
 
-        for clone in clone_list:
-            kwargs = {}
-            if self.driver_handles_share_servers:
-                kwargs['share_server'] = share_server
-            export_locations = (
-                self.create_share_from_snapshot(
-                    context, clone['share'], clone['snapshot'], **kwargs))
+        kwargs = {}
+        if self.driver_handles_share_servers:
+            kwargs['share_server'] = share_server
+
+        def _create_share_from_snapshot(clone):
+            return self.create_share_from_snapshot(
+                context, clone['share'], clone['snapshot'], **kwargs)
+
+        results, failure = self._run_share_group_member_operations(
+            _create_share_from_snapshot, clone_list,
+            lambda clone: 'share %s' % clone['share']['id'])
+        if failure:
+            six.reraise(*failure)
+
+        for clone, export_locations in results:
             share_update_list.append({
                 'id': clone['share']['id'],
                 'export_locations': export_locations,
             })
         return None, share_update_list
 
+    def _run_share_group_member_operations(self, operation, members,
+                                           describe):
+        """Runs an operation for every member of a share group.
+
+        Up to share_group_member_operations_concurrency operations run at the
+        same time. No further operations are started once one has failed.
+
+        :param operation: callable taking a member.
+        :param members: list of members.
+        :param describe: callable returning the name of a member for logs.
+        :returns: (results, failure) -- list of (member, result) tuples of
+            the successful operations, in the order of members, and
+            sys.exc_info() of the first failed operation or None.
+        """
+        results = {}
+        failures = []
+
+        def _run(index, member):
+            if failures:
+                return
+            start = time.time()
+            try:
+                result = operation(member)
+            except Exception:
+                failures.append(sys.exc_info())
+                return
+            results[index] = (member, result)
+            LOG.debug('Share group member operation for %(member)s '
+                      'finished in %(time).2f seconds.',
+                      {'member': describe(member),
+                       'time': time.time() - start})
+
+        start = time.time()
+        pool = eventlet.GreenPool(
+            self.share_group_member_operations_concurrency)
+        for index, member in enumerate(members):
+            pool.spawn_n(_run, index, member)
+        pool.waitall()
+        LOG.debug('Share group member operations for %(count)d members '
+                  'finished in %(time).2f seconds.',
+                  {'count': len(members), 'time': time.time() - start})
+
+        return ([results[index] for index in sorted(results)],
+                failures[0] if failures else None)
+
     def delete_share_group(self, context, share_group_dict, share_server=None):
         """Delete a share group
 
@@ -1365,9 +1438,8 @@ class ShareDriver(object):
             return None, None
         else:
             share_snapshots = []
-            snapshot_members_updates = []
             for member in snapshot_members:
-                share_snapshot = {
+                share_snapshots.append({
                     'snapshot_id': member['share_group_snapshot_id'],
                     'share_id': member['share_id'],
                     'share_instance_id': member['share']['id'],
@@ -1377,15 +1449,13 @@ class ShareDriver(object):
                     'share_size': member['share']['size'],
                     'share_proto': member['share']['share_proto'],
                     'provider_location': None,
-                }
+                })
+
+            def _create_snapshot(share_snapshot):
                 try:
-                    member_update = self.create_snapshot(
+                    return self.create_snapshot(
                         context, share_snapshot, share_server=share_server)
-                    if member_update:
-                        member_update['id'] = member['id']
-                        snapshot_members_updates.append(member_update)
-                    share_snapshots.append(share_snapshot)
-                except exception.ManilaException as e:
+                except exception.ManilaException:
                     msg = _LE('Could not create share group snapshot. Failed '
                               'to create share snapshot %(snap)s for '
                               'share %(share)s.')
@@ -1393,14 +1463,26 @@ class ShareDriver(object):
                         'snap': share_snapshot['id'],
                         'share': share_snapshot['share_id']
                     })
+                    raise
 
-                    # clean up any share snapshots previously created
-                    LOG.debug(
-                        'Attempting to clean up snapshots due to failure.')
-                    for share_snapshot in share_snapshots:
-                        self._cleanup_group_share_snapshot(
-                            context, share_snapshot, share_server)
-                    raise e
+            results, failure = self._run_share_group_member_operations(
+                _create_snapshot, share_snapshots,
+                lambda snapshot: 'share snapshot %s' % snapshot['id'])
+
+            if failure:
+                # clean up any share snapshots previously created
+                LOG.debug(
+                    'Attempting to clean up snapshots due to failure.')
+                for share_snapshot, member_update in results:
+                    self._cleanup_group_share_snapshot(
+                        context, share_snapshot, share_server)
+                six.reraise(*failure)
+
+            snapshot_members_updates = []
+            for share_snapshot, member_update in results:
+                if member_update:
+                    member_update['id'] = share_snapshot['id']
+                    snapshot_members_updates.append(member_update)
 
             LOG.debug('Successfully created share group snapshot %s.',
                       snap_dict['id'])
@@ -121,14 +121,21 @@ class GaneshaNASHelper(NASHelperBase):
         """Subclass this to create FSAL block."""
         return {}
 
-    def _allow_access(self, base_path, share, access):
-        """Allow access to the share."""
+    def _get_export_name(self, share, access):
+        """Get the name of the export of share for access."""
+        return "%s--%s" % (share['name'], access['id'])
+
+    def _make_export(self, base_path, share, access):
+        """Build the export block of share for access.
+
+        :returns: a tuple of the export name and the export block.
+        """
         if access['access_type'] != 'ip':
             raise exception.InvalidShareAccess('Only IP access type allowed')
         cf = {}
         accid = access['id']
         name = share['name']
-        export_name = "%s--%s" % (name, accid)
+        export_name = self._get_export_name(share, access)
         ganesha_utils.patch(cf, self.export_template, {
             'EXPORT': {
                 'Export_Id': self.ganesha.get_export_id(),
@@ -141,21 +148,30 @@ class GaneshaNASHelper(NASHelperBase):
                 'FSAL': self._fsal_hook(base_path, share, access)
             }
         })
-        self.ganesha.add_export(export_name, cf)
+        return export_name, cf
+
+    def _allow_access(self, base_path, share, access):
+        """Allow access to the share."""
+        self.ganesha.add_export(*self._make_export(base_path, share, access))
 
     def _deny_access(self, base_path, share, access):
         """Deny access to the share."""
-        self.ganesha.remove_export("%s--%s" % (share['name'], access['id']))
+        self.ganesha.remove_export(self._get_export_name(share, access))
 
     def update_access(self, base_path, share, add_rules, delete_rules,
                       recovery=False):
-        """Update access rules of share."""
+        """Update access rules of share.
+
+        All the rule changes are applied to Ganesha as one batch.
+        """
 
         if recovery:
             self.ganesha.reset_exports()
             self.ganesha.restart_service()
 
-        for rule in add_rules:
-            self._allow_access(base_path, share, rule)
-        for rule in delete_rules:
-            self._deny_access(base_path, share, rule)
+        add_exports = dict(self._make_export(base_path, share, rule)
+                           for rule in add_rules)
+        remove_exports = [self._get_export_name(share, rule)
+                          for rule in delete_rules]
+        self.ganesha.update_exports(add_exports=add_exports,
+                                    remove_exports=remove_exports)
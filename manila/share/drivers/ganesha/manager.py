@@ -13,13 +13,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import errno
+import glob
 import os
 import pipes
 import re
+import sqlite3
 import sys
+import tempfile
 
 from oslo_log import log
 from oslo_serialization import jsonutils
+from oslo_utils import excutils
 import six
 
 from manila import exception
@@ -172,7 +177,14 @@ def mkconf(confdict):
 
 
 class GaneshaManager(object):
-    """Ganesha instrumentation class."""
+    """Ganesha instrumentation class.
+
+    If the export directory and the export id database are accessible
+    to the manila process (ie. Ganesha runs locally and the directories
+    are writable), export files and export ids are managed in-process.
+    Otherwise (eg. Ganesha is managed over SSH) each file operation is
+    performed by a single shell script run via the executor.
+    """
 
     def __init__(self, execute, tag, **kwargs):
         self.confrx = re.compile('\.conf\Z')
@@ -199,34 +211,87 @@ class GaneshaManager(object):
         self.ganesha_db_path = kwargs['ganesha_db_path']
         self.execute('mkdir', '-p', os.path.dirname(self.ganesha_db_path))
         self.ganesha_service = kwargs['ganesha_service_name']
+        self.local = (
+            not isinstance(execute, ganesha_utils.SSHExecutor) and
+            all(os.access(d, os.W_OK) for d in (
+                self.ganesha_export_dir,
+                os.path.dirname(self.ganesha_db_path))))
         # Here we are to make sure that an SQLite database of the
         # required scheme exists at self.ganesha_db_path.
-        # The following command gets us there -- provided the file
-        # does not yet exist (otherwise it just fails). However,
-        # we don't care about this condition, we just execute the
-        # command unconditionally (ignoring failure). Instead we
-        # directly query the db right after, to check its validity.
-        self.execute("sqlite3", self.ganesha_db_path,
-                     'create table ganesha(key varchar(20) primary key, '
-                     'value int); insert into ganesha values("exportid", '
-                     '100);', run_as_root=False, check_exit_code=False)
+        if self.local:
+            self._init_db()
+        else:
+            # The following command gets us there -- provided the file
+            # does not yet exist (otherwise it just fails). However,
+            # we don't care about this condition, we just execute the
+            # command unconditionally (ignoring failure). Instead we
+            # directly query the db right after, to check its validity.
+            self.execute("sqlite3", self.ganesha_db_path,
+                         'create table ganesha(key varchar(20) primary key, '
+                         'value int); insert into ganesha values("exportid", '
+                         '100);', run_as_root=False, check_exit_code=False)
         self.get_export_id(bump=False)
 
+    def _init_db(self):
+        """Create the export id database in-process if it does not exist."""
+        conn = sqlite3.connect(self.ganesha_db_path)
+        try:
+            with conn:
+                conn.execute('create table if not exists ganesha('
+                             'key varchar(20) primary key, value int)')
+                conn.execute('insert or ignore into ganesha '
+                             'values("exportid", 100)')
+        except sqlite3.Error:
+            # Let get_export_id() report the invalid database.
+            pass
+        finally:
+            conn.close()
+
     def _getpath(self, name):
         """Get the path of config file for name."""
         return os.path.join(self.ganesha_export_dir, name + ".conf")
 
+    def _write_file_local(self, path, data):
+        """Write data to path atomically, in-process."""
+        dirpath, fname = os.path.split(path)
+        fd, tmpf = tempfile.mkstemp(dir=dirpath, prefix=fname + '.')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data + '\n')
+            os.chmod(tmpf, 0o644)
+            os.rename(tmpf, path)
+        except Exception:
+            os.remove(tmpf)
+            raise
+
+    @staticmethod
+    def _write_file_script(path, data, var='tmpf'):
+        """Compose a shell snippet writing data to path atomically."""
+        dirpath, fname = os.path.split(path)
+        return ('%(var)s=$(mktemp -p %(dir)s -t %(tmpl)s) && '
+                'printf "%%s\\n" %(data)s > "$%(var)s" && '
+                'mv "$%(var)s" %(path)s') % {
+            'var': var, 'dir': pipes.quote(dirpath),
+            'tmpl': pipes.quote(fname + '.XXXXXX'),
+            'data': pipes.quote(data), 'path': pipes.quote(path)}
+
+    def _index_script(self):
+        """Compose a shell snippet regenerating the index file."""
+        expdir = pipes.quote(self.ganesha_export_dir)
+        index = pipes.quote(self._getpath('INDEX'))
+        return ('idxf=$(mktemp -p %(dir)s -t INDEX.conf.XXXXXX) && '
+                'for f in %(dir)s/*.conf; do '
+                '[ "$f" = %(index)s ] || [ ! -e "$f" ] || '
+                'echo "%%include $f"; done > "$idxf" && '
+                'mv "$idxf" %(index)s') % {'dir': expdir, 'index': index}
+
     def _write_file(self, path, data):
         """Write data to path atomically."""
-        dirpath, fname = (getattr(os.path, q + "name")(path) for q in
-                          ("dir", "base"))
-        tmpf = self.execute('mktemp', '-p', dirpath, "-t",
-                            fname + ".XXXXXX")[0][:-1]
-        self.execute(
-            'sh', '-c',
-            'echo %s > %s' % (pipes.quote(data), pipes.quote(tmpf)),
-            message='writing ' + tmpf)
-        self.execute('mv', tmpf, path)
+        if self.local:
+            self._write_file_local(path, data)
+        else:
+            self.execute('sh', '-c', self._write_file_script(path, data),
+                         message='writing ' + path)
 
     def _write_conf_file(self, name, data):
         """Write data to config file for name atomically."""
@@ -234,26 +299,102 @@ class GaneshaManager(object):
         self._write_file(path, data)
         return path
 
+    def _mkindex_local(self):
+        """Generate the index file for current exports, in-process."""
+        files = sorted(f for f in os.listdir(self.ganesha_export_dir)
+                       if self.confrx.search(f) and f != "INDEX.conf")
+        index = "".join("%include " + os.path.join(
+            self.ganesha_export_dir, f) + "\n" for f in files)
+        # _write_file_local() terminates the data with a newline.
+        self._write_file_local(self._getpath("INDEX"), index[:-1])
+
     def _mkindex(self):
         """Generate the index file for current exports."""
         @utils.synchronized("ganesha-index-" + self.tag, external=True)
         def _mkindex():
-            files = filter(lambda f: self.confrx.search(f) and
-                           f != "INDEX.conf",
-                           self.execute('ls', self.ganesha_export_dir,
-                                        run_as_root=False)[0].split("\n"))
-            index = "".join(map(lambda f: "%include " + os.path.join(
-                    self.ganesha_export_dir, f) + "\n", files))
-            self._write_conf_file("INDEX", index)
+            if self.local:
+                self._mkindex_local()
+            else:
+                self.execute('sh', '-c', self._index_script(),
+                             message='writing index')
         _mkindex()
 
+    def _update_export_files(self, writes, removals):
+        """Write and remove export files with one index regeneration.
+
+        :param writes: a dict mapping export names to config strings.
+        :param removals: an iterable of export names.
+        :returns: a dict mapping the names of written exports to
+                  the paths of their config files.
+        """
+        paths = dict((name, self._getpath(name)) for name in writes)
+
+        @utils.synchronized("ganesha-index-" + self.tag, external=True)
+        def _update_export_files():
+            if self.local:
+                for name in removals:
+                    try:
+                        os.remove(self._getpath(name))
+                    except OSError as e:
+                        if e.errno != errno.ENOENT:
+                            raise
+                for name, data in writes.items():
+                    self._write_file_local(paths[name], data)
+                self._mkindex_local()
+            else:
+                script = []
+                if removals:
+                    script.append('rm -f ' + ' '.join(
+                        pipes.quote(self._getpath(name))
+                        for name in removals))
+                for i, (name, data) in enumerate(writes.items()):
+                    script.append(self._write_file_script(
+                        paths[name], data, var='tmpf%d' % i))
+                script.append(self._index_script())
+                self.execute('sh', '-c', ' && '.join(script),
+                             message='updating exports')
+
+        _update_export_files()
+        return paths
+
     def _read_export_file(self, name):
         """Return the dict of the export identified by name."""
+        if self.local:
+            with open(self._getpath(name)) as f:
+                return parseconf(f.read())
         return parseconf(self.execute("cat", self._getpath(name),
                                       message='reading export ' + name)[0])
 
-    def _write_export_file(self, name, confdict):
-        """Write confdict to the export file of name."""
+    def _read_export_files(self, names):
+        """Return a dict mapping names to the dicts of existing exports."""
+        if self.local:
+            confdicts = {}
+            for name in names:
+                try:
+                    confdicts[name] = self._read_export_file(name)
+                except IOError as e:
+                    if e.errno != errno.ENOENT:
+                        raise
+            return confdicts
+        if not names:
+            return {}
+        # Read all the export files with one command, prefixing each of
+        # them with a header line telling its name.
+        script = ('for f; do [ -e "$f" ] || continue; '
+                  'echo "#@ $f"; cat "$f"; echo; done')
+        out = self.execute(
+            'sh', '-c', script, 'sh',
+            *[self._getpath(name) for name in names],
+            message='reading exports')[0]
+        confdicts = {}
+        pathmap = dict((self._getpath(name), name) for name in names)
+        for chunk in re.split('^#@ ', out, flags=re.M)[1:]:
+            path, conf = chunk.split('\n', 1)
+            confdicts[pathmap[path]] = parseconf(conf)
+        return confdicts
+
+    def _validate_export(self, confdict):
+        """Check that no stub is left in confdict."""
         for k, v in ganesha_utils.walk(confdict):
             # values in the export block template that need to be
             # filled in by Manila are pre-fixed by '@'
@@ -261,11 +402,18 @@ class GaneshaManager(object):
                 msg = _("Incomplete export block: value %(val)s of attribute "
                         "%(key)s is a stub.") % {'key': k, 'val': v}
                 raise exception.InvalidParameterValue(err=msg)
+
+    def _write_export_file(self, name, confdict):
+        """Write confdict to the export file of name."""
+        self._validate_export(confdict)
         return self._write_conf_file(name, mkconf(confdict))
 
     def _rm_export_file(self, name):
         """Remove export file of name."""
-        self.execute("rm", self._getpath(name))
+        if self.local:
+            os.remove(self._getpath(name))
+        else:
+            self.execute("rm", self._getpath(name))
 
     def _dbus_send_ganesha(self, method, *args, **kwargs):
         """Send a message to Ganesha via dbus."""
@@ -279,6 +427,11 @@ class GaneshaManager(object):
         """Remove an export from Ganesha runtime with given export id."""
         self._dbus_send_ganesha("RemoveExport", "uint16:%d" % xid)
 
+    def _add_export_dbus(self, path, xid):
+        """Add an export to Ganesha runtime from the given config file."""
+        self._dbus_send_ganesha("AddExport", "string:" + path,
+                                "string:EXPORT(Export_Id=%d)" % xid)
+
     def add_export(self, name, confdict):
         """Add an export to Ganesha specified by confdict."""
         xid = confdict["EXPORT"]["Export_Id"]
@@ -288,8 +441,7 @@ class GaneshaManager(object):
             path = self._write_export_file(name, confdict)
             undos.append(lambda: self._rm_export_file(name))
 
-            self._dbus_send_ganesha("AddExport", "string:" + path,
-                                    "string:EXPORT(Export_Id=%d)" % xid)
+            self._add_export_dbus(path, xid)
             undos.append(lambda: self._remove_export_dbus(xid))
 
             _mkindex_called = True
@@ -310,10 +462,58 @@ class GaneshaManager(object):
             self._rm_export_file(name)
             self._mkindex()
 
+    def update_exports(self, add_exports=None, remove_exports=None):
+        """Add and remove a batch of exports.
+
+        The export files are updated with a single regeneration of the
+        index, and Ganesha is notified only about existing exports being
+        removed or overwritten and about the exports added.
+
+        :param add_exports: a dict mapping names of exports to be added
+                            to their confdicts.
+        :param remove_exports: an iterable of names of exports to be
+                               removed.
+        """
+        add_exports = dict(add_exports or {})
+        remove_exports = set(remove_exports or ()) - set(add_exports)
+        if not (add_exports or remove_exports):
+            return
+        for confdict in add_exports.values():
+            self._validate_export(confdict)
+
+        old_confdicts = self._read_export_files(
+            sorted(remove_exports | set(add_exports)))
+        try:
+            for name in sorted(old_confdicts):
+                self._remove_export_dbus(
+                    old_confdicts[name]["EXPORT"]["Export_Id"])
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self._update_export_files({}, remove_exports)
+
+        paths = self._update_export_files(
+            dict((name, mkconf(confdict))
+                 for name, confdict in add_exports.items()),
+            remove_exports)
+
+        added = []
+        try:
+            for name in sorted(add_exports):
+                xid = add_exports[name]["EXPORT"]["Export_Id"]
+                self._add_export_dbus(paths[name], xid)
+                added.append(xid)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                for xid in added:
+                    self._remove_export_dbus(xid)
+                self._update_export_files({}, add_exports)
+
     def get_export_id(self, bump=True):
         """Get a new export id."""
         # XXX overflowing the export id (16 bit unsigned integer)
         # is not handled
+        if self.local:
+            return self._get_export_id_local(bump)
         if bump:
             bumpcode = 'update ganesha set value = value + 1;'
         else:
@@ -324,18 +524,49 @@ class GaneshaManager(object):
             run_as_root=False)[0]
         match = re.search('\Aexportid\|(\d+)$', out)
         if not match:
-            LOG.error(_LE("Invalid export database on "
-                      "Ganesha node %(tag)s: %(db)s."),
-                      {'tag': self.tag, 'db': self.ganesha_db_path})
-            raise exception.InvalidSqliteDB()
+            self._invalid_db()
         return int(match.groups()[0])
 
+    def _get_export_id_local(self, bump):
+        """Get a new export id through the sqlite3 module."""
+        row = None
+        try:
+            conn = sqlite3.connect(self.ganesha_db_path)
+            try:
+                # The update and the query are done in a single
+                # transaction.
+                with conn:
+                    if bump:
+                        conn.execute('update ganesha set value = value + 1 '
+                                     'where key = "exportid"')
+                    row = conn.execute('select value from ganesha '
+                                       'where key = "exportid"').fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+        if not row or not isinstance(row[0], six.integer_types):
+            self._invalid_db()
+        return row[0]
+
+    def _invalid_db(self):
+        LOG.error(_LE("Invalid export database on "
+                  "Ganesha node %(tag)s: %(db)s."),
+                  {'tag': self.tag, 'db': self.ganesha_db_path})
+        raise exception.InvalidSqliteDB()
+
     def restart_service(self):
         """Restart the Ganesha service."""
         self.execute("service", self.ganesha_service, "restart")
 
     def reset_exports(self):
         """Delete all export files."""
-        self.execute('sh', '-c',
-                     'rm -f %s/*.conf' % pipes.quote(self.ganesha_export_dir))
+        if self.local:
+            for path in glob.glob(
+                    os.path.join(self.ganesha_export_dir, '*.conf')):
+                os.remove(path)
+        else:
+            self.execute(
+                'sh', '-c',
+                'rm -f %s/*.conf' % pipes.quote(self.ganesha_export_dir))
         self._mkindex()
@@ -25,6 +25,7 @@ import xml.etree.cElementTree as etree
 
 from oslo_config import cfg
 from oslo_log import log
+from oslo_service import loopingcall
 import six
 
 from manila import exception
@@ -59,6 +60,16 @@ glusterfs_volume_mapped_opts = [
                     'In latter example, the number that matches "#{size}", '
                     'that is, 3, is an indication that the size of volume '
                     'is 3G.'),
+    cfg.IntOpt('glusterfs_volume_inventory_refresh_interval',
+               default=300,
+               min=0,
+               help='Interval in seconds between background refreshes of '
+                    'the inventory of GlusterFS volumes matching '
+                    '"glusterfs_volume_pattern" and of their binding to '
+                    'shares. Volumes are picked for new shares from this '
+                    'inventory; it is also refreshed on demand if no '
+                    'suitable volume is found in it. 0 disables background '
+                    'refresh.'),
 ]
 
 
@@ -86,6 +97,18 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
         super(GlusterfsVolumeMappedLayout, self).__init__(
             driver, *args, **kwargs)
         self.gluster_used_vols = set()
+        # The inventory of the volumes matching the volume pattern,
+        # a dict of structure {<server>: {<vol>: <voldata>}} where
+        # <server> is an item of glusterfs_servers, <vol> is the
+        # qualified address of a volume and <voldata> is a dict with
+        # 'params' (the named groups extracted from the volume name) and
+        # 'share' (value of the USER_MANILA_SHARE option of the volume).
+        self.gluster_vols_inventory = {}
+        # Volumes whose inventory record has been updated locally since
+        # the last backend query was started.
+        self._gluster_vols_touched = set()
+        # Periodic task refreshing the inventory, if enabled.
+        self._inventory_task = None
         self.configuration.append_config_values(
             common.glusterfs_common_opts)
         self.configuration.append_config_values(
@@ -156,8 +179,11 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
                 'minvers': gluster_version_min_str})
         self.glusterfs_versions = glusterfs_versions
 
-        gluster_volumes_initial = set(
-            self._fetch_gluster_volumes(filter_used=False))
+        self._update_gluster_vols_inventory(
+            self._query_gluster_vols_inventory())
+        gluster_volumes_initial = set()
+        for voldict in self.gluster_vols_inventory.values():
+            gluster_volumes_initial.update(voldict)
         if not gluster_volumes_initial:
             # No suitable volumes are found on the Gluster end.
             # Raise exception.
@@ -172,6 +198,21 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
 
         self._check_mount_glusterfs()
 
+        interval = (
+            self.configuration.glusterfs_volume_inventory_refresh_interval)
+        self._stop_gluster_vols_inventory_refresh()
+        if interval:
+            self._inventory_task = loopingcall.FixedIntervalLoopingCall(
+                self._refresh_gluster_vols_inventory)
+            self._inventory_task.start(interval=interval,
+                                       initial_delay=interval)
+
+    def _stop_gluster_vols_inventory_refresh(self):
+        """Stop the periodic refresh of the volume inventory, if running."""
+        if self._inventory_task is not None:
+            self._inventory_task.stop()
+            self._inventory_task = None
+
     def _glustermanager(self, gluster_address, req_volume=True):
         """Create GlusterManager object for gluster_address."""
 
@@ -188,80 +229,190 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
             return
         return self._glustermanager(gluster_address)
 
-    def _fetch_gluster_volumes(self, filter_used=True):
-        """Do a 'gluster volume list | grep <volume pattern>'.
+    def _fetch_gluster_volumes(self, gluster_mgr):
+        """Do a 'gluster volume info' and filter it by volume pattern.
 
-        Aggregate the results from all servers.
         Extract the named groups from the matching volume names
-        using the specs given in PATTERN_DICT.
+        using the specs given in PATTERN_DICT and the value of the
+        USER_MANILA_SHARE option of the matching volumes.
         Return a dict with keys of the form <server>:/<volname>
-        and values being dicts that map names of named groups
-        to their extracted value.
+        and values being dicts with 'params' (mapping names of named
+        groups to their extracted value) and 'share' keys.
         """
 
+        if gluster_mgr.user:
+            logmsg = _LE("Retrieving volume info "
+                         "on host %s") % gluster_mgr.host
+        else:
+            logmsg = _LE("Retrieving volume info")
+        args = ('--xml', 'volume', 'info')
+        out, err = gluster_mgr.gluster_call(*args, log=logmsg)
+        if not out:
+            raise exception.GlusterfsException(
+                _('gluster volume info: no data received from %s') %
+                gluster_mgr.host)
+
+        volxml = etree.fromstring(out)
+        gluster_mgr.xml_response_check(volxml, args[1:])
+
         volumes_dict = {}
+        for volel in volxml.findall('./volInfo/volumes/volume'):
+            volname = common.volxml_get(volel, 'name')
+            patmatch = self.volume_pattern.match(volname)
+            if not patmatch:
+                continue
+            vshr = None
+            for optel in volel.findall('./options/option'):
+                if common.volxml_get(optel, 'name') == USER_MANILA_SHARE:
+                    vshr = common.volxml_get(optel, 'value', default=None)
+                    break
+            pattern_dict = {}
+            for key in self.volume_pattern_keys:
+                keymatch = patmatch.group(key)
+                if keymatch is None:
+                    pattern_dict[key] = None
+                else:
+                    trans = PATTERN_DICT[key].get('trans', lambda x: x)
+                    pattern_dict[key] = trans(keymatch)
+            comp_vol = gluster_mgr.components.copy()
+            comp_vol.update({'volume': volname})
+            volumes_dict[self._glustermanager(comp_vol).qualified] = {
+                'params': pattern_dict, 'share': vshr}
+        return volumes_dict
+
+    def _query_gluster_vols_inventory(self):
+        """Query the volume inventory of all servers.
+
+        Return a dict mapping servers to the result of
+        _fetch_gluster_volumes() on them. Servers which fail to
+        respond are omitted from the result, so that their entries
+        in the inventory are retained.
+        """
+
+        self._gluster_vols_touched = set()
+        inventory = {}
         for srvaddr in self.configuration.glusterfs_servers:
-            gluster_mgr = self._glustermanager(srvaddr, False)
-            if gluster_mgr.user:
-                logmsg = _LE("Retrieving volume list "
-                             "on host %s") % gluster_mgr.host
-            else:
-                logmsg = _LE("Retrieving volume list")
-            out, err = gluster_mgr.gluster_call('volume', 'list', log=logmsg)
-            for volname in out.split("\n"):
-                patmatch = self.volume_pattern.match(volname)
-                if not patmatch:
+            try:
+                inventory[srvaddr] = self._fetch_gluster_volumes(
+                    self._glustermanager(srvaddr, False))
+            except (exception.GlusterfsException, exception.InvalidShare,
+                    etree.ParseError) as exc:
+                LOG.warning(_LW("Failed to refresh the volume inventory "
+                                "of server %(server)s: %(error)s"),
+                            {'server': srvaddr, 'error': exc})
+        return inventory
+
+    def _update_gluster_vols_inventory(self, inventory):
+        """Merge the result of a backend query into the inventory.
+
+        Records of volumes which have been updated locally since the
+        query was started take precedence over the queried data.
+        """
+
+        for srvaddr, voldict in inventory.items():
+            old_voldict = self.gluster_vols_inventory.get(srvaddr, {})
+            for vol in self._gluster_vols_touched:
+                if vol in old_voldict:
+                    voldict[vol] = old_voldict[vol]
+            self.gluster_vols_inventory[srvaddr] = voldict
+
+    def _refresh_gluster_vols_inventory(self):
+        """Refresh the volume inventory from the backend."""
+        # The query is done without holding the lock, so that the
+        # allocation of volumes is not blocked by the remote calls.
+        # NOTE: an exception escaping this method would stop the looping
+        # call for good, leaving the inventory stale.
+        try:
+            inventory = self._query_gluster_vols_inventory()
+            self._merge_gluster_vols_inventory(inventory)
+        except Exception:
+            LOG.exception(_LE("Failed to refresh the volume inventory."))
+
+    @utils.synchronized("glusterfs_native", external=False)
+    def _merge_gluster_vols_inventory(self, inventory):
+        self._update_gluster_vols_inventory(inventory)
+
+    def _set_gluster_vol_share(self, vol, share_id):
+        """Locally record the binding of a volume in the inventory."""
+        for voldict in self.gluster_vols_inventory.values():
+            if vol in voldict:
+                voldict[vol]['share'] = share_id
+                self._gluster_vols_touched.add(vol)
+                break
+
+    def _forget_gluster_vol(self, vol):
+        """Remove a deleted volume from the inventory."""
+        for voldict in self.gluster_vols_inventory.values():
+            voldict.pop(vol, None)
+
+    def _get_unused_gluster_vols(self):
+        """Get the unbound volumes from the inventory.
+
+        Return a dict mapping volume addresses to the named groups
+        extracted from the volume names.
+        """
+
+        voldict = {}
+        for srvvols in self.gluster_vols_inventory.values():
+            for vol, voldata in srvvols.items():
+                if (vol in self.gluster_used_vols or
+                        UUID_RE.search(voldata['share'] or '')):
                     continue
-                comp_vol = gluster_mgr.components.copy()
-                comp_vol.update({'volume': volname})
-                gluster_mgr_vol = self._glustermanager(comp_vol)
-                if filter_used:
-                    vshr = gluster_mgr_vol.get_vol_option(
-                        USER_MANILA_SHARE) or ''
-                    if UUID_RE.search(vshr):
-                        continue
-                pattern_dict = {}
-                for key in self.volume_pattern_keys:
-                    keymatch = patmatch.group(key)
-                    if keymatch is None:
-                        pattern_dict[key] = None
-                    else:
-                        trans = PATTERN_DICT[key].get('trans', lambda x: x)
-                        pattern_dict[key] = trans(keymatch)
-                volumes_dict[gluster_mgr_vol.qualified] = pattern_dict
-        return volumes_dict
+                voldict[vol] = voldata['params']
+        return voldict
 
     @utils.synchronized("glusterfs_native", external=False)
     def _pop_gluster_vol(self, size=None):
         """Pick an unbound volume.
 
-        Do a _fetch_gluster_volumes() first to get the complete
-        list of usable volumes.
-        Keep only the unbound ones (ones that are not yet used to
-        back a share).
+        Pick from the unbound volumes of the inventory (ones that are not
+        yet used to back a share). If none of them is suitable, refresh
+        the inventory from the backend and try again.
         If size is given, try to pick one which has a size specification
         (according to the 'size' named group of the volume pattern),
         and its size is greater-than-or-equal to the given size.
         Return the volume chosen (in <host>:/<volname> format).
         """
 
-        voldict = self._fetch_gluster_volumes()
-        # calculate the set of unused volumes
-        unused_vols = set(voldict) - self.gluster_used_vols
-
-        if not unused_vols:
-            # No volumes available for use as share. Warn user.
-            LOG.warning(_LW("No unused gluster volumes available for use as "
-                            "share! Create share won't be supported unless "
-                            "existing shares are deleted or some gluster "
-                            "volumes are created with names matching "
-                            "'glusterfs_volume_pattern'."))
-        else:
+        vol = self._choose_gluster_vol(self._get_unused_gluster_vols(), size)
+        if not vol:
+            self._update_gluster_vols_inventory(
+                self._query_gluster_vols_inventory())
+            voldict = self._get_unused_gluster_vols()
+            if not voldict:
+                # No volumes available for use as share. Warn user.
+                LOG.warning(_LW("No unused gluster volumes available for "
+                                "use as share! Create share won't be "
+                                "supported unless existing shares are "
+                                "deleted or some gluster volumes are "
+                                "created with names matching "
+                                "'glusterfs_volume_pattern'."))
+            vol = self._choose_gluster_vol(voldict, size)
+        if not vol:
+            msg = (_("Couldn't find a free gluster volume to use."))
+            LOG.error(msg)
+            raise exception.GlusterfsException(msg)
+
+        self.gluster_used_vols.add(vol)
+        self._gluster_vols_touched.add(vol)
+        return vol
+
+    def _choose_gluster_vol(self, voldict, size=None):
+        """Choose a volume from voldict fitting size.
+
+        :param voldict: a dict mapping volume addresses to the
+                        named groups extracted from the volume names.
+        :param size: the required size.
+        :returns: the address of the chosen volume, or None if
+                  there is no suitable volume in voldict.
+        """
+
+        if voldict:
             LOG.info(_LI("Number of gluster volumes in use:  "
                          "%(inuse-numvols)s. Number of gluster volumes "
                          "available for use as share: %(unused-numvols)s"),
                      {'inuse-numvols': len(self.gluster_used_vols),
-                     'unused-numvols': len(unused_vols)})
+                     'unused-numvols': len(voldict)})
 
         # volmap is the data structure used to categorize and sort
         # the unused volumes. It's a nested dictionary of structure
@@ -280,7 +431,7 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
         else:
             # else just use a stub.
             get_volsize = lambda vol: None
-        for vol in unused_vols:
+        for vol in voldict:
             # For each unused volume, we extract the <size>
             # and <host> values with which it can be inserted
             # into the volmap, and conditionally perform
@@ -310,9 +461,7 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
             chosen_size = None
         chosen_hostmap = volmap[chosen_size]
         if not chosen_hostmap:
-            msg = (_("Couldn't find a free gluster volume to use."))
-            LOG.error(msg)
-            raise exception.GlusterfsException(msg)
+            return
 
         # From the hosts we choose randomly to tend towards
         # even distribution of share backing volumes among
@@ -320,9 +469,7 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
         chosen_host = random.choice(list(chosen_hostmap.keys()))
         # Within a host's volumes, choose alphabetically first,
         # to make it predictable.
-        vol = sorted(chosen_hostmap[chosen_host])[0]
-        self.gluster_used_vols.add(vol)
-        return vol
+        return sorted(chosen_hostmap[chosen_host])[0]
 
     @utils.synchronized("glusterfs_native", external=False)
     def _push_gluster_vol(self, exp_locn):
@@ -332,6 +479,7 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
             msg = (_("Couldn't find the share in used list."))
             LOG.error(msg)
             raise exception.GlusterfsException(msg)
+        self._set_gluster_vol_share(exp_locn, None)
 
     def _wipe_gluster_vol(self, gluster_mgr):
 
@@ -395,6 +543,7 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
             {'share': share, 'manager': gmgr})
 
         gmgr.set_vol_option(USER_MANILA_SHARE, share['id'])
+        self._set_gluster_vol_share(vol, share['id'])
         self.private_storage.update(share['id'], {'volume': vol})
 
         # TODO(deepakcs): Enable quota and set it to the share size.
@@ -428,6 +577,7 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
                 # management of those volumes which were
                 # created by us (as snapshot clones) ...
                 gmgr.gluster_call('volume', 'delete', gmgr.volume)
+                self._forget_gluster_vol(gmgr.qualified)
             else:
                 # ... for volumes that come from the pool, we return
                 # them to the pool (after some purification rituals)
@@ -587,6 +737,7 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
         self.gluster_used_vols.add(gmgr.qualified)
 
         gmgr.set_vol_option(USER_MANILA_SHARE, share['id'])
+        self._set_gluster_vol_share(gmgr.qualified, share['id'])
 
     # Debt...
 
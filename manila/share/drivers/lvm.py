@@ -48,6 +48,12 @@ share_opts = [
     cfg.StrOpt('lvm_share_volume_group',
                default='lvm-shares',
                help='Name for the VG that will contain exported shares.'),
+    cfg.StrOpt('lvm_share_thin_pool',
+               help='Name of the thin pool LV in the share volume group. If '
+                    'set, shares and snapshots are created as thin LVs in '
+                    'this pool and shares are created from snapshots as thin '
+                    'snapshots instead of full copies. Can not be used '
+                    'together with lvm_share_mirrors.'),
     cfg.ListOpt('lvm_share_helpers',
                 default=[
                     'CIFS=manila.share.drivers.helpers.CIFSHelperUserAccess',
@@ -74,11 +80,37 @@ class LVMMixin(driver.ExecuteMixin):
         if not self.configuration.lvm_share_export_ip:
             msg = (_("lvm_share_export_ip isn't specified"))
             raise exception.InvalidParameterValue(err=msg)
+        if self.configuration.lvm_share_thin_pool:
+            self._check_thin_pool()
+
+    def _get_thin_pool_name(self):
+        return "%s/%s" % (self.configuration.lvm_share_volume_group,
+                          self.configuration.lvm_share_thin_pool)
+
+    def _check_thin_pool(self):
+        if self.configuration.lvm_share_mirrors:
+            msg = _("lvm_share_mirrors can not be used together with "
+                    "lvm_share_thin_pool")
+            raise exception.InvalidParameterValue(err=msg)
+        try:
+            out, err = self._execute('lvs', '--noheadings', '-o', 'lv_attr',
+                                     self._get_thin_pool_name(),
+                                     run_as_root=True)
+        except exception.ProcessExecutionError:
+            out = ''
+        if not out.strip().startswith('t'):
+            msg = (_("thin pool %s doesn't exist")
+                   % self._get_thin_pool_name())
+            raise exception.InvalidParameterValue(err=msg)
 
     def _allocate_container(self, share):
         sizestr = '%sG' % share['size']
-        cmd = ['lvcreate', '-L', sizestr, '-n', share['name'],
-               self.configuration.lvm_share_volume_group]
+        if self.configuration.lvm_share_thin_pool:
+            cmd = ['lvcreate', '-V', sizestr, '-n', share['name'],
+                   '--thinpool', self._get_thin_pool_name()]
+        else:
+            cmd = ['lvcreate', '-L', sizestr, '-n', share['name'],
+                   self.configuration.lvm_share_volume_group]
         if self.configuration.lvm_share_mirrors:
             cmd += ['-m', self.configuration.lvm_share_mirrors, '--nosync']
             terras = int(sizestr[:-1]) / 1024.0
@@ -113,10 +145,18 @@ class LVMMixin(driver.ExecuteMixin):
         """Creates a snapshot."""
         orig_lv_name = "%s/%s" % (self.configuration.lvm_share_volume_group,
                                   snapshot['share_name'])
-        self._try_execute(
-            'lvcreate', '-L', '%sG' % snapshot['share']['size'],
-            '--name', snapshot['name'],
-            '--snapshot', orig_lv_name, run_as_root=True)
+        if self.configuration.lvm_share_thin_pool:
+            # NOTE: thin snapshot takes space from the pool only as data
+            # diverges, and is skipped on activation unless told otherwise.
+            self._try_execute(
+                'lvcreate', '--name', snapshot['name'],
+                '--snapshot', orig_lv_name,
+                '--setactivationskip', 'n', run_as_root=True)
+        else:
+            self._try_execute(
+                'lvcreate', '-L', '%sG' % snapshot['share']['size'],
+                '--name', snapshot['name'],
+                '--snapshot', orig_lv_name, run_as_root=True)
         snapshot_device_name = self._get_local_path(snapshot)
         self._execute(
             'tune2fs', '-U', 'random', snapshot_device_name, run_as_root=True,
@@ -199,6 +239,8 @@ class LVMShareDriver(LVMMixin, driver.ShareDriver):
         super(LVMShareDriver, self)._update_share_stats(data)
 
     def get_share_server_pools(self, share_server=None):
+        if self.configuration.lvm_share_thin_pool:
+            return self._get_thin_pool_stats()
         out, err = self._execute('vgs',
                                  self.configuration.lvm_share_volume_group,
                                  '--rows', '--units', 'g',
@@ -212,6 +254,24 @@ class LVMShareDriver(LVMMixin, driver.ShareDriver):
             'reserved_percentage': 0,
         }, ]
 
+    def _get_thin_pool_stats(self):
+        out, err = self._execute('lvs', '--noheadings', '--nosuffix',
+                                 '--units', 'g', '-o', 'lv_size,data_percent',
+                                 self._get_thin_pool_name(),
+                                 run_as_root=True)
+        total_size, data_percent = out.split()
+        total_size = float(total_size)
+        free_size = total_size * (100 - float(data_percent)) / 100
+        return [{
+            'pool_name': 'lvm-single-pool',
+            'total_capacity_gb': total_size,
+            'free_capacity_gb': round(free_size, 2),
+            'reserved_percentage': 0,
+            'thin_provisioning': True,
+            'max_over_subscription_ratio':
+                self.configuration.max_over_subscription_ratio,
+        }, ]
+
     def create_share(self, context, share, share_server=None):
         self._allocate_container(share)
         # create file system
@@ -224,6 +284,8 @@ class LVMShareDriver(LVMMixin, driver.ShareDriver):
     def create_share_from_snapshot(self, context, share, snapshot,
                                    share_server=None):
         """Is called to create share from snapshot."""
+        if self.configuration.lvm_share_thin_pool:
+            return self._create_share_from_thin_snapshot(share, snapshot)
         self._allocate_container(share)
         snapshot_device_name = self._get_local_path(snapshot)
         share_device_name = self._get_local_path(share)
@@ -237,6 +299,24 @@ class LVMShareDriver(LVMMixin, driver.ShareDriver):
         self._mount_device(share, share_device_name)
         return location
 
+    def _create_share_from_thin_snapshot(self, share, snapshot):
+        """Creates share as thin snapshot of given snapshot."""
+        snap_lv_name = "%s/%s" % (self.configuration.lvm_share_volume_group,
+                                  snapshot['name'])
+        self._try_execute(
+            'lvcreate', '--name', share['name'], '--snapshot', snap_lv_name,
+            '--setactivationskip', 'n', run_as_root=True)
+        share_device_name = self._get_local_path(share)
+        self._execute(
+            'tune2fs', '-U', 'random', share_device_name, run_as_root=True,
+        )
+        location = self._get_helper(share).create_exports(
+            self.share_server, share['name'])
+        self._mount_device(share, share_device_name)
+        if share['size'] > (snapshot.get('size') or share['size']):
+            self.extend_share(share, share['size'])
+        return location
+
     def delete_share(self, context, share, share_server=None):
         self._remove_export(context, share)
         self._delete_share(context, share)
@@ -342,6 +422,18 @@ class LVMShareDriver(LVMMixin, driver.ShareDriver):
                             share['name'])
 
     def _copy_volume(self, srcstr, deststr, size_in_g):
+        if self.configuration.share_volume_fstype.startswith('ext'):
+            # NOTE: e2image copies only blocks used by the filesystem, so
+            # copy time depends on amount of data rather than on share size.
+            try:
+                self._execute('e2image', '-ra', srcstr, deststr,
+                              run_as_root=True)
+                return
+            except exception.ProcessExecutionError as e:
+                LOG.warning(_LW("Failed to copy used blocks of %(src)s, "
+                                "copying whole volume. %(e)s"),
+                            {'src': srcstr, 'e': e})
+
         # Use O_DIRECT to avoid thrashing the system buffer cache
         extra_flags = ['iflag=direct', 'oflag=direct']
 
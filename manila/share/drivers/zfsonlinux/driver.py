@@ -22,11 +22,15 @@ import math
 import os
 import time
 
+import eventlet
+from eventlet import semaphore
 from oslo_config import cfg
 from oslo_log import log
+from oslo_utils import excutils
 from oslo_utils import importutils
 from oslo_utils import strutils
 from oslo_utils import timeutils
+from oslo_utils import units
 
 from manila.common import constants
 from manila import exception
@@ -117,6 +121,41 @@ zfsonlinux_opts = [
         required=True,
         default="tmp_snapshot_for_share_migration_",
         help="Set snapshot prefix for usage in ZFS migration. Required."),
+    cfg.IntOpt(
+        "zfs_inventory_cache_ttl",
+        default=10,
+        min=0,
+        help="Time in seconds for which results of bulk 'zpool list' and "
+             "'zfs list' queries are reused for capacity reporting and "
+             "dataset lookups. Cached data is dropped on any mutating ZFS "
+             "command run by the driver. Set 0 to disable caching. "
+             "Optional."),
+    cfg.BoolOpt(
+        "zfs_replication_compressed_stream",
+        default=False,
+        help="Send replication streams with blocks kept compressed as they "
+             "are stored on disk ('zfs send -c'). Requires ZFS on Linux 0.7 "
+             "or newer. Optional."),
+    cfg.BoolOpt(
+        "zfs_replication_resumable",
+        default=False,
+        help="Receive replication streams with 'zfs receive -s', so that "
+             "interrupted transfer is resumed from the point of failure on "
+             "next replica sync instead of being restarted. Requires ZFS on "
+             "Linux 0.7 or newer. Optional."),
+    cfg.IntOpt(
+        "zfs_replication_max_concurrent_transfers",
+        default=4,
+        min=1,
+        help="Maximum number of replication transfers run by backend at the "
+             "same time. Optional."),
+    cfg.StrOpt(
+        "zfs_replication_buffer_command",
+        help="Command that replication streams are piped through on the "
+             "host running the manila-share service, between the SSH "
+             "connections to the source and destination hosts. Can be used "
+             "for buffering and throttling, e.g. "
+             "'mbuffer -q -s 128k -m 256M -r 100M'. Optional."),
 ]
 
 CONF = cfg.CONF
@@ -184,6 +223,8 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
         self._init_common_capabilities()
 
         self._shell_executors = {}
+        self._replication_semaphore = semaphore.Semaphore(
+            self.configuration.zfs_replication_max_concurrent_transfers)
 
     def _get_shell_executor_by_host(self, host):
         backend_name = share_utils.extract_host(host, level='backend_name')
@@ -350,15 +391,16 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
     def _get_pools_info(self):
         """Returns info about all pools used by backend."""
         pools = []
+        zpools_inventory = self.get_zpools_inventory()
         for zpool in self.zpool_list:
-            free_size = self.get_zpool_option(zpool, 'free')
-            free_size = utils.translate_string_size_to_float(free_size)
-            total_size = self.get_zpool_option(zpool, 'size')
-            total_size = utils.translate_string_size_to_float(total_size)
+            zpool_info = zpools_inventory.get(zpool)
+            if not zpool_info:
+                raise exception.ZFSonLinuxException(
+                    msg=_("Zpool '%s' is not found.") % zpool)
             pool = {
                 'pool_name': zpool,
-                'total_capacity_gb': float(total_size),
-                'free_capacity_gb': float(free_size),
+                'total_capacity_gb': float(zpool_info['size']) / units.Gi,
+                'free_capacity_gb': float(zpool_info['free']) / units.Gi,
                 'reserved_percentage':
                     self.configuration.reserved_share_percentage,
             }
@@ -636,25 +678,20 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
             dataset_name = self._get_dataset_name(share)
 
         pool_name = share_utils.extract_host(share['host'], level='pool')
-        out, err = self.zfs('list', '-r', pool_name)
-        data = self.parse_zfs_answer(out)
-        for datum in data:
-            if datum['NAME'] == dataset_name:
-                ssh_cmd = '%(username)s@%(host)s' % {
-                    'username': self.configuration.zfs_ssh_username,
-                    'host': self.service_ip,
-                }
-                self.private_storage.update(
-                    share['id'], {'ssh_cmd': ssh_cmd})
-                sharenfs = self.get_zfs_option(dataset_name, 'sharenfs')
-                if sharenfs != 'off':
-                    self.zfs('share', dataset_name)
-                export_locations = self._get_share_helper(
-                    share['share_proto']).get_exports(dataset_name)
-                return export_locations
-        else:
+        dataset = self.get_datasets_inventory([pool_name]).get(dataset_name)
+        if not dataset:
             raise exception.ShareResourceNotFound(share_id=share['id'])
 
+        ssh_cmd = '%(username)s@%(host)s' % {
+            'username': self.configuration.zfs_ssh_username,
+            'host': self.service_ip,
+        }
+        self.private_storage.update(share['id'], {'ssh_cmd': ssh_cmd})
+        if dataset['sharenfs'] != 'off':
+            self.zfs('share', dataset_name)
+        return self._get_share_helper(
+            share['share_proto']).get_exports(dataset_name)
+
     def get_network_allocations_number(self):
         """ZFS does not handle networking. Return 0."""
         return 0
@@ -682,9 +719,13 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
         """Updates access rules for given share."""
         dataset_name = self._get_dataset_name(share)
         executor = self._get_shell_executor_by_host(share['host'])
-        return self._get_share_helper(share['share_proto']).update_access(
-            dataset_name, access_rules, add_rules, delete_rules,
-            executor=executor)
+        try:
+            return self._get_share_helper(share['share_proto']).update_access(
+                dataset_name, access_rules, add_rules, delete_rules,
+                executor=executor)
+        finally:
+            # NOTE: share helper changes 'sharenfs' by its own executor.
+            self.invalidate_zfs_inventory()
 
     def manage_existing(self, share, driver_options):
         """Manage existing ZFS dataset as manila share.
@@ -709,13 +750,33 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
 
         new_dataset_name = self._get_dataset_name(share)
 
+        # Perform checks on requested dataset
+        if actual_pool_name != scheduled_pool_name:
+            raise exception.ZFSonLinuxException(
+                _("Cannot manage share '%(share_id)s' "
+                  "(share_instance '%(si_id)s'), because scheduled "
+                  "pool '%(sch)s' and actual '%(actual)s' differ.") % {
+                    "share_id": share["share_id"],
+                    "si_id": share["id"],
+                    "sch": scheduled_pool_name,
+                    "actual": actual_pool_name})
+
+        dataset = self.get_datasets_inventory(
+            [actual_pool_name]).get(old_dataset_name)
+        if not dataset:
+            raise exception.ZFSonLinuxException(
+                _("Cannot manage share '%(share_id)s' "
+                  "(share_instance '%(si_id)s'), because dataset "
+                  "'%(dataset)s' not found in zpool '%(zpool)s'.") % {
+                    "share_id": share["share_id"],
+                    "si_id": share["id"],
+                    "dataset": old_dataset_name,
+                    "zpool": actual_pool_name})
+
         # Calculate quota for managed dataset
         quota = driver_options.get("size")
         if not quota:
-            consumed_space = self.get_zfs_option(old_dataset_name, "used")
-            consumed_space = utils.translate_string_size_to_float(
-                consumed_space)
-            quota = int(consumed_space) + 1
+            quota = int(float(dataset["used"]) / units.Gi) + 1
         share["size"] = int(quota)
 
         # Save dataset-specific data in private storage
@@ -734,32 +795,6 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
             }
         )
 
-        # Perform checks on requested dataset
-        if actual_pool_name != scheduled_pool_name:
-            raise exception.ZFSonLinuxException(
-                _("Cannot manage share '%(share_id)s' "
-                  "(share_instance '%(si_id)s'), because scheduled "
-                  "pool '%(sch)s' and actual '%(actual)s' differ.") % {
-                    "share_id": share["share_id"],
-                    "si_id": share["id"],
-                    "sch": scheduled_pool_name,
-                    "actual": actual_pool_name})
-
-        out, err = self.zfs("list", "-r", actual_pool_name)
-        data = self.parse_zfs_answer(out)
-        for datum in data:
-            if datum["NAME"] == old_dataset_name:
-                break
-        else:
-            raise exception.ZFSonLinuxException(
-                _("Cannot manage share '%(share_id)s' "
-                  "(share_instance '%(si_id)s'), because dataset "
-                  "'%(dataset)s' not found in zpool '%(zpool)s'.") % {
-                    "share_id": share["share_id"],
-                    "si_id": share["id"],
-                    "dataset": old_dataset_name,
-                    "zpool": actual_pool_name})
-
         # Rename dataset
         out, err = self.execute("sudo", "mount")
         if "%s " % old_dataset_name in out:
@@ -872,6 +907,184 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
             snapshot_tag.replace('-', '_').replace('.', '_').replace(':', '_'))
         return snapshot_tag
 
+    def _get_replication_send_cmd(self, ssh_to_src_cmd, *args):
+        """Returns 'zfs send' part of replication pipeline."""
+        cmd = ['ssh', ssh_to_src_cmd, 'sudo', 'zfs', 'send']
+        cmd.extend(args)
+        buffer_cmd = self.configuration.zfs_replication_buffer_command
+        if buffer_cmd:
+            cmd.append('|')
+            cmd.extend(buffer_cmd.split())
+        return cmd
+
+    def _save_replication_resume_token(self, replica_id, ssh_to_dst_cmd,
+                                       dst_dataset_name):
+        """Saves resume token of interrupted replication transfer."""
+        try:
+            out, err = self.execute(
+                'ssh', ssh_to_dst_cmd,
+                'sudo', 'zfs', 'get', '-H', '-o', 'value',
+                'receive_resume_token', dst_dataset_name,
+            )
+        except exception.ProcessExecutionError as e:
+            LOG.warning(
+                _LW("Failed to get resume token of replica %(id)s. %(e)s"),
+                {'id': replica_id, 'e': e})
+            return
+        token = out.strip()
+        if token and token != '-':
+            self.private_storage.update(
+                replica_id, {'repl_resume_token': token})
+
+    def _get_latest_received_snapshot_tag(self, replica_id, ssh_to_dst_cmd,
+                                          dst_dataset_name):
+        """Returns tag of the newest snapshot of replica dataset or None."""
+        try:
+            out, err = self.execute(
+                'ssh', ssh_to_dst_cmd,
+                'sudo', 'zfs', 'list', '-H', '-r', '-d', '1',
+                '-t', 'snapshot', '-o', 'name', '-s', 'creation',
+                dst_dataset_name,
+            )
+        except exception.ProcessExecutionError as e:
+            LOG.warning(
+                _LW("Failed to get snapshots of replica %(id)s. %(e)s"),
+                {'id': replica_id, 'e': e})
+            return None
+        snapshots = out.strip().splitlines()
+        if not snapshots:
+            return None
+        return snapshots[-1].strip().split('@')[-1]
+
+    def _resume_replication_transfer(self, replica_id, ssh_to_src_cmd,
+                                     ssh_to_dst_cmd, dst_dataset_name):
+        """Completes interrupted replication transfer if there is one.
+
+        Resume token continues only the snapshot that was in flight when
+        the transfer was interrupted, so the newest snapshot of the replica
+        dataset is looked up afterwards; the caller sends the rest of the
+        snapshots incrementally from it.
+
+        :return: tag of latest snapshot of replica after resumed transfer
+            or None.
+        """
+        token = self.private_storage.get(replica_id, 'repl_resume_token')
+        if not token:
+            return None
+        snapshot_tag = None
+        cmd = self._get_replication_send_cmd(ssh_to_src_cmd, '-v', '-t', token)
+        cmd.extend([
+            '|', 'ssh', ssh_to_dst_cmd,
+            'sudo', 'zfs', 'receive', '-v', '-s', dst_dataset_name,
+        ])
+        try:
+            out, err = self.execute(*cmd)
+            LOG.debug("Resumed replication of replica '%(id)s': \n%(out)s",
+                      {'id': replica_id, 'out': out})
+            snapshot_tag = self._get_latest_received_snapshot_tag(
+                replica_id, ssh_to_dst_cmd, dst_dataset_name)
+        except exception.ProcessExecutionError as e:
+            LOG.warning(
+                _LW("Failed to resume replication of replica %(id)s, "
+                    "transfer will be restarted. %(e)s"),
+                {'id': replica_id, 'e': e})
+            try:
+                self.execute(
+                    'ssh', ssh_to_dst_cmd,
+                    'sudo', 'zfs', 'receive', '-A', dst_dataset_name,
+                )
+            except exception.ProcessExecutionError:
+                # NOTE: partially received state may be gone already.
+                pass
+        self.private_storage.delete(replica_id, 'repl_resume_token')
+        if snapshot_tag:
+            self.private_storage.update(
+                replica_id, {'repl_snapshot_tag': snapshot_tag})
+        return snapshot_tag
+
+    def _transfer_replication_stream(self, replica_id, ssh_to_src_cmd,
+                                     ssh_to_dst_cmd, dst_dataset_name,
+                                     src_snapshot_name,
+                                     previous_snapshot_tag=None):
+        """Sends snapshot from source host to replica dataset.
+
+        Sends incremental stream starting from previous snapshot if it is
+        provided and full replication stream otherwise. Number of transfers
+        run at the same time is limited by
+        'zfs_replication_max_concurrent_transfers' option.
+        """
+        resumable = self.configuration.zfs_replication_resumable
+        with self._replication_semaphore:
+            if previous_snapshot_tag and resumable:
+                previous_snapshot_tag = self._resume_replication_transfer(
+                    replica_id, ssh_to_src_cmd, ssh_to_dst_cmd,
+                    dst_dataset_name) or previous_snapshot_tag
+                if previous_snapshot_tag == src_snapshot_name.split('@')[-1]:
+                    # NOTE: resumed transfer has already delivered the
+                    # requested snapshot, nothing is left to send.
+                    return '', ''
+
+            send_flags = '-vD'
+            if self.configuration.zfs_replication_compressed_stream:
+                send_flags += 'c'
+            send_flags += 'R'
+            if previous_snapshot_tag:
+                send_args = [
+                    send_flags + 'I', previous_snapshot_tag, src_snapshot_name]
+                receive_args = ['-vF']
+            else:
+                send_args = [send_flags, src_snapshot_name]
+                receive_args = ['-v']
+            if resumable:
+                receive_args.append('-s')
+
+            cmd = self._get_replication_send_cmd(ssh_to_src_cmd, *send_args)
+            cmd.extend(['|', 'ssh', ssh_to_dst_cmd, 'sudo', 'zfs', 'receive'])
+            cmd.extend(receive_args)
+            cmd.append(dst_dataset_name)
+            try:
+                return self.execute(*cmd)
+            except exception.ProcessExecutionError:
+                with excutils.save_and_reraise_exception():
+                    if resumable:
+                        self._save_replication_resume_token(
+                            replica_id, ssh_to_dst_cmd, dst_dataset_name)
+
+    def _sync_replicas(self, replicas, ssh_to_src_cmd, src_snapshot_name):
+        """Syncs given replicas with snapshot concurrently.
+
+        :return: list of IDs of replicas that failed to sync.
+        """
+        snapshot_tag = src_snapshot_name.split('@')[-1]
+
+        def sync(replica_id):
+            previous_snapshot_tag = self.private_storage.get(
+                replica_id, 'repl_snapshot_tag')
+            dataset_name = self.private_storage.get(
+                replica_id, 'dataset_name')
+            ssh_to_dst_cmd = self.private_storage.get(replica_id, 'ssh_cmd')
+            try:
+                # Send/receive diff between previous snapshot and last one
+                out, err = self._transfer_replication_stream(
+                    replica_id, ssh_to_src_cmd, ssh_to_dst_cmd, dataset_name,
+                    src_snapshot_name, previous_snapshot_tag)
+            except exception.ProcessExecutionError as e:
+                LOG.warning(_LW("Failed to sync replica %(id)s. %(e)s"),
+                            {'id': replica_id, 'e': e})
+                return replica_id
+
+            msg = ("Info about last replica '%(replica_id)s' "
+                   "sync is following: \n%(out)s")
+            LOG.debug(msg, {'replica_id': replica_id, 'out': out})
+
+            # Update latest replication snapshot for replica
+            self.private_storage.update(
+                replica_id, {'repl_snapshot_tag': snapshot_tag})
+
+        pool = eventlet.GreenPool(
+            self.configuration.zfs_replication_max_concurrent_transfers)
+        return [failed for failed in pool.imap(sync, replicas) if failed]
+
     @ensure_share_server_not_provided
     def create_replica(self, context, replica_list, new_replica,
                        access_rules, replica_snapshots, share_server=None):
@@ -917,12 +1130,9 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
         )
 
         # Send/receive temporary snapshot
-        out, err = self.execute(
-            'ssh', ssh_to_src_cmd,
-            'sudo', 'zfs', 'send', '-vDR', src_snapshot_name, '|',
-            'ssh', ssh_cmd,
-            'sudo', 'zfs', 'receive', '-v', dst_dataset_name,
-        )
+        out, err = self._transfer_replication_stream(
+            new_replica['id'], ssh_to_src_cmd, ssh_cmd, dst_dataset_name,
+            src_snapshot_name)
         msg = ("Info about replica '%(replica_id)s' creation is following: "
                "\n%(out)s")
         LOG.debug(msg, {'replica_id': new_replica['id'], 'out': out})
@@ -1011,13 +1221,9 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
         self.zfs('set', 'readonly=on', dst_dataset_name)
 
         # Send/receive diff between previous snapshot and last one
-        out, err = self.execute(
-            'ssh', ssh_to_src_cmd,
-            'sudo', 'zfs', 'send', '-vDRI',
-            previous_snapshot_tag, src_snapshot_name, '|',
-            'ssh', ssh_to_dst_cmd,
-            'sudo', 'zfs', 'receive', '-vF', dst_dataset_name,
-        )
+        out, err = self._transfer_replication_stream(
+            replica['id'], ssh_to_src_cmd, ssh_to_dst_cmd, dst_dataset_name,
+            src_snapshot_name, previous_snapshot_tag)
         msg = ("Info about last replica '%(replica_id)s' sync is following: "
                "\n%(out)s")
         LOG.debug(msg, {'replica_id': replica['id'], 'out': out})
@@ -1036,13 +1242,13 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
                 self.private_storage.get(repl['id'], 'repl_snapshot_tag'))
 
         dst_pool_name = dst_dataset_name.split('/')[0]
-        out, err = self.zfs('list', '-r', '-t', 'snapshot', dst_pool_name)
-        data = self.parse_zfs_answer(out)
-        for datum in data:
-            if (dst_dataset_name in datum['NAME'] and
-                    '@' + self.replica_snapshot_prefix in datum['NAME'] and
-                    datum['NAME'].split('@')[-1] not in snap_references):
-                self._delete_dataset_or_snapshot_with_retry(datum['NAME'])
+        inventory = self.get_datasets_inventory([dst_pool_name])
+        for name, props in sorted(inventory.items()):
+            if (props['type'] == 'snapshot' and
+                    dst_dataset_name in name and
+                    '@' + self.replica_snapshot_prefix in name and
+                    name.split('@')[-1] not in snap_references):
+                self._delete_dataset_or_snapshot_with_retry(name)
 
         # Destroy all snapshots on src filesystem except referenced ones.
         src_pool_name = src_snapshot_name.split('/')[0]
@@ -1111,39 +1317,13 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
             )
 
             # Apply temporary snapshot to all replicas
-            for repl in replica_list:
-                if repl['replica_state'] == constants.REPLICA_STATE_ACTIVE:
-                    continue
-                previous_snapshot_tag = self.private_storage.get(
-                    repl['id'], 'repl_snapshot_tag')
-                dataset_name = self.private_storage.get(
-                    repl['id'], 'dataset_name')
-                ssh_to_dst_cmd = self.private_storage.get(
-                    repl['id'], 'ssh_cmd')
-
-                try:
-                    # Send/receive diff between previous snapshot and last one
-                    out, err = self.execute(
-                        'ssh', ssh_to_src_cmd,
-                        'sudo', 'zfs', 'send', '-vDRI',
-                        previous_snapshot_tag, src_snapshot_name, '|',
-                        'ssh', ssh_to_dst_cmd,
-                        'sudo', 'zfs', 'receive', '-vF', dataset_name,
-                    )
-                except exception.ProcessExecutionError as e:
-                    LOG.warning(_LW("Failed to sync replica %(id)s. %(e)s"),
-                                {'id': repl['id'], 'e': e})
-                    replica_dict[repl['id']]['replica_state'] = (
-                        constants.REPLICA_STATE_OUT_OF_SYNC)
-                    continue
-
-                msg = ("Info about last replica '%(replica_id)s' "
-                       "sync is following: \n%(out)s")
-                LOG.debug(msg, {'replica_id': repl['id'], 'out': out})
-
-                # Update latest replication snapshot for replica
-                self.private_storage.update(
-                    repl['id'], {'repl_snapshot_tag': snapshot_tag})
+            failed_replica_ids = self._sync_replicas(
+                [r['id'] for r in replica_list
+                 if r['replica_state'] != constants.REPLICA_STATE_ACTIVE],
+                ssh_to_src_cmd, src_snapshot_name)
+            for replica_id in failed_replica_ids:
+                replica_dict[replica_id]['replica_state'] = (
+                    constants.REPLICA_STATE_OUT_OF_SYNC)
 
             # Update latest replication snapshot for currently active replica
             self.private_storage.update(
@@ -1164,40 +1344,14 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
             src_snapshot_name = dst_dataset_name + '@' + snapshot_tag
             ssh_to_src_cmd = self.private_storage.get(replica['id'], 'ssh_cmd')
             self.zfs('snapshot', src_snapshot_name)
-            for repl in replica_list:
-                if (repl['replica_state'] == constants.REPLICA_STATE_ACTIVE or
-                        repl['id'] == replica['id']):
-                    continue
-                previous_snapshot_tag = self.private_storage.get(
-                    repl['id'], 'repl_snapshot_tag')
-                dataset_name = self.private_storage.get(
-                    repl['id'], 'dataset_name')
-                ssh_to_dst_cmd = self.private_storage.get(
-                    repl['id'], 'ssh_cmd')
-
-                try:
-                    # Send/receive diff between previous snapshot and last one
-                    out, err = self.execute(
-                        'ssh', ssh_to_src_cmd,
-                        'sudo', 'zfs', 'send', '-vDRI',
-                        previous_snapshot_tag, src_snapshot_name, '|',
-                        'ssh', ssh_to_dst_cmd,
-                        'sudo', 'zfs', 'receive', '-vF', dataset_name,
-                    )
-                except exception.ProcessExecutionError as e:
-                    LOG.warning(_LW("Failed to sync replica %(id)s. %(e)s"),
-                                {'id': repl['id'], 'e': e})
-                    replica_dict[repl['id']]['replica_state'] = (
-                        constants.REPLICA_STATE_OUT_OF_SYNC)
-                    continue
-
-                msg = ("Info about last replica '%(replica_id)s' "
-                       "sync is following: \n%(out)s")
-                LOG.debug(msg, {'replica_id': repl['id'], 'out': out})
-
-                # Update latest replication snapshot for replica
-                self.private_storage.update(
-                    repl['id'], {'repl_snapshot_tag': snapshot_tag})
+            failed_replica_ids = self._sync_replicas(
+                [r['id'] for r in replica_list
+                 if (r['replica_state'] != constants.REPLICA_STATE_ACTIVE and
+                     r['id'] != replica['id'])],
+                ssh_to_src_cmd, src_snapshot_name)
+            for replica_id in failed_replica_ids:
+                replica_dict[replica_id]['replica_state'] = (
+                    constants.REPLICA_STATE_OUT_OF_SYNC)
 
             # Update latest replication snapshot for new active replica
             self.private_storage.update(
@@ -1251,45 +1405,20 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
             )
 
         # Populate snapshot to all replicas
+        failed_replica_ids = self._sync_replicas(
+            [si['share_instance_id'] for si in replica_snapshots
+             if si['share_instance_id'] != active_replica['id']],
+            ssh_to_src_cmd, src_snapshot_name)
         for replica_snapshot in replica_snapshots:
-            replica_id = replica_snapshot['share_instance_id']
-            if replica_id == active_replica['id']:
-                replica_snapshots_dict[replica_snapshot['id']]['status'] = (
-                    constants.STATUS_AVAILABLE)
-                continue
-            previous_snapshot_tag = self.private_storage.get(
-                replica_id, 'repl_snapshot_tag')
-            dst_dataset_name = self.private_storage.get(
-                replica_id, 'dataset_name')
-            ssh_to_dst_cmd = self.private_storage.get(replica_id, 'ssh_cmd')
-
-            try:
-                # Send/receive diff between previous snapshot and last one
-                out, err = self.execute(
-                    'ssh', ssh_to_src_cmd,
-                    'sudo', 'zfs', 'send', '-vDRI',
-                    previous_snapshot_tag, src_snapshot_name, '|',
-                    'ssh', ssh_to_dst_cmd,
-                    'sudo', 'zfs', 'receive', '-vF', dst_dataset_name,
-                )
-            except exception.ProcessExecutionError as e:
+            if replica_snapshot['share_instance_id'] in failed_replica_ids:
                 LOG.warning(
-                    _LW("Failed to sync snapshot instance %(id)s. %(e)s"),
-                    {'id': replica_snapshot['id'], 'e': e})
+                    _LW("Failed to sync snapshot instance %s."),
+                    replica_snapshot['id'])
                 replica_snapshots_dict[replica_snapshot['id']]['status'] = (
                     constants.STATUS_ERROR)
-                continue
-
-            replica_snapshots_dict[replica_snapshot['id']]['status'] = (
-                constants.STATUS_AVAILABLE)
-
-            msg = ("Info about last replica '%(replica_id)s' "
-                   "sync is following: \n%(out)s")
-            LOG.debug(msg, {'replica_id': replica_id, 'out': out})
-
-            # Update latest replication snapshot for replica
-            self.private_storage.update(
-                replica_id, {'repl_snapshot_tag': repl_snapshot_tag})
+            else:
+                replica_snapshots_dict[replica_snapshot['id']]['status'] = (
+                    constants.STATUS_AVAILABLE)
 
         # Update latest replication snapshot for currently active replica
         self.private_storage.update(
@@ -1344,15 +1473,10 @@ class ZFSonLinuxShareDriver(zfs_utils.ExecuteMixin, driver.ShareDriver):
 
         snapshot_name = self._get_saved_snapshot_name(replica_snapshot)
 
-        out, err = self.zfs('list', '-r', '-t', 'snapshot', snapshot_name)
-        data = self.parse_zfs_answer(out)
-        snapshot_found = False
-        for datum in data:
-            if datum['NAME'] == snapshot_name:
-                snapshot_found = True
-                break
+        inventory = self.get_datasets_inventory(
+            [snapshot_name.split('/')[0]])
         return_dict = {'id': replica_snapshot['id']}
-        if snapshot_found:
+        if snapshot_name in inventory:
             return_dict.update({'status': constants.STATUS_AVAILABLE})
         else:
             return_dict.update({'status': constants.STATUS_ERROR})
@@ -22,6 +22,7 @@ Module for storing ZFSonLinux driver utility stuff such as:
 # TODO(vponomaryov): add support of SaMBa
 
 import abc
+import time
 
 from oslo_log import log
 import six
@@ -35,6 +36,19 @@ from manila import utils
 
 LOG = log.getLogger(__name__)
 
+# NOTE: properties fetched by single 'zpool list' and 'zfs list' calls
+# and kept in inventory. First one is always used as key.
+ZPOOL_INVENTORY_PROPERTIES = ('name', 'size', 'free', 'allocated')
+ZFS_INVENTORY_PROPERTIES = (
+    'name', 'type', 'used', 'quota', 'mountpoint', 'sharenfs', 'readonly')
+
+# NOTE: zpool/zfs subcommands that change state reflected in inventory.
+ZFS_MUTATING_COMMANDS = (
+    'clone', 'create', 'destroy', 'inherit', 'promote', 'receive', 'recv',
+    'rename', 'rollback', 'set', 'snapshot', 'add', 'attach', 'detach',
+    'remove', 'replace',
+)
+
 
 def zfs_dataset_synchronized(f):
 
@@ -81,6 +95,8 @@ class ExecuteMixin(driver.ExecuteMixin):
             )
         else:
             self.ssh_executor = None
+        self._zpools_inventory = None
+        self._datasets_inventory = {}
 
     def execute(self, *cmd, **kwargs):
         """Common interface for running shell commands."""
@@ -94,7 +110,20 @@ class ExecuteMixin(driver.ExecuteMixin):
         if cmd[0] == 'sudo':
             kwargs['run_as_root'] = True
             cmd = cmd[1:]
-        return executor(*cmd, **kwargs)
+        try:
+            return executor(*cmd, **kwargs)
+        finally:
+            if self._is_zfs_mutation(cmd):
+                self.invalidate_zfs_inventory()
+
+    @staticmethod
+    def _is_zfs_mutation(cmd):
+        """Says whether command changes state of zpools or datasets."""
+        for i, arg in enumerate(cmd[:-1]):
+            if (arg in ('zfs', 'zpool') and
+                    cmd[i + 1] in ZFS_MUTATING_COMMANDS):
+                return True
+        return False
 
     @utils.retry(exception.ProcessExecutionError,
                  interval=5, retries=36, backoff_rate=1)
@@ -140,6 +169,76 @@ class ExecuteMixin(driver.ExecuteMixin):
         """Returns value of requested zfs dataset option."""
         return self._get_option(dataset_name, option_name, False, **kwargs)
 
+    def _get_inventory_ttl(self):
+        return getattr(self.configuration, 'zfs_inventory_cache_ttl', 0) or 0
+
+    def _is_inventory_fresh(self, entry):
+        ttl = self._get_inventory_ttl()
+        return bool(entry) and time.time() - entry[0] < ttl
+
+    def _list_inventory(self, app, properties, names):
+        """Returns dict of resources listed by single zpool/zfs call."""
+        cmd = ['sudo', app, 'list', '-Hp']
+        if app == 'zfs':
+            cmd.extend(['-t', 'all'])
+        cmd.extend(['-o', ','.join(properties)])
+        if names and app == 'zfs':
+            cmd.append('-r')
+        cmd.extend(names)
+
+        out, err = self.execute(*cmd)
+
+        inventory = {}
+        for line in out.split('\n'):
+            values = line.split('\t')
+            if len(values) != len(properties):
+                continue
+            inventory[values[0]] = dict(zip(properties[1:], values[1:]))
+        return inventory
+
+    def get_zpools_inventory(self):
+        """Returns dict with properties of all zpools keyed by name.
+
+        Sizes are in bytes. Result is cached for 'zfs_inventory_cache_ttl'
+        seconds and is invalidated on any mutating zpool/zfs command.
+        """
+        if not self._is_inventory_fresh(self._zpools_inventory):
+            self._zpools_inventory = (
+                time.time(),
+                self._list_inventory('zpool', ZPOOL_INVENTORY_PROPERTIES, []))
+        return self._zpools_inventory[1]
+
+    def get_datasets_inventory(self, zpools):
+        """Returns dict with datasets and snapshots of given zpools.
+
+        Properties of each dataset and snapshot are keyed by its full name,
+        sizes are in bytes. Only zpools absent in cache or stale are queried,
+        and all of them with single 'zfs list' call.
+        """
+        zpools = [zpool.split('/')[0] for zpool in zpools]
+        stale = [zpool for zpool in zpools if not self._is_inventory_fresh(
+            self._datasets_inventory.get(zpool))]
+        if stale:
+            listed = self._list_inventory(
+                'zfs', ZFS_INVENTORY_PROPERTIES, stale)
+            now = time.time()
+            for zpool in stale:
+                self._datasets_inventory[zpool] = (now, {})
+            for name, props in listed.items():
+                zpool = name.split('@')[0].split('/')[0]
+                if zpool in self._datasets_inventory:
+                    self._datasets_inventory[zpool][1][name] = props
+
+        inventory = {}
+        for zpool in zpools:
+            inventory.update(self._datasets_inventory[zpool][1])
+        return inventory
+
+    def invalidate_zfs_inventory(self):
+        """Drops cached zpools and datasets inventory."""
+        self._zpools_inventory = None
+        self._datasets_inventory = {}
+
     def zfs(self, *cmd, **kwargs):
         """ZFS shell commands executor."""
         return self.execute('sudo', 'zfs', *cmd, **kwargs)
@@ -19,8 +19,11 @@ related to common Manila models like Share or Snapshot.
 """
 
 import abc
+import contextlib
+import threading
 
 from oslo_config import cfg
+from oslo_utils import excutils
 from oslo_utils import importutils
 from oslo_utils import uuidutils
 import six
@@ -98,6 +101,69 @@ class SqlStorageDriver(StorageDriver):
         )
 
 
+class _EntityCache(object):
+    """Private data of one entity as seen by the current operation.
+
+    Keeps the pending changes apart from the loaded data, so that only the
+    keys changed by the operation are written back on flush.
+    """
+
+    def __init__(self):
+        self.data = None
+        self.updates = {}
+        self.deleted = set()
+        self.delete_all = False
+
+    @property
+    def loaded(self):
+        return self.data is not None
+
+    @property
+    def dirty(self):
+        return bool(self.updates or self.deleted or self.delete_all)
+
+    def load(self, data):
+        self.data = {} if self.delete_all else dict(data)
+        for key in self.deleted:
+            self.data.pop(key, None)
+        self.data.update(self.updates)
+
+    def get(self, key, default):
+        if key is None:
+            return dict(self.data)
+        elif isinstance(key, list):
+            return {k: self.data[k] for k in key if k in self.data}
+        return self.data.get(key, default)
+
+    def update(self, details, delete_existing):
+        if delete_existing:
+            self.clear()
+        for key, value in details.items():
+            # NOTE: values are stored as text, mirror it for cached reads.
+            value = six.text_type(value)
+            self.updates[key] = value
+            self.deleted.discard(key)
+            if self.loaded:
+                self.data[key] = value
+
+    def delete(self, key):
+        if key is None:
+            self.clear()
+            return
+        for k in (key if isinstance(key, list) else [key]):
+            self.updates.pop(k, None)
+            if not self.delete_all:
+                self.deleted.add(k)
+            if self.loaded:
+                self.data.pop(k, None)
+
+    def clear(self):
+        self.data = {}
+        self.updates = {}
+        self.deleted = set()
+        self.delete_all = True
+
+
 class DriverPrivateData(object):
     def __init__(self, storage=None, *args, **kwargs):
         """Init method.
@@ -127,6 +193,50 @@ class DriverPrivateData(object):
                     " 'context' and 'backend_host' parameters.")
             raise ValueError(msg)
 
+        # NOTE: greenthread local when eventlet has patched threading, so
+        # every operation gets its own cache.
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def cached(self):
+        """Cache private data for the duration of an operation.
+
+        Within the block every entity is loaded from the storage once,
+        then reads are served from memory and changes are accumulated.
+        On exit, changes are written back with at most one update and one
+        delete call per entity.  Only changed keys are written, so
+        concurrent operations on the same entity do not overwrite each
+        other's keys.  Nested blocks share the outermost cache.
+        """
+        if getattr(self._local, 'entities', None) is not None:
+            yield
+            return
+
+        entities = self._local.entities = {}
+        try:
+            yield
+        except Exception:
+            # NOTE: changes made before a failure are written too, drivers
+            # rely on them to clean up.
+            with excutils.save_and_reraise_exception():
+                self._local.entities = None
+                self._flush(entities)
+        self._local.entities = None
+        self._flush(entities)
+
+    def _get_entity_cache(self):
+        return getattr(self._local, 'entities', None)
+
+    def _flush(self, entities):
+        for entity_id, entity in entities.items():
+            if not entity.dirty:
+                continue
+            if entity.delete_all or entity.updates:
+                self._storage.update(
+                    entity_id, entity.updates, entity.delete_all)
+            if entity.deleted and not entity.delete_all:
+                self._storage.delete(entity_id, sorted(entity.deleted))
+
     def get(self, entity_id, key=None, default=None):
         """Get one, list or all key-value pairs.
 
@@ -136,7 +246,14 @@ class DriverPrivateData(object):
         :returns: string or dict
         """
         self._validate_entity_id(entity_id)
-        return self._storage.get(entity_id, key, default)
+        entities = self._get_entity_cache()
+        if entities is None:
+            return self._storage.get(entity_id, key, default)
+
+        entity = entities.setdefault(entity_id, _EntityCache())
+        if not entity.loaded:
+            entity.load(self._storage.get(entity_id, None, {}) or {})
+        return entity.get(key, default)
 
     def update(self, entity_id, details, delete_existing=False):
         """Update or create specified key-value pairs.
@@ -156,8 +273,14 @@ class DriverPrivateData(object):
                    % six.text_type(details))
             raise ValueError(msg)
 
-        return self._storage.update(
-            entity_id, details, delete_existing)
+        entities = self._get_entity_cache()
+        if entities is None:
+            return self._storage.update(
+                entity_id, details, delete_existing)
+
+        entities.setdefault(entity_id, _EntityCache()).update(
+            details, delete_existing)
+        return details
 
     def delete(self, entity_id, key=None):
         """Delete one, list or all key-value pairs.
@@ -166,7 +289,11 @@ class DriverPrivateData(object):
         :param key: Key string or list of keys
         """
         self._validate_entity_id(entity_id)
-        return self._storage.delete(entity_id, key)
+        entities = self._get_entity_cache()
+        if entities is None:
+            return self._storage.delete(entity_id, key)
+
+        entities.setdefault(entity_id, _EntityCache()).delete(key)
 
     @staticmethod
     def _validate_entity_id(entity_id):
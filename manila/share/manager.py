@@ -23,6 +23,7 @@ import copy
 import datetime
 import functools
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log
 from oslo_serialization import jsonutils
@@ -93,6 +94,19 @@ share_manager_opts = [
                deprecated_group='DEFAULT',
                min=10,
                max=60),
+    cfg.IntOpt('share_server_cleanup_concurrency',
+               default=1,
+               min=1,
+               help='Maximum number of unused share servers that the '
+                    'automatic share server cleanup deletes at the same '
+                    'time.'),
+    cfg.IntOpt('share_server_cleanup_max_per_run',
+               default=0,
+               min=0,
+               help='Maximum number of unused share servers that one run of '
+                    'the automatic share server cleanup deletes. The rest '
+                    'are deleted by the following runs. Value 0 means no '
+                    'limit.'),
     cfg.IntOpt('replica_state_update_interval',
                default=300,
                help='This value, specified in seconds, determines how often '
@@ -104,6 +118,35 @@ share_manager_opts = [
                     'the share manager will poll the driver to perform the '
                     'next step of migration in the storage backend, for a '
                     'migrating share.'),
+    cfg.FloatOpt('access_rules_update_coalescing_window',
+                 default=0,
+                 min=0,
+                 help='Time, in seconds, for which the share manager delays '
+                      'applying access rule changes of a share instance, so '
+                      'that all rule changes requested for that share '
+                      'instance within this time are applied by a single '
+                      'driver call. Value 0 disables the delay and applies '
+                      'every request immediately.'),
+    cfg.IntOpt('share_server_pool_size',
+               default=0,
+               min=0,
+               help='Number of unused share servers that a backend which '
+                    'handles share servers keeps ready for each share '
+                    'network it has no shares in yet, so that the first '
+                    'share of a share network on the backend does not wait '
+                    'for a share server to be set up. These share servers '
+                    'are created in the background, and are not deleted by '
+                    'the automatic share server cleanup while their share '
+                    'network has no shares on the backend. Each of them '
+                    'takes backend resources, e.g. a service instance for '
+                    'the Generic driver, so see also '
+                    'share_server_pool_share_networks. Value 0 disables the '
+                    'pool.'),
+    cfg.ListOpt('share_server_pool_share_networks',
+                default=[],
+                help='IDs of share networks to keep share server pools for, '
+                     'if share_server_pool_size is set. Pools are kept for '
+                     'all share networks if empty.'),
 ]
 
 CONF = cfg.CONF
@@ -187,6 +230,21 @@ def add_hooks(f):
     return wrapped
 
 
+def cache_private_data(f):
+    """Cache driver private data for the duration of a manager operation.
+
+    Drivers read the same private data keys many times per operation, the
+    keys are loaded once and all changes are written back when the
+    operation ends.
+    """
+    @functools.wraps(f)
+    def wrapped(self, *args, **kwargs):
+        with self.private_storage.cached():
+            return f(self, *args, **kwargs)
+
+    return wrapped
+
+
 class ShareManager(manager.SchedulerDependentManager):
     """Manages NAS storages."""
 
@@ -214,6 +272,7 @@ class ShareManager(manager.SchedulerDependentManager):
             context=ctxt, backend_host=self.host,
             config_group=self.configuration.config_group
         )
+        self.private_storage = private_storage
         self.driver = importutils.import_object(
             share_driver, private_storage=private_storage,
             configuration=self.configuration,
@@ -224,6 +283,15 @@ class ShareManager(manager.SchedulerDependentManager):
             snapshot_access.ShareSnapshotInstanceAccess(self.db, self.driver))
         self.migration_wait_access_rules_timeout = (
             CONF.migration_wait_access_rules_timeout)
+        # Share instances with access rule updates waiting for the end of
+        # the coalescing window, mapped to the context to apply them with.
+        self._pending_access_updates = {}
+        # Number of pooled share servers being created per share network.
+        self._pending_pooled_share_servers = {}
+        # Share networks whose pools are not refilled for a while after a
+        # failed share server setup, mapped to the number of failures in a
+        # row and to the time of the next attempt.
+        self._failed_share_server_pools = {}
 
         self.hooks = []
         self._init_hook_drivers()
@@ -264,6 +332,7 @@ class ShareManager(manager.SchedulerDependentManager):
         return pool
 
     @add_hooks
+    @cache_private_data
     def init_host(self):
         """Initialization for a standalone service."""
 
@@ -1538,6 +1607,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def create_share_instance(self, context, share_instance_id,
                               request_spec=None, filter_properties=None,
                               snapshot_id=None):
@@ -1689,6 +1759,7 @@ class ShareManager(manager.SchedulerDependentManager):
     @add_hooks
     @utils.require_driver_initialized
     @locked_share_replica_operation
+    @cache_private_data
     def create_share_replica(self, context, share_replica_id, share_id=None,
                              request_spec=None, filter_properties=None):
         """Create a share replica."""
@@ -1825,6 +1896,7 @@ class ShareManager(manager.SchedulerDependentManager):
     @add_hooks
     @utils.require_driver_initialized
     @locked_share_replica_operation
+    @cache_private_data
     def delete_share_replica(self, context, share_replica_id, share_id=None,
                              force=False):
         """Delete a share replica."""
@@ -1905,6 +1977,7 @@ class ShareManager(manager.SchedulerDependentManager):
     @add_hooks
     @utils.require_driver_initialized
     @locked_share_replica_operation
+    @cache_private_data
     def promote_share_replica(self, context, share_replica_id, share_id=None):
         """Promote a share replica to active state."""
         context = context.elevated()
@@ -2070,6 +2143,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def update_share_replica(self, context, share_replica_id, share_id=None):
         """Initiated by the force_update API."""
         share_replica = self.db.share_replica_get(
@@ -2157,6 +2231,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def manage_share(self, context, share_id, driver_options):
         context = context.elevated()
         share_ref = self.db.share_get(context, share_id)
@@ -2227,6 +2302,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def manage_snapshot(self, context, snapshot_id, driver_options):
         if self.driver.driver_handles_share_servers:
             msg = _("Manage snapshot is not supported for "
@@ -2329,6 +2405,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def unmanage_share(self, context, share_id):
         context = context.elevated()
         share_ref = self.db.share_get(context, share_id)
@@ -2390,6 +2467,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def unmanage_snapshot(self, context, snapshot_id):
         status = {'status': constants.STATUS_UNMANAGE_ERROR}
         if self.driver.driver_handles_share_servers:
@@ -2459,6 +2537,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def revert_to_snapshot(self, context, snapshot_id,
                            reservations):
         context = context.elevated()
@@ -2536,6 +2615,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def delete_share_instance(self, context, share_instance_id, force=False):
         """Delete a share instance."""
         context = context.elevated()
@@ -2616,11 +2696,171 @@ class ShareManager(manager.SchedulerDependentManager):
         servers = self.db.share_server_get_all_unused_deletable(ctxt,
                                                                 self.host,
                                                                 updated_before)
+        if self.configuration.share_server_pool_size:
+            servers = self._exclude_pooled_share_servers(ctxt, servers)
+
+        backlog = len(servers)
+        max_servers = self.configuration.share_server_cleanup_max_per_run
+        if max_servers:
+            servers = servers[:max_servers]
+        if not servers:
+            return
+
+        results = {'deleted': 0, 'in_use': 0, 'failed': 0}
+
+        def _delete_free_share_server(server):
+            try:
+                self.delete_share_server(ctxt, server)
+            except exception.ShareServerInUse:
+                results['in_use'] += 1
+            except Exception:
+                LOG.exception(_LE("Failed to delete unused share server "
+                                  "%s."), server['id'])
+                results['failed'] += 1
+            else:
+                results['deleted'] += 1
+
+        start = timeutils.now()
+        pool = eventlet.GreenPool(
+            self.configuration.share_server_cleanup_concurrency)
         for server in servers:
-            self.delete_share_server(ctxt, server)
+            pool.spawn_n(_delete_free_share_server, server)
+        pool.waitall()
+
+        results.update(left=backlog - len(servers),
+                       elapsed=timeutils.now() - start)
+        LOG.info(_LI("Unused share servers cleanup finished in "
+                     "%(elapsed).1f seconds: %(deleted)d deleted, "
+                     "%(in_use)d in use, %(failed)d failed, %(left)d left "
+                     "for next runs."), results)
+
+    def _get_pooled_share_network_ids(self, context):
+        """Returns IDs of share networks to keep share server pools for.
+
+        Pools only serve the first share of a share network on this host,
+        later shares reuse its share server, so share networks which already
+        have share instances here are left out.
+        """
+        share_network_ids = set(
+            share_network['id']
+            for share_network in self.db.share_network_get_all(context))
+        allowed_ids = self.configuration.share_server_pool_share_networks
+        if allowed_ids:
+            share_network_ids &= set(allowed_ids)
+        share_instances = self.db.share_instances_get_all_by_host(
+            context, self.host)
+        share_network_ids -= set(instance['share_network_id']
+                                 for instance in share_instances)
+        return share_network_ids
+
+    def _exclude_pooled_share_servers(self, context, share_servers):
+        """Filters out the unused share servers kept in the pool."""
+        pool_size = self.configuration.share_server_pool_size
+        pooled_server_ids = set()
+        share_network_ids = set(server['share_network_id']
+                                for server in share_servers)
+        share_network_ids &= self._get_pooled_share_network_ids(context)
+        for share_network_id in share_network_ids:
+            free_servers = (
+                self.db.share_server_get_all_free_by_host_and_share_net(
+                    context, self.host, share_network_id))
+            pooled_server_ids.update(
+                server['id'] for server in free_servers[:pool_size])
+        return [server for server in share_servers
+                if server['id'] not in pooled_server_ids]
+
+    @periodic_task.periodic_task(spacing=CONF.periodic_interval)
+    @utils.require_driver_initialized
+    def _replenish_share_server_pools(self, context):
+        if not (self.driver.driver_handles_share_servers and
+                self.configuration.share_server_pool_size):
+            return
+        share_network_ids = self._get_pooled_share_network_ids(context)
+        for share_network_id in share_network_ids:
+            self._replenish_share_server_pool(context, share_network_id)
+        for share_network_id in (set(self._failed_share_server_pools) -
+                                 share_network_ids):
+            del self._failed_share_server_pools[share_network_id]
+
+    def _replenish_share_server_pool(self, context, share_network_id):
+        """Starts creation of the share servers missing from the pool."""
+        failures, retry_at = self._failed_share_server_pools.get(
+            share_network_id, (0, None))
+        if retry_at and timeutils.utcnow() < retry_at:
+            LOG.debug("Skipping refill of share server pool of share "
+                      "network %(network)s until %(retry_at)s after "
+                      "%(failures)d failed share server setups.",
+                      {'network': share_network_id, 'retry_at': retry_at,
+                       'failures': failures})
+            return
+
+        @utils.synchronized("share_server_pool_%s" % share_network_id)
+        def _reserve_missing_share_servers():
+            free_servers = (
+                self.db.share_server_get_all_free_by_host_and_share_net(
+                    context, self.host, share_network_id))
+            pending = self._pending_pooled_share_servers.get(
+                share_network_id, 0)
+            missing = (self.configuration.share_server_pool_size -
+                       len(free_servers) - pending)
+            if missing > 0:
+                self._pending_pooled_share_servers[share_network_id] = (
+                    pending + missing)
+            return missing
+
+        try:
+            missing = _reserve_missing_share_servers()
+        except Exception:
+            LOG.exception(_LE("Failed to check share server pool of share "
+                              "network %s."), share_network_id)
+            return
+
+        for __ in range(missing):
+            eventlet.spawn_n(self._create_pooled_share_server,
+                             context, share_network_id)
+
+    def _create_pooled_share_server(self, context, share_network_id):
+        try:
+            # NOTE: Pooled share servers are created as inactive, so that
+            # they are not chosen for shares before they are set up.
+            share_server = self.db.share_server_create(
+                context,
+                {
+                    'host': self.host,
+                    'share_network_id': share_network_id,
+                    'status': constants.STATUS_INACTIVE,
+                }
+            )
+            share_server = self._setup_server(context, share_server)
+            self._failed_share_server_pools.pop(share_network_id, None)
+            LOG.info(_LI("Share server %(server)s was added to the pool of "
+                         "share network %(network)s."),
+                     {'server': share_server['id'],
+                      'network': share_network_id})
+        except Exception:
+            failures, __ = self._failed_share_server_pools.get(
+                share_network_id, (0, None))
+            failures += 1
+            # NOTE: Delay doubles with each failure in a row, up to the
+            # interval after which unused share servers are cleaned up.
+            delay = min(
+                CONF.periodic_interval * 2 ** (failures - 1),
+                self.configuration.unused_share_server_cleanup_interval * 60)
+            retry_at = timeutils.utcnow() + datetime.timedelta(seconds=delay)
+            self._failed_share_server_pools[share_network_id] = (
+                failures, retry_at)
+            LOG.exception(_LE("Failed to create pooled share server for "
+                              "share network %(network)s. The pool will not "
+                              "be refilled until %(retry_at)s."),
+                          {'network': share_network_id, 'retry_at': retry_at})
+        finally:
+            self._pending_pooled_share_servers[share_network_id] -= 1
+            if not self._pending_pooled_share_servers[share_network_id]:
+                del self._pending_pooled_share_servers[share_network_id]
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def create_snapshot(self, context, share_id, snapshot_id):
         """Create snapshot for share."""
         snapshot_ref = self.db.share_snapshot_get(context, snapshot_id)
@@ -2669,6 +2909,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def delete_snapshot(self, context, snapshot_id, force=False):
         """Delete share snapshot."""
         context = context.elevated()
@@ -2741,6 +2982,7 @@ class ShareManager(manager.SchedulerDependentManager):
     @add_hooks
     @utils.require_driver_initialized
     @locked_share_replica_operation
+    @cache_private_data
     def create_replicated_snapshot(self, context, snapshot_id, share_id=None):
         """Create a snapshot for a replicated share."""
         # Grab the snapshot and replica information from the DB.
@@ -2870,6 +3112,7 @@ class ShareManager(manager.SchedulerDependentManager):
     @add_hooks
     @utils.require_driver_initialized
     @locked_share_replica_operation
+    @cache_private_data
     def delete_replicated_snapshot(self, context, snapshot_id,
                                    share_id=None, force=False):
         """Delete a snapshot from a replicated share."""
@@ -3065,6 +3308,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def update_access(self, context, share_instance_id):
         """Allow/Deny access to some share."""
         share_instance = self._get_share_instance(context, share_instance_id)
@@ -3073,11 +3317,50 @@ class ShareManager(manager.SchedulerDependentManager):
         LOG.debug("Received request to update access for share instance"
                   " %s." % share_instance_id)
 
+        window = self.configuration.access_rules_update_coalescing_window
+        if window:
+            self._schedule_access_rules_update(
+                context, share_instance_id, window)
+            return
+
         self.access_helper.update_access_rules(
             context,
             share_instance_id,
             share_server=share_server)
 
+    def _schedule_access_rules_update(self, context, share_instance_id,
+                                      window):
+        # Access rule changes are queued in the DB by the API, so one access
+        # rules update applies all of them. Requests that arrive while an
+        # update for the same share instance is already scheduled are merged
+        # into it.
+        if share_instance_id in self._pending_access_updates:
+            LOG.debug("Access rules update for share instance %s is already "
+                      "scheduled, coalescing request.", share_instance_id)
+            return
+
+        self._pending_access_updates[share_instance_id] = context
+        eventlet.spawn_after(
+            window, self._flush_pending_access_rules_update, share_instance_id)
+
+    def _flush_pending_access_rules_update(self, share_instance_id):
+        context = self._pending_access_updates.pop(share_instance_id, None)
+        if context is None:
+            return
+
+        try:
+            share_instance = self._get_share_instance(
+                context, share_instance_id)
+            share_server = self._get_share_server(context, share_instance)
+            self.access_helper.update_access_rules(
+                context, share_instance_id, share_server=share_server)
+        except exception.NotFound:
+            LOG.debug("Share instance %s was deleted before its access rules "
+                      "were updated.", share_instance_id)
+        except Exception:
+            LOG.exception(_LE("Failed to update access rules of share "
+                              "instance %s."), share_instance_id)
+
     @periodic_task.periodic_task(spacing=CONF.periodic_interval)
     @utils.require_driver_initialized
     def _report_driver_status(self, context):
@@ -3119,7 +3402,7 @@ class ShareManager(manager.SchedulerDependentManager):
     def publish_service_capabilities(self, context):
         """Collect driver status and then publish it."""
         self._report_driver_status(context)
-        self._publish_service_capabilities(context)
+        self._publish_service_capabilities(context, full_report=True)
 
     def _form_server_setup_info(self, context, share_server, share_network):
         # Network info is used by driver for setting up share server
@@ -3165,6 +3448,7 @@ class ShareManager(manager.SchedulerDependentManager):
             # details table to remove dependency from share network after
             # creation operation. It will allow us to delete share server and
             # share network separately without dependency on each other.
+            security_services_details = {}
             for security_service in network_info['security_services']:
                 ss_type = security_service['type']
                 data = {
@@ -3176,9 +3460,12 @@ class ShareManager(manager.SchedulerDependentManager):
                     'type': ss_type,
                     'password': security_service['password'],
                 }
+                security_services_details['security_service_' + ss_type] = (
+                    jsonutils.dumps(data))
+            if security_services_details:
                 self.db.share_server_backend_details_set(
-                    context, share_server['id'],
-                    {'security_service_' + ss_type: jsonutils.dumps(data)})
+                    context, share_server['id'], security_services_details,
+                    check_exists=False)
 
             server_info = self.driver.setup_server(
                 network_info, metadata=metadata)
@@ -3188,7 +3475,8 @@ class ShareManager(manager.SchedulerDependentManager):
 
             if server_info and isinstance(server_info, dict):
                 self.db.share_server_backend_details_set(
-                    context, share_server['id'], server_info)
+                    context, share_server['id'], server_info,
+                    check_exists=False)
             return self.db.share_server_update(
                 context, share_server['id'],
                 {'status': constants.STATUS_ACTIVE})
@@ -3272,11 +3560,13 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def delete_share_server(self, context, share_server):
+        server_id = share_server['id']
 
         @utils.synchronized(
             "share_manager_%s" % share_server['share_network_id'])
-        def _wrapped_delete_share_server():
+        def _mark_share_server_deleting():
             # NOTE(vponomaryov): Verify that there are no dependent shares.
             # Without this verification we can get here exception in next case:
             # share-server-delete API was called after share creation scheduled
@@ -3284,17 +3574,23 @@ class ShareManager(manager.SchedulerDependentManager):
             # of share_server_id field for share. If so, after lock realese
             # this method starts executing when amount of dependent shares
             # has been changed.
-            server_id = share_server['id']
             shares = self.db.share_instances_get_all_by_share_server(
                 context, server_id)
 
             if shares:
                 raise exception.ShareServerInUse(share_server_id=server_id)
 
-            server_details = share_server['backend_details']
-
             self.db.share_server_update(context, server_id,
                                         {'status': constants.STATUS_DELETING})
+
+        # NOTE: Share servers in 'deleting' status are not provided to new
+        # shares, so only marking the share server is done under the share
+        # network lock, and share servers of the same share network can be
+        # torn down at the same time.
+        @utils.synchronized("share_server_delete_%s" % server_id)
+        def _wrapped_delete_share_server():
+            _mark_share_server_deleting()
+            server_details = share_server['backend_details']
             try:
                 LOG.debug("Deleting share server '%s'", server_id)
                 security_services = []
@@ -3324,6 +3620,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def extend_share(self, context, share_id, new_size, reservations):
         context = context.elevated()
         share = self.db.share_get(context, share_id)
@@ -3367,6 +3664,7 @@ class ShareManager(manager.SchedulerDependentManager):
 
     @add_hooks
     @utils.require_driver_initialized
+    @cache_private_data
     def shrink_share(self, context, share_id, new_size):
         context = context.elevated()
         share = self.db.share_get(context, share_id)
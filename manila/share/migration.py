@@ -70,20 +70,23 @@ class ShareMigrationHelper(object):
         deadline = starttime + self.migration_create_delete_share_timeout
         tries = 0
         instance = "Something not None"
-        while instance is not None:
-            try:
-                instance = self.db.share_instance_get(self.context,
-                                                      share_instance['id'])
-                tries += 1
-                now = time.time()
-                if now > deadline:
-                    msg = _("Timeout trying to delete instance "
-                            "%s") % share_instance['id']
-                    raise exception.ShareMigrationFailed(reason=msg)
-            except exception.NotFound:
-                instance = None
-            else:
-                time.sleep(tries ** 2)
+        with utils.ResourceChangeWaiter('share_instance',
+                                        share_instance['id']) as waiter:
+            while instance is not None:
+                try:
+                    instance = self.db.share_instance_get(
+                        self.context, share_instance['id'])
+                    tries += 1
+                    now = time.time()
+                    if now > deadline:
+                        msg = _("Timeout trying to delete instance "
+                                "%s") % share_instance['id']
+                        raise exception.ShareMigrationFailed(reason=msg)
+                except exception.NotFound:
+                    instance = None
+                else:
+                    waiter.wait(min(tries ** 2,
+                                    utils.RESOURCE_CHANGE_MAX_POLL_INTERVAL))
 
     def create_instance_and_wait(self, share, dest_host, new_share_network_id,
                                  new_az_id, new_share_type_id):
@@ -95,30 +98,35 @@ class ShareMigrationHelper(object):
         # Wait for new_share_instance to become ready
         starttime = time.time()
         deadline = starttime + self.migration_create_delete_share_timeout
-        new_share_instance = self.db.share_instance_get(
-            self.context, new_share_instance['id'], with_share_data=True)
-        tries = 0
-        while new_share_instance['status'] != constants.STATUS_AVAILABLE:
-            tries += 1
-            now = time.time()
-            if new_share_instance['status'] == constants.STATUS_ERROR:
-                msg = _("Failed to create new share instance"
-                        " (from %(share_id)s) on "
-                        "destination host %(host_name)s") % {
-                    'share_id': share['id'], 'host_name': dest_host}
-                self.cleanup_new_instance(new_share_instance)
-                raise exception.ShareMigrationFailed(reason=msg)
-            elif now > deadline:
-                msg = _("Timeout creating new share instance "
-                        "(from %(share_id)s) on "
-                        "destination host %(host_name)s") % {
-                    'share_id': share['id'], 'host_name': dest_host}
-                self.cleanup_new_instance(new_share_instance)
-                raise exception.ShareMigrationFailed(reason=msg)
-            else:
-                time.sleep(tries ** 2)
+        waiter = utils.ResourceChangeWaiter('share_instance',
+                                            new_share_instance['id'])
+        with waiter:
             new_share_instance = self.db.share_instance_get(
                 self.context, new_share_instance['id'], with_share_data=True)
+            tries = 0
+            while new_share_instance['status'] != constants.STATUS_AVAILABLE:
+                tries += 1
+                now = time.time()
+                if new_share_instance['status'] == constants.STATUS_ERROR:
+                    msg = _("Failed to create new share instance"
+                            " (from %(share_id)s) on "
+                            "destination host %(host_name)s") % {
+                        'share_id': share['id'], 'host_name': dest_host}
+                    self.cleanup_new_instance(new_share_instance)
+                    raise exception.ShareMigrationFailed(reason=msg)
+                elif now > deadline:
+                    msg = _("Timeout creating new share instance "
+                            "(from %(share_id)s) on "
+                            "destination host %(host_name)s") % {
+                        'share_id': share['id'], 'host_name': dest_host}
+                    self.cleanup_new_instance(new_share_instance)
+                    raise exception.ShareMigrationFailed(reason=msg)
+                else:
+                    waiter.wait(min(tries ** 2,
+                                    utils.RESOURCE_CHANGE_MAX_POLL_INTERVAL))
+                new_share_instance = self.db.share_instance_get(
+                    self.context, new_share_instance['id'],
+                    with_share_data=True)
 
         return new_share_instance
 
@@ -15,6 +15,7 @@
 
 """Built-in share type properties."""
 
+import copy
 import re
 
 from oslo_config import cfg
@@ -35,6 +36,64 @@ CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
 
+class ShareTypesCache(object):
+    """In-memory cache of share types and their extra specs.
+
+    Entries are tagged with the share types generation, a counter stored in
+    the database and increased on every change of share types, extra specs
+    or share type access.  Reading it is a single primary key lookup, much
+    cheaper than loading share types with their extra specs, and a changed
+    generation drops all entries.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        self._generation = None
+        self._entries = {}
+
+    def get(self, ctxt, key, load):
+        if not CONF.share_types_cache_enabled:
+            return load()
+
+        generation = db.share_types_generation_get(ctxt)
+        if generation != self._generation:
+            self._entries = {}
+            self._generation = generation
+
+        # NOTE: private share types are only visible to some projects.
+        key += (None if ctxt.is_admin else ctxt.project_id, )
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = self._entries[key] = load()
+        else:
+            self.hits += 1
+        # Callers are free to modify what they get.
+        return copy.deepcopy(value)
+
+    def get_stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._entries)}
+
+
+_CACHE = ShareTypesCache()
+
+
+def get_cache_stats():
+    """Return hit and miss counters of the share types cache."""
+    return _CACHE.get_stats()
+
+
+def invalidate_cache():
+    """Drop share types cached by this process."""
+    _CACHE.clear()
+
+
 def create(context, name, extra_specs=None, is_public=True, projects=None):
     """Creates share types."""
     extra_specs = extra_specs or {}
@@ -78,7 +137,9 @@ def get_all_types(context, inactive=0, search_opts=None):
     if 'is_public' in search_opts:
         filters['is_public'] = search_opts.pop('is_public')
 
-    share_types = db.share_type_get_all(context, inactive, filters=filters)
+    share_types = _CACHE.get(
+        context, ('all', inactive, tuple(sorted(filters.items()))),
+        lambda: db.share_type_get_all(context, inactive, filters=filters))
 
     for type_name, type_args in share_types.items():
         required_extra_specs = {}
@@ -130,7 +191,9 @@ def get_share_type(ctxt, id, expected_fields=None):
     if ctxt is None:
         ctxt = context.get_admin_context()
 
-    return db.share_type_get(ctxt, id, expected_fields=expected_fields)
+    return _CACHE.get(
+        ctxt, ('id', id, tuple(expected_fields or ())),
+        lambda: db.share_type_get(ctxt, id, expected_fields=expected_fields))
 
 
 def get_share_type_by_name(context, name):
@@ -139,7 +202,9 @@ def get_share_type_by_name(context, name):
         msg = _("name cannot be None")
         raise exception.InvalidShareType(reason=msg)
 
-    return db.share_type_get_by_name(context, name)
+    return _CACHE.get(
+        context, ('name', name),
+        lambda: db.share_type_get_by_name(context, name))
 
 
 def get_share_type_by_name_or_id(context, share_type=None):
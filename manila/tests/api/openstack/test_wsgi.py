@@ -12,6 +12,7 @@
 
 import ddt
 import mock
+from oslo_serialization import jsonutils
 import six
 import webob
 
@@ -178,6 +179,36 @@ class JSONDictSerializerTest(test.TestCase):
                                 six.b('')).replace(six.b(' '), six.b(''))
         self.assertEqual(expected_json, result)
 
+    def test_serialize_iter(self):
+        items = [{'id': i, 'name': 'fake_%s' % i} for i in range(10)]
+        data = {'servers': wsgi.StreamedList(iter(items)),
+                'servers_links': [{'rel': 'next'}]}
+        serializer = wsgi.JSONDictSerializer()
+        serializer.stream_chunk_size = 32
+
+        chunks = list(serializer.serialize_iter(data))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(
+            {'servers': items, 'servers_links': [{'rel': 'next'}]},
+            jsonutils.loads(six.b('').join(chunks)))
+
+    def test_serialize_iter_empty_list(self):
+        data = {'servers': wsgi.StreamedList([])}
+        serializer = wsgi.JSONDictSerializer()
+
+        result = six.b('').join(serializer.serialize_iter(data))
+
+        self.assertEqual({'servers': []}, jsonutils.loads(result))
+
+    def test_serialize_streamed_list(self):
+        data = {'servers': wsgi.StreamedList(iter([{'id': 1}]))}
+        serializer = wsgi.JSONDictSerializer()
+
+        result = serializer.serialize(data)
+
+        self.assertEqual({'servers': [{'id': 1}]}, jsonutils.loads(result))
+
 
 class TextDeserializerTest(test.TestCase):
     def test_dispatch_default(self):
@@ -208,6 +239,7 @@ class JSONDeserializerTest(test.TestCase):
         self.assertEqual(as_dict, deserializer.deserialize(data))
 
 
+@ddt.ddt
 class ResourceTest(test.TestCase):
     def test_resource_call(self):
         class Controller(object):
@@ -220,6 +252,51 @@ class ResourceTest(test.TestCase):
         self.assertEqual(six.b('off'), response.body)
         self.assertEqual(200, response.status_int)
 
+    @ddt.data((True, False), (False, True), (True, True))
+    @ddt.unpack
+    def test_resource_call_request_cache(self, enabled, debug):
+        self.flags(api_request_cache_enabled=enabled,
+                   api_request_cache_debug=debug)
+        ctxt = context.RequestContext('fake_user', 'fake_project')
+        load = mock.Mock(return_value='off')
+
+        class Controller(object):
+            def index(self, req):
+                cache = req.environ['manila.context'].request_cache
+                cache.get('fake_key', load)
+                return cache.get('fake_key', load)
+
+        req = webob.Request.blank('/tests')
+        req.environ['manila.context'] = ctxt
+        self.mock_object(wsgi.LOG, 'debug')
+        app = fakes.TestRouter(Controller())
+        response = req.get_response(app)
+
+        self.assertEqual(six.b('off'), response.body)
+        self.assertEqual(1 if enabled else 2, load.call_count)
+        self.assertIsNone(ctxt.request_cache)
+        self.assertEqual(
+            debug,
+            any('read %(call)s' in call[0][0]
+                for call in wsgi.LOG.debug.call_args_list))
+
+    def test_resource_call_request_cache_disabled(self):
+        self.flags(api_request_cache_enabled=False,
+                   api_request_cache_debug=False)
+        ctxt = context.RequestContext('fake_user', 'fake_project')
+
+        class Controller(object):
+            def index(self, req):
+                return six.text_type(
+                    req.environ['manila.context'].request_cache)
+
+        req = webob.Request.blank('/tests')
+        req.environ['manila.context'] = ctxt
+        app = fakes.TestRouter(Controller())
+        response = req.get_response(app)
+
+        self.assertEqual(six.b('None'), response.body)
+
     def test_resource_not_authorized(self):
         class Controller(object):
             def index(self, req):
@@ -864,6 +941,18 @@ class ResponseObjectTest(test.TestCase):
             self.assertEqual(202, response.status_int)
             self.assertEqual(six.b(mtype), response.body)
 
+    def test_serialize_streamed(self):
+        items = [{'id': 'fake_id_%s' % i} for i in range(3)]
+        robj = wsgi.ResponseObject(
+            {'servers': wsgi.StreamedList(iter(items))})
+        request = wsgi.Request.blank('/tests')
+
+        response = robj.serialize(request, 'application/json',
+                                  {'json': wsgi.JSONDictSerializer})
+
+        self.assertIsNone(response.content_length)
+        self.assertEqual({'servers': items}, jsonutils.loads(response.body))
+
 
 class ValidBodyTest(test.TestCase):
 
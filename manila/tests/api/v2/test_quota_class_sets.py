@@ -132,10 +132,14 @@ class QuotaSetsControllerTest(test.TestCase):
             }
         }
 
+        mock_invalidate = self.mock_object(quota_class_sets.QUOTAS,
+                                           'invalidate_limits_cache')
+
         update_result = controller().update(
             req, self.class_name, body=body)
 
         self.assertEqual(expected, update_result)
+        mock_invalidate.assert_called_once_with()
 
         show_result = controller().show(req, self.class_name)
 
@@ -222,11 +222,14 @@ class QuotaSetsControllerTest(test.TestCase):
             request.environ['manila.context'], self.resource_name, 'update')
         mock_policy_show_check_call = mock.call(
             request.environ['manila.context'], self.resource_name, 'show')
+        mock_invalidate = self.mock_object(quota_sets.QUOTAS,
+                                           'invalidate_limits_cache')
 
         update_result = self.controller.update(
             request, self.project_id, body=body)
 
         self.assertEqual(expected, update_result)
+        mock_invalidate.assert_called_once_with(self.project_id)
 
         show_result = self.controller.show(request, self.project_id)
 
@@ -21,6 +21,7 @@ import ddt
 import mock
 from oslo_config import cfg
 from oslo_serialization import jsonutils
+from oslo_utils import uuidutils
 import six
 import webob
 import webob.exc
@@ -1968,6 +1969,131 @@ class ShareActionsTest(test.TestCase):
             req.environ['manila.context'], share, 'user',
             'clemsontigers', 'rw')
 
+    def test_allow_access_bulk(self):
+        access_rules = [
+            {'access_type': 'ip', 'access_to': '127.0.0.1'},
+            {'access_type': 'ip', 'access_to': '10.0.0.0/24',
+             'access_level': 'ro'},
+        ]
+        self.mock_object(share_api.API, 'allow_access_bulk',
+                         mock.Mock(return_value=['fake1', 'fake2']))
+        self.mock_object(self.controller._access_view_builder,
+                         'detail_list_view',
+                         mock.Mock(return_value={'access_list': 'fake'}))
+        id = 'fake_share_id'
+        body = {'allow_access_bulk': {'access_rules': access_rules}}
+        req = fakes.HTTPRequest.blank(
+            '/v2/tenant1/shares/%s/action' % id, version="2.33")
+
+        res = self.controller.allow_access_bulk(req, id, body)
+
+        self.assertEqual({'access_list': 'fake'}, res)
+        share_api.API.allow_access_bulk.assert_called_once_with(
+            req.environ['manila.context'], mock.ANY, access_rules)
+        (self.controller._access_view_builder.detail_list_view.
+            assert_called_once_with(req, ['fake1', 'fake2']))
+
+    @ddt.data(
+        {},
+        {'access_rules': []},
+        {'access_rules': 'fake'},
+        {'access_rules': [{'access_type': 'ip'}]},
+        {'access_rules': [{'access_type': 'ip', 'access_to': '127.0.0.1'},
+                          {'access_type': 'ip', 'access_to': 'localhost'}]},
+    )
+    def test_allow_access_bulk_invalid(self, bulk_body):
+        self.mock_object(share_api.API, 'allow_access_bulk')
+        id = 'fake_share_id'
+        body = {'allow_access_bulk': bulk_body}
+        req = fakes.HTTPRequest.blank(
+            '/v2/tenant1/shares/%s/action' % id, version="2.33")
+
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.allow_access_bulk, req, id, body)
+        self.assertFalse(share_api.API.allow_access_bulk.called)
+
+    @ddt.data(exception.ShareAccessExists(access_type='ip', access='fake'),
+              exception.InvalidShareAccess(reason='fake'))
+    def test_allow_access_bulk_share_api_error(self, exc):
+        self.mock_object(share_api.API, 'allow_access_bulk',
+                         mock.Mock(side_effect=exc))
+        id = 'fake_share_id'
+        body = {'allow_access_bulk': {'access_rules': [
+            {'access_type': 'ip', 'access_to': '127.0.0.1'}]}}
+        req = fakes.HTTPRequest.blank(
+            '/v2/tenant1/shares/%s/action' % id, version="2.33")
+
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.allow_access_bulk, req, id, body)
+
+    def test_allow_access_bulk_unsupported_version(self):
+        id = 'fake_share_id'
+        body = {'allow_access_bulk': {'access_rules': [
+            {'access_type': 'ip', 'access_to': '127.0.0.1'}]}}
+        req = fakes.HTTPRequest.blank(
+            '/v2/tenant1/shares/%s/action' % id, version="2.32")
+
+        self.assertRaises(exception.VersionNotFoundForAPIMethod,
+                          self.controller.allow_access_bulk, req, id, body)
+
+    def test_deny_access_bulk(self):
+        accesses = [{'id': uuidutils.generate_uuid()} for i in range(3)]
+        self.mock_object(db, 'share_access_get_all_for_share',
+                         mock.Mock(return_value=accesses))
+        self.mock_object(share_api.API, 'access_get_all')
+        self.mock_object(share_api.API, 'deny_access_bulk')
+        id = 'fake_share_id'
+        access_ids = [accesses[0]['id'], accesses[2]['id']]
+        body = {'deny_access_bulk': {'access_ids': access_ids}}
+        req = fakes.HTTPRequest.blank(
+            '/v2/tenant1/shares/%s/action' % id, version="2.33")
+
+        res = self.controller.deny_access_bulk(req, id, body)
+
+        self.assertEqual(202, res.status_int)
+        share_api.API.deny_access_bulk.assert_called_once_with(
+            req.environ['manila.context'], mock.ANY, mock.ANY)
+        denied = share_api.API.deny_access_bulk.call_args[0][2]
+        self.assertEqual(sorted(access_ids), sorted(a['id'] for a in denied))
+        db.share_access_get_all_for_share.assert_called_once_with(
+            req.environ['manila.context'], 'fake_share_id')
+        # Listing rules is subject to its own policy, which is not needed
+        # to deny them.
+        self.assertFalse(share_api.API.access_get_all.called)
+
+    def test_deny_access_bulk_not_found(self):
+        access_id = uuidutils.generate_uuid()
+        self.mock_object(db, 'share_access_get_all_for_share',
+                         mock.Mock(return_value=[{'id': access_id}]))
+        self.mock_object(share_api.API, 'deny_access_bulk')
+        id = 'fake_share_id'
+        body = {'deny_access_bulk': {
+            'access_ids': [access_id, uuidutils.generate_uuid()]}}
+        req = fakes.HTTPRequest.blank(
+            '/v2/tenant1/shares/%s/action' % id, version="2.33")
+
+        self.assertRaises(webob.exc.HTTPNotFound,
+                          self.controller.deny_access_bulk, req, id, body)
+        self.assertFalse(share_api.API.deny_access_bulk.called)
+
+    @ddt.data(None, [], 'fake', ['fake_access_id'], {},
+              {'access_ids': []}, {'access_ids': 'fake'},
+              {'access_ids': [{'id': 'fake'}]}, {'access_ids': [['fake']]},
+              {'access_ids': [1]}, {'access_ids': [None]},
+              {'access_ids': ['fake_access_id']})
+    def test_deny_access_bulk_invalid(self, bulk_body):
+        self.mock_object(db, 'share_access_get_all_for_share')
+        self.mock_object(share_api.API, 'deny_access_bulk')
+        id = 'fake_share_id'
+        body = {'deny_access_bulk': bulk_body}
+        req = fakes.HTTPRequest.blank(
+            '/v2/tenant1/shares/%s/action' % id, version="2.33")
+
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.deny_access_bulk, req, id, body)
+        self.assertFalse(db.share_access_get_all_for_share.called)
+        self.assertFalse(share_api.API.deny_access_bulk.called)
+
     def test_deny_access(self):
         def _stub_deny_access(*args, **kwargs):
             pass
@@ -42,6 +42,9 @@ def set_defaults(conf):
     _safe_set_of_opts(conf, 'share_driver',
                       'manila.tests.fake_driver.FakeShareDriver')
     _safe_set_of_opts(conf, 'auth_strategy', 'noauth')
+    # NOTE: unit tests stub DB calls per test case, the share types cache
+    # is enabled explicitly by the tests that cover it.
+    _safe_set_of_opts(conf, 'share_types_cache_enabled', False)
 
     _safe_set_of_opts(conf, 'zfs_share_export_ip', '1.1.1.1')
     _safe_set_of_opts(conf, 'zfs_service_ip', '2.2.2.2')
@@ -39,6 +39,7 @@ import datetime
 from oslo_db import exception as oslo_db_exc
 from oslo_utils import uuidutils
 import six
+import sqlalchemy as sa
 from sqlalchemy import exc as sa_exc
 
 from manila.common import constants
@@ -2169,3 +2170,63 @@ class ShareGroupNewConsistentSnapshotSupportColumnChecks(BaseMigrationChecks):
         self.test_case.assertEqual(1, db_result.rowcount)
         for sg in db_result:
             self.test_case.assertFalse(hasattr(sg, self.new_attr_name))
+
+
+@map_to_migration('4531fa7d0bb2')
+class ShareTypesGenerationChecks(BaseMigrationChecks):
+    table_name = 'share_types_generation'
+
+    def setup_upgrade_data(self, engine):
+        pass
+
+    def check_upgrade(self, engine, data):
+        table = utils.load_table(self.table_name, engine)
+        rows = engine.execute(table.select()).fetchall()
+        self.test_case.assertEqual(1, len(rows))
+        self.test_case.assertEqual(0, rows[0]['generation'])
+
+    def check_downgrade(self, engine):
+        self.test_case.assertRaises(
+            sa_exc.NoSuchTableError,
+            utils.load_table, self.table_name, engine)
+
+
+@map_to_migration('7b1c5f3e9a24')
+class MetadataAndExtraSpecsIndexesChecks(BaseMigrationChecks):
+    indexes = {
+        'share_metadata': 'share_metadata_key_value_share_id_idx',
+        'share_type_extra_specs': (
+            'share_type_extra_specs_share_type_id_spec_key_spec_value_idx'),
+    }
+
+    def _get_index_names(self, engine, table_name):
+        return [index['name']
+                for index in sa.inspect(engine).get_indexes(table_name)]
+
+    def setup_upgrade_data(self, engine):
+        pass
+
+    def check_upgrade(self, engine, data):
+        for table_name, index_name in self.indexes.items():
+            self.test_case.assertIn(
+                index_name, self._get_index_names(engine, table_name))
+
+    def check_downgrade(self, engine):
+        for table_name, index_name in self.indexes.items():
+            self.test_case.assertNotIn(
+                index_name, self._get_index_names(engine, table_name))
+
+
+@map_to_migration('a87e0fb17dee')
+class HotQueriesIndexesChecks(MetadataAndExtraSpecsIndexesChecks):
+    indexes = {
+        'share_instances': 'share_instances_host_deleted_idx',
+        'share_instance_export_locations': (
+            'share_instance_export_locations_share_instance_id_deleted_idx'),
+        'share_instance_access_map': (
+            'share_instance_access_map_share_instance_id_deleted_state_idx'),
+        'share_servers': 'share_servers_host_deleted_status_updated_at_idx',
+        'share_snapshot_instances': (
+            'share_snapshot_instances_share_instance_id_deleted_idx'),
+        'network_allocations': 'network_allocations_ip_address_deleted_idx',
+    }
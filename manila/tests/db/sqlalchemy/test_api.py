@@ -23,6 +23,7 @@ import ddt
 import mock
 import random
 
+from oslo_config import cfg
 from oslo_db import exception as db_exception
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
@@ -35,6 +36,9 @@ from manila.db.sqlalchemy import models
 from manila import exception
 from manila import test
 from manila.tests import db_utils
+from manila import utils
+
+CONF = cfg.CONF
 
 security_service_dict = {
     'id': 'fake id',
@@ -89,6 +93,71 @@ class GenericDatabaseAPITestCase(test.TestCase):
                           self.ctxt, share_access.id)
 
 
+@ddt.ddt
+class ReadFromSlaveTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ReadFromSlaveTestCase, self).setUp()
+        self.ctxt = context.RequestContext('fake_user', 'fake_project')
+        CONF.set_override('slave_connection', 'sqlite://',
+                          group='database')
+
+        @db_api.read_from_slave
+        def _read(context, session=None):
+            return db_api.get_session()
+
+        self.read = _read
+
+    def _mock_facade(self):
+        facade = mock.Mock()
+        self.mock_object(db_api, '_create_facade_lazily',
+                         mock.Mock(return_value=facade))
+        return facade
+
+    def test_read_from_slave(self):
+        facade = self._mock_facade()
+
+        self.read(self.ctxt)
+
+        facade.get_session.assert_called_once_with(use_slave=True)
+        self.assertFalse(db_api._LOCAL.use_slave)
+
+    @ddt.data({'slave_connection': None},
+              {'session': 'fake_session'},
+              {'db_written': True})
+    @ddt.unpack
+    def test_read_from_slave_primary_used(self, slave_connection='sqlite://',
+                                          session=None, db_written=False):
+        CONF.set_override('slave_connection', slave_connection,
+                          group='database')
+        self.ctxt.db_written = db_written
+        facade = self._mock_facade()
+
+        self.read(self.ctxt, session=session)
+
+        facade.get_session.assert_called_once_with(use_slave=False)
+
+    @ddt.data(None, 'fake_session')
+    def test_read_from_slave_positional_session(self, session):
+        @db_api.read_from_slave
+        def _read(context, project_id, session=None):
+            return db_api.get_session()
+
+        facade = self._mock_facade()
+
+        _read(self.ctxt, 'fake_project', session)
+
+        facade.get_session.assert_called_once_with(
+            use_slave=session is None)
+
+    def test_write_marks_current_context(self):
+        self.assertFalse(getattr(self.ctxt, 'db_written', False))
+
+        db_utils.create_share_network()
+
+        self.assertTrue(self.ctxt.db_written)
+
+
 @ddt.ddt
 class ShareAccessDatabaseAPITestCase(test.TestCase):
 
@@ -143,6 +212,113 @@ class ShareAccessDatabaseAPITestCase(test.TestCase):
                          instance_access_mapping['state'])
         self.assertEqual('watson4heisman', access['access_key'])
 
+    def test_share_access_create_all(self):
+        share = db_utils.create_share()
+        db_utils.create_share_instance(share_id=share['id'])
+        values_list = [
+            {'access_type': 'ip', 'access_to': '10.0.0.1'},
+            {'access_type': 'ip', 'access_to': '10.0.0.2',
+             'access_level': constants.ACCESS_LEVEL_RO},
+        ]
+
+        accesses = db_api.share_access_create_all(
+            self.ctxt, share['id'], values_list)
+
+        self.assertEqual(2, len(accesses))
+        accesses = sorted(accesses, key=lambda a: a['access_to'])
+        self.assertEqual([constants.ACCESS_LEVEL_RW,
+                          constants.ACCESS_LEVEL_RO],
+                         [a['access_level'] for a in accesses])
+        share = db_api.share_get(self.ctxt, share['id'])
+        for access in accesses:
+            self.assertEqual(share['id'], access['share_id'])
+            self.assertEqual(
+                sorted(i['id'] for i in share.instances),
+                sorted(m['share_instance_id']
+                       for m in access.instance_mappings))
+            self.assertEqual(constants.ACCESS_STATE_QUEUED_TO_APPLY,
+                             access['state'])
+        self.assertEqual(2, len(db_api.share_access_get_all_for_share(
+            self.ctxt, share['id'])))
+
+    def test_share_access_create_all_empty(self):
+        share = db_utils.create_share()
+
+        self.assertEqual(
+            [], db_api.share_access_create_all(self.ctxt, share['id'], []))
+
+    def test_share_instance_access_update_all_conditionally_change(self):
+        share = db_utils.create_share()
+        instance_id = share.instance['id']
+        to_apply = db_utils.create_access(
+            share_id=share['id'], state=constants.ACCESS_STATE_QUEUED_TO_APPLY)
+        to_deny = db_utils.create_access(
+            share_id=share['id'], state=constants.ACCESS_STATE_QUEUED_TO_DENY)
+        active = db_utils.create_access(
+            share_id=share['id'], state=constants.ACCESS_STATE_ACTIVE)
+        conditionally_change = {
+            constants.ACCESS_STATE_QUEUED_TO_APPLY:
+                constants.ACCESS_STATE_APPLYING,
+            constants.ACCESS_STATE_QUEUED_TO_DENY:
+                constants.ACCESS_STATE_DENYING,
+        }
+
+        result = db_api.share_instance_access_update_all(
+            self.ctxt, instance_id, conditionally_change=conditionally_change)
+
+        expected = {
+            to_apply['id']: constants.ACCESS_STATE_APPLYING,
+            to_deny['id']: constants.ACCESS_STATE_DENYING,
+            active['id']: constants.ACCESS_STATE_ACTIVE,
+        }
+        self.assertEqual(expected, result)
+        for access_id, state in expected.items():
+            mapping = db_api.share_instance_access_get(
+                self.ctxt, access_id, instance_id)
+            self.assertEqual(state, mapping['state'])
+
+    def test_share_instance_access_update_all_with_filters_and_updates(self):
+        share = db_utils.create_share()
+        instance_id = share.instance['id']
+        to_apply = db_utils.create_access(
+            share_id=share['id'], state=constants.ACCESS_STATE_QUEUED_TO_APPLY)
+        active = db_utils.create_access(
+            share_id=share['id'], state=constants.ACCESS_STATE_ACTIVE)
+        filters = {'state': constants.ACCESS_STATE_QUEUED_TO_APPLY}
+
+        result = db_api.share_instance_access_update_all(
+            self.ctxt, instance_id, filters=filters,
+            updates={'state': constants.ACCESS_STATE_ERROR,
+                     'access_key': 'watson4heisman'})
+
+        self.assertEqual({to_apply['id']: constants.ACCESS_STATE_ERROR},
+                         result)
+        self.assertEqual({'state': constants.ACCESS_STATE_QUEUED_TO_APPLY},
+                         filters)
+        mapping = db_api.share_instance_access_get(
+            self.ctxt, to_apply['id'], instance_id)
+        self.assertEqual(constants.ACCESS_STATE_ERROR, mapping['state'])
+        self.assertEqual(
+            'watson4heisman',
+            db_api.share_access_get(self.ctxt, to_apply['id'])['access_key'])
+        mapping = db_api.share_instance_access_get(
+            self.ctxt, active['id'], instance_id)
+        self.assertEqual(constants.ACCESS_STATE_ACTIVE, mapping['state'])
+        self.assertIsNone(
+            db_api.share_access_get(self.ctxt, active['id'])['access_key'])
+
+    def test_share_instance_access_update_all_no_rules(self):
+        share = db_utils.create_share()
+        db_utils.create_access(
+            share_id=share['id'], state=constants.ACCESS_STATE_ACTIVE)
+
+        result = db_api.share_instance_access_update_all(
+            self.ctxt, share.instance['id'],
+            filters={'state': constants.ACCESS_STATE_QUEUED_TO_DENY},
+            updates={'state': constants.ACCESS_STATE_DENYING})
+
+        self.assertEqual({}, result)
+
     @ddt.data(True, False)
     def test_share_access_get_all_for_instance_with_share_access_data(
             self, with_share_access_data):
@@ -227,6 +403,81 @@ class ShareDatabaseAPITestCase(test.TestCase):
         super(ShareDatabaseAPITestCase, self).setUp()
         self.ctxt = context.get_admin_context()
 
+    def test_share_get_request_cached(self):
+        share = db_utils.create_share()
+        self.ctxt.request_cache = context.RequestCache()
+
+        first = db_api.share_get(self.ctxt, share['id'])
+        second = db_api.share_get(self.ctxt, share['id'])
+        user_ctxt = context.RequestContext(
+            'fake_user', share['project_id'], is_admin=False)
+        user_ctxt.request_cache = self.ctxt.request_cache
+        third = db_api.share_get(user_ctxt, share['id'])
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertEqual(
+            {('share_get', True, None, 'no', (share['id'], ), ()): 2},
+            self.ctxt.request_cache.get_duplicates())
+
+    def test_share_get_request_cache_cleared_by_write(self):
+        share = db_utils.create_share(display_name='fake_name')
+        self.ctxt.request_cache = context.RequestCache()
+        db_api.share_get(self.ctxt, share['id'])
+
+        db_api.share_update(self.ctxt, share['id'],
+                            {'display_name': 'new_name'})
+
+        self.assertEqual(
+            'new_name',
+            db_api.share_get(self.ctxt, share['id'])['display_name'])
+
+    def test_share_get_request_cache_not_used_with_session(self):
+        share = db_utils.create_share()
+        self.ctxt.request_cache = context.RequestCache()
+
+        db_api.share_get(self.ctxt, share['id'],
+                         session=db_api.get_session())
+
+        self.assertEqual({}, dict(self.ctxt.request_cache.reads))
+
+    @ddt.data(({'k1': 'v1'}, ['s1', 's2']),
+              ({'k1': 'v1', 'k2': 'v2'}, ['s1']),
+              ({'k1': 'v2'}, []),
+              ({'k1': 'v1', 'k3': 'v3'}, []))
+    @ddt.unpack
+    def test_share_get_all_filter_by_metadata(self, metadata, expected):
+        db_utils.create_share(id='s1',
+                              metadata={'k1': 'v1', 'k2': 'v2', 'k3': 'v'})
+        db_utils.create_share(id='s2', metadata={'k1': 'v1', 'k2': 'v'})
+        db_utils.create_share(id='s3', metadata={'k2': 'v2'})
+        db_api.share_metadata_delete(self.ctxt, 's2', 'k2')
+
+        result = db_api.share_get_all(
+            self.ctxt, filters={'metadata': metadata})
+
+        self.assertEqual(sorted(expected), sorted(s['id'] for s in result))
+
+    @ddt.data(({'k1': 'v1'}, ['s1', 's2']),
+              ({'k1': 'v1', 'k2': 'v2'}, ['s1']),
+              ({'k1': 'v2'}, []),
+              ({'k2': 'v1'}, ['s2']))
+    @ddt.unpack
+    def test_share_get_all_filter_by_extra_specs(self, extra_specs,
+                                                 expected):
+        type1 = db_utils.create_share_type(
+            name='type1', extra_specs={'k1': 'v1', 'k2': 'v2'})
+        type2 = db_utils.create_share_type(
+            name='type2', extra_specs={'k1': 'v1', 'k2': 'v1'})
+        db_utils.create_share(id='s1', share_type_id=type1['id'])
+        db_utils.create_share(id='s2', share_type_id=type2['id'])
+        db_utils.create_share(id='s3')
+
+        result = db_api.share_get_all(
+            self.ctxt, filters={'extra_specs': extra_specs})
+
+        self.assertEqual(sorted(expected), sorted(s['id'] for s in result))
+
     def test_share_filter_by_host_with_pools(self):
         share_instances = [[
             db_api.share_create(self.ctxt, {'host': value}).instance
@@ -240,6 +491,31 @@ class ShareDatabaseAPITestCase(test.TestCase):
                                                       'share_type_id',
                                                       'export_locations'])
 
+    def test_share_filter_by_host_with_pools_similar_hosts(self):
+        share_instances = [
+            db_api.share_create(self.ctxt, {'host': value}).instance
+            for value in ('foo_1', 'foo_1#pool0', 'foo_1#', 'fooa1#pool0',
+                          'foo_1$pool0', 'foo_10#pool0', 'foo_10')]
+
+        result = db_api.share_instances_get_all_by_host(self.ctxt, 'foo_1')
+
+        self.assertEqual(
+            sorted(instance['id'] for instance in share_instances[:3]),
+            sorted(instance['id'] for instance in result))
+
+    @ddt.data('foo%', 'foo\\')
+    def test_share_filter_by_host_with_pools_wildcards(self, host):
+        share_instances = [
+            db_api.share_create(self.ctxt, {'host': value}).instance
+            for value in (host, host + '#pool0', 'foobar#pool0',
+                          'foo#pool0')]
+
+        result = db_api.share_instances_get_all_by_host(self.ctxt, host)
+
+        self.assertEqual(
+            sorted(instance['id'] for instance in share_instances[:2]),
+            sorted(instance['id'] for instance in result))
+
     def test_share_filter_all_by_host_with_pools_multiple_hosts(self):
         share_instances = [[
             db_api.share_create(self.ctxt, {'host': value}).instance
@@ -289,6 +565,28 @@ class ShareDatabaseAPITestCase(test.TestCase):
         self.assertRaises(exception.NotFound, db_api.share_metadata_get,
                           self.ctxt, share['id'])
 
+    def test_share_instance_update_notifies_waiters(self):
+        share = db_utils.create_share()
+        instance_id = share.instance['id']
+
+        with utils.ResourceChangeWaiter('share_instance',
+                                        instance_id) as waiter:
+            db_api.share_instance_update(
+                self.ctxt, instance_id,
+                {'status': constants.STATUS_AVAILABLE})
+
+            self.assertTrue(waiter.wait(0))
+
+    def test_share_instance_delete_notifies_waiters(self):
+        share = db_utils.create_share()
+        instance_id = share.instance['id']
+
+        with utils.ResourceChangeWaiter('share_instance',
+                                        instance_id) as waiter:
+            db_api.share_instance_delete(self.ctxt, instance_id)
+
+            self.assertTrue(waiter.wait(0))
+
     def test_share_instance_get(self):
         share = db_utils.create_share()
 
@@ -1585,6 +1883,19 @@ class DriverPrivateDataDatabaseAPITestCase(test.TestCase):
 
         self.assertEqual(details_update, actual_result)
 
+    def test_update_keeps_other_keys(self):
+        test_id = self._get_driver_test_data()
+        db_api.driver_private_data_update(
+            self.ctxt, test_id, {"key1": "val1", "key2": "val2"})
+        db_api.driver_private_data_delete(self.ctxt, test_id, "key2")
+
+        db_api.driver_private_data_update(
+            self.ctxt, test_id, {"key2": "val2_upd", "key3": "val3"})
+
+        actual_result = db_api.driver_private_data_get(self.ctxt, test_id)
+        self.assertEqual({"key1": "val1", "key2": "val2_upd", "key3": "val3"},
+                         actual_result)
+
     def test_get(self):
         test_id = self._get_driver_test_data()
         test_key = "foo"
@@ -2211,6 +2522,28 @@ class ShareServerDatabaseAPITestCase(test.TestCase):
             share_net_id='1')
         self.assertEqual(valid['id'], servers[0]['id'])
 
+    def test_get_all_free_by_host_and_share_net(self):
+        free_old = db_utils.create_share_server(
+            share_network_id='1', host='host1',
+            created_at=datetime.datetime(2017, 1, 1))
+        free_new = db_utils.create_share_server(
+            share_network_id='1', host='host1',
+            created_at=datetime.datetime(2017, 1, 2))
+        used = db_utils.create_share_server(
+            share_network_id='1', host='host1')
+        db_utils.create_share(share_server_id=used['id'])
+        db_utils.create_share_server(
+            share_network_id='1', host='host1',
+            status=constants.STATUS_CREATING)
+        db_utils.create_share_server(share_network_id='1', host='host2')
+        db_utils.create_share_server(share_network_id='2', host='host1')
+
+        servers = db_api.share_server_get_all_free_by_host_and_share_net(
+            self.ctxt, 'host1', '1')
+
+        self.assertEqual([free_new['id'], free_old['id']],
+                         [server['id'] for server in servers])
+
     def test_get_all_by_host_and_share_net_not_found(self):
         self.assertRaises(
             exception.ShareServerNotFound,
@@ -2262,6 +2595,38 @@ class ShareServerDatabaseAPITestCase(test.TestCase):
             db_api.share_server_get(self.ctxt, server['id'])['backend_details']
         )
 
+    def test_backend_details_set_updates_existing(self):
+        server = db_utils.create_share_server(
+            backend_details={'value1': '1', 'value2': '2'})
+
+        db_api.share_server_backend_details_set(
+            self.ctxt, server['id'], {'value2': '22', 'value3': '3'})
+
+        self.assertDictMatch(
+            {'value1': '1', 'value2': '22', 'value3': '3'},
+            db_api.share_server_get(self.ctxt, server['id'])['backend_details']
+        )
+        self.assertEqual(
+            3, db_api.model_query(
+                self.ctxt, models.ShareServerBackendDetails).filter_by(
+                    share_server_id=server['id']).count())
+
+    def test_backend_details_set_without_existence_check(self):
+        server = db_utils.create_share_server()
+        self.mock_object(db_api, 'model_query',
+                         mock.Mock(wraps=db_api.model_query))
+
+        db_api.share_server_backend_details_set(
+            self.ctxt, server['id'], {'value1': '1'}, check_exists=False)
+
+        self.assertNotIn(
+            models.ShareServer,
+            [c[0][1] for c in db_api.model_query.call_args_list])
+        self.assertDictMatch(
+            {'value1': '1'},
+            db_api.share_server_get(self.ctxt, server['id'])['backend_details']
+        )
+
     def test_backend_details_set_not_found(self):
         fake_id = 'FAKE_UUID'
         self.assertRaises(exception.ShareServerNotFound,
@@ -2300,6 +2665,128 @@ class ShareServerDatabaseAPITestCase(test.TestCase):
                          len(db_api.share_server_get_all(self.ctxt)))
 
 
+@ddt.ddt
+class QuotaDatabaseAPITestCase(test.TestCase):
+
+    def setUp(self):
+        super(QuotaDatabaseAPITestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+
+    def test_quota_get_all_limits(self):
+        db_api.quota_create(self.ctxt, 'fake_project', 'shares', 20)
+        db_api.quota_create(self.ctxt, 'fake_project', 'gigabytes', 500,
+                            user_id='fake_user')
+        db_api.quota_create(self.ctxt, 'other_project', 'shares', 30)
+        db_api.quota_class_create(self.ctxt, 'default', 'snapshots', 40)
+        db_api.quota_class_create(self.ctxt, 'fake_class', 'snapshots', 50)
+        db_api.quota_class_create(self.ctxt, 'other_class', 'shares', 60)
+
+        result = db_api.quota_get_all_limits(
+            self.ctxt, 'fake_project', user_id='fake_user',
+            quota_class='fake_class')
+
+        self.assertEqual({'project': {'shares': 20},
+                          'user': {'gigabytes': 500},
+                          'class': {'snapshots': 50},
+                          'default': {'snapshots': 40}}, result)
+
+    def test_quota_get_all_limits_without_user_and_class(self):
+        db_api.quota_create(self.ctxt, 'fake_project', 'shares', 20)
+        db_api.quota_create(self.ctxt, 'fake_project', 'gigabytes', 500,
+                            user_id='fake_user')
+        db_api.quota_class_create(self.ctxt, 'fake_class', 'snapshots', 50)
+
+        result = db_api.quota_get_all_limits(self.ctxt, 'fake_project')
+
+        self.assertEqual({'project': {'shares': 20}, 'user': {},
+                          'class': {}, 'default': {}}, result)
+
+    def _create_reservations(self, expire=None):
+        expire = expire or timeutils.utcnow() + datetime.timedelta(days=1)
+        usages = {
+            resource: db_api.quota_usage_create(
+                self.ctxt, 'fake_project', 'fake_user', resource, in_use,
+                reserved, None)
+            for resource, in_use, reserved in (('shares', 1, 3),
+                                               ('gigabytes', 10, 5))
+        }
+        session = db_api.get_session()
+        reservations = []
+        for resource, delta in (('shares', 1), ('shares', 2),
+                                ('gigabytes', 5), ('gigabytes', -4)):
+            reservation = db_api._reservation_create(
+                self.ctxt, uuidutils.generate_uuid(), usages[resource],
+                'fake_project', 'fake_user', resource, delta, expire,
+                session=session)
+            reservations.append(reservation.uuid)
+        return reservations
+
+    def _get_usages(self):
+        usages = db_api.quota_usage_get_all_by_project_and_user(
+            self.ctxt, 'fake_project', 'fake_user')
+        return {resource: usages[resource] for resource in ('shares',
+                                                            'gigabytes')}
+
+    def _get_reservations_count(self):
+        return db_api.model_query(
+            self.ctxt, models.Reservation, read_deleted="no").count()
+
+    def test_reservation_commit(self):
+        reservations = self._create_reservations()
+
+        db_api.reservation_commit(self.ctxt, reservations,
+                                  project_id='fake_project',
+                                  user_id='fake_user')
+
+        self.assertEqual({'shares': {'in_use': 4, 'reserved': 0},
+                          'gigabytes': {'in_use': 11, 'reserved': 0}},
+                         self._get_usages())
+        self.assertEqual(0, self._get_reservations_count())
+
+    def test_reservation_rollback(self):
+        reservations = self._create_reservations()
+
+        db_api.reservation_rollback(self.ctxt, reservations[:3],
+                                    project_id='fake_project',
+                                    user_id='fake_user')
+
+        self.assertEqual({'shares': {'in_use': 1, 'reserved': 0},
+                          'gigabytes': {'in_use': 10, 'reserved': 0}},
+                         self._get_usages())
+        self.assertEqual(1, self._get_reservations_count())
+
+    def test_reservation_commit_unknown_reservations(self):
+        self._create_reservations()
+
+        db_api.reservation_commit(self.ctxt, ['fake_uuid'],
+                                  project_id='fake_project',
+                                  user_id='fake_user')
+
+        self.assertEqual({'shares': {'in_use': 1, 'reserved': 3},
+                          'gigabytes': {'in_use': 10, 'reserved': 5}},
+                         self._get_usages())
+        self.assertEqual(4, self._get_reservations_count())
+
+    @ddt.data(None, 0, 1, 3, 4, 10)
+    def test_reservation_expire(self, batch_size):
+        self._create_reservations(
+            expire=timeutils.utcnow() - datetime.timedelta(seconds=1))
+        active = self._create_reservations()
+        self.mock_object(db_api, '_reservation_expire_batch',
+                         mock.Mock(wraps=db_api._reservation_expire_batch))
+
+        result = db_api.reservation_expire(self.ctxt, batch_size=batch_size)
+
+        self.assertEqual(4, result)
+        self.assertEqual(4, self._get_reservations_count())
+        self.assertEqual(
+            (4 // batch_size) + 1 if batch_size else 1,
+            db_api._reservation_expire_batch.call_count)
+        db_api.reservation_rollback(self.ctxt, active)
+        for usage in self._get_usages().values():
+            self.assertEqual(0, usage['reserved'])
+
+
 class ServiceDatabaseAPITestCase(test.TestCase):
 
     def setUp(self):
@@ -2335,6 +2822,22 @@ class ServiceDatabaseAPITestCase(test.TestCase):
         valid_values.update(update_data)
         self.assertSubDictMatch(valid_values, service.to_dict())
 
+    def test_heartbeat(self):
+        service = db_api.service_create(self.ctxt, self.service_data)
+        self.assertIsNone(service['updated_at'])
+
+        db_api.service_heartbeat(self.ctxt, service['id'])
+        db_api.service_heartbeat(self.ctxt, service['id'])
+
+        service = db_api.service_get(self.ctxt, service['id'])
+        self.assertEqual(2, service['report_count'])
+        self.assertIsNotNone(service['updated_at'])
+        self.assertEqual('fake_zone', service['availability_zone']['name'])
+
+    def test_heartbeat_not_found(self):
+        self.assertRaises(exception.ServiceNotFound,
+                          db_api.service_heartbeat, self.ctxt, 12345)
+
 
 @ddt.ddt
 class AvailabilityZonesDatabaseAPITestCase(test.TestCase):
@@ -2633,3 +3136,27 @@ class ShareTypeAPITestCase(test.TestCase):
         result = db_api.share_type_get_by_name_or_id(self.ctxt, fake_id)
 
         self.assertIsNone(result)
+
+    def test_share_types_generation_get_no_row(self):
+        self.assertEqual(0, db_api.share_types_generation_get(self.ctxt))
+
+    def test_share_types_generation_bumped(self):
+        share_type = db_utils.create_share_type()
+        generations = [db_api.share_types_generation_get(self.ctxt)]
+
+        db_api.share_type_extra_specs_update_or_create(
+            self.ctxt, share_type['id'], {'foo': 'bar'})
+        generations.append(db_api.share_types_generation_get(self.ctxt))
+        db_api.share_type_extra_specs_delete(
+            self.ctxt, share_type['id'], 'foo')
+        generations.append(db_api.share_types_generation_get(self.ctxt))
+        db_api.share_type_access_add(
+            self.ctxt, share_type['id'], 'fake_project')
+        generations.append(db_api.share_types_generation_get(self.ctxt))
+        db_api.share_type_access_remove(
+            self.ctxt, share_type['id'], 'fake_project')
+        generations.append(db_api.share_types_generation_get(self.ctxt))
+        db_api.share_type_destroy(self.ctxt, share_type['id'])
+        generations.append(db_api.share_types_generation_get(self.ctxt))
+
+        self.assertEqual([1, 2, 3, 4, 5, 6], generations)
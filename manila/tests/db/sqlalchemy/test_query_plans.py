@@ -0,0 +1,128 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Testing of query plans of frequently called DB API methods."""
+
+import contextlib
+import datetime
+import re
+
+import ddt
+from sqlalchemy import event
+
+from manila import context
+from manila.db.sqlalchemy import api as db_api
+from manila import test
+from manila.tests import db_utils
+
+
+@ddt.ddt
+class QueryPlansTestCase(test.TestCase):
+    """Fails if a hot query has to scan a whole table."""
+
+    def setUp(self):
+        super(QueryPlansTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        self.engine = db_api.get_engine()
+        if self.engine.dialect.name not in ('sqlite', 'mysql'):
+            self.skipTest('Query plans are only checked on SQLite and MySQL.')
+
+        self.share = db_utils.create_share(host='fake_host@backend#pool')
+        self.instance_id = self.share.instance['id']
+        self.snapshot = db_utils.create_snapshot(share_id=self.share['id'])
+        self.server = db_utils.create_share_server(host='fake_host@backend')
+
+    @contextlib.contextmanager
+    def _record_queries(self):
+        queries = []
+
+        def _before_cursor_execute(conn, cursor, statement, parameters,
+                                   context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                queries.append((statement, parameters))
+
+        event.listen(self.engine, 'before_cursor_execute',
+                     _before_cursor_execute)
+        try:
+            yield queries
+        finally:
+            event.remove(self.engine, 'before_cursor_execute',
+                         _before_cursor_execute)
+
+    def _get_full_scans(self, statement, parameters):
+        with self.engine.connect() as conn:
+            if self.engine.dialect.name == 'sqlite':
+                rows = conn.execute(
+                    'EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+                return [row[-1] for row in rows
+                        if re.match(r'SCAN (TABLE )?\w+$', row[-1])]
+            rows = conn.execute(
+                'EXPLAIN ' + statement, parameters).fetchall()
+            return ['%s: %s' % (row.table, row.type) for row in rows
+                    if row.type == 'ALL']
+
+    def _assert_no_full_scan(self, table_name, method, *args, **kwargs):
+        with self._record_queries() as queries:
+            method(self.ctxt, *args, **kwargs)
+
+        queries = [(statement, parameters)
+                   for statement, parameters in queries
+                   if re.search(r'\bFROM %s\b' % table_name, statement)]
+        self.assertTrue(queries)
+        for statement, parameters in queries:
+            full_scans = [scan for scan in
+                          self._get_full_scans(statement, parameters)
+                          if table_name in scan]
+            self.assertEqual([], full_scans, statement)
+
+    def test_share_instances_get_all_by_host(self):
+        if self.engine.dialect.name == 'sqlite':
+            # NOTE: SQLite uses an index for LIKE only with the
+            # case_sensitive_like pragma set.
+            self.skipTest('Pools of a host are matched with LIKE.')
+        self._assert_no_full_scan(
+            'share_instances', db_api.share_instances_get_all_by_host,
+            'fake_host@backend')
+
+    def test_share_export_locations_get_by_share_instance_id(self):
+        self._assert_no_full_scan(
+            'share_instance_export_locations',
+            db_api.share_export_locations_get_by_share_instance_id,
+            self.instance_id)
+
+    @ddt.data(None, {'state': 'active'})
+    def test_share_access_get_all_for_instance(self, filters):
+        self._assert_no_full_scan(
+            'share_instance_access_map',
+            db_api.share_access_get_all_for_instance,
+            self.instance_id, filters=filters)
+
+    def test_share_server_get_all_unused_deletable(self):
+        self._assert_no_full_scan(
+            'share_servers', db_api.share_server_get_all_unused_deletable,
+            'fake_host@backend', datetime.datetime(2017, 1, 1))
+
+    @ddt.data('snapshot_ids', 'share_instance_ids')
+    def test_share_snapshot_instance_get_all_with_filters(self, key):
+        ids = {
+            'snapshot_ids': [self.snapshot['id']],
+            'share_instance_ids': [self.instance_id],
+        }[key]
+
+        self._assert_no_full_scan(
+            'share_snapshot_instances',
+            db_api.share_snapshot_instance_get_all_with_filters,
+            {key: ids})
+
+    def test_network_allocations_get_by_ip_address(self):
+        self._assert_no_full_scan(
+            'network_allocations',
+            db_api.network_allocations_get_by_ip_address, '10.0.0.1')
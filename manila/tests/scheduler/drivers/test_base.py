@@ -51,7 +51,8 @@ class SchedulerTestCase(test.TestCase):
             self.driver.update_service_capabilities(
                 service_name, host, capabilities)
             self.driver.host_manager.update_service_capabilities.\
-                assert_called_once_with(service_name, host, capabilities)
+                assert_called_once_with(service_name, host, capabilities,
+                                        seq=None, is_delta=False)
 
     def test_hosts_up(self):
         service1 = {'host': 'host1'}
@@ -19,6 +19,7 @@ Tests For HostManager
 """
 
 import copy
+import datetime
 import ddt
 import mock
 from oslo_config import cfg
@@ -143,6 +144,72 @@ class HostManagerTestCase(test.TestCase):
         }
         self.assertDictMatch(service_states, expected)
 
+    def test_update_service_capabilities_with_delta(self):
+        full_capabs = {
+            'free_capacity_gb': 10,
+            'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 4},
+                      {'pool_name': 'pool2', 'free_capacity_gb': 6}],
+        }
+        delta = {
+            'changed': {'free_capacity_gb': 8},
+            'removed': [],
+            'pools': [{'pool_name': 'pool1',
+                       'changed': {'pool_name': 'pool1',
+                                   'free_capacity_gb': 2},
+                       'removed': []}],
+            'removed_pools': [],
+        }
+        self.mock_object(timeutils, 'utcnow', mock.Mock(return_value=31337))
+
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', full_capabs, seq=4)
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', delta, seq=5, is_delta=True)
+
+        expected = {
+            'free_capacity_gb': 8,
+            'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 2},
+                      {'pool_name': 'pool2', 'free_capacity_gb': 6}],
+            'timestamp': 31337,
+        }
+        self.assertEqual(expected, self.host_manager.service_states['host1'])
+        self.assertEqual(
+            5, self.host_manager.service_capabilities_seq['host1'])
+        self.assertEqual(4, full_capabs['pools'][0]['free_capacity_gb'])
+
+    @ddt.data(None, 3, 5)
+    def test_update_service_capabilities_with_out_of_order_delta(self,
+                                                                 last_seq):
+        full_capabs = {'free_capacity_gb': 10}
+        delta = {'changed': {'free_capacity_gb': 8}, 'removed': []}
+        timestamps = [31337] if last_seq is None else [31336, 31337]
+        self.mock_object(timeutils, 'utcnow',
+                         mock.Mock(side_effect=timestamps))
+        if last_seq is not None:
+            self.host_manager.update_service_capabilities(
+                'share', 'host1', full_capabs, seq=last_seq)
+
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', delta, seq=5, is_delta=True)
+
+        self.assertEqual(
+            10, self.host_manager.service_states.get(
+                'host1', full_capabs)['free_capacity_gb'])
+        self.assertEqual(
+            last_seq, self.host_manager.service_capabilities_seq.get('host1'))
+
+    def test_update_service_capabilities_without_seq_resets_seq(self):
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', {'free_capacity_gb': 10}, seq=7)
+
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', {'free_capacity_gb': 8})
+
+        self.assertNotIn('host1', self.host_manager.service_capabilities_seq)
+        self.assertNotIn('host1', self.host_manager.reported_capabilities)
+        self.assertEqual(
+            8, self.host_manager.service_states['host1']['free_capacity_gb'])
+
     def test_get_all_host_states_share(self):
         fake_context = context.RequestContext('user', 'project')
         topic = CONF.share_topic
@@ -441,6 +508,28 @@ class HostManagerTestCase(test.TestCase):
             for pool in expected:
                 self.assertIn(pool, res)
 
+    @ddt.data((0, 0, 2), (0, 20, 2), (30, 20, 1), (30, 30, 2))
+    @ddt.unpack
+    def test__get_share_services(self, ttl, elapsed, reads):
+        self.flags(scheduler_service_cache_ttl=ttl)
+        fake_context = context.RequestContext('user', 'project')
+        now = datetime.datetime(2017, 1, 1)
+        self.mock_object(
+            timeutils, 'utcnow',
+            mock.Mock(side_effect=[
+                now, now + datetime.timedelta(seconds=elapsed)]))
+        self.mock_object(
+            db, 'service_get_all_by_topic',
+            mock.Mock(side_effect=[['fake_service1'], ['fake_service2']]))
+
+        self.host_manager._get_share_services(fake_context)
+        result = self.host_manager._get_share_services(fake_context)
+
+        self.assertEqual(['fake_service%s' % reads], result)
+        self.assertEqual(reads, db.service_get_all_by_topic.call_count)
+        db.service_get_all_by_topic.assert_called_with(
+            fake_context, CONF.share_topic)
+
     def test_get_pools_host_down(self):
         fake_context = context.RequestContext('user', 'project')
         mock_service_is_up = self.mock_object(utils, 'service_is_up')
@@ -105,7 +105,8 @@ class SchedulerManagerTestCase(test.TestCase):
             self.manager.update_service_capabilities(
                 self.context, service_name=service_name, host=host)
             (self.manager.driver.update_service_capabilities.
-                assert_called_once_with(service_name, host, {}))
+                assert_called_once_with(service_name, host, {},
+                                        seq=None, is_delta=False))
         with mock.patch.object(self.manager.driver,
                                'update_service_capabilities', mock.Mock()):
             capabilities = {'fake_capability': 'fake_value'}
@@ -113,7 +114,16 @@ class SchedulerManagerTestCase(test.TestCase):
                 self.context, service_name=service_name, host=host,
                 capabilities=capabilities)
             (self.manager.driver.update_service_capabilities.
-                assert_called_once_with(service_name, host, capabilities))
+                assert_called_once_with(service_name, host, capabilities,
+                                        seq=None, is_delta=False))
+        with mock.patch.object(self.manager.driver,
+                               'update_service_capabilities', mock.Mock()):
+            self.manager.update_service_capabilities(
+                self.context, service_name=service_name, host=host,
+                capabilities=capabilities, seq=2, is_delta=True)
+            (self.manager.driver.update_service_capabilities.
+                assert_called_once_with(service_name, host, capabilities,
+                                        seq=2, is_delta=True))
 
     @mock.patch.object(db, 'share_update', mock.Mock())
     def test_create_share_exception_puts_share_in_error_state(self):
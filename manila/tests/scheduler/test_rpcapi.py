@@ -80,6 +80,17 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  capabilities='fake_capabilities',
                                  fanout=True)
 
+    def test_update_service_capabilities_with_seq(self):
+        self._test_scheduler_api('update_service_capabilities',
+                                 rpc_method='cast',
+                                 service_name='fake_name',
+                                 host='fake_host',
+                                 capabilities='fake_capabilities',
+                                 seq=3,
+                                 is_delta=True,
+                                 fanout=True,
+                                 version='1.9')
+
     def test_create_share_instance(self):
         self._test_scheduler_api('create_share_instance',
                                  rpc_method='cast',
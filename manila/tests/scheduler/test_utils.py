@@ -62,3 +62,62 @@ class UtilsTestCase(test.TestCase):
     def test_thin_provisioning(self, thin_capabilities, thin):
         thin_provisioning = utils.thin_provisioning(thin_capabilities)
         self.assertEqual(thin, thin_provisioning)
+
+    def test_get_capabilities_delta(self):
+        old = {
+            'vendor_name': 'fake_vendor',
+            'free_capacity_gb': 10,
+            'obsolete': True,
+            'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 4},
+                      {'pool_name': 'pool2', 'free_capacity_gb': 6,
+                       'qos': False},
+                      {'pool_name': 'pool3', 'free_capacity_gb': 0}],
+        }
+        new = {
+            'vendor_name': 'fake_vendor',
+            'free_capacity_gb': 12,
+            'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 4},
+                      {'pool_name': 'pool2', 'free_capacity_gb': 5},
+                      {'pool_name': 'pool4', 'free_capacity_gb': 3}],
+        }
+
+        delta = utils.get_capabilities_delta(old, new)
+
+        self.assertEqual({'free_capacity_gb': 12}, delta['changed'])
+        self.assertEqual(['obsolete'], delta['removed'])
+        self.assertEqual(
+            [{'pool_name': 'pool2',
+              'changed': {'pool_name': 'pool2', 'free_capacity_gb': 5},
+              'removed': ['qos']},
+             {'pool_name': 'pool4',
+              'changed': {'pool_name': 'pool4', 'free_capacity_gb': 3},
+              'removed': []}],
+            delta['pools'])
+        self.assertEqual(['pool3'], delta['removed_pools'])
+        self.assertEqual(new, utils.apply_capabilities_delta(old, delta))
+        self.assertFalse(old['pools'][1]['qos'])
+
+    @ddt.data(
+        ({'pools': None}, {'pools': [{'pool_name': 'pool1'}]}),
+        ({'pools': [{'pool_name': 'pool1'}]}, {'foo': 'bar'}),
+        ({'pools': [{'free_capacity_gb': 1}]},
+         {'pools': [{'free_capacity_gb': 2}]}),
+        ({'pools': [{'pool_name': 'pool1'}]},
+         {'pools': [{'pool_name': 'pool1'}, {'pool_name': 'pool1'}]}),
+    )
+    @ddt.unpack
+    def test_get_capabilities_delta_pools_compared_as_whole(self, old, new):
+        delta = utils.get_capabilities_delta(old, new)
+
+        self.assertNotIn('removed_pools', delta)
+        self.assertEqual(new, utils.apply_capabilities_delta(old, delta))
+
+    def test_get_capabilities_delta_no_changes(self):
+        capabilities = {'free_capacity_gb': 1,
+                        'pools': [{'pool_name': 'pool1'}]}
+
+        delta = utils.get_capabilities_delta(capabilities,
+                                             dict(capabilities))
+
+        self.assertEqual({'changed': {}, 'removed': [], 'pools': [],
+                          'removed_pools': []}, delta)
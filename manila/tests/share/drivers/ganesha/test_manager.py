@@ -13,7 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
 import re
+import shutil
+import tempfile
 
 import mock
 from oslo_serialization import jsonutils
@@ -214,34 +217,21 @@ class GaneshaManagerTestCase(test.TestCase):
             '/fakedir0/export.d/fakefile.conf',
             self._manager._getpath('fakefile'))
 
+    def test_init_local(self):
+        self.assertFalse(self._manager.local)
+
     def test_write_file(self):
         test_data = 'fakedata'
-        self.mock_object(manager.pipes, 'quote',
-                         mock.Mock(side_effect=['fakedata',
-                                                'fakefile.conf.RANDOM']))
-        test_args = [
-            ('mktemp', '-p', '/fakedir0/export.d', '-t',
-             'fakefile.conf.XXXXXX'),
-            ('sh', '-c', 'echo fakedata > fakefile.conf.RANDOM'),
-            ('mv', 'fakefile.conf.RANDOM', test_path)]
-        test_kwargs = {
-            'message': 'writing fakefile.conf.RANDOM'
-        }
-
-        def return_tmpfile(*args, **kwargs):
-            if args == test_args[0]:
-                return ('fakefile.conf.RANDOM\n', '')
+        self.mock_object(self._manager, 'execute')
 
-        self.mock_object(self._manager, 'execute',
-                         mock.Mock(side_effect=return_tmpfile))
         self._manager._write_file(test_path, test_data)
-        self._manager.execute.assert_has_calls([
-            mock.call(*test_args[0]),
-            mock.call(*test_args[1], **test_kwargs),
-            mock.call(*test_args[2])])
-        manager.pipes.quote.assert_has_calls([
-            mock.call('fakedata'),
-            mock.call('fakefile.conf.RANDOM')])
+
+        self._manager.execute.assert_called_once_with(
+            'sh', '-c',
+            'tmpf=$(mktemp -p /fakedir0/export.d -t fakefile.conf.XXXXXX) '
+            '&& printf "%s\\n" fakedata > "$tmpf" && '
+            'mv "$tmpf" /fakedir0/export.d/fakefile.conf',
+            message='writing ' + test_path)
 
     def test_write_conf_file(self):
         test_data = 'fakedata'
@@ -255,18 +245,60 @@ class GaneshaManagerTestCase(test.TestCase):
             test_path, test_data)
 
     def test_mkindex(self):
-        test_ls_output = 'INDEX.conf\nfakefile.conf\nfakefile.txt'
-        test_index = '%include /fakedir0/export.d/fakefile.conf\n'
-        self.mock_object(self._manager, 'execute',
-                         mock.Mock(return_value=(test_ls_output, '')))
-        self.mock_object(self._manager, '_write_conf_file')
+        self.mock_object(self._manager, 'execute')
+
         ret = self._manager._mkindex()
+
         self._manager.execute.assert_called_once_with(
-            'ls', '/fakedir0/export.d', run_as_root=False)
-        self._manager._write_conf_file.assert_called_once_with(
-            'INDEX', test_index)
+            'sh', '-c',
+            'idxf=$(mktemp -p /fakedir0/export.d -t INDEX.conf.XXXXXX) && '
+            'for f in /fakedir0/export.d/*.conf; do '
+            '[ "$f" = /fakedir0/export.d/INDEX.conf ] || [ ! -e "$f" ] || '
+            'echo "%include $f"; done > "$idxf" && '
+            'mv "$idxf" /fakedir0/export.d/INDEX.conf',
+            message='writing index')
         self.assertIsNone(ret)
 
+    def test_update_export_files(self):
+        self.mock_object(self._manager, 'execute')
+        self.mock_object(self._manager, '_index_script',
+                         mock.Mock(return_value='fakeindexscript'))
+
+        ret = self._manager._update_export_files(
+            {'fakefile': 'fakedata'}, ['fakefile2', 'fakefile3'])
+
+        self.assertEqual({'fakefile': test_path}, ret)
+        self._manager.execute.assert_called_once_with(
+            'sh', '-c',
+            'rm -f /fakedir0/export.d/fakefile2.conf '
+            '/fakedir0/export.d/fakefile3.conf && '
+            'tmpf0=$(mktemp -p /fakedir0/export.d -t fakefile.conf.XXXXXX) '
+            '&& printf "%s\\n" fakedata > "$tmpf0" && '
+            'mv "$tmpf0" /fakedir0/export.d/fakefile.conf && '
+            'fakeindexscript',
+            message='updating exports')
+
+    def test_read_export_files(self):
+        out = ('#@ /fakedir0/export.d/fakefile.conf\n' + test_ganesha_cnf +
+               '\n\n')
+        self.mock_object(self._manager, 'execute',
+                         mock.Mock(return_value=(out, '')))
+
+        ret = self._manager._read_export_files(['fakefile', 'fakefile2'])
+
+        self.assertEqual({'fakefile': test_dict_unicode}, ret)
+        self._manager.execute.assert_called_once_with(
+            'sh', '-c', mock.ANY, 'sh', test_path,
+            '/fakedir0/export.d/fakefile2.conf', message='reading exports')
+
+    def test_read_export_files_no_names(self):
+        self.mock_object(self._manager, 'execute')
+
+        ret = self._manager._read_export_files([])
+
+        self.assertEqual({}, ret)
+        self.assertFalse(self._manager.execute.called)
+
     def test_read_export_file(self):
         test_args = ('cat', test_path)
         test_kwargs = {'message': 'reading export fakefile'}
@@ -461,6 +493,92 @@ class GaneshaManagerTestCase(test.TestCase):
         self._manager._rm_export_file.assert_called_once_with(test_name)
         self._manager._mkindex.assert_called_once_with()
 
+    def test_update_exports(self):
+        test_dict2 = {'EXPORT': {'Export_Id': 102,
+                                 'CLIENT': {'Clients': 'ip2'}}}
+        self.mock_object(
+            self._manager, '_read_export_files',
+            mock.Mock(return_value={'fakefile3': test_dict_unicode}))
+        self.mock_object(
+            self._manager, '_update_export_files',
+            mock.Mock(return_value={'fakefile2': '/fakepath2'}))
+        self.mock_object(self._manager, '_remove_export_dbus')
+        self.mock_object(self._manager, '_add_export_dbus')
+
+        ret = self._manager.update_exports(
+            add_exports={'fakefile2': test_dict2},
+            remove_exports=['fakefile2', 'fakefile3', 'fakefile4'])
+
+        self.assertIsNone(ret)
+        self._manager._read_export_files.assert_called_once_with(
+            ['fakefile2', 'fakefile3', 'fakefile4'])
+        self._manager._remove_export_dbus.assert_called_once_with(101)
+        self._manager._update_export_files.assert_called_once_with(
+            {'fakefile2': manager.mkconf(test_dict2)},
+            set(['fakefile3', 'fakefile4']))
+        self._manager._add_export_dbus.assert_called_once_with(
+            '/fakepath2', 102)
+
+    def test_update_exports_nothing_to_do(self):
+        self.mock_object(self._manager, '_read_export_files')
+
+        self._manager.update_exports(add_exports={}, remove_exports=[])
+
+        self.assertFalse(self._manager._read_export_files.called)
+
+    def test_update_exports_error_incomplete_export_block(self):
+        self.mock_object(self._manager, '_read_export_files')
+
+        self.assertRaises(
+            exception.InvalidParameterValue, self._manager.update_exports,
+            add_exports={'fakefile': {'EXPORT': {'Export_Id': '@config'}}})
+
+        self.assertFalse(self._manager._read_export_files.called)
+
+    def test_update_exports_error_during_remove_export_dbus(self):
+        self.mock_object(
+            self._manager, '_read_export_files',
+            mock.Mock(return_value={'fakefile': test_dict_unicode}))
+        self.mock_object(self._manager, '_update_export_files')
+        self.mock_object(
+            self._manager, '_remove_export_dbus',
+            mock.Mock(side_effect=exception.GaneshaCommandFailure))
+        self.mock_object(self._manager, '_add_export_dbus')
+
+        self.assertRaises(exception.GaneshaCommandFailure,
+                          self._manager.update_exports,
+                          remove_exports=['fakefile'])
+
+        self._manager._update_export_files.assert_called_once_with(
+            {}, set(['fakefile']))
+        self.assertFalse(self._manager._add_export_dbus.called)
+
+    def test_update_exports_error_during_add_export_dbus(self):
+        test_dict2 = {'EXPORT': {'Export_Id': 102}}
+        add_exports = {'fakefile': test_dict_str, 'fakefile2': test_dict2}
+        self.mock_object(self._manager, '_read_export_files',
+                         mock.Mock(return_value={}))
+        self.mock_object(
+            self._manager, '_update_export_files',
+            mock.Mock(return_value={'fakefile': test_path,
+                                    'fakefile2': '/fakepath2'}))
+        self.mock_object(self._manager, '_remove_export_dbus')
+        self.mock_object(
+            self._manager, '_add_export_dbus',
+            mock.Mock(side_effect=[None, exception.GaneshaCommandFailure]))
+
+        self.assertRaises(exception.GaneshaCommandFailure,
+                          self._manager.update_exports,
+                          add_exports=add_exports)
+
+        self._manager._add_export_dbus.assert_has_calls([
+            mock.call(test_path, 101), mock.call('/fakepath2', 102)])
+        self._manager._remove_export_dbus.assert_called_once_with(101)
+        self._manager._update_export_files.assert_has_calls([
+            mock.call({'fakefile': manager.mkconf(test_dict_str),
+                       'fakefile2': manager.mkconf(test_dict2)}, set()),
+            mock.call({}, add_exports)])
+
     def test_get_export_id(self):
         self.mock_object(self._manager, 'execute',
                          mock.Mock(return_value=('exportid|101', '')))
@@ -511,3 +629,91 @@ class GaneshaManagerTestCase(test.TestCase):
             'sh', '-c', 'rm -f /fakedir0/export.d/*.conf')
         self._manager._mkindex.assert_called_once_with()
         self.assertIsNone(ret)
+
+
+class GaneshaManagerLocalTestCase(test.TestCase):
+    """Tests GaneshaManager with in-process file and database handling."""
+
+    def setUp(self):
+        super(GaneshaManagerLocalTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.export_dir = os.path.join(self.tmpdir, 'export.d')
+        os.mkdir(self.export_dir)
+        self._execute = mock.Mock(return_value=('', ''))
+        self.mock_object(utils, 'synchronized',
+                         mock.Mock(return_value=lambda f: f))
+        self._manager = manager.GaneshaManager(
+            self._execute, 'faketag',
+            ganesha_config_path=os.path.join(self.tmpdir, 'fakeconfig'),
+            ganesha_db_path=os.path.join(self.tmpdir, 'fake.db'),
+            ganesha_export_dir=self.export_dir,
+            ganesha_service_name='ganesha.fakeservice')
+
+    def _read(self, name):
+        with open(os.path.join(self.export_dir, name)) as f:
+            return f.read()
+
+    def test_init(self):
+        self.assertTrue(self._manager.local)
+        self.assertEqual(
+            [mock.call('mkdir', '-p', self.export_dir),
+             mock.call('mkdir', '-p', self.tmpdir)],
+            self._execute.call_args_list)
+
+    def test_get_export_id(self):
+        self.assertEqual(100, self._manager.get_export_id(bump=False))
+        self.assertEqual(101, self._manager.get_export_id())
+        self.assertEqual(102, self._manager.get_export_id())
+        self.assertEqual(102, self._manager.get_export_id(bump=False))
+
+    def test_get_export_id_error_invalid_export_db(self):
+        with open(self._manager.ganesha_db_path, 'w') as f:
+            f.write('invalid')
+        self.mock_object(manager.LOG, 'error')
+
+        self.assertRaises(exception.InvalidSqliteDB,
+                          self._manager.get_export_id)
+
+        manager.LOG.error.assert_called_once_with(mock.ANY, mock.ANY)
+
+    def test_write_export_file(self):
+        ret = self._manager._write_export_file(test_name, test_dict_str)
+
+        self.assertEqual(os.path.join(self.export_dir, 'fakefile.conf'), ret)
+        self.assertEqual(manager.mkconf(test_dict_str) + '\n',
+                         self._read('fakefile.conf'))
+        self.assertEqual(test_dict_unicode,
+                         self._manager._read_export_file(test_name))
+        self.assertEqual(['fakefile.conf'], os.listdir(self.export_dir))
+
+    def test_update_exports(self):
+        test_dict2 = {'EXPORT': {'Export_Id': 102,
+                                 'CLIENT': {'Clients': 'ip2'}}}
+        self._manager._write_export_file('fakefile2', test_dict2)
+        self.mock_object(self._manager, '_dbus_send_ganesha')
+
+        self._manager.update_exports(add_exports={test_name: test_dict_str},
+                                     remove_exports=['fakefile2'])
+
+        self.assertEqual(['INDEX.conf', 'fakefile.conf'],
+                         sorted(os.listdir(self.export_dir)))
+        self.assertEqual(
+            '%%include %s\n' % os.path.join(self.export_dir,
+                                            'fakefile.conf'),
+            self._read('INDEX.conf'))
+        self._manager._dbus_send_ganesha.assert_has_calls([
+            mock.call('RemoveExport', 'uint16:102'),
+            mock.call('AddExport',
+                      'string:' + os.path.join(self.export_dir,
+                                               'fakefile.conf'),
+                      'string:EXPORT(Export_Id=101)')])
+        self.assertEqual(2, self._manager._dbus_send_ganesha.call_count)
+
+    def test_reset_exports(self):
+        self._manager._write_export_file(test_name, test_dict_str)
+
+        self._manager.reset_exports()
+
+        self.assertEqual(['INDEX.conf'], os.listdir(self.export_dir))
+        self.assertEqual('\n', self._read('INDEX.conf'))
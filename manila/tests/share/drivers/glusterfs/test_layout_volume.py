@@ -60,6 +60,22 @@ def glusterXMLOut(**kwargs):
     return template % kwargs, ''
 
 
+def glusterVolInfoXMLOut(volumes):
+
+    template = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<cliOutput>
+  <opRet>0</opRet>
+  <opErrno>0</opErrno>
+  <opErrstr/>
+  <volInfo>
+    <volumes>%s
+    </volumes>
+  </volInfo>
+</cliOutput>"""
+
+    return template % volumes, ''
+
+
 FAKE_UUID1 = '11111111-1111-1111-1111-111111111111'
 FAKE_UUID2 = '22222222-2222-2222-2222-222222222222'
 
@@ -78,8 +94,6 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
         self.glusterfs_target2 = 'root@host2:/gv2'
         self.glusterfs_server1 = 'root@host1'
         self.glusterfs_server2 = 'root@host2'
-        self.glusterfs_server1_volumes = 'manila-share-1-1G\nshare1'
-        self.glusterfs_server2_volumes = 'manila-share-2-2G\nshare2'
         self.share1 = new_share(
             export_location=self.glusterfs_target1,
             status=constants.STATUS_AVAILABLE)
@@ -91,9 +105,6 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
                           requires={'volume': False})
         self.gmgr2 = gmgr(self.glusterfs_server2, self._execute, None, None,
                           requires={'volume': False})
-        self.glusterfs_volumes_dict = (
-            {'root@host1:/manila-share-1-1G': {'size': 1},
-             'root@host2:/manila-share-2-2G': {'size': 2}})
         self.glusterfs_used_vols = set([
             'root@host1:/manila-share-1-1G',
             'root@host2:/manila-share-2-2G'])
@@ -157,120 +168,221 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
 
         self.assertEqual(re.compile(volume_pattern), ret)
 
-    @ddt.data({'root@host1:/manila-share-1-1G': 'NONE',
-               'root@host2:/manila-share-2-2G': None},
-              {'root@host1:/manila-share-1-1G': FAKE_UUID1,
-               'root@host2:/manila-share-2-2G': None},
-              {'root@host1:/manila-share-1-1G': 'foobarbaz',
-               'root@host2:/manila-share-2-2G': FAKE_UUID2},
-              {'root@host1:/manila-share-1-1G': FAKE_UUID1,
-               'root@host2:/manila-share-2-2G': FAKE_UUID2})
+    @ddt.data(None, 'NONE', FAKE_UUID1)
     def test_fetch_gluster_volumes(self, sharemark):
-        vol1_qualified = 'root@host1:/manila-share-1-1G'
-        gmgr_vol1 = common.GlusterManager(vol1_qualified)
-        gmgr_vol1.get_vol_option = mock.Mock(
-            return_value=sharemark[vol1_qualified])
-        vol2_qualified = 'root@host2:/manila-share-2-2G'
-        gmgr_vol2 = common.GlusterManager(vol2_qualified)
-        gmgr_vol2.get_vol_option = mock.Mock(
-            return_value=sharemark[vol2_qualified])
-        self.mock_object(
-            self.gmgr1, 'gluster_call',
-            mock.Mock(return_value=(self.glusterfs_server1_volumes, '')))
-        self.mock_object(
-            self.gmgr2, 'gluster_call',
-            mock.Mock(return_value=(self.glusterfs_server2_volumes, '')))
-        _glustermanager_calls = (self.gmgr1, gmgr_vol1, self.gmgr2, gmgr_vol2)
+        options = ''
+        if sharemark:
+            options = """
+        <options>
+          <option>
+            <name>user.manila-share</name>
+            <value>%s</value>
+          </option>
+        </options>""" % sharemark
+        volinfo = glusterVolInfoXMLOut(
+            """
+      <volume>
+        <name>manila-share-1-1G</name>%s
+      </volume>
+      <volume>
+        <name>share1</name>
+      </volume>""" % options)
+        self.mock_object(self.gmgr1, 'gluster_call',
+                         mock.Mock(return_value=volinfo))
         self.mock_object(self._layout, '_glustermanager',
-                         mock.Mock(side_effect=_glustermanager_calls))
-        expected_output = {}
-        for q, d in self.glusterfs_volumes_dict.items():
-            if sharemark[q] not in (FAKE_UUID1, FAKE_UUID2):
-                expected_output[q] = d
-
-        ret = self._layout._fetch_gluster_volumes()
-
-        test_args = ('volume', 'list')
-        self.gmgr1.gluster_call.assert_called_once_with(*test_args,
-                                                        log=mock.ANY)
-        self.gmgr2.gluster_call.assert_called_once_with(*test_args,
-                                                        log=mock.ANY)
-        gmgr_vol1.get_vol_option.assert_called_once_with(
-            'user.manila-share')
-        gmgr_vol2.get_vol_option.assert_called_once_with(
-            'user.manila-share')
-        self.assertEqual(expected_output, ret)
+                         mock.Mock(side_effect=common.GlusterManager))
+        expected_output = {'root@host1:/manila-share-1-1G': {
+            'params': {'size': 1}, 'share': sharemark}}
 
-    def test_fetch_gluster_volumes_no_filter_used(self):
-        vol1_qualified = 'root@host1:/manila-share-1-1G'
-        gmgr_vol1 = common.GlusterManager(vol1_qualified)
-        gmgr_vol1.get_vol_option = mock.Mock()
-        vol2_qualified = 'root@host2:/manila-share-2-2G'
-        gmgr_vol2 = common.GlusterManager(vol2_qualified)
-        gmgr_vol2.get_vol_option = mock.Mock()
-        self.mock_object(
-            self.gmgr1, 'gluster_call',
-            mock.Mock(return_value=(self.glusterfs_server1_volumes, '')))
-        self.mock_object(
-            self.gmgr2, 'gluster_call',
-            mock.Mock(return_value=(self.glusterfs_server2_volumes, '')))
-        _glustermanager_calls = (self.gmgr1, gmgr_vol1, self.gmgr2, gmgr_vol2)
-        self.mock_object(self._layout, '_glustermanager',
-                         mock.Mock(side_effect=_glustermanager_calls))
-        expected_output = self.glusterfs_volumes_dict
-
-        ret = self._layout._fetch_gluster_volumes(filter_used=False)
-
-        test_args = ('volume', 'list')
-        self.gmgr1.gluster_call.assert_called_once_with(*test_args,
-                                                        log=mock.ANY)
-        self.gmgr2.gluster_call.assert_called_once_with(*test_args,
-                                                        log=mock.ANY)
-        self.assertFalse(gmgr_vol1.get_vol_option.called)
-        self.assertFalse(gmgr_vol2.get_vol_option.called)
+        ret = self._layout._fetch_gluster_volumes(self.gmgr1)
+
+        self.gmgr1.gluster_call.assert_called_once_with(
+            '--xml', 'volume', 'info', log=mock.ANY)
         self.assertEqual(expected_output, ret)
 
     def test_fetch_gluster_volumes_no_keymatch(self):
-        vol1_qualified = 'root@host1:/manila-share-1'
-        gmgr_vol1 = common.GlusterManager(vol1_qualified)
-        gmgr_vol1.get_vol_option = mock.Mock(return_value=None)
-        self._layout.configuration.glusterfs_servers = [self.glusterfs_server1]
-        self.mock_object(
-            self.gmgr1, 'gluster_call',
-            mock.Mock(return_value=('manila-share-1', '')))
-        _glustermanager_calls = (self.gmgr1, gmgr_vol1)
+        volinfo = glusterVolInfoXMLOut(
+            """
+      <volume>
+        <name>manila-share-1</name>
+      </volume>""")
+        self.mock_object(self.gmgr1, 'gluster_call',
+                         mock.Mock(return_value=volinfo))
         self.mock_object(self._layout, '_glustermanager',
-                         mock.Mock(side_effect=_glustermanager_calls))
+                         mock.Mock(side_effect=common.GlusterManager))
         self.mock_object(self._layout, 'volume_pattern',
                          re.compile('manila-share-\d+(-(?P<size>\d+)G)?$'))
-        expected_output = {'root@host1:/manila-share-1': {'size': None}}
+        expected_output = {'root@host1:/manila-share-1': {
+            'params': {'size': None}, 'share': None}}
 
-        ret = self._layout._fetch_gluster_volumes()
+        ret = self._layout._fetch_gluster_volumes(self.gmgr1)
 
-        test_args = ('volume', 'list')
-        self.gmgr1.gluster_call.assert_called_once_with(*test_args,
-                                                        log=mock.ANY)
         self.assertEqual(expected_output, ret)
 
-    def test_fetch_gluster_volumes_error(self):
-        test_args = ('volume', 'list')
+    @ddt.data(('', ''), glusterXMLOut(ret=-1, errno=2))
+    def test_fetch_gluster_volumes_bad_response(self, volinfo):
+        self.mock_object(self.gmgr1, 'gluster_call',
+                         mock.Mock(return_value=volinfo))
 
-        def raise_exception(*args, **kwargs):
-            if(args == test_args):
-                raise exception.GlusterfsException()
+        self.assertRaises((exception.GlusterfsException,
+                           exception.InvalidShare),
+                          self._layout._fetch_gluster_volumes, self.gmgr1)
 
-        self._layout.configuration.glusterfs_servers = [self.glusterfs_server1]
+    def test_fetch_gluster_volumes_error(self):
         self.mock_object(self.gmgr1, 'gluster_call',
-                         mock.Mock(side_effect=raise_exception))
-        self.mock_object(self._layout, '_glustermanager',
-                         mock.Mock(return_value=self.gmgr1))
-        self.mock_object(layout_volume.LOG, 'error')
+                         mock.Mock(side_effect=exception.GlusterfsException))
 
         self.assertRaises(exception.GlusterfsException,
-                          self._layout._fetch_gluster_volumes)
+                          self._layout._fetch_gluster_volumes, self.gmgr1)
+
+        self.gmgr1.gluster_call.assert_called_once_with(
+            '--xml', 'volume', 'info', log=mock.ANY)
+
+    def test_query_gluster_vols_inventory(self):
+        voldict1 = {'root@host1:/manila-share-1-1G': {
+            'params': {'size': 1}, 'share': None}}
+        self.mock_object(self._layout, '_glustermanager',
+                         mock.Mock(side_effect=[self.gmgr1, self.gmgr2]))
+        self.mock_object(
+            self._layout, '_fetch_gluster_volumes',
+            mock.Mock(side_effect=[voldict1, exception.GlusterfsException]))
+        self.mock_object(layout_volume.LOG, 'warning')
+        self._layout._gluster_vols_touched = set(['fake'])
+
+        ret = self._layout._query_gluster_vols_inventory()
+
+        self.assertEqual({self.glusterfs_server1: voldict1}, ret)
+        self._layout._glustermanager.assert_has_calls(
+            [mock.call(self.glusterfs_server1, False),
+             mock.call(self.glusterfs_server2, False)])
+        self._layout._fetch_gluster_volumes.assert_has_calls(
+            [mock.call(self.gmgr1), mock.call(self.gmgr2)])
+        self.assertEqual(1, layout_volume.LOG.warning.call_count)
+        self.assertEqual(set(), self._layout._gluster_vols_touched)
+
+    @ddt.data(glusterXMLOut(ret=-1, errno=2), ('<cliOutput>', ''))
+    def test_query_gluster_vols_inventory_bad_response(self, volinfo):
+        voldict1 = {'root@host1:/manila-share-1-1G': {
+            'params': {'size': 1}, 'share': None}}
+        self.mock_object(self._layout, '_glustermanager',
+                         mock.Mock(side_effect=[self.gmgr1, self.gmgr2]))
+        self.mock_object(self.gmgr2, 'gluster_call',
+                         mock.Mock(return_value=volinfo))
+        fetch = self._layout._fetch_gluster_volumes
+        self.mock_object(
+            self._layout, '_fetch_gluster_volumes',
+            mock.Mock(side_effect=lambda gmgr: (
+                voldict1 if gmgr is self.gmgr1 else fetch(gmgr))))
+        self.mock_object(layout_volume.LOG, 'warning')
 
-        self.gmgr1.gluster_call.assert_called_once_with(*test_args,
-                                                        log=mock.ANY)
+        ret = self._layout._query_gluster_vols_inventory()
+
+        self.assertEqual({self.glusterfs_server1: voldict1}, ret)
+        self.assertEqual(1, layout_volume.LOG.warning.call_count)
+
+    def test_update_gluster_vols_inventory(self):
+        vol1 = 'root@host1:/manila-share-1-1G'
+        vol2 = 'root@host1:/manila-share-2-1G'
+        vol3 = 'root@host2:/manila-share-3-2G'
+        self._layout.gluster_vols_inventory = {
+            self.glusterfs_server1: {
+                vol1: {'params': {'size': 1}, 'share': FAKE_UUID1},
+                vol2: {'params': {'size': 1}, 'share': None}},
+            self.glusterfs_server2: {
+                vol3: {'params': {'size': 2}, 'share': None}}}
+        self._layout._gluster_vols_touched = set([vol1])
+
+        self._layout._update_gluster_vols_inventory(
+            {self.glusterfs_server1: {
+                vol1: {'params': {'size': 1}, 'share': None}}})
+
+        self.assertEqual(
+            {self.glusterfs_server1: {
+                vol1: {'params': {'size': 1}, 'share': FAKE_UUID1}},
+             self.glusterfs_server2: {
+                vol3: {'params': {'size': 2}, 'share': None}}},
+            self._layout.gluster_vols_inventory)
+
+    def test_refresh_gluster_vols_inventory(self):
+        inventory = {self.glusterfs_server1: {}}
+        self.mock_object(self._layout, '_query_gluster_vols_inventory',
+                         mock.Mock(return_value=inventory))
+        self.mock_object(self._layout, '_update_gluster_vols_inventory')
+
+        self._layout._refresh_gluster_vols_inventory()
+
+        self._layout._query_gluster_vols_inventory.assert_called_once_with()
+        self._layout._update_gluster_vols_inventory.assert_called_once_with(
+            inventory)
+
+    def test_refresh_gluster_vols_inventory_error(self):
+        self.mock_object(self._layout, '_query_gluster_vols_inventory',
+                         mock.Mock(side_effect=ValueError))
+        self.mock_object(self._layout, '_update_gluster_vols_inventory')
+        self.mock_object(layout_volume.LOG, 'exception')
+
+        self._layout._refresh_gluster_vols_inventory()
+
+        self.assertFalse(self._layout._update_gluster_vols_inventory.called)
+        self.assertEqual(1, layout_volume.LOG.exception.call_count)
+
+    def test_stop_gluster_vols_inventory_refresh(self):
+        fake_task = mock.Mock()
+        self._layout._inventory_task = fake_task
+
+        self._layout._stop_gluster_vols_inventory_refresh()
+        self._layout._stop_gluster_vols_inventory_refresh()
+
+        fake_task.stop.assert_called_once_with()
+        self.assertIsNone(self._layout._inventory_task)
+
+    @ddt.data(FAKE_UUID2, None)
+    def test_set_gluster_vol_share(self, share_id):
+        vol1 = 'root@host1:/manila-share-1-1G'
+        self._layout.gluster_vols_inventory = {
+            self.glusterfs_server1: {
+                vol1: {'params': {'size': 1}, 'share': FAKE_UUID1}}}
+
+        self._layout._set_gluster_vol_share(vol1, share_id)
+        self._layout._set_gluster_vol_share('root@host3:/fake', share_id)
+
+        self.assertEqual(
+            {self.glusterfs_server1: {
+                vol1: {'params': {'size': 1}, 'share': share_id}}},
+            self._layout.gluster_vols_inventory)
+        self.assertEqual(set([vol1]), self._layout._gluster_vols_touched)
+
+    def test_forget_gluster_vol(self):
+        vol1 = 'root@host1:/manila-share-1-1G'
+        self._layout.gluster_vols_inventory = {
+            self.glusterfs_server1: {
+                vol1: {'params': {'size': 1}, 'share': FAKE_UUID1}}}
+
+        self._layout._forget_gluster_vol(vol1)
+
+        self.assertEqual({self.glusterfs_server1: {}},
+                         self._layout.gluster_vols_inventory)
+
+    def test_get_unused_gluster_vols(self):
+        self._layout.gluster_vols_inventory = {
+            self.glusterfs_server1: {
+                'root@host1:/manila-share-1-1G': {
+                    'params': {'size': 1}, 'share': FAKE_UUID1},
+                'root@host1:/manila-share-2-1G': {
+                    'params': {'size': 1}, 'share': 'NONE'}},
+            self.glusterfs_server2: {
+                'root@host2:/manila-share-3-2G': {
+                    'params': {'size': 2}, 'share': None},
+                'root@host2:/manila-share-4-2G': {
+                    'params': {'size': 2}, 'share': None}}}
+        self._layout.gluster_used_vols = set(
+            ['root@host2:/manila-share-4-2G'])
+
+        ret = self._layout._get_unused_gluster_vols()
+
+        self.assertEqual({'root@host1:/manila-share-2-1G': {'size': 1},
+                          'root@host2:/manila-share-3-2G': {'size': 2}},
+                         ret)
 
     def test_do_setup(self):
         self._layout.configuration.glusterfs_servers = [self.glusterfs_server1]
@@ -278,18 +390,53 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
                          mock.Mock(return_value=('3', '6')))
         self.mock_object(self._layout, '_glustermanager',
                          mock.Mock(return_value=self.gmgr1))
-        self.mock_object(self._layout, '_fetch_gluster_volumes',
-                         mock.Mock(return_value=self.glusterfs_volumes_dict))
+        inventory = {self.glusterfs_server1: {
+            'root@host1:/manila-share-1-1G': {
+                'params': {'size': 1}, 'share': None}}}
+        self.mock_object(self._layout, '_query_gluster_vols_inventory',
+                         mock.Mock(return_value=inventory))
         self.mock_object(self._layout, '_check_mount_glusterfs')
         self._layout.gluster_used_vols = self.glusterfs_used_vols
         self.mock_object(layout_volume.LOG, 'warning')
+        fake_task = mock.Mock()
+        self.mock_object(layout_volume.loopingcall,
+                         'FixedIntervalLoopingCall',
+                         mock.Mock(return_value=fake_task))
 
         self._layout.do_setup(self._context)
 
-        self._layout._fetch_gluster_volumes.assert_called_once_with(
-            filter_used=False)
+        self._layout._query_gluster_vols_inventory.assert_called_once_with()
+        self.assertEqual(inventory, self._layout.gluster_vols_inventory)
         self._layout._check_mount_glusterfs.assert_called_once_with()
         self.gmgr1.get_gluster_version.assert_called_once_with()
+        (layout_volume.loopingcall.FixedIntervalLoopingCall.
+            assert_called_once_with(
+                self._layout._refresh_gluster_vols_inventory))
+        fake_task.start.assert_called_once_with(interval=300,
+                                                initial_delay=300)
+        self.assertIs(fake_task, self._layout._inventory_task)
+
+    def test_do_setup_no_inventory_refresh(self):
+        conf = self._layout.configuration
+        conf.glusterfs_servers = [self.glusterfs_server1]
+        conf.glusterfs_volume_inventory_refresh_interval = 0
+        self.mock_object(self.gmgr1, 'get_gluster_version',
+                         mock.Mock(return_value=('3', '6')))
+        self.mock_object(self._layout, '_glustermanager',
+                         mock.Mock(return_value=self.gmgr1))
+        self.mock_object(
+            self._layout, '_query_gluster_vols_inventory',
+            mock.Mock(return_value={self.glusterfs_server1: {
+                'root@host1:/manila-share-1-1G': {
+                    'params': {'size': 1}, 'share': None}}}))
+        self.mock_object(self._layout, '_check_mount_glusterfs')
+        self.mock_object(layout_volume.loopingcall,
+                         'FixedIntervalLoopingCall')
+
+        self._layout.do_setup(self._context)
+
+        self.assertFalse(
+            layout_volume.loopingcall.FixedIntervalLoopingCall.called)
 
     def test_do_setup_unsupported_glusterfs_version(self):
         self._layout.configuration.glusterfs_servers = [self.glusterfs_server1]
@@ -324,14 +471,13 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
                          mock.Mock(return_value=('3', '6')))
         self.mock_object(self._layout, '_glustermanager',
                          mock.Mock(return_value=self.gmgr1))
-        self.mock_object(self._layout, '_fetch_gluster_volumes',
-                         mock.Mock(return_value={}))
+        self.mock_object(self._layout, '_query_gluster_vols_inventory',
+                         mock.Mock(return_value={self.glusterfs_server1: {}}))
 
         self.assertRaises(exception.GlusterfsException,
                           self._layout.do_setup, self._context)
 
-        self._layout._fetch_gluster_volumes.assert_called_once_with(
-            filter_used=False)
+        self._layout._query_gluster_vols_inventory.assert_called_once_with()
 
     def test_share_manager(self):
         self.mock_object(self._layout, '_glustermanager',
@@ -363,6 +509,7 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
         gmgr1.set_vol_option = mock.Mock()
         self.mock_object(self._layout, '_share_manager',
                          mock.Mock(return_value=gmgr1))
+        self.mock_object(self._layout, '_set_gluster_vol_share')
 
         self._layout.ensure_share(self._context, share)
 
@@ -370,6 +517,8 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
         self.assertIn(self.glusterfs_target1, self._layout.gluster_used_vols)
         gmgr1.set_vol_option.assert_called_once_with(
             'user.manila-share', share['id'])
+        self._layout._set_gluster_vol_share.assert_called_once_with(
+            self.glusterfs_target1, share['id'])
 
     @ddt.data({"voldict": {"host:/share2G": {"size": 2}}, "used_vols": set(),
                "size": 1, "expected": "host:/share2G"},
@@ -401,7 +550,10 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
     def test_pop_gluster_vol(self, voldict, used_vols, size, expected):
         gmgr = common.GlusterManager
         gmgr1 = gmgr(expected, self._execute, None, None)
-        self._layout._fetch_gluster_volumes = mock.Mock(return_value=voldict)
+        self._layout._get_unused_gluster_vols = mock.Mock(
+            return_value=dict((v, p) for v, p in voldict.items()
+                              if v not in used_vols))
+        self._layout._query_gluster_vols_inventory = mock.Mock()
         self._layout.gluster_used_vols = used_vols
         self._layout._glustermanager = mock.Mock(return_value=gmgr1)
         self._layout.volume_pattern_keys = list(voldict.values())[0].keys()
@@ -410,35 +562,63 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
 
         self.assertEqual(expected, result)
         self.assertIn(result, used_vols)
-        self._layout._fetch_gluster_volumes.assert_called_once_with()
+        self.assertIn(result, self._layout._gluster_vols_touched)
+        self._layout._get_unused_gluster_vols.assert_called_once_with()
+        self.assertFalse(self._layout._query_gluster_vols_inventory.called)
         self._layout._glustermanager.assert_called_once_with(result)
 
+    def test_pop_gluster_vol_refresh(self):
+        vol = 'host:/share2G'
+        inventory = {'host': {vol: {'params': {'size': 2}, 'share': None}}}
+        self._layout.gluster_vols_inventory = {'host': {}}
+        self._layout.gluster_used_vols = set()
+        self._layout._query_gluster_vols_inventory = mock.Mock(
+            return_value=inventory)
+        self._layout._glustermanager = mock.Mock(
+            return_value=common.GlusterManager(vol))
+        self._layout.volume_pattern_keys = ['size']
+
+        result = self._layout._pop_gluster_vol(size=1)
+
+        self.assertEqual(vol, result)
+        self.assertIn(vol, self._layout.gluster_used_vols)
+        self._layout._query_gluster_vols_inventory.assert_called_once_with()
+        self.assertEqual(inventory, self._layout.gluster_vols_inventory)
+
     @ddt.data({"voldict": {"share2G": {"size": 2}},
                "used_vols": set(), "size": 3},
               {"voldict": {"share2G": {"size": 2}},
                "used_vols": set(["share2G"]), "size": None})
     @ddt.unpack
     def test_pop_gluster_vol_excp(self, voldict, used_vols, size):
-        self._layout._fetch_gluster_volumes = mock.Mock(return_value=voldict)
+        self._layout.gluster_vols_inventory = {'host': dict(
+            (v, {'params': p, 'share': None}) for v, p in voldict.items())}
+        self._layout._query_gluster_vols_inventory = mock.Mock(
+            return_value={})
         self._layout.gluster_used_vols = used_vols
         self._layout.volume_pattern_keys = list(voldict.values())[0].keys()
 
         self.assertRaises(exception.GlusterfsException,
                           self._layout._pop_gluster_vol, size=size)
 
-        self._layout._fetch_gluster_volumes.assert_called_once_with()
+        self._layout._query_gluster_vols_inventory.assert_called_once_with()
         self.assertFalse(
             self.fake_driver._setup_via_manager.called)
 
     def test_push_gluster_vol(self):
         self._layout.gluster_used_vols = set([
             self.glusterfs_target1, self.glusterfs_target2])
+        self._layout.gluster_vols_inventory = {
+            self.glusterfs_server2: {
+                self.glusterfs_target2: {'params': {}, 'share': FAKE_UUID1}}}
 
         self._layout._push_gluster_vol(self.glusterfs_target2)
 
         self.assertEqual(1, len(self._layout.gluster_used_vols))
         self.assertFalse(
             self.glusterfs_target2 in self._layout.gluster_used_vols)
+        self.assertIsNone(self._layout.gluster_vols_inventory[
+            self.glusterfs_server2][self.glusterfs_target2]['share'])
 
     def test_push_gluster_vol_excp(self):
         self._layout.gluster_used_vols = set([self.glusterfs_target1])
@@ -555,6 +735,7 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
                          mock.Mock(return_value=gmgr1))
         self.mock_object(self.fake_driver, '_setup_via_manager',
                          mock.Mock(return_value='host1:/gv1'))
+        self.mock_object(self._layout, '_set_gluster_vol_share')
 
         share = new_share()
         exp_locn = self._layout.create_share(self._context, share)
@@ -566,6 +747,8 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
             share['id'], {'volume': self.glusterfs_target1})
         gmgr1.set_vol_option.assert_called_once_with(
             'user.manila-share', share['id'])
+        self._layout._set_gluster_vol_share.assert_called_once_with(
+            self.glusterfs_target1, share['id'])
         self.assertEqual('host1:/gv1', exp_locn)
 
     def test_create_share_error(self):
@@ -612,6 +795,7 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
         gmgr1.get_vol_option = mock.Mock(return_value=FAKE_UUID1)
         self.mock_object(self._layout, '_glustermanager',
                          mock.Mock(return_value=gmgr1))
+        self.mock_object(self._layout, '_forget_gluster_vol')
         self._layout.gluster_used_vols = set([self.glusterfs_target1])
 
         self._layout.delete_share(self._context, self.share1)
@@ -625,6 +809,8 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
             self.share1['id'])
         gmgr1.gluster_call.assert_called_once_with(
             'volume', 'delete', 'gv1')
+        self._layout._forget_gluster_vol.assert_called_once_with(
+            self.glusterfs_target1)
 
     def test_delete_share_error(self):
         self._layout._wipe_gluster_vol = mock.Mock()
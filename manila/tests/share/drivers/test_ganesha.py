@@ -256,47 +256,80 @@ class GaneshaNASHelperTestCase(test.TestCase):
             'fakename--fakeaccid')
         self.assertIsNone(ret)
 
+    def test_make_export(self):
+        self.mock_object(self._helper.ganesha, 'get_export_id',
+                         mock.Mock(return_value=101))
+        self.mock_object(self._helper, '_fsal_hook',
+                         mock.Mock(return_value='fakefsal'))
+        self._helper.export_template = {}
+
+        ret = self._helper._make_export(fake_basepath, self.share,
+                                        self.access)
+
+        self._helper.ganesha.get_export_id.assert_called_once_with()
+        self._helper._fsal_hook.assert_called_once_with(
+            fake_basepath, self.share, self.access)
+        self.assertEqual((fake_export_name, fake_output_template), ret)
+
     @ddt.data({}, {'recovery': False})
     def test_update_access_for_allow(self, kwargs):
-        self.mock_object(self._helper, '_allow_access')
-        self.mock_object(self._helper, '_deny_access')
+        self.mock_object(self._helper, '_make_export',
+                         mock.Mock(return_value=('fakeexport', 'fakeconf')))
 
         self._helper.update_access(
-            '/some/path', 'aShare', add_rules=["example.com"], delete_rules=[],
-            **kwargs)
-
-        self._helper._allow_access.assert_called_once_with(
-            '/some/path', 'aShare', 'example.com')
+            '/some/path', self.share, add_rules=[self.access],
+            delete_rules=[], **kwargs)
 
-        self.assertFalse(self._helper._deny_access.called)
+        self._helper._make_export.assert_called_once_with(
+            '/some/path', self.share, self.access)
+        self._helper.ganesha.update_exports.assert_called_once_with(
+            add_exports={'fakeexport': 'fakeconf'}, remove_exports=[])
         self.assertFalse(self._helper.ganesha.reset_exports.called)
         self.assertFalse(self._helper.ganesha.restart_service.called)
 
     def test_update_access_for_deny(self):
-        self.mock_object(self._helper, '_allow_access')
-        self.mock_object(self._helper, '_deny_access')
+        self.mock_object(self._helper, '_make_export')
 
         self._helper.update_access(
-            '/some/path', 'aShare', [], delete_rules=["example.com"])
-
-        self._helper._deny_access.assert_called_once_with(
-            '/some/path', 'aShare', 'example.com')
+            '/some/path', self.share, [], delete_rules=[self.access])
 
-        self.assertFalse(self._helper._allow_access.called)
+        self._helper.ganesha.update_exports.assert_called_once_with(
+            add_exports={}, remove_exports=[fake_export_name])
+        self.assertFalse(self._helper._make_export.called)
         self.assertFalse(self._helper.ganesha.reset_exports.called)
         self.assertFalse(self._helper.ganesha.restart_service.called)
 
-    def test_update_access_recovery(self):
-        self.mock_object(self._helper, '_allow_access')
-        self.mock_object(self._helper, '_deny_access')
+    def test_update_access_batch(self):
+        access2 = fake_share.fake_access(id='fakeaccid2')
+        access3 = fake_share.fake_access(id='fakeaccid3')
+        self.mock_object(
+            self._helper, '_make_export',
+            mock.Mock(side_effect=[('fakeexport1', 'fakeconf1'),
+                                   ('fakeexport2', 'fakeconf2')]))
 
         self._helper.update_access(
-            '/some/path', 'aShare', add_rules=["example.com"], delete_rules=[],
-            recovery=True)
+            '/some/path', self.share, add_rules=[self.access, access2],
+            delete_rules=[access3])
 
-        self._helper._allow_access.assert_called_once_with(
-            '/some/path', 'aShare', 'example.com')
+        self._helper._make_export.assert_has_calls([
+            mock.call('/some/path', self.share, self.access),
+            mock.call('/some/path', self.share, access2)])
+        self._helper.ganesha.update_exports.assert_called_once_with(
+            add_exports={'fakeexport1': 'fakeconf1',
+                         'fakeexport2': 'fakeconf2'},
+            remove_exports=['fakename--fakeaccid3'])
+
+    def test_update_access_recovery(self):
+        self.mock_object(self._helper, '_make_export',
+                         mock.Mock(return_value=('fakeexport', 'fakeconf')))
+
+        self._helper.update_access(
+            '/some/path', self.share, add_rules=[self.access],
+            delete_rules=[], recovery=True)
 
-        self.assertFalse(self._helper._deny_access.called)
+        self._helper._make_export.assert_called_once_with(
+            '/some/path', self.share, self.access)
+        self._helper.ganesha.update_exports.assert_called_once_with(
+            add_exports={'fakeexport': 'fakeconf'}, remove_exports=[])
         self.assertTrue(self._helper.ganesha.reset_exports.called)
         self.assertTrue(self._helper.ganesha.restart_service.called)
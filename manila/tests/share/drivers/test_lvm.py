@@ -14,16 +14,22 @@
 #    under the License.
 """Unit tests for the LVM driver module."""
 
+import ast
+import inspect
 import os
 
 import ddt
 import mock
 from oslo_config import cfg
+from oslo_rootwrap import wrapper
+import six
 
+import manila
 from manila.common import constants as const
 from manila import context
 from manila import exception
 from manila.share import configuration
+from manila.share.drivers import generic
 from manila.share.drivers import lvm
 from manila import test
 from manila.tests.db import fakes as db_fakes
@@ -77,6 +83,53 @@ def fake_access(**kwargs):
     return db_fakes.FakeModel(access)
 
 
+def _get_literal(node):
+    if isinstance(node, ast.Name):
+        return {'True': True, 'False': False}.get(node.id)
+    return getattr(node, 'value', getattr(node, 's', None))
+
+
+def get_commands_run_as_root(module):
+    """Returns commands run with run_as_root=True by methods of module."""
+    fstypes = [opt.type.choices for opt in generic.share_opts
+               if opt.name == 'share_volume_fstype'][0]
+    commands = set()
+    for func in ast.walk(ast.parse(inspect.getsource(module))):
+        if not isinstance(func, ast.FunctionDef):
+            continue
+        # Commands built as lists before being executed, e.g. cmd = [...]
+        cmd_lists = dict(
+            (target.id, node.value.elts[0])
+            for node in ast.walk(func)
+            if isinstance(node, ast.Assign) and
+            isinstance(node.value, ast.List) and node.value.elts
+            for target in node.targets if isinstance(target, ast.Name))
+        for call in ast.walk(func):
+            if not (isinstance(call, ast.Call) and
+                    isinstance(call.func, ast.Attribute) and
+                    call.func.attr in ('_execute', '_try_execute')):
+                continue
+            if not any(kw.arg == 'run_as_root' and
+                       _get_literal(kw.value) is True
+                       for kw in call.keywords):
+                continue
+            # NOTE: *args are kept apart from positional arguments on py2.
+            args = call.args or [getattr(call, 'starargs', None)]
+            arg = args[0]
+            if isinstance(arg, getattr(ast, 'Starred', ())):
+                arg = arg.value
+            if isinstance(arg, ast.Name):
+                arg = cmd_lists[arg.id]
+            if isinstance(arg, ast.BinOp) and isinstance(arg.op, ast.Mod):
+                commands.update(_get_literal(arg.left) % fstype
+                                for fstype in fstypes)
+            else:
+                command = _get_literal(arg)
+                assert isinstance(command, six.string_types), ast.dump(arg)
+                commands.add(command)
+    return commands
+
+
 @ddt.ddt
 class LVMShareDriverTestCase(test.TestCase):
     """Tests LVMShareDriver."""
@@ -121,6 +174,20 @@ class LVMShareDriverTestCase(test.TestCase):
         fake_utils.fake_execute_set_repliers([])
         fake_utils.fake_execute_clear_log()
 
+    def test_rootwrap_filters_cover_commands_run_as_root(self):
+        filters_path = os.path.join(
+            os.path.dirname(os.path.dirname(manila.__file__)),
+            'etc', 'manila', 'rootwrap.d')
+        filters = wrapper.load_filters([filters_path])
+        commands = get_commands_run_as_root(lvm)
+
+        self.assertIn('lvs', commands)
+        self.assertIn('e2image', commands)
+        self.assertIn('mkfs.ext4', commands)
+        self.assertEqual(
+            [], sorted(command for command in commands
+                       if not any(f.match([command]) for f in filters)))
+
     def test_do_setup(self):
         CONF.set_default('lvm_share_helpers', ['NFS=fakenfs'])
         lvm.importutils = mock.Mock()
@@ -207,13 +274,108 @@ class LVMShareDriverTestCase(test.TestCase):
             'lvcreate -L 1G -n fakename fakevg',
             'mkfs.ext4 /dev/mapper/fakevg-fakename',
             'tune2fs -U random %s' % mount_share,
-            ("dd count=0 if=%s of=%s iflag=direct oflag=direct" %
-             (mount_snapshot, mount_share)),
-            ("dd if=%s of=%s count=1024 bs=1M iflag=direct oflag=direct" %
-             (mount_snapshot, mount_share)),
+            'e2image -ra %s %s' % (mount_snapshot, mount_share),
+        ]
+        self.assertEqual(expected_exec, fake_utils.fake_execute_get_log())
+
+    def test_create_share_from_snapshot_thin(self):
+        self.flags(lvm_share_thin_pool='fakepool')
+        self._driver._mount_device = mock.Mock()
+        self.mock_object(self._driver, 'extend_share')
+        snapshot_instance = {
+            'snapshot_id': 'fakesnapshotid',
+            'name': 'fakesnapshotname',
+            'size': 1,
+        }
+
+        ret = self._driver.create_share_from_snapshot(
+            self._context, self.share, snapshot_instance, self.share_server)
+
+        self._driver._mount_device.assert_called_once_with(
+            self.share, '/dev/mapper/fakevg-fakename')
+        expected_exec = [
+            'lvcreate --name fakename --snapshot fakevg/fakesnapshotname '
+            '--setactivationskip n',
+            'tune2fs -U random /dev/mapper/fakevg-fakename',
+        ]
+        self.assertEqual(expected_exec, fake_utils.fake_execute_get_log())
+        self.assertFalse(self._driver.extend_share.called)
+        self.assertEqual(self._helper_nfs.create_exports.return_value, ret)
+
+    def test_create_share_from_snapshot_thin_bigger(self):
+        self.flags(lvm_share_thin_pool='fakepool')
+        self._driver._mount_device = mock.Mock()
+        self.mock_object(self._driver, 'extend_share')
+        share = fake_share(size=3)
+        snapshot_instance = {'name': 'fakesnapshotname', 'size': 1}
+
+        self._driver.create_share_from_snapshot(
+            self._context, share, snapshot_instance, self.share_server)
+
+        self._driver.extend_share.assert_called_once_with(share, 3)
+
+    def test_create_share_thin(self):
+        self.flags(lvm_share_thin_pool='fakepool')
+        self._driver._mount_device = mock.Mock()
+
+        self._driver.create_share(self._context, self.share,
+                                  self.share_server)
+
+        expected_exec = [
+            'lvcreate -V 1G -n fakename --thinpool fakevg/fakepool',
+            'mkfs.ext4 /dev/mapper/fakevg-fakename',
+        ]
+        self.assertEqual(expected_exec, fake_utils.fake_execute_get_log())
+
+    def test_create_snapshot_thin(self):
+        self.flags(lvm_share_thin_pool='fakepool')
+        self._driver._mount_device = mock.Mock()
+
+        self._driver.create_snapshot(self._context, self.snapshot,
+                                     self.share_server)
+
+        expected_exec = [
+            'lvcreate --name fakesnapshotname --snapshot fakevg/fakename '
+            '--setactivationskip n',
+            'tune2fs -U random /dev/mapper/fakevg-fakesnapshotname',
         ]
         self.assertEqual(expected_exec, fake_utils.fake_execute_get_log())
 
+    @ddt.data(('  twi-aotz--\n', None),
+              ('  -wi-a-----\n', exception.InvalidParameterValue),
+              (exception.ProcessExecutionError,
+               exception.InvalidParameterValue))
+    @ddt.unpack
+    def test_check_for_setup_error_thin(self, lvs_result, expected_error):
+        self.flags(lvm_share_thin_pool='fakepool')
+
+        def exec_runner(*args, **kwargs):
+            if args[0] == 'vgs':
+                return '\n   fakevg\n', ''
+            if not isinstance(lvs_result, str):
+                raise lvs_result()
+            return lvs_result, ''
+
+        self.mock_object(self._driver, '_execute',
+                         mock.Mock(side_effect=exec_runner))
+
+        if expected_error:
+            self.assertRaises(expected_error,
+                              self._driver.check_for_setup_error)
+        else:
+            self._driver.check_for_setup_error()
+        self._driver._execute.assert_called_with(
+            'lvs', '--noheadings', '-o', 'lv_attr', 'fakevg/fakepool',
+            run_as_root=True)
+
+    def test_check_for_setup_error_thin_with_mirrors(self):
+        self.flags(lvm_share_thin_pool='fakepool', lvm_share_mirrors=2)
+        self.mock_object(self._driver, '_execute',
+                         mock.Mock(return_value=('\n   fakevg\n', '')))
+
+        self.assertRaises(exception.InvalidParameterValue,
+                          self._driver.check_for_setup_error)
+
     def test_create_share_mirrors(self):
         share = fake_share(size='2048')
         CONF.set_default('lvm_share_mirrors', 2)
@@ -505,9 +667,39 @@ class LVMShareDriverTestCase(test.TestCase):
         self._driver._execute.assert_called_once_with(
             'vgs', 'fakevg', '--rows', '--units', 'g', run_as_root=True)
 
+    def test_copy_volume(self):
+        self.mock_object(self._driver, '_execute')
+
+        self._driver._copy_volume('src', 'dest', 1)
+
+        self._driver._execute.assert_called_once_with(
+            'e2image', '-ra', 'src', 'dest', run_as_root=True)
+
+    def test_get_share_server_pools_thin(self):
+        self.flags(lvm_share_thin_pool='fakepool',
+                   max_over_subscription_ratio=10.0)
+        expected_result = [{
+            'pool_name': 'lvm-single-pool',
+            'total_capacity_gb': 40.0,
+            'free_capacity_gb': 30.0,
+            'reserved_percentage': 0,
+            'thin_provisioning': True,
+            'max_over_subscription_ratio': 10.0,
+        }, ]
+        self.mock_object(
+            self._driver,
+            '_execute',
+            mock.Mock(return_value=("  40.00 25.00\n", None)))
+
+        self.assertEqual(expected_result,
+                         self._driver.get_share_server_pools())
+        self._driver._execute.assert_called_once_with(
+            'lvs', '--noheadings', '--nosuffix', '--units', 'g', '-o',
+            'lv_size,data_percent', 'fakevg/fakepool', run_as_root=True)
+
     def test_copy_volume_error(self):
         def _fake_exec(*args, **kwargs):
-            if 'count=0' in args:
+            if 'count=0' in args or args[0] == 'e2image':
                 raise exception.ProcessExecutionError()
 
         self.mock_object(self._driver, '_execute',
@@ -17,6 +17,7 @@ import ddt
 import mock
 
 from oslo_config import cfg
+from oslo_utils import units
 
 from manila import context
 from manila import exception
@@ -65,6 +66,16 @@ class FakeConfig(object):
             "max_over_subscription_ratio", 15.0)
         self.filter_function = kwargs.get("filter_function", None)
         self.goodness_function = kwargs.get("goodness_function", None)
+        self.zfs_inventory_cache_ttl = kwargs.get(
+            "zfs_inventory_cache_ttl", 10)
+        self.zfs_replication_compressed_stream = kwargs.get(
+            "zfs_replication_compressed_stream", False)
+        self.zfs_replication_resumable = kwargs.get(
+            "zfs_replication_resumable", False)
+        self.zfs_replication_max_concurrent_transfers = kwargs.get(
+            "zfs_replication_max_concurrent_transfers", 4)
+        self.zfs_replication_buffer_command = kwargs.get(
+            "zfs_replication_buffer_command", None)
 
     def safe_get(self, key):
         return getattr(self, key)
@@ -86,8 +97,12 @@ class FakeDriverPrivateStorage(object):
     def get(self, entity_id, key):
         return self.storage.get(entity_id, {}).get(key)
 
-    def delete(self, entity_id):
-        self.storage.pop(entity_id, None)
+    def delete(self, entity_id, key=None):
+        if key is None:
+            self.storage.pop(entity_id, None)
+            return
+        for k in (key if isinstance(key, list) else [key]):
+            self.storage.get(entity_id, {}).pop(k, None)
 
 
 class FakeTempDir(object):
@@ -270,8 +285,14 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
     @ddt.data(None, '', 'foo_replication_domain')
     def test__get_pools_info(self, replication_domain):
         self.mock_object(
-            self.driver, 'get_zpool_option',
-            mock.Mock(side_effect=['2G', '3G', '5G', '4G']))
+            self.driver, 'get_zpools_inventory',
+            mock.Mock(return_value={
+                'foo': {'size': str(3 * units.Gi), 'free': str(2 * units.Gi),
+                        'allocated': str(units.Gi)},
+                'bar': {'size': str(4 * units.Gi), 'free': str(5 * units.Gi),
+                        'allocated': '0'},
+                'other': {'size': '1', 'free': '1', 'allocated': '0'},
+            }))
         self.configuration.replication_domain = replication_domain
         self.driver.zpool_list = ['foo', 'bar']
         expected = [
@@ -299,12 +320,17 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         result = self.driver._get_pools_info()
 
         self.assertEqual(expected, result)
-        self.driver.get_zpool_option.assert_has_calls([
-            mock.call('foo', 'free'),
-            mock.call('foo', 'size'),
-            mock.call('bar', 'free'),
-            mock.call('bar', 'size'),
-        ])
+        self.driver.get_zpools_inventory.assert_called_once_with()
+
+    def test__get_pools_info_zpool_absent(self):
+        self.mock_object(
+            self.driver, 'get_zpools_inventory',
+            mock.Mock(return_value={'foo': {'size': '3', 'free': '2'}}))
+        self.configuration.replication_domain = None
+        self.driver.zpool_list = ['foo', 'bar']
+
+        self.assertRaises(
+            exception.ZFSonLinuxException, self.driver._get_pools_info)
 
     @ddt.data(
         ([], {'compression': [True, False], 'dedupe': [True, False]}),
@@ -892,22 +918,20 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
             self.driver, '_get_dataset_name',
             mock.Mock(return_value=dataset_name))
         self.mock_object(
-            self.driver, 'get_zfs_option',
-            mock.Mock(return_value=get_zfs_option_answer))
+            self.driver, 'get_datasets_inventory',
+            mock.Mock(return_value={
+                'fake1': {'sharenfs': 'off'},
+                dataset_name: {'sharenfs': get_zfs_option_answer},
+                'fake2': {'sharenfs': 'on'},
+            }))
         mock_helper = self.mock_object(self.driver, '_get_share_helper')
         self.mock_object(
             self.driver, 'zfs', mock.Mock(return_value=('a', 'b')))
-        self.mock_object(
-            self.driver, 'parse_zfs_answer',
-            mock.Mock(side_effect=[[{'NAME': 'fake1'},
-                                    {'NAME': dataset_name},
-                                    {'NAME': 'fake2'}]] * 2))
 
         for s in ('1', '2'):
             self.driver.zfs.reset_mock()
-            self.driver.get_zfs_option.reset_mock()
+            self.driver.get_datasets_inventory.reset_mock()
             mock_helper.reset_mock()
-            self.driver.parse_zfs_answer.reset_mock()
             self.driver._get_dataset_name.reset_mock()
 
             self.driver.share_export_ip = '1.1.1.%s' % s
@@ -919,17 +943,16 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
             self.assertEqual(
                 'user%(s)s@2.2.2.%(s)s' % {'s': s},
                 self.driver.private_storage.get(share['id'], 'ssh_cmd'))
-            self.driver.get_zfs_option.assert_called_once_with(
-                dataset_name, 'sharenfs')
+            self.driver.get_datasets_inventory.assert_called_once_with(
+                ['bar'])
             mock_helper.assert_called_once_with(
                 share['share_proto'])
             mock_helper.return_value.get_exports.assert_called_once_with(
                 dataset_name)
-            expected_calls = [mock.call('list', '-r', 'bar')]
             if get_zfs_option_answer != 'off':
-                expected_calls.append(mock.call('share', dataset_name))
-            self.driver.zfs.assert_has_calls(expected_calls)
-            self.driver.parse_zfs_answer.assert_called_once_with('a')
+                self.driver.zfs.assert_called_once_with('share', dataset_name)
+            else:
+                self.assertFalse(self.driver.zfs.called)
             self.driver._get_dataset_name.assert_called_once_with(share)
             self.assertEqual(
                 mock_helper.return_value.get_exports.return_value,
@@ -941,13 +964,11 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         dataset_name = 'foo_zpool/foo_fs'
         self.driver.private_storage.update(
             share['id'], {'dataset_name': dataset_name})
-        self.mock_object(self.driver, 'get_zfs_option')
         self.mock_object(self.driver, '_get_share_helper')
+        self.mock_object(self.driver, 'zfs')
         self.mock_object(
-            self.driver, 'zfs', mock.Mock(return_value=('a', 'b')))
-        self.mock_object(
-            self.driver, 'parse_zfs_answer',
-            mock.Mock(side_effect=[[], [{'NAME': dataset_name}]]))
+            self.driver, 'get_datasets_inventory',
+            mock.Mock(return_value={'bar/other': {'sharenfs': 'on'}}))
 
         self.assertRaises(
             exception.ShareResourceNotFound,
@@ -955,10 +976,9 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
             'fake_context', share,
         )
 
-        self.assertEqual(0, self.driver.get_zfs_option.call_count)
         self.assertEqual(0, self.driver._get_share_helper.call_count)
-        self.driver.zfs.assert_called_once_with('list', '-r', 'bar')
-        self.driver.parse_zfs_answer.assert_called_once_with('a')
+        self.assertEqual(0, self.driver.zfs.call_count)
+        self.driver.get_datasets_inventory.assert_called_once_with(['bar'])
 
     def test_ensure_share_with_share_server(self):
         self.assertRaises(
@@ -1091,6 +1111,7 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         mock_helper = self.mock_object(self.driver, '_get_share_helper')
         mock_shell_executor = self.mock_object(
             self.driver, '_get_shell_executor_by_host')
+        self.mock_object(self.driver, 'invalidate_zfs_inventory')
         share = {
             'share_proto': 'NFS',
             'host': 'foo_host@bar_backend@quuz_pool',
@@ -1101,6 +1122,7 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
 
         self.driver._get_dataset_name.assert_called_once_with(share)
         mock_shell_executor.assert_called_once_with(share['host'])
+        self.driver.invalidate_zfs_inventory.assert_called_once_with()
         self.assertEqual(
             mock_helper.return_value.update_access.return_value,
             result,
@@ -1151,16 +1173,13 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
             mock_execute.return_value = "%s " % old_dataset_name, "fake_err"
         else:
             mock_execute.return_value = ("foo", "bar")
-        mock_parse_zfs_answer = self.mock_object(
-            self.driver,
-            "parse_zfs_answer",
-            mock.Mock(return_value=[
-                {"NAME": "some_other_dataset_1"},
-                {"NAME": old_dataset_name},
-                {"NAME": "some_other_dataset_2"},
-            ]))
-        mock_get_zfs_option = self.mock_object(
-            self.driver, 'get_zfs_option', mock.Mock(return_value="4G"))
+        mock_get_datasets_inventory = self.mock_object(
+            self.driver, "get_datasets_inventory",
+            mock.Mock(return_value={
+                "some_other_dataset_1": {"used": "0"},
+                old_dataset_name: {"used": str(4 * units.Gi)},
+                "some_other_dataset_2": {"used": "0"},
+            }))
 
         result = self.driver.manage_existing(share, driver_options)
 
@@ -1176,12 +1195,8 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         if mount_exists:
             mock_sleep.assert_called_once_with(1)
         mock_execute.assert_called_once_with("sudo", "mount")
-        mock_parse_zfs_answer.assert_called_once_with(mock_zfs.return_value[0])
-        if driver_options.get("size"):
-            self.assertFalse(mock_get_zfs_option.called)
-        else:
-            mock_get_zfs_option.assert_called_once_with(
-                old_dataset_name, "used")
+        mock_get_datasets_inventory.assert_called_once_with(["foopool"])
+        mock_zfs.assert_has_calls([mock.call("mount", new_dataset_name)])
         mock__get_dataset_name.assert_called_once_with(share)
         mock_get_extra_specs_from_share.assert_called_once_with(share)
 
@@ -1203,8 +1218,8 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         mock__get_dataset_name = self.mock_object(
             self.driver, "_get_dataset_name",
             mock.Mock(return_value=new_dataset_name))
-        mock_get_zfs_option = self.mock_object(
-            self.driver, 'get_zfs_option', mock.Mock(return_value="4G"))
+        mock_get_datasets_inventory = self.mock_object(
+            self.driver, "get_datasets_inventory")
 
         self.assertRaises(
             exception.ZFSonLinuxException,
@@ -1213,8 +1228,8 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         )
 
         mock__get_dataset_name.assert_called_once_with(share)
-        mock_get_zfs_option.assert_called_once_with(old_dataset_name, "used")
-        mock_get_extra_specs_from_share.assert_called_once_with(share)
+        self.assertFalse(mock_get_datasets_inventory.called)
+        self.assertFalse(mock_get_extra_specs_from_share.called)
 
     def test_manage_share_dataset_not_found(self):
         old_dataset_name = "foopool/path/to/old/dataset/name"
@@ -1234,15 +1249,10 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         mock__get_dataset_name = self.mock_object(
             self.driver, "_get_dataset_name",
             mock.Mock(return_value=new_dataset_name))
-        mock_get_zfs_option = self.mock_object(
-            self.driver, 'get_zfs_option', mock.Mock(return_value="4G"))
-        mock_zfs = self.mock_object(
-            self.driver, "zfs",
-            mock.Mock(return_value=("fake_out", "fake_error")))
-        mock_parse_zfs_answer = self.mock_object(
-            self.driver,
-            "parse_zfs_answer",
-            mock.Mock(return_value=[{"NAME": "some_other_dataset_1"}]))
+        mock_zfs = self.mock_object(self.driver, "zfs")
+        mock_get_datasets_inventory = self.mock_object(
+            self.driver, "get_datasets_inventory",
+            mock.Mock(return_value={"some_other_dataset_1": {"used": "0"}}))
 
         self.assertRaises(
             exception.ZFSonLinuxException,
@@ -1251,11 +1261,10 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         )
 
         mock__get_dataset_name.assert_called_once_with(share)
-        mock_get_zfs_option.assert_called_once_with(old_dataset_name, "used")
-        mock_zfs.assert_called_once_with(
-            "list", "-r", old_dataset_name.split("/")[0])
-        mock_parse_zfs_answer.assert_called_once_with(mock_zfs.return_value[0])
-        mock_get_extra_specs_from_share.assert_called_once_with(share)
+        mock_get_datasets_inventory.assert_called_once_with(
+            [old_dataset_name.split("/")[0]])
+        self.assertFalse(mock_zfs.called)
+        self.assertFalse(mock_get_extra_specs_from_share.called)
 
     def test_unmanage(self):
         share = {'id': 'fake_share_id'}
@@ -1428,6 +1437,273 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         self.assertEqual(1, zfs_driver.LOG.info.call_count)
         self.assertEqual(2, self.driver.zfs.call_count)
 
+    @ddt.data(None, 'mbuffer -q -r 10M')
+    def test__get_replication_send_cmd(self, buffer_cmd):
+        self.configuration.zfs_replication_buffer_command = buffer_cmd
+        expected = ['ssh', 'fake_ssh', 'sudo', 'zfs', 'send', '-v', 'foo@s']
+        if buffer_cmd:
+            expected.extend(['|', 'mbuffer', '-q', '-r', '10M'])
+
+        result = self.driver._get_replication_send_cmd(
+            'fake_ssh', '-v', 'foo@s')
+
+        self.assertEqual(expected, result)
+
+    @ddt.data(
+        (False, False, None, '-vDR', ['-v']),
+        (True, False, None, '-vDcR', ['-v']),
+        (False, False, 'prev', '-vDRI', ['-vF']),
+        (True, True, 'prev', '-vDcRI', ['-vF', '-s']),
+    )
+    @ddt.unpack
+    def test__transfer_replication_stream(self, compressed, resumable,
+                                          previous, send_flags, recv_args):
+        self.configuration.zfs_replication_compressed_stream = compressed
+        self.configuration.zfs_replication_resumable = resumable
+        self.mock_object(self.driver, 'execute')
+        self.mock_object(
+            self.driver, '_resume_replication_transfer',
+            mock.Mock(return_value=None))
+        send_args = [send_flags, 'foo/src@tag']
+        if previous:
+            send_args.insert(1, previous)
+
+        result = self.driver._transfer_replication_stream(
+            'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst',
+            'foo/src@tag', previous)
+
+        self.assertEqual(self.driver.execute.return_value, result)
+        self.driver.execute.assert_called_once_with(*(
+            ['ssh', 'fake_src_ssh', 'sudo', 'zfs', 'send'] + send_args +
+            ['|', 'ssh', 'fake_dst_ssh', 'sudo', 'zfs', 'receive'] +
+            recv_args + ['bar/dst']))
+        if previous and resumable:
+            self.driver._resume_replication_transfer.assert_called_once_with(
+                'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst')
+        else:
+            self.assertFalse(self.driver._resume_replication_transfer.called)
+
+    def test__transfer_replication_stream_after_resume(self):
+        self.configuration.zfs_replication_resumable = True
+        self.mock_object(self.driver, 'execute')
+        self.mock_object(
+            self.driver, '_resume_replication_transfer',
+            mock.Mock(return_value='resumed'))
+
+        self.driver._transfer_replication_stream(
+            'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst',
+            'foo/src@tag', 'prev')
+
+        self.driver.execute.assert_called_once_with(
+            'ssh', 'fake_src_ssh', 'sudo', 'zfs', 'send', '-vDRI', 'resumed',
+            'foo/src@tag', '|', 'ssh', 'fake_dst_ssh', 'sudo', 'zfs',
+            'receive', '-vF', '-s', 'bar/dst')
+
+    def test__transfer_replication_stream_resumed_to_target(self):
+        self.configuration.zfs_replication_resumable = True
+        self.mock_object(self.driver, 'execute')
+        self.mock_object(
+            self.driver, '_resume_replication_transfer',
+            mock.Mock(return_value='tag'))
+
+        result = self.driver._transfer_replication_stream(
+            'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst',
+            'foo/src@tag', 'prev')
+
+        self.assertEqual(('', ''), result)
+        self.assertFalse(self.driver.execute.called)
+
+    def test__transfer_replication_stream_resume_multiple_snapshots(self):
+        # Incremental stream 'prev' -> 'tag' carrying snapshots 's1', 's2'
+        # and 'tag' was interrupted while 's1' was in flight.
+        self.configuration.zfs_replication_resumable = True
+        self.private_storage.update(
+            'fake_replica_id', {'repl_snapshot_tag': 'prev'})
+        self.mock_object(
+            self.driver, 'execute',
+            mock.Mock(side_effect=[
+                exception.ProcessExecutionError('fake'),
+                ('1-abc-def\n', ''),
+                ('out', 'err'),
+                ('bar/dst@prev\nbar/dst@s1\n', ''),
+                ('out', 'err'),
+            ]))
+
+        self.assertRaises(
+            exception.ProcessExecutionError,
+            self.driver._transfer_replication_stream,
+            'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst',
+            'foo/src@tag', 'prev')
+        result = self.driver._transfer_replication_stream(
+            'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst',
+            'foo/src@tag', 'prev')
+
+        self.assertEqual(('out', 'err'), result)
+        self.driver.execute.assert_has_calls([
+            mock.call(
+                'ssh', 'fake_src_ssh', 'sudo', 'zfs', 'send', '-v', '-t',
+                '1-abc-def', '|', 'ssh', 'fake_dst_ssh', 'sudo', 'zfs',
+                'receive', '-v', '-s', 'bar/dst'),
+            mock.call(
+                'ssh', 'fake_dst_ssh', 'sudo', 'zfs', 'list', '-H', '-r',
+                '-d', '1', '-t', 'snapshot', '-o', 'name', '-s', 'creation',
+                'bar/dst'),
+            mock.call(
+                'ssh', 'fake_src_ssh', 'sudo', 'zfs', 'send', '-vDRI', 's1',
+                'foo/src@tag', '|', 'ssh', 'fake_dst_ssh', 'sudo', 'zfs',
+                'receive', '-vF', '-s', 'bar/dst'),
+        ])
+        self.assertEqual(
+            {'repl_snapshot_tag': 's1'},
+            self.private_storage.storage['fake_replica_id'])
+
+    @ddt.data(('1-abc-def\n', True), ('-\n', False))
+    @ddt.unpack
+    def test__transfer_replication_stream_failure_resumable(self, token_out,
+                                                            token_saved):
+        self.configuration.zfs_replication_resumable = True
+        self.mock_object(
+            self.driver, 'execute',
+            mock.Mock(side_effect=[
+                exception.ProcessExecutionError('fake'), (token_out, '')]))
+
+        self.assertRaises(
+            exception.ProcessExecutionError,
+            self.driver._transfer_replication_stream,
+            'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst',
+            'foo/src@tag')
+
+        self.driver.execute.assert_called_with(
+            'ssh', 'fake_dst_ssh', 'sudo', 'zfs', 'get', '-H', '-o', 'value',
+            'receive_resume_token', 'bar/dst')
+        if token_saved:
+            self.assertEqual(
+                '1-abc-def',
+                self.private_storage.get(
+                    'fake_replica_id', 'repl_resume_token'))
+        else:
+            self.assertIsNone(
+                self.private_storage.get(
+                    'fake_replica_id', 'repl_resume_token'))
+
+    def test__transfer_replication_stream_failure_not_resumable(self):
+        self.mock_object(
+            self.driver, 'execute',
+            mock.Mock(side_effect=exception.ProcessExecutionError('fake')))
+
+        self.assertRaises(
+            exception.ProcessExecutionError,
+            self.driver._transfer_replication_stream,
+            'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst',
+            'foo/src@tag', 'prev')
+
+        self.assertEqual(1, self.driver.execute.call_count)
+
+    def test__resume_replication_transfer_no_token(self):
+        self.mock_object(self.driver, 'execute')
+
+        result = self.driver._resume_replication_transfer(
+            'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst')
+
+        self.assertIsNone(result)
+        self.assertFalse(self.driver.execute.called)
+
+    @ddt.data('s1', None)
+    def test__resume_replication_transfer_success(self, latest):
+        self.private_storage.update('fake_replica_id', {
+            'repl_snapshot_tag': 'old',
+            'repl_resume_token': 'fake_token',
+        })
+        self.mock_object(
+            self.driver, 'execute', mock.Mock(return_value=('out', 'err')))
+        self.mock_object(
+            self.driver, '_get_latest_received_snapshot_tag',
+            mock.Mock(return_value=latest))
+
+        result = self.driver._resume_replication_transfer(
+            'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst')
+
+        self.assertEqual(latest, result)
+        self.driver.execute.assert_called_once_with(
+            'ssh', 'fake_src_ssh', 'sudo', 'zfs', 'send', '-v', '-t',
+            'fake_token', '|', 'ssh', 'fake_dst_ssh', 'sudo', 'zfs',
+            'receive', '-v', '-s', 'bar/dst')
+        (self.driver._get_latest_received_snapshot_tag.
+            assert_called_once_with('fake_replica_id', 'fake_dst_ssh',
+                                    'bar/dst'))
+        self.assertEqual(
+            {'repl_snapshot_tag': latest or 'old'},
+            self.private_storage.storage['fake_replica_id'])
+
+    @ddt.data(
+        (('bar/dst@old\nbar/dst@s1\n', ''), 's1'),
+        (('', ''), None),
+        (exception.ProcessExecutionError('fake'), None),
+    )
+    @ddt.unpack
+    def test__get_latest_received_snapshot_tag(self, list_result, expected):
+        self.mock_object(
+            self.driver, 'execute', mock.Mock(side_effect=[list_result]))
+
+        result = self.driver._get_latest_received_snapshot_tag(
+            'fake_replica_id', 'fake_dst_ssh', 'bar/dst')
+
+        self.assertEqual(expected, result)
+        self.driver.execute.assert_called_once_with(
+            'ssh', 'fake_dst_ssh', 'sudo', 'zfs', 'list', '-H', '-r',
+            '-d', '1', '-t', 'snapshot', '-o', 'name', '-s', 'creation',
+            'bar/dst')
+
+    def test__resume_replication_transfer_failure(self):
+        self.private_storage.update('fake_replica_id', {
+            'repl_snapshot_tag': 'old',
+            'repl_resume_token': 'fake_token',
+        })
+        self.mock_object(
+            self.driver, 'execute',
+            mock.Mock(side_effect=exception.ProcessExecutionError('fake')))
+
+        result = self.driver._resume_replication_transfer(
+            'fake_replica_id', 'fake_src_ssh', 'fake_dst_ssh', 'bar/dst')
+
+        self.assertIsNone(result)
+        self.driver.execute.assert_called_with(
+            'ssh', 'fake_dst_ssh', 'sudo', 'zfs', 'receive', '-A', 'bar/dst')
+        self.assertEqual(
+            {'repl_snapshot_tag': 'old'},
+            self.private_storage.storage['fake_replica_id'])
+
+    def test__sync_replicas(self):
+        for i in ('1', '2', '3'):
+            self.private_storage.update('replica_%s' % i, {
+                'repl_snapshot_tag': 'old',
+                'dataset_name': 'bar/dataset_%s' % i,
+                'ssh_cmd': 'fake_ssh_%s' % i,
+            })
+        self.mock_object(
+            self.driver, '_transfer_replication_stream',
+            mock.Mock(side_effect=[
+                ('out', 'err'),
+                exception.ProcessExecutionError('fake'),
+                ('out', 'err'),
+            ]))
+
+        result = self.driver._sync_replicas(
+            ['replica_1', 'replica_2', 'replica_3'], 'fake_src_ssh',
+            'foo/src@new')
+
+        self.assertEqual(['replica_2'], result)
+        self.driver._transfer_replication_stream.assert_has_calls([
+            mock.call('replica_%s' % i, 'fake_src_ssh', 'fake_ssh_%s' % i,
+                      'bar/dataset_%s' % i, 'foo/src@new', 'old')
+            for i in ('1', '2', '3')
+        ])
+        for replica_id, tag in (('replica_1', 'new'), ('replica_2', 'old'),
+                                ('replica_3', 'new')):
+            self.assertEqual(
+                tag,
+                self.private_storage.get(replica_id, 'repl_snapshot_tag'))
+
     def test_create_replica(self):
         active_replica = {
             'id': 'fake_active_replica_id',
@@ -1622,14 +1898,21 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         self.mock_object(self.driver, 'execute_with_retry',
                          mock.Mock(side_effect=[('g', 'h')]))
         self.mock_object(self.driver, 'zfs',
-                         mock.Mock(side_effect=[('j', 'k'), ('l', 'm')]))
+                         mock.Mock(side_effect=[('j', 'k')]))
+        self.mock_object(
+            self.driver, 'get_datasets_inventory',
+            mock.Mock(return_value={
+                dst_dataset_name: {'type': 'filesystem'},
+                dst_dataset_name + '@' + old_repl_snapshot_tag: {
+                    'type': 'snapshot'},
+                dst_dataset_name + '@%s_time_some_time' % snap_tag_prefix: {
+                    'type': 'snapshot'},
+                'other/dataset/name1@' + old_repl_snapshot_tag: {
+                    'type': 'snapshot'},
+            }))
         self.mock_object(
             self.driver, 'parse_zfs_answer',
             mock.Mock(side_effect=[
-                ({'NAME': dst_dataset_name + '@' + old_repl_snapshot_tag},
-                 {'NAME': dst_dataset_name + '@%s_time_some_time' %
-                  snap_tag_prefix},
-                 {'NAME': 'other/dataset/name1@' + old_repl_snapshot_tag}),
                 ({'NAME': src_dataset_name + '@' + old_repl_snapshot_tag},
                  {'NAME': src_dataset_name + '@' + snap_tag_prefix + 'quuz'},
                  {'NAME': 'other/dataset/name2@' + old_repl_snapshot_tag}),
@@ -1671,8 +1954,10 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         ])
         mock_delete_snapshot.assert_called_once_with(
             dst_dataset_name + '@' + old_repl_snapshot_tag)
-        self.driver.parse_zfs_answer.assert_has_calls(
-            [mock.call('l'), mock.call('e')])
+        self.driver.zfs.assert_called_once_with(
+            'set', 'readonly=on', dst_dataset_name)
+        self.driver.get_datasets_inventory.assert_called_once_with(['bar'])
+        self.driver.parse_zfs_answer.assert_called_once_with('e')
 
     def test_promote_replica_active_available(self):
         active_replica = {
@@ -2063,22 +2348,20 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
         ])
 
     @ddt.data(
-        ({'NAME': 'fake'}, zfs_driver.constants.STATUS_ERROR),
-        ({'NAME': 'fake_snap_name'}, zfs_driver.constants.STATUS_AVAILABLE),
+        ('foo/fake', zfs_driver.constants.STATUS_ERROR),
+        ('foo/fake@snap', zfs_driver.constants.STATUS_AVAILABLE),
     )
     @ddt.unpack
-    def test_update_replicated_snapshot(self, parse_answer, expected_status):
-        snap_name = 'fake_snap_name'
+    def test_update_replicated_snapshot(self, inventory_name,
+                                        expected_status):
+        snap_name = 'foo/fake@snap'
         self.mock_object(self.driver, '_update_replica_state')
         self.mock_object(
             self.driver, '_get_saved_snapshot_name',
             mock.Mock(return_value=snap_name))
         self.mock_object(
-            self.driver, 'zfs', mock.Mock(side_effect=[('a', 'b')]))
-        self.mock_object(
-            self.driver, 'parse_zfs_answer', mock.Mock(side_effect=[
-                [parse_answer]
-            ]))
+            self.driver, 'get_datasets_inventory',
+            mock.Mock(return_value={inventory_name: {'type': 'snapshot'}}))
         fake_context = 'fake_context'
         replica_list = ['foo', 'bar']
         share_replica = 'quuz'
@@ -2093,9 +2376,7 @@ class ZFSonLinuxShareDriverTestCase(test.TestCase):
             fake_context, replica_list, share_replica)
         self.driver._get_saved_snapshot_name.assert_called_once_with(
             snapshot_instance)
-        self.driver.zfs.assert_called_once_with(
-            'list', '-r', '-t', 'snapshot', snap_name)
-        self.driver.parse_zfs_answer.assert_called_once_with('a')
+        self.driver.get_datasets_inventory.assert_called_once_with(['foo'])
         self.assertIsInstance(result, dict)
         self.assertEqual(2, len(result))
         self.assertIn('status', result)
@@ -40,6 +40,7 @@ def get_fake_configuration(*args, **kwargs):
             "zfs_ssh_user_password", 'fake_pass'),
         "zfs_ssh_private_key_path": kwargs.get(
             "zfs_ssh_private_key_path", '/fake/path'),
+        "zfs_inventory_cache_ttl": kwargs.get("zfs_inventory_cache_ttl", 10),
         "append_config_values": mock.Mock(),
     }
     return type("FakeConfig", (object, ), fake_config_options)
@@ -213,6 +214,121 @@ foo_res  opt_3           some_value       local"""
         self.driver._get_option.assert_called_once_with(
             dataset_name, opt_name, False)
 
+    @ddt.data(
+        (('zfs', 'set', 'quota=1G', 'foo/bar'), True),
+        (('zpool', 'add', 'foo', 'sdb'), True),
+        (('ssh', 'fake_ssh', 'zfs', 'send', 'foo@snap', '|',
+          'ssh', 'fake_ssh', 'sudo', 'zfs', 'receive', 'foo/bar'), True),
+        (('zfs', 'list', '-r', 'foo'), False),
+        (('zfs', 'get', 'used', 'foo'), False),
+        (('zfs', 'share', 'foo/bar'), False),
+        (('mount',), False),
+    )
+    @ddt.unpack
+    def test_execute_invalidates_inventory(self, cmd, invalidated):
+        self.mock_object(self.driver, '_execute')
+        self.mock_object(self.driver, 'invalidate_zfs_inventory')
+
+        self.driver.execute('sudo', *cmd)
+
+        self.assertEqual(
+            invalidated, self.driver.invalidate_zfs_inventory.called)
+
+    def test_execute_invalidates_inventory_on_failure(self):
+        self.mock_object(
+            self.driver, '_execute',
+            mock.Mock(side_effect=exception.ProcessExecutionError('fake')))
+        self.mock_object(self.driver, 'invalidate_zfs_inventory')
+
+        self.assertRaises(
+            exception.ProcessExecutionError,
+            self.driver.execute, 'sudo', 'zfs', 'destroy', 'foo/bar')
+
+        self.driver.invalidate_zfs_inventory.assert_called_once_with()
+
+    def test_get_zpools_inventory(self):
+        out = ('foo\t1000\t400\t600\n'
+               'bar\t2000\t2000\t0\n'
+               'malformed line\n')
+        self.mock_object(
+            self.driver, '_execute', mock.Mock(return_value=(out, '')))
+
+        for i in range(2):
+            result = self.driver.get_zpools_inventory()
+
+            self.assertEqual(
+                {'foo': {'size': '1000', 'free': '400', 'allocated': '600'},
+                 'bar': {'size': '2000', 'free': '2000', 'allocated': '0'}},
+                result)
+        self.driver._execute.assert_called_once_with(
+            'zpool', 'list', '-Hp', '-o', 'name,size,free,allocated',
+            run_as_root=True)
+
+    def test_get_zpools_inventory_ttl_disabled(self):
+        self.driver.configuration.zfs_inventory_cache_ttl = 0
+        self.mock_object(
+            self.driver, '_execute', mock.Mock(return_value=('', '')))
+
+        self.driver.get_zpools_inventory()
+        self.driver.get_zpools_inventory()
+
+        self.assertEqual(2, self.driver._execute.call_count)
+
+    def test_get_zpools_inventory_expired(self):
+        self.mock_object(
+            self.driver, '_execute', mock.Mock(return_value=('', '')))
+        self.mock_object(
+            zfs_utils.time, 'time',
+            mock.Mock(side_effect=[100, 105, 111, 111]))
+
+        self.driver.get_zpools_inventory()
+        self.driver.get_zpools_inventory()
+        self.assertEqual(1, self.driver._execute.call_count)
+
+        self.driver.get_zpools_inventory()
+        self.assertEqual(2, self.driver._execute.call_count)
+
+    def test_get_datasets_inventory(self):
+        props = 'name,type,used,quota,mountpoint,sharenfs,readonly'
+        out_1 = ('foo\tfilesystem\t10\t0\t/foo\toff\toff\n'
+                 'foo/a\tfilesystem\t5\t1024\t/foo/a\ton\toff\n'
+                 'foo/a@s\tsnapshot\t0\t-\t-\t-\t-\n'
+                 'bar\tfilesystem\t1\t0\t/bar\toff\toff\n')
+        out_2 = 'quuz\tfilesystem\t1\t0\t/quuz\toff\toff\n'
+        self.mock_object(
+            self.driver, '_execute',
+            mock.Mock(side_effect=[(out_1, ''), (out_2, '')]))
+
+        result_1 = self.driver.get_datasets_inventory(['foo', 'bar/subbar'])
+        result_2 = self.driver.get_datasets_inventory(['foo', 'quuz'])
+
+        self.assertEqual(
+            ['bar', 'foo', 'foo/a', 'foo/a@s'], sorted(result_1.keys()))
+        self.assertEqual(
+            {'type': 'filesystem', 'used': '5', 'quota': '1024',
+             'mountpoint': '/foo/a', 'sharenfs': 'on', 'readonly': 'off'},
+            result_1['foo/a'])
+        self.assertEqual('snapshot', result_1['foo/a@s']['type'])
+        self.assertEqual(
+            ['foo', 'foo/a', 'foo/a@s', 'quuz'], sorted(result_2.keys()))
+        self.driver._execute.assert_has_calls([
+            mock.call('zfs', 'list', '-Hp', '-t', 'all', '-o', props,
+                      '-r', 'foo', 'bar', run_as_root=True),
+            mock.call('zfs', 'list', '-Hp', '-t', 'all', '-o', props,
+                      '-r', 'quuz', run_as_root=True),
+        ])
+
+    def test_invalidate_zfs_inventory(self):
+        out = 'foo\tfilesystem\t10\t0\t/foo\toff\toff\n'
+        self.mock_object(
+            self.driver, '_execute', mock.Mock(return_value=(out, '')))
+
+        self.driver.get_datasets_inventory(['foo'])
+        self.driver.zfs('destroy', 'foo/bar')
+        self.driver.get_datasets_inventory(['foo'])
+
+        self.assertEqual(3, self.driver._execute.call_count)
+
     def test_zfs(self):
         self.mock_object(self.driver, 'execute')
         self.mock_object(self.driver, 'execute_with_retry')
@@ -137,15 +137,12 @@ class ShareInstanceAccessDatabaseMixinTestCase(test.TestCase):
         share = db_utils.create_share(status=constants.STATUS_AVAILABLE)
         db_utils.create_access(share_id=share['id'], state=statuses[0])
         db_utils.create_access(share_id=share['id'], state=statuses[-1])
-        self.mock_object(db, 'share_instance_access_update', mock.Mock(
-            side_effect=db.share_instance_access_update))
+        self.mock_object(db, 'share_instance_access_update')
+        self.mock_object(db, 'share_instance_access_update_all', mock.Mock(
+            side_effect=db.share_instance_access_update_all))
         updates = {
             'access_key': 'renfrow2stars'
         }
-        expected_updates = {
-            'access_key': 'renfrow2stars',
-            'state': constants.ACCESS_STATE_QUEUED_TO_DENY,
-        }
         conditionally_change = {
             constants.ACCESS_STATE_APPLYING:
                 constants.ACCESS_STATE_QUEUED_TO_DENY,
@@ -162,11 +159,27 @@ class ShareInstanceAccessDatabaseMixinTestCase(test.TestCase):
             r['state'] == constants.ACCESS_STATE_QUEUED_TO_DENY
         ]
         self.assertEqual(changes_allowed, len(state_changed_rules))
-        self.assertEqual(2, db.share_instance_access_update.call_count)
-        db.share_instance_access_update.assert_has_calls([
-            mock.call(self.context, mock.ANY, share['instance']['id'],
-                      expected_updates),
-        ] * changes_allowed)
+        self.assertEqual(2, len(rules))
+        for rule in rules:
+            self.assertEqual('renfrow2stars', rule['access_key'])
+        db.share_instance_access_update_all.assert_called_once_with(
+            self.context, share['instance']['id'], filters=None,
+            updates=updates, conditionally_change=conditionally_change)
+        self.assertFalse(db.share_instance_access_update.called)
+
+    def test_get_and_update_all_access_rules_no_rules_matched(self):
+        share = db_utils.create_share(status=constants.STATUS_AVAILABLE)
+        db_utils.create_access(share_id=share['id'],
+                               state=constants.ACCESS_STATE_ACTIVE)
+        self.mock_object(db, 'share_access_get_all_for_instance')
+
+        rules = self.access_helper.get_and_update_share_instance_access_rules(
+            self.context, share_instance_id=share['instance']['id'],
+            filters={'state': constants.ACCESS_STATE_QUEUED_TO_DENY},
+            updates={'state': constants.ACCESS_STATE_DENYING})
+
+        self.assertEqual([], rules)
+        self.assertFalse(db.share_access_get_all_for_instance.called)
 
     def test_get_and_update_access_rule_just_get(self):
         share = db_utils.create_share(status=constants.STATUS_AVAILABLE)
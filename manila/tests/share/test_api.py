@@ -691,7 +691,8 @@ class ShareAPITestCase(test.TestCase):
             }
         )
         db_api.share_type_get.assert_called_once_with(
-            self.context, share_instance['share_type_id'])
+            self.context, share_instance['share_type_id'],
+            expected_fields=None)
         self.api.share_rpcapi.create_share_instance.assert_called_once_with(
             self.context,
             share_instance,
@@ -1991,6 +1992,85 @@ class ShareAPITestCase(test.TestCase):
         self.api.allow_access_to_instance.assert_called_once_with(
             self.context, share.instance)
 
+    def test_allow_access_bulk(self):
+        share = db_utils.create_share(
+            host='fake', status=constants.STATUS_AVAILABLE)
+        db_utils.create_share_instance(
+            share_id=share['id'], host='fake',
+            status=constants.STATUS_AVAILABLE)
+        share = db_api.share_get(self.context, share['id'])
+        rpc_method = self.mock_object(self.api.share_rpcapi, 'update_access')
+        access_rules = [
+            {'access_type': 'ip', 'access_to': '10.0.0.%s' % i}
+            for i in range(3)
+        ]
+        access_rules[0]['access_level'] = constants.ACCESS_LEVEL_RO
+
+        accesses = self.api.allow_access_bulk(
+            self.context, share, access_rules)
+
+        self.assertEqual(3, len(accesses))
+        self.assertEqual(
+            sorted(r['access_to'] for r in access_rules),
+            sorted(a['access_to'] for a in accesses))
+        for access in accesses:
+            self.assertEqual(share['id'], access['share_id'])
+            self.assertEqual(2, len(access.instance_mappings))
+            self.assertEqual(constants.ACCESS_STATE_QUEUED_TO_APPLY,
+                             access['state'])
+            expected_level = (constants.ACCESS_LEVEL_RO
+                              if access['access_to'] == '10.0.0.0'
+                              else constants.ACCESS_LEVEL_RW)
+            self.assertEqual(expected_level, access['access_level'])
+        rpc_method.assert_has_calls(
+            [mock.call(self.context, instance)
+             for instance in share.instances], any_order=True)
+        self.assertEqual(2, rpc_method.call_count)
+
+    @ddt.data(
+        [{'access_type': 'ip', 'access_to': '10.0.0.1'},
+         {'access_type': 'ip', 'access_to': '10.0.0.1'}],
+        [{'access_type': 'ip', 'access_to': '10.0.0.2'},
+         {'access_type': 'ip', 'access_to': 'fake_IP'}],
+    )
+    def test_allow_access_bulk_access_exists(self, access_rules):
+        share = db_utils.create_share(host='fake')
+        db_utils.create_access(share_id=share['id'], access_type='ip',
+                               access_to='fake_IP')
+        self.mock_object(db_api, 'share_access_create_all')
+        rpc_method = self.mock_object(self.api.share_rpcapi, 'update_access')
+
+        self.assertRaises(exception.ShareAccessExists,
+                          self.api.allow_access_bulk,
+                          self.context, share, access_rules)
+        self.assertFalse(db_api.share_access_create_all.called)
+        self.assertFalse(rpc_method.called)
+
+    def test_allow_access_bulk_invalid_access_level(self):
+        share = db_utils.create_share(host='fake')
+        self.mock_object(db_api, 'share_access_create_all')
+        access_rules = [
+            {'access_type': 'ip', 'access_to': '10.0.0.1'},
+            {'access_type': 'ip', 'access_to': '10.0.0.2',
+             'access_level': 'fake_level'},
+        ]
+
+        self.assertRaises(exception.InvalidShareAccess,
+                          self.api.allow_access_bulk,
+                          self.context, share, access_rules)
+        self.assertFalse(db_api.share_access_create_all.called)
+
+    def test_allow_access_bulk_invalid_instance(self):
+        share = db_utils.create_share(host='fake')
+        db_utils.create_share_instance(share_id=share['id'], host=None)
+        share = db_api.share_get(self.context, share['id'])
+        self.mock_object(db_api, 'share_access_create_all')
+
+        self.assertRaises(exception.InvalidShare, self.api.allow_access_bulk,
+                          self.context, share,
+                          [{'access_type': 'ip', 'access_to': '10.0.0.1'}])
+        self.assertFalse(db_api.share_access_create_all.called)
+
     def test_allow_access_to_instance(self):
         share = db_utils.create_share(host='fake')
         rpc_method = self.mock_object(self.api.share_rpcapi, 'update_access')
@@ -2028,6 +2108,44 @@ class ShareAPITestCase(test.TestCase):
         self.api.deny_access_to_instance.assert_called_once_with(
             self.context, share.instance, access_rule)
 
+    def test_deny_access_bulk(self):
+        share = db_utils.create_share(
+            host='fake', status=constants.STATUS_AVAILABLE)
+        db_utils.create_share_instance(
+            share_id=share['id'], host='fake',
+            status=constants.STATUS_AVAILABLE)
+        share = db_api.share_get(self.context, share['id'])
+        rules = [
+            db_utils.create_access(share_id=share['id'],
+                                   access_to='10.0.0.%s' % i,
+                                   state=constants.ACCESS_STATE_ACTIVE)
+            for i in range(3)
+        ]
+        rpc_method = self.mock_object(self.api.share_rpcapi, 'update_access')
+
+        retval = self.api.deny_access_bulk(self.context, share, rules[:2])
+
+        self.assertIsNone(retval)
+        for instance in share.instances:
+            for rule, state in zip(
+                    rules, [constants.ACCESS_STATE_QUEUED_TO_DENY] * 2 +
+                    [constants.ACCESS_STATE_ACTIVE]):
+                mapping = db_api.share_instance_access_get(
+                    self.context, rule['id'], instance['id'])
+                self.assertEqual(state, mapping['state'])
+        self.assertEqual(2, rpc_method.call_count)
+
+    def test_deny_access_bulk_invalid_instance(self):
+        share = db_utils.create_share(host='fake')
+        db_utils.create_share_instance(share_id=share['id'], host=None)
+        share = db_api.share_get(self.context, share['id'])
+        access_rule = db_utils.create_access(share_id=share['id'])
+        rpc_method = self.mock_object(self.api.share_rpcapi, 'update_access')
+
+        self.assertRaises(exception.InvalidShare, self.api.deny_access_bulk,
+                          self.context, share, [access_rule])
+        self.assertFalse(rpc_method.called)
+
     def test_deny_access_to_instance(self):
         share = db_utils.create_share(host='fake')
         share_instance = db_utils.create_share_instance(
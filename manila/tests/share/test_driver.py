@@ -18,6 +18,7 @@
 import time
 
 import ddt
+import eventlet
 import mock
 
 from manila import exception
@@ -957,6 +958,128 @@ class ShareDriverTestCase(test.TestCase):
         mock_delete_snap.assert_called_with(
             'fake_context', fake_snap_member_1_expected, share_server=None)
 
+    def test_create_share_group_snapshot_concurrently(self):
+        members = [
+            {'id': 'fake_member_%d' % i,
+             'share_id': 'fake_share_id_%d' % i,
+             'share_group_snapshot_id': 'fake_share_group_snapshot_id',
+             'share': {'id': 'fake_share_instance_id_%d' % i,
+                       'size': 1,
+                       'share_proto': 'fake_share_proto'}}
+            for i in range(4)]
+        fake_snap_dict = {
+            'id': 'fake_share_group_snapshot_id',
+            'share_group_id': 'fake_share_group_id',
+            'share_group_snapshot_members': members,
+        }
+        share_driver = self._instantiate_share_driver(None, False)
+        share_driver.configuration.safe_get = mock.Mock(
+            side_effect=lambda key: {
+                'share_group_member_operations_concurrency': 3}.get(key))
+        share_driver._stats['share_group_snapshot_support'] = True
+        running = []
+        max_running = []
+
+        def fake_create_snapshot(context, share_snapshot, share_server=None):
+            running.append(share_snapshot['id'])
+            max_running.append(len(running))
+            eventlet.sleep(0)
+            running.remove(share_snapshot['id'])
+            if share_snapshot['id'] == 'fake_member_1':
+                raise exception.ManilaException()
+
+        mock_create_snap = self.mock_object(
+            share_driver, 'create_snapshot',
+            mock.Mock(side_effect=fake_create_snapshot))
+        mock_delete_snap = self.mock_object(share_driver, 'delete_snapshot')
+
+        self.assertRaises(
+            exception.ManilaException,
+            share_driver.create_share_group_snapshot,
+            'fake_context', fake_snap_dict)
+
+        self.assertEqual(3, max(max_running))
+        self.assertEqual(
+            ['fake_member_0', 'fake_member_1', 'fake_member_2'],
+            [call[0][1]['id'] for call in mock_create_snap.call_args_list])
+        self.assertEqual(
+            ['fake_member_0', 'fake_member_2'],
+            [call[0][1]['id'] for call in mock_delete_snap.call_args_list])
+
+    def test_create_share_group_from_share_group_snapshot_concurrently(self):
+        share_driver = self._instantiate_share_driver(None, False)
+        share_driver.configuration.safe_get = mock.Mock(
+            side_effect=lambda key: {
+                'share_group_member_operations_concurrency': 2}.get(key))
+        fake_shares = [
+            {'id': 'fake_share_%d' % i,
+             'source_share_group_snapshot_member_id': 'fake_member_%d' % i}
+            for i in range(3)]
+        fake_share_group_dict = {
+            'source_share_group_snapshot_id': 'fake_share_group_snapshot_id',
+            'shares': fake_shares,
+            'id': 'fake_share_group_id',
+        }
+        fake_share_group_snapshot_dict = {
+            'share_group_snapshot_members': [
+                {'id': 'fake_member_%d' % i} for i in range(3)],
+            'id': 'fake_share_group_snapshot_id',
+        }
+
+        def fake_create_share_from_snapshot(context, share, snapshot):
+            # Let the members finish in reverse order.
+            for __ in range(3 - int(share['id'][-1])):
+                eventlet.sleep(0)
+            return 'fake_export_%s' % share['id'][-1]
+
+        self.mock_object(
+            share_driver, 'create_share_from_snapshot',
+            mock.Mock(side_effect=fake_create_share_from_snapshot))
+
+        share_group_update, share_update = (
+            share_driver.create_share_group_from_share_group_snapshot(
+                'fake_context', fake_share_group_dict,
+                fake_share_group_snapshot_dict))
+
+        self.assertIsNone(share_group_update)
+        self.assertEqual(
+            [{'id': 'fake_share_%d' % i,
+              'export_locations': 'fake_export_%d' % i} for i in range(3)],
+            share_update)
+
+    def test_create_share_group_from_share_group_snapshot_failed(self):
+        share_driver = self._instantiate_share_driver(None, False)
+        fake_share_group_dict = {
+            'source_share_group_snapshot_id': 'fake_share_group_snapshot_id',
+            'shares': [{'id': 'fake_share_1',
+                        'source_share_group_snapshot_member_id':
+                            'fake_member_1'}],
+            'id': 'fake_share_group_id',
+        }
+        fake_share_group_snapshot_dict = {
+            'share_group_snapshot_members': [{'id': 'fake_member_1'}],
+            'id': 'fake_share_group_snapshot_id',
+        }
+        self.mock_object(
+            share_driver, 'create_share_from_snapshot',
+            mock.Mock(side_effect=exception.ManilaException))
+
+        self.assertRaises(
+            exception.ManilaException,
+            share_driver.create_share_group_from_share_group_snapshot,
+            'fake_context', fake_share_group_dict,
+            fake_share_group_snapshot_dict)
+
+    @ddt.data((None, 1), (4, 4), (0, 1))
+    @ddt.unpack
+    def test_share_group_member_operations_concurrency(self, value,
+                                                       expected):
+        share_driver = self._instantiate_share_driver(None, False)
+        share_driver.configuration.safe_get = mock.Mock(return_value=value)
+
+        self.assertEqual(
+            expected, share_driver.share_group_member_operations_concurrency)
+
     def test_create_share_group_snapshot_no_support(self):
         fake_snap_dict = {
             'status': 'available',
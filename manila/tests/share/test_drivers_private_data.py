@@ -17,6 +17,7 @@ import ddt
 import mock
 from oslo_utils import uuidutils
 
+from manila import exception
 from manila.share import drivers_private_data as pd
 from manila import test
 
@@ -118,6 +119,117 @@ class DriverPrivateDataTestCase(test.TestCase):
             self.entity_id, key
         )
 
+    def _fake_storage(self, data=None):
+        stored = {self.entity_id: dict(data or {})}
+
+        def fake_get(entity_id, key, default):
+            return dict(stored.get(entity_id, {}))
+
+        self.mock_object(self.fake_storage, 'get',
+                         mock.Mock(side_effect=fake_get))
+        self.mock_object(self.fake_storage, 'update')
+        self.mock_object(self.fake_storage, 'delete')
+        return pd.DriverPrivateData(storage=self.fake_storage)
+
+    def test_cached_get(self):
+        data = self._fake_storage({'foo': 'bar', 'tee': 'too'})
+
+        with data.cached():
+            self.assertEqual('bar', data.get(self.entity_id, 'foo'))
+            self.assertEqual('def', data.get(self.entity_id, 'bad', 'def'))
+            self.assertEqual({'tee': 'too'},
+                             data.get(self.entity_id, ['tee', 'bad']))
+            self.assertEqual({'foo': 'bar', 'tee': 'too'},
+                             data.get(self.entity_id))
+
+        self.fake_storage.get.assert_called_once_with(
+            self.entity_id, None, {})
+        self.assertFalse(self.fake_storage.update.called)
+        self.assertFalse(self.fake_storage.delete.called)
+
+    def test_cached_update_and_delete(self):
+        data = self._fake_storage({'foo': 'bar', 'tee': 'too'})
+
+        with data.cached():
+            data.update(self.entity_id, {'foo': 'baz', 'new': 1})
+            data.delete(self.entity_id, 'tee')
+            data.update(self.entity_id, {'gone': 'soon'})
+            data.delete(self.entity_id, ['gone'])
+            self.assertEqual({'foo': 'baz', 'new': '1'},
+                             data.get(self.entity_id))
+            self.assertFalse(self.fake_storage.update.called)
+
+        self.fake_storage.get.assert_called_once_with(
+            self.entity_id, None, {})
+        self.fake_storage.update.assert_called_once_with(
+            self.entity_id, {'foo': 'baz', 'new': '1'}, False)
+        self.fake_storage.delete.assert_called_once_with(
+            self.entity_id, ['gone', 'tee'])
+
+    def test_cached_write_without_read(self):
+        data = self._fake_storage({'foo': 'bar'})
+
+        with data.cached():
+            data.update(self.entity_id, {'tee': 'too'})
+
+        self.assertFalse(self.fake_storage.get.called)
+        self.fake_storage.update.assert_called_once_with(
+            self.entity_id, {'tee': 'too'}, False)
+        self.assertFalse(self.fake_storage.delete.called)
+
+    def test_cached_write_before_read(self):
+        data = self._fake_storage({'foo': 'bar', 'tee': 'too'})
+
+        with data.cached():
+            data.delete(self.entity_id, 'tee')
+            data.update(self.entity_id, {'new': 'val'})
+
+            self.assertEqual({'foo': 'bar', 'new': 'val'},
+                             data.get(self.entity_id))
+
+    @ddt.data(
+        lambda data, entity_id: data.delete(entity_id),
+        lambda data, entity_id: data.update(entity_id, {'new': 'val'},
+                                            delete_existing=True),
+    )
+    def test_cached_delete_all(self, operation):
+        data = self._fake_storage({'foo': 'bar'})
+
+        with data.cached():
+            data.update(self.entity_id, {'tee': 'too'})
+            operation(data, self.entity_id)
+            expected = data.get(self.entity_id)
+
+        self.assertTrue(set(expected).issubset({'new'}))
+        self.fake_storage.update.assert_called_once_with(
+            self.entity_id, expected, True)
+        self.assertFalse(self.fake_storage.delete.called)
+
+    def test_cached_nested(self):
+        data = self._fake_storage()
+
+        with data.cached():
+            with data.cached():
+                data.update(self.entity_id, {'foo': 'bar'})
+            self.assertFalse(self.fake_storage.update.called)
+
+        self.fake_storage.update.assert_called_once_with(
+            self.entity_id, {'foo': 'bar'}, False)
+
+    def test_cached_flushes_on_error(self):
+        data = self._fake_storage()
+
+        def operation():
+            with data.cached():
+                data.update(self.entity_id, {'foo': 'bar'})
+                raise exception.ManilaException()
+
+        self.assertRaises(exception.ManilaException, operation)
+        self.fake_storage.update.assert_called_once_with(
+            self.entity_id, {'foo': 'bar'}, False)
+        data.get(self.entity_id, 'foo')
+        self.assertEqual(1, self.fake_storage.get.call_count)
+
 
 fake_storage_data = {
     "entity_id": "fake_id",
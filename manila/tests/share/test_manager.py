@@ -18,6 +18,7 @@ import datetime
 import random
 
 import ddt
+import eventlet
 import mock
 from oslo_concurrency import lockutils
 from oslo_serialization import jsonutils
@@ -2628,16 +2629,16 @@ class ShareManagerTestCase(test.TestCase):
         self.share_manager.db.share_server_backend_details_set.\
             assert_has_calls([
                 mock.call(self.context, share_server['id'],
-                          {'security_service_' + sec_services[0]['type']:
-                              jsonutils.dumps(sec_services[0])}),
-                mock.call(self.context, share_server['id'],
-                          {'security_service_' + sec_services[1]['type']:
-                              jsonutils.dumps(sec_services[1])}),
-                mock.call(self.context, share_server['id'],
-                          {'security_service_' + sec_services[2]['type']:
-                              jsonutils.dumps(sec_services[2])}),
-                mock.call(self.context, share_server['id'], server_info),
+                          {'security_service_' + sec_service['type']:
+                              jsonutils.dumps(sec_service)
+                           for sec_service in sec_services},
+                          check_exists=False),
+                mock.call(self.context, share_server['id'], server_info,
+                          check_exists=False),
             ])
+        self.assertEqual(
+            2, self.share_manager.db.share_server_backend_details_set.
+            call_count)
         self.share_manager.db.share_server_update.assert_called_once_with(
             self.context, share_server['id'],
             {'status': constants.STATUS_ACTIVE})
@@ -2964,6 +2965,297 @@ class ShareManagerTestCase(test.TestCase):
             'server1')
         timeutils.utcnow.assert_called_once_with()
 
+    @mock.patch.object(timeutils, 'utcnow', mock.Mock(
+                       return_value=datetime.timedelta(minutes=20)))
+    def test_delete_free_share_servers_concurrently(self):
+        self.flags(share_server_cleanup_concurrency=2,
+                   share_server_cleanup_max_per_run=3)
+        servers = [{'id': 'fake_id_%s' % i} for i in range(4)]
+        self.mock_object(db, 'share_server_get_all_unused_deletable',
+                         mock.Mock(return_value=servers))
+        running = []
+        max_running = []
+
+        def fake_delete_share_server(ctxt, server):
+            running.append(server['id'])
+            max_running.append(len(running))
+            eventlet.sleep(0)
+            running.remove(server['id'])
+            if server['id'] == 'fake_id_1':
+                raise exception.ShareServerInUse(share_server_id='fake_id_1')
+            elif server['id'] == 'fake_id_2':
+                raise exception.ManilaException()
+
+        self.mock_object(self.share_manager, 'delete_share_server',
+                         mock.Mock(side_effect=fake_delete_share_server))
+        self.mock_object(manager.LOG, 'exception')
+        self.mock_object(manager.LOG, 'info')
+
+        self.share_manager.delete_free_share_servers(self.context)
+
+        self.share_manager.delete_share_server.assert_has_calls(
+            [mock.call(self.context, server) for server in servers[:3]])
+        self.assertEqual(3, self.share_manager.delete_share_server.call_count)
+        self.assertEqual(2, max(max_running))
+        manager.LOG.exception.assert_called_once_with(mock.ANY, 'fake_id_2')
+        results = manager.LOG.info.call_args[0][1]
+        self.assertEqual(
+            {'deleted': 1, 'in_use': 1, 'failed': 1, 'left': 1},
+            {key: results[key]
+             for key in ('deleted', 'in_use', 'failed', 'left')})
+
+    def test_delete_share_server(self):
+        share_server = db_utils.create_share_server(
+            backend_details={'fake_key': 'fake_value'})
+        self.mock_object(self.share_manager, 'driver')
+        self.mock_object(self.share_manager.db, 'share_server_update')
+
+        self.share_manager.delete_share_server(self.context, share_server)
+
+        self.share_manager.db.share_server_update.assert_called_once_with(
+            self.context, share_server['id'],
+            {'status': constants.STATUS_DELETING})
+        self.share_manager.driver.teardown_server.assert_called_once_with(
+            server_details={'fake_key': 'fake_value'}, security_services=[])
+        self.assertRaises(exception.ShareServerNotFound,
+                          db.share_server_get,
+                          self.context, share_server['id'])
+        (self.share_manager.driver.deallocate_network.
+            assert_called_once_with(self.context, share_server['id']))
+
+    def test_delete_share_server_in_use(self):
+        share_server = db_utils.create_share_server()
+        db_utils.create_share(share_server_id=share_server['id'])
+        self.mock_object(self.share_manager, 'driver')
+
+        self.assertRaises(exception.ShareServerInUse,
+                          self.share_manager.delete_share_server,
+                          self.context, share_server)
+
+        self.assertEqual(
+            constants.STATUS_ACTIVE,
+            db.share_server_get(self.context, share_server['id'])['status'])
+        self.assertFalse(self.share_manager.driver.teardown_server.called)
+
+    @mock.patch.object(timeutils, 'utcnow', mock.Mock(
+                       return_value=datetime.timedelta(minutes=20)))
+    def test_delete_free_share_servers_keeps_pooled_servers(self):
+        self.flags(share_server_pool_size=1)
+        servers = [{'id': 'fake_id_%s' % i, 'share_network_id': 'fake_sn'}
+                   for i in range(3)]
+        self.mock_object(db, 'share_server_get_all_unused_deletable',
+                         mock.Mock(return_value=servers))
+        self.mock_object(self.share_manager, '_get_pooled_share_network_ids',
+                         mock.Mock(return_value={'fake_sn'}))
+        self.mock_object(db, 'share_server_get_all_free_by_host_and_share_net',
+                         mock.Mock(return_value=servers[1:]))
+        self.mock_object(self.share_manager, 'delete_share_server')
+
+        self.share_manager.delete_free_share_servers(self.context)
+
+        (db.share_server_get_all_free_by_host_and_share_net.
+            assert_called_once_with(self.context, self.share_manager.host,
+                                    'fake_sn'))
+        self.share_manager.delete_share_server.assert_has_calls([
+            mock.call(self.context, servers[0]),
+            mock.call(self.context, servers[2]),
+        ])
+        self.assertEqual(2, self.share_manager.delete_share_server.call_count)
+
+    @mock.patch.object(timeutils, 'utcnow', mock.Mock(
+                       return_value=datetime.timedelta(minutes=20)))
+    def test_delete_free_share_servers_reclaims_servers_not_pooled(self):
+        self.flags(share_server_pool_size=1)
+        servers = [
+            {'id': 'fake_id_1', 'share_network_id': 'fake_sn1'},
+            {'id': 'fake_id_2', 'share_network_id': 'fake_sn2'},
+        ]
+        self.mock_object(db, 'share_server_get_all_unused_deletable',
+                         mock.Mock(return_value=servers))
+        self.mock_object(self.share_manager, '_get_pooled_share_network_ids',
+                         mock.Mock(return_value={'fake_sn1', 'fake_sn3'}))
+        self.mock_object(db, 'share_server_get_all_free_by_host_and_share_net',
+                         mock.Mock(return_value=servers[:1]))
+        self.mock_object(self.share_manager, 'delete_share_server')
+
+        self.share_manager.delete_free_share_servers(self.context)
+
+        (db.share_server_get_all_free_by_host_and_share_net.
+            assert_called_once_with(self.context, self.share_manager.host,
+                                    'fake_sn1'))
+        self.share_manager.delete_share_server.assert_called_once_with(
+            self.context, servers[1])
+
+    @ddt.data(([], {'fake_sn1', 'fake_sn3'}),
+              (['fake_sn1', 'fake_sn2', 'fake_sn4'], {'fake_sn1'}))
+    @ddt.unpack
+    def test__get_pooled_share_network_ids(self, allowed_ids, expected):
+        self.flags(share_server_pool_share_networks=allowed_ids)
+        self.mock_object(db, 'share_network_get_all',
+                         mock.Mock(return_value=[
+                             {'id': 'fake_sn%s' % i} for i in range(1, 4)]))
+        self.mock_object(db, 'share_instances_get_all_by_host',
+                         mock.Mock(return_value=[
+                             {'share_network_id': 'fake_sn2'},
+                             {'share_network_id': None}]))
+
+        result = self.share_manager._get_pooled_share_network_ids(
+            self.context)
+
+        self.assertEqual(expected, result)
+        db.share_network_get_all.assert_called_once_with(self.context)
+        db.share_instances_get_all_by_host.assert_called_once_with(
+            self.context, self.share_manager.host)
+
+    @ddt.data(0, 2)
+    def test__replenish_share_server_pools(self, pool_size):
+        self.flags(share_server_pool_size=pool_size)
+        self.mock_object(self.share_manager, 'driver')
+        self.share_manager.driver.driver_handles_share_servers = True
+        self.mock_object(self.share_manager, '_get_pooled_share_network_ids',
+                         mock.Mock(return_value={'fake_sn1'}))
+        self.mock_object(self.share_manager, '_replenish_share_server_pool')
+        self.share_manager._failed_share_server_pools.update(
+            {'fake_sn1': (1, None), 'fake_sn2': (1, None)})
+
+        self.share_manager._replenish_share_server_pools(self.context)
+
+        if pool_size:
+            (self.share_manager._get_pooled_share_network_ids.
+                assert_called_once_with(self.context))
+            (self.share_manager._replenish_share_server_pool.
+                assert_called_once_with(self.context, 'fake_sn1'))
+            # Failures of share networks left out of pooling are forgotten
+            self.assertEqual(['fake_sn1'],
+                             list(self.share_manager.
+                                  _failed_share_server_pools))
+        else:
+            self.assertFalse(
+                self.share_manager._get_pooled_share_network_ids.called)
+            self.assertFalse(
+                self.share_manager._replenish_share_server_pool.called)
+
+    @ddt.data((1, False), (-1, True))
+    @ddt.unpack
+    def test__replenish_share_server_pool_after_failure(self, retry_in,
+                                                        refilled):
+        self.flags(share_server_pool_size=2)
+        self.mock_object(db, 'share_server_get_all_free_by_host_and_share_net',
+                         mock.Mock(return_value=[]))
+        self.mock_object(manager.eventlet, 'spawn_n')
+        now = datetime.datetime(2017, 1, 1)
+        self.mock_object(timeutils, 'utcnow', mock.Mock(return_value=now))
+        self.share_manager._failed_share_server_pools['fake_sn'] = (
+            1, now + datetime.timedelta(seconds=retry_in))
+
+        self.share_manager._replenish_share_server_pool(
+            self.context, 'fake_sn')
+
+        self.assertEqual(
+            refilled,
+            db.share_server_get_all_free_by_host_and_share_net.called)
+        self.assertEqual(2 if refilled else 0,
+                         manager.eventlet.spawn_n.call_count)
+
+    @ddt.data((3, 1, 0, 2), (3, 1, 1, 1), (3, 2, 1, 0), (2, 3, 0, -1))
+    @ddt.unpack
+    def test__replenish_share_server_pool(self, pool_size, free, pending,
+                                          missing):
+        self.flags(share_server_pool_size=pool_size)
+        self.mock_object(db, 'share_server_get_all_free_by_host_and_share_net',
+                         mock.Mock(return_value=['fake_server'] * free))
+        self.mock_object(manager.eventlet, 'spawn_n')
+        if pending:
+            self.share_manager._pending_pooled_share_servers['fake_sn'] = (
+                pending)
+
+        self.share_manager._replenish_share_server_pool(
+            self.context, 'fake_sn')
+
+        self.assertEqual(max(missing, 0),
+                         manager.eventlet.spawn_n.call_count)
+        manager.eventlet.spawn_n.assert_has_calls(
+            [mock.call(self.share_manager._create_pooled_share_server,
+                       self.context, 'fake_sn')] * max(missing, 0))
+        self.assertEqual(
+            pending + max(missing, 0),
+            self.share_manager._pending_pooled_share_servers.get(
+                'fake_sn', 0))
+
+    def test__create_pooled_share_server(self):
+        share_network = db_utils.create_share_network()
+        self.share_manager._pending_pooled_share_servers[
+            share_network['id']] = 2
+        self.share_manager._failed_share_server_pools[
+            share_network['id']] = (1, None)
+        self.mock_object(
+            self.share_manager, '_setup_server',
+            mock.Mock(side_effect=lambda ctxt, server: server))
+
+        self.share_manager._create_pooled_share_server(
+            self.context, share_network['id'])
+
+        share_server = self.share_manager._setup_server.call_args[0][1]
+        self.assertEqual(constants.STATUS_INACTIVE, share_server['status'])
+        self.assertEqual(self.share_manager.host, share_server['host'])
+        self.assertEqual(share_network['id'],
+                         share_server['share_network_id'])
+        self.assertEqual(
+            {share_network['id']: 1},
+            self.share_manager._pending_pooled_share_servers)
+        self.assertEqual({}, self.share_manager._failed_share_server_pools)
+
+    @ddt.data((0, 60), (1, 120), (3, 480), (10, 600))
+    @ddt.unpack
+    def test__create_pooled_share_server_error(self, failures, delay):
+        self.flags(periodic_interval=60,
+                   unused_share_server_cleanup_interval=10)
+        now = datetime.datetime(2017, 1, 1)
+        self.mock_object(timeutils, 'utcnow', mock.Mock(return_value=now))
+        self.share_manager._pending_pooled_share_servers['fake_sn'] = 1
+        if failures:
+            self.share_manager._failed_share_server_pools['fake_sn'] = (
+                failures, now)
+        self.mock_object(db, 'share_server_create')
+        self.mock_object(self.share_manager, '_setup_server',
+                         mock.Mock(side_effect=exception.ManilaException))
+        self.mock_object(manager.LOG, 'exception')
+
+        self.share_manager._create_pooled_share_server(
+            self.context, 'fake_sn')
+
+        self.assertTrue(manager.LOG.exception.called)
+        self.assertEqual({}, self.share_manager._pending_pooled_share_servers)
+        self.assertEqual(
+            {'fake_sn': (failures + 1,
+                         now + datetime.timedelta(seconds=delay))},
+            self.share_manager._failed_share_server_pools)
+
+    def test__create_pooled_share_server_error_backs_off(self):
+        self.flags(share_server_pool_size=2)
+        self.mock_object(self.share_manager, 'driver')
+        self.share_manager.driver.driver_handles_share_servers = True
+        self.mock_object(self.share_manager, '_get_pooled_share_network_ids',
+                         mock.Mock(return_value={'fake_sn'}))
+        self.mock_object(db, 'share_server_get_all_free_by_host_and_share_net',
+                         mock.Mock(return_value=[]))
+        self.mock_object(db, 'share_server_create')
+        self.mock_object(self.share_manager, '_setup_server',
+                         mock.Mock(side_effect=exception.ManilaException))
+        self.mock_object(manager.LOG, 'exception')
+        self.mock_object(manager.eventlet, 'spawn_n',
+                         mock.Mock(side_effect=lambda f, *a: f(*a)))
+
+        self.share_manager._replenish_share_server_pools(self.context)
+        self.share_manager._replenish_share_server_pools(self.context)
+
+        # Both pooled servers of the first run failed, the second run does
+        # not retry yet.
+        self.assertEqual(2, self.share_manager._setup_server.call_count)
+        self.assertEqual(
+            1, db.share_server_get_all_free_by_host_and_share_net.call_count)
+        self.assertEqual({}, self.share_manager._pending_pooled_share_servers)
+
     def test_extend_share_invalid(self):
         share = db_utils.create_share()
         share_id = share['id']
@@ -6173,6 +6465,82 @@ class ShareManagerTestCase(test.TestCase):
             self.context, share_instance['id'],
             share_server='fake_share_server')
 
+    def test_update_access_coalesced(self):
+        self.flags(access_rules_update_coalescing_window=2.5)
+        share = db_utils.create_share(status=constants.STATUS_AVAILABLE)
+        share_instance_id = share.instance['id']
+        mock_spawn_after = self.mock_object(manager.eventlet, 'spawn_after')
+        access_rules_update_method = self.mock_object(
+            self.share_manager.access_helper, 'update_access_rules')
+
+        for i in range(3):
+            self.share_manager.update_access(self.context, share_instance_id)
+
+        mock_spawn_after.assert_called_once_with(
+            2.5, self.share_manager._flush_pending_access_rules_update,
+            share_instance_id)
+        self.assertFalse(access_rules_update_method.called)
+        self.assertEqual({share_instance_id: self.context},
+                         self.share_manager._pending_access_updates)
+
+    def test_update_access_coalesced_rules_are_eventually_applied(self):
+        self.flags(access_rules_update_coalescing_window=1)
+        share = db_utils.create_share(status=constants.STATUS_AVAILABLE)
+        share_instance_id = share.instance['id']
+        mock_spawn_after = self.mock_object(manager.eventlet, 'spawn_after')
+        mock_driver_update_access = self.mock_object(
+            self.share_manager.driver, 'update_access',
+            mock.Mock(return_value=None))
+
+        rules = []
+        for i in range(3):
+            rules.append(db_utils.create_access(
+                share_id=share['id'], access_to='10.0.0.%s' % i))
+            self.share_manager.update_access(self.context, share_instance_id)
+
+        self.assertEqual(1, mock_spawn_after.call_count)
+        self.assertFalse(mock_driver_update_access.called)
+
+        # The coalescing window is over
+        flush, flush_share_instance_id = mock_spawn_after.call_args[0][1:]
+        flush(flush_share_instance_id)
+
+        self.assertEqual(1, mock_driver_update_access.call_count)
+        add_rules = mock_driver_update_access.call_args[1]['add_rules']
+        self.assertEqual(sorted(r['id'] for r in rules),
+                         sorted(r['access_id'] for r in add_rules))
+        for rule in rules:
+            self.assertEqual(
+                constants.ACCESS_STATE_ACTIVE,
+                db.share_instance_access_get(
+                    self.context, rule['id'], share_instance_id)['state'])
+        self.assertEqual(
+            constants.STATUS_ACTIVE,
+            db.share_instance_get(
+                self.context, share_instance_id)['access_rules_status'])
+        self.assertEqual({}, self.share_manager._pending_access_updates)
+
+    def test__flush_pending_access_rules_update_nothing_pending(self):
+        access_rules_update_method = self.mock_object(
+            self.share_manager.access_helper, 'update_access_rules')
+
+        self.share_manager._flush_pending_access_rules_update('fake_id')
+
+        self.assertFalse(access_rules_update_method.called)
+
+    @ddt.data(exception.NotFound, exception.ManilaException)
+    def test__flush_pending_access_rules_update_failure(self, exc):
+        self.share_manager._pending_access_updates['fake_id'] = self.context
+        self.mock_object(self.share_manager, '_get_share_instance',
+                         mock.Mock(side_effect=exc))
+        access_rules_update_method = self.mock_object(
+            self.share_manager.access_helper, 'update_access_rules')
+
+        self.share_manager._flush_pending_access_rules_update('fake_id')
+
+        self.assertFalse(access_rules_update_method.called)
+        self.assertEqual({}, self.share_manager._pending_access_updates)
+
 
 @ddt.ddt
 class HookWrapperTestCase(test.TestCase):
@@ -6215,3 +6583,25 @@ class HookWrapperTestCase(test.TestCase):
         for mock_hook in self.hooks:
             self.assertFalse(mock_hook.execute_pre_hook.called)
             self.assertFalse(mock_hook.execute_post_hook.called)
+
+
+class CachePrivateDataTestCase(test.TestCase):
+
+    def setUp(self):
+        super(CachePrivateDataTestCase, self).setUp()
+        self.private_storage = drivers_private_data.DriverPrivateData(
+            storage=mock.Mock())
+        self.entity_id = 'c3b8f3c4-6a5e-4b24-9a7f-2d1e0f6b9a11'
+
+    @manager.cache_private_data
+    def _fake_wrapped_method(self, some_arg, some_kwarg=None):
+        self.private_storage.update(self.entity_id, {'foo': some_arg})
+        self.assertFalse(self.private_storage._storage.update.called)
+        return some_kwarg
+
+    def test_cache_private_data(self):
+        result = self._fake_wrapped_method('bar', some_kwarg='baz')
+
+        self.assertEqual('baz', result)
+        self.private_storage._storage.update.assert_called_once_with(
+            self.entity_id, {'foo': 'bar'}, False)
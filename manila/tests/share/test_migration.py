@@ -52,7 +52,7 @@ class ShareMigrationHelperTestCase(test.TestCase):
         self.mock_object(db, 'share_instance_get',
                          mock.Mock(side_effect=[self.share_instance,
                                                 exception.NotFound()]))
-        self.mock_object(time, 'sleep')
+        self.mock_object(utils.ResourceChangeWaiter, 'wait')
 
         # run
         self.helper.delete_instance_and_wait(self.share_instance)
@@ -65,7 +65,7 @@ class ShareMigrationHelperTestCase(test.TestCase):
             mock.call(self.context, self.share_instance['id']),
             mock.call(self.context, self.share_instance['id'])])
 
-        time.sleep.assert_called_once_with(1)
+        utils.ResourceChangeWaiter.wait.assert_called_once_with(1)
 
     def test_delete_instance_and_wait_timeout(self):
 
@@ -130,7 +130,7 @@ class ShareMigrationHelperTestCase(test.TestCase):
         self.mock_object(db, 'share_instance_get',
                          mock.Mock(side_effect=[share_instance_creating,
                                                 share_instance_available]))
-        self.mock_object(time, 'sleep')
+        self.mock_object(utils.ResourceChangeWaiter, 'wait')
 
         # run
         self.helper.create_instance_and_wait(
@@ -147,7 +147,7 @@ class ShareMigrationHelperTestCase(test.TestCase):
             mock.call(self.context, share_instance_creating['id'],
                       with_share_data=True)])
 
-        time.sleep.assert_called_once_with(1)
+        utils.ResourceChangeWaiter.wait.assert_called_once_with(1)
 
     def test_create_instance_and_wait_status_error(self):
 
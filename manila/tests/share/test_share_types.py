@@ -345,3 +345,82 @@ class ShareTypesTestCase(test.TestCase):
                           share_types.parse_boolean_extra_spec,
                           'fake_key',
                           spec_value)
+
+
+class ShareTypesCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ShareTypesCacheTestCase, self).setUp()
+        self.flags(share_types_cache_enabled=True)
+        self.context = context.get_admin_context()
+        self.cache = share_types.ShareTypesCache()
+        self.load = mock.Mock(return_value={'extra_specs': {'foo': 'bar'}})
+
+    def test_get_hit(self):
+        first = self.cache.get(self.context, ('id', 'fake'), self.load)
+        second = self.cache.get(self.context, ('id', 'fake'), self.load)
+
+        self.load.assert_called_once_with()
+        self.assertEqual(first, second)
+        self.assertEqual({'hits': 1, 'misses': 1, 'size': 1},
+                         self.cache.get_stats())
+
+    def test_get_returns_copy(self):
+        first = self.cache.get(self.context, ('id', 'fake'), self.load)
+        first['extra_specs']['foo'] = 'changed'
+
+        second = self.cache.get(self.context, ('id', 'fake'), self.load)
+
+        self.assertEqual('bar', second['extra_specs']['foo'])
+
+    def test_get_per_project(self):
+        ctxt = context.RequestContext('fake_user', 'fake_project')
+
+        self.cache.get(self.context, ('id', 'fake'), self.load)
+        self.cache.get(ctxt, ('id', 'fake'), self.load)
+
+        self.assertEqual(2, self.load.call_count)
+
+    def test_get_generation_changed(self):
+        self.cache.get(self.context, ('id', 'fake'), self.load)
+        share_types.create(self.context, 'fake_type',
+                           extra_specs={'driver_handles_share_servers': True})
+
+        self.cache.get(self.context, ('id', 'fake'), self.load)
+
+        self.assertEqual(2, self.load.call_count)
+        self.assertEqual({'hits': 0, 'misses': 2, 'size': 1},
+                         self.cache.get_stats())
+
+    def test_get_disabled(self):
+        self.flags(share_types_cache_enabled=False)
+        self.mock_object(db, 'share_types_generation_get')
+
+        self.cache.get(self.context, ('id', 'fake'), self.load)
+        self.cache.get(self.context, ('id', 'fake'), self.load)
+
+        self.assertEqual(2, self.load.call_count)
+        self.assertFalse(db.share_types_generation_get.called)
+
+    def test_get_share_type_cached(self):
+        self.mock_object(share_types, '_CACHE', self.cache)
+        share_types.create(
+            self.context, 'fake_type',
+            extra_specs={'driver_handles_share_servers': True, 'foo': 'bar'})
+        share_type = db.share_type_get_by_name(self.context, 'fake_type')
+        self.mock_object(db, 'share_type_get',
+                         mock.Mock(side_effect=db.share_type_get))
+
+        share_types.get_share_type(self.context, share_type['id'])
+        result = share_types.get_share_type(self.context, share_type['id'])
+
+        db.share_type_get.assert_called_once_with(
+            self.context, share_type['id'], expected_fields=None)
+        self.assertEqual('bar', result['extra_specs']['foo'])
+
+        db.share_type_extra_specs_update_or_create(
+            self.context, share_type['id'], {'foo': 'baz'})
+        result = share_types.get_share_type(self.context, share_type['id'])
+
+        self.assertEqual(2, db.share_type_get.call_count)
+        self.assertEqual('baz', result['extra_specs']['foo'])
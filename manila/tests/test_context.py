@@ -12,6 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import mock
+
 from manila import context
 from manila import test
 
@@ -63,3 +65,44 @@ class ContextTestCase(test.TestCase):
                           ctxt,
                           'read_deleted',
                           True)
+
+    def test_request_context_elevated_shares_request_cache(self):
+        ctxt = context.RequestContext('111', '222')
+        ctxt.request_cache = context.RequestCache()
+
+        self.assertIs(ctxt.request_cache, ctxt.elevated().request_cache)
+        self.assertNotIn('request_cache', ctxt.to_dict())
+
+
+class RequestCacheTestCase(test.TestCase):
+
+    def test_get(self):
+        cache = context.RequestCache()
+        load = mock.Mock(return_value='fake_value')
+
+        self.assertEqual('fake_value', cache.get('fake_key', load))
+        self.assertEqual('fake_value', cache.get('fake_key', load))
+
+        load.assert_called_once_with()
+        self.assertEqual({'fake_key': 2}, cache.get_duplicates())
+
+    def test_get_disabled(self):
+        cache = context.RequestCache(enabled=False)
+        load = mock.Mock(return_value='fake_value')
+
+        cache.get('fake_key', load)
+        cache.get('fake_key', load)
+        cache.get('other_key', load)
+
+        self.assertEqual(3, load.call_count)
+        self.assertEqual({'fake_key': 2}, cache.get_duplicates())
+
+    def test_clear(self):
+        cache = context.RequestCache()
+        load = mock.Mock(return_value='fake_value')
+
+        cache.get('fake_key', load)
+        cache.clear()
+        cache.get('fake_key', load)
+
+        self.assertEqual(2, load.call_count)
@@ -17,7 +17,9 @@
 
 import ddt
 import mock
+from oslo_service import periodic_task
 from oslo_utils import importutils
+from oslo_utils import timeutils
 
 from manila import manager
 from manila import test
@@ -56,6 +58,127 @@ class ManagerTestCase(test.TestCase):
             fake_context, raise_on_error=raise_on_error)
 
 
+class FakePeriodicManager(manager.Manager):
+
+    def __init__(self, *args, **kwargs):
+        super(FakePeriodicManager, self).__init__(*args, **kwargs)
+        self.task_calls = []
+
+    @periodic_task.periodic_task(spacing=10, run_immediately=True)
+    def _fast_task(self, context):
+        self.task_calls.append(('_fast_task', context))
+
+    @periodic_task.periodic_task(spacing=300, run_immediately=True)
+    def _slow_task(self, context):
+        self.task_calls.append(('_slow_task', context))
+
+
+class PeriodicTasksTestCase(test.TestCase):
+
+    def setUp(self):
+        super(PeriodicTasksTestCase, self).setUp()
+        self.mock_object(importutils, 'import_module')
+        self.flags(periodic_tasks_concurrency=2, periodic_task_jitter=0)
+        self.manager = FakePeriodicManager('host', 'fake_driver')
+        self.mock_object(timeutils, 'now', mock.Mock(return_value=1000))
+
+    def test_run_periodic_tasks_sequentially(self):
+        self.flags(periodic_tasks_concurrency=0)
+        self.mock_object(periodic_task.PeriodicTasks, 'run_periodic_tasks',
+                         mock.Mock(return_value=42))
+
+        idle_for = self.manager.run_periodic_tasks('fake_context')
+
+        self.assertEqual(42, idle_for)
+        periodic_task.PeriodicTasks.run_periodic_tasks.assert_called_once_with(
+            'fake_context', raise_on_error=False)
+        self.assertIsNone(self.manager._periodic_pool)
+
+    def test_run_periodic_tasks_concurrently(self):
+        idle_for = self.manager.run_periodic_tasks('fake_context')
+        self.manager._periodic_pool.waitall()
+
+        self.assertEqual(10, idle_for)
+        self.assertEqual(
+            [('_fast_task', 'fake_context'), ('_slow_task', 'fake_context')],
+            sorted(self.manager.task_calls))
+        self.assertEqual({'_fast_task': 1010, '_slow_task': 1300},
+                         self.manager._periodic_next_run)
+        stats = self.manager.get_periodic_task_stats()
+        for task_name in ('_fast_task', '_slow_task'):
+            self.assertEqual(1, stats[task_name]['runs'])
+            self.assertEqual(0, stats[task_name]['overruns'])
+            self.assertEqual(0, stats[task_name]['last_duration'])
+
+    def test_run_periodic_tasks_tasks_have_own_schedule(self):
+        self.manager.run_periodic_tasks('fake_context')
+        self.manager._periodic_pool.waitall()
+        timeutils.now.return_value = 1011
+
+        idle_for = self.manager.run_periodic_tasks('fake_context')
+        self.manager._periodic_pool.waitall()
+
+        self.assertEqual(10, idle_for)
+        self.assertEqual(2, self.manager.task_calls.count(
+            ('_fast_task', 'fake_context')))
+        self.assertEqual(1, self.manager.task_calls.count(
+            ('_slow_task', 'fake_context')))
+
+    def test_run_periodic_tasks_skip_still_running(self):
+        self.manager._periodic_running.add('_fast_task')
+        self.mock_object(manager.LOG, 'warning')
+
+        self.manager.run_periodic_tasks('fake_context')
+        self.manager._periodic_pool.waitall()
+
+        self.assertEqual([('_slow_task', 'fake_context')],
+                         self.manager.task_calls)
+        self.assertEqual(
+            1, self.manager.get_periodic_task_stats()['_fast_task']['skipped'])
+        self.assertEqual(1010, self.manager._periodic_next_run['_fast_task'])
+        manager.LOG.warning.assert_called_once_with(mock.ANY, '_fast_task')
+
+    def test_run_periodic_tasks_no_free_slot(self):
+        self.manager._periodic_pool = mock.Mock()
+        self.manager._periodic_pool.free.return_value = 0
+
+        idle_for = self.manager.run_periodic_tasks('fake_context')
+
+        self.assertEqual(manager.MIN_PERIODIC_IDLE, idle_for)
+        self.assertFalse(self.manager._periodic_pool.spawn_n.called)
+        self.assertEqual({'_fast_task': 1000, '_slow_task': 1000},
+                         self.manager._periodic_next_run)
+
+    def test_run_periodic_tasks_with_jitter(self):
+        self.flags(periodic_task_jitter=0.1)
+        self.mock_object(manager.random, 'random',
+                         mock.Mock(return_value=0.5))
+
+        self.manager.run_periodic_tasks('fake_context')
+        self.manager._periodic_pool.waitall()
+
+        self.assertEqual({'_fast_task': 1010.5, '_slow_task': 1315},
+                         self.manager._periodic_next_run)
+
+    def test__run_periodic_task_overrun(self):
+        timeutils.now.side_effect = [1000, 1025]
+        task = mock.Mock(side_effect=Exception('fake'))
+        self.manager._periodic_running.add('fake_task')
+        self.mock_object(manager.LOG, 'exception')
+        self.mock_object(manager.LOG, 'warning')
+
+        self.manager._run_periodic_task('fake_context', 'fake_task', task, 10)
+
+        task.assert_called_once_with(self.manager, 'fake_context')
+        self.assertEqual(set(), self.manager._periodic_running)
+        self.assertEqual(
+            {'runs': 1, 'skipped': 0, 'overruns': 1, 'last_duration': 25,
+             'max_duration': 25},
+            self.manager.get_periodic_task_stats()['fake_task'])
+        self.assertTrue(manager.LOG.exception.called)
+        self.assertTrue(manager.LOG.warning.called)
+
+
 @ddt.ddt
 class SchedulerDependentManagerTestCase(test.TestCase):
 
@@ -115,6 +238,48 @@ class SchedulerDependentManagerTestCase(test.TestCase):
                 self.context, self.service_name, self.host, last_capabilities)
         manager.LOG.debug.assert_called_once_with(mock.ANY)
 
+    def test__publish_service_capabilities_deltas(self):
+        self.flags(capabilities_full_report_interval=3)
+        rpcapi = self.sched_manager.scheduler_rpcapi
+        self.mock_object(rpcapi, 'update_service_capabilities')
+        self.mock_object(
+            manager.scheduler_utils, 'get_capabilities_delta',
+            mock.Mock(side_effect=lambda old, new: ('fake_delta', old, new)))
+        capabilities = {'foo': 'bar'}
+        self.sched_manager.last_capabilities = capabilities
+
+        self.sched_manager._publish_service_capabilities(self.context)
+        capabilities['foo'] = 'quuz'
+        self.sched_manager._publish_service_capabilities(self.context)
+        self.sched_manager._publish_service_capabilities(self.context)
+
+        rpcapi.update_service_capabilities.assert_has_calls([
+            mock.call(self.context, self.service_name, self.host,
+                      capabilities, seq=1, is_delta=False),
+            mock.call(self.context, self.service_name, self.host,
+                      ('fake_delta', {'foo': 'bar'}, capabilities),
+                      seq=2, is_delta=True),
+            mock.call(self.context, self.service_name, self.host,
+                      capabilities, seq=3, is_delta=False),
+        ])
+        self.assertEqual({'foo': 'quuz'},
+                         self.sched_manager._published_capabilities)
+
+    def test__publish_service_capabilities_forced_full_report(self):
+        self.flags(capabilities_full_report_interval=10)
+        rpcapi = self.sched_manager.scheduler_rpcapi
+        self.mock_object(rpcapi, 'update_service_capabilities')
+        self.sched_manager.last_capabilities = {'foo': 'bar'}
+        self.sched_manager._published_capabilities = {'foo': 'bar'}
+        self.sched_manager._capabilities_seq = 4
+
+        self.sched_manager._publish_service_capabilities(
+            self.context, full_report=True)
+
+        rpcapi.update_service_capabilities.assert_called_once_with(
+            self.context, self.service_name, self.host, {'foo': 'bar'},
+            seq=5, is_delta=False)
+
     @ddt.data(None, '', [], {}, {'foo': 'bar'})
     def test_update_service_capabilities(self, capabilities):
         self.sched_manager.update_service_capabilities(capabilities)
@@ -591,6 +591,22 @@ class QuotaEngineTestCase(test.TestCase):
 
         self.assertEqual([('expire', context), ], driver.called)
 
+    def test_invalidate_limits_cache(self):
+        driver = mock.Mock()
+        quota_obj = self._make_quota_obj(driver)
+
+        quota_obj.invalidate_limits_cache('test_project')
+
+        driver.invalidate_limits_cache.assert_called_once_with('test_project')
+
+    def test_invalidate_limits_cache_not_supported(self):
+        driver = FakeDriver()
+        quota_obj = self._make_quota_obj(driver)
+
+        quota_obj.invalidate_limits_cache()
+
+        self.assertEqual([], driver.called)
+
     def test_resources(self):
         quota_obj = self._make_quota_obj(None)
 
@@ -948,19 +964,17 @@ class DbQuotaDriverTestCase(test.TestCase):
         }
         self.assertEqual(expected, result)
 
-    def _stub_get_project_quotas(self):
-        def fake_get_project_quotas(context, resources, project_id,
-                                    quota_class=None, defaults=True,
-                                    usages=True):
-            self.calls.append('get_project_quotas')
-            return {k: dict(limit=v.default)
-                    for k, v in resources.items()}
+    def _stub_quota_get_all_limits(self):
+        def fake_quota_get_all_limits(context, project_id, user_id=None,
+                                      quota_class=None):
+            self.calls.append('quota_get_all_limits')
+            return {'project': {}, 'user': {}, 'class': {}, 'default': {}}
 
-        self.mock_object(self.driver, 'get_project_quotas',
-                         fake_get_project_quotas)
+        self.mock_object(db, 'quota_get_all_limits',
+                         fake_quota_get_all_limits)
 
     def test_get_quotas_has_sync_unknown(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self.assertRaises(exception.QuotaResourceUnknown,
                           self.driver._get_quotas,
                           None, quota.QUOTAS._resources,
@@ -968,7 +982,7 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual([], self.calls)
 
     def test_get_quotas_no_sync_unknown(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self.assertRaises(exception.QuotaResourceUnknown,
                           self.driver._get_quotas,
                           None, quota.QUOTAS._resources,
@@ -976,7 +990,7 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual([], self.calls)
 
     def test_get_quotas_has_sync_no_sync_resource(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self.assertRaises(exception.QuotaResourceUnknown,
                           self.driver._get_quotas,
                           None, quota.QUOTAS._resources,
@@ -984,7 +998,7 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual([], self.calls)
 
     def test_get_quotas_no_sync_has_sync_resource(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self.assertRaises(exception.QuotaResourceUnknown,
                           self.driver._get_quotas,
                           None, quota.QUOTAS._resources,
@@ -992,16 +1006,123 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual([], self.calls)
 
     def test_get_quotas_has_sync(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         result = self.driver._get_quotas(FakeContext('test_project',
                                                      'test_class'),
                                          quota.QUOTAS._resources,
                                          ['shares', 'gigabytes'],
                                          True)
 
-        self.assertEqual(['get_project_quotas'], self.calls)
+        self.assertEqual(['quota_get_all_limits'], self.calls)
         self.assertEqual(dict(shares=10, gigabytes=1000, ), result)
 
+    def test_get_quotas_resolution_order(self):
+        limits = {
+            'project': {'shares': 20, 'gigabytes': 200},
+            'user': {'shares': 5},
+            'class': {'gigabytes': 300, 'snapshots': 30},
+            'default': {'snapshots': 40, 'snapshot_gigabytes': 400},
+        }
+        mock_get_limits = self.mock_object(
+            db, 'quota_get_all_limits', mock.Mock(return_value=limits))
+        context = FakeContext('test_project', 'test_class')
+        keys = ['shares', 'gigabytes', 'snapshots', 'snapshot_gigabytes',
+                'share_networks']
+
+        project_result = self.driver._get_quotas(
+            context, quota.QUOTAS._resources, keys, True,
+            project_id='test_project')
+        user_result = self.driver._get_quotas(
+            context, quota.QUOTAS._resources, keys, True,
+            project_id='test_project', user_id='fake_user')
+
+        self.assertEqual(
+            dict(shares=20, gigabytes=200, snapshots=30,
+                 snapshot_gigabytes=400, share_networks=10),
+            project_result)
+        self.assertEqual(
+            dict(shares=5, gigabytes=200, snapshots=30,
+                 snapshot_gigabytes=400, share_networks=10),
+            user_result)
+        mock_get_limits.assert_has_calls([
+            mock.call(context, 'test_project', user_id=None,
+                      quota_class='test_class'),
+            mock.call(context, 'test_project', user_id='fake_user',
+                      quota_class='test_class')])
+
+    def test_get_limits_cache_disabled(self):
+        self._stub_quota_get_all_limits()
+        context = FakeContext('test_project', 'test_class')
+
+        for i in range(2):
+            self.driver._get_limits(context, 'test_project', 'fake_user')
+
+        self.assertEqual(['quota_get_all_limits'] * 2, self.calls)
+        self.assertEqual({}, self.driver._limits_cache)
+
+    def test_get_limits_cached(self):
+        self.flags(quota_limits_cache_ttl=30)
+        self._stub_quota_get_all_limits()
+        context = FakeContext('test_project', 'test_class')
+
+        first = self.driver._get_limits(context, 'test_project', 'fake_user')
+        second = self.driver._get_limits(context, 'test_project', 'fake_user')
+
+        self.assertEqual(['quota_get_all_limits'], self.calls)
+        self.assertIs(first, second)
+
+    def test_get_limits_cache_expired(self):
+        self.flags(quota_limits_cache_ttl=30)
+        self._stub_quota_get_all_limits()
+        context = FakeContext('test_project', 'test_class')
+
+        self.driver._get_limits(context, 'test_project', 'fake_user')
+        self.mock_utcnow.return_value += datetime.timedelta(seconds=31)
+        self.driver._get_limits(context, 'test_project', 'fake_user')
+
+        self.assertEqual(['quota_get_all_limits'] * 2, self.calls)
+        self.assertEqual(1, len(self.driver._limits_cache))
+
+    def test_get_limits_cache_not_shared_with_other_projects(self):
+        self.flags(quota_limits_cache_ttl=30)
+        self._stub_quota_get_all_limits()
+
+        self.driver._get_limits(FakeContext('test_project', 'test_class'),
+                                'test_project')
+        self.driver._get_limits(FakeContext('other_project', 'test_class'),
+                                'test_project')
+
+        self.assertEqual(['quota_get_all_limits'] * 2, self.calls)
+
+    def _test_invalidate_limits_cache(self, project_id):
+        self.flags(quota_limits_cache_ttl=30)
+        self._stub_quota_get_all_limits()
+        context = FakeContext('test_project', 'test_class')
+        self.driver._get_limits(context, 'test_project')
+        self.driver._get_limits(context, 'test_project', 'fake_user')
+
+        self.driver.invalidate_limits_cache(project_id)
+        self.driver._get_limits(context, 'test_project')
+
+        self.assertEqual(['quota_get_all_limits'] * 3, self.calls)
+
+    def test_invalidate_limits_cache_all(self):
+        self._test_invalidate_limits_cache(None)
+
+    def test_invalidate_limits_cache_project(self):
+        self._test_invalidate_limits_cache('test_project')
+
+    def test_invalidate_limits_cache_other_project(self):
+        self.flags(quota_limits_cache_ttl=30)
+        self._stub_quota_get_all_limits()
+        context = FakeContext('test_project', 'test_class')
+        self.driver._get_limits(context, 'test_project')
+
+        self.driver.invalidate_limits_cache('other_project')
+        self.driver._get_limits(context, 'test_project')
+
+        self.assertEqual(['quota_get_all_limits'], self.calls)
+
     def _stub_quota_reserve(self):
         def fake_quota_reserve(context, resources, quotas, user_quotas,
                                deltas, expire, until_refresh, max_age,
@@ -1012,7 +1133,7 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.mock_object(db, 'quota_reserve', fake_quota_reserve)
 
     def test_reserve_bad_expire(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self._stub_quota_reserve()
         self.assertRaises(exception.InvalidReservationExpiration,
                           self.driver.reserve,
@@ -1022,31 +1143,31 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual([], self.calls)
 
     def test_reserve_default_expire(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self._stub_quota_reserve()
         result = self.driver.reserve(FakeContext('test_project', 'test_class'),
                                      quota.QUOTAS._resources,
                                      dict(shares=2))
 
         expire = timeutils.utcnow() + datetime.timedelta(seconds=86400)
-        self.assertEqual(['get_project_quotas',
+        self.assertEqual(['quota_get_all_limits',
                           ('quota_reserve', expire, 0, 0), ], self.calls)
         self.assertEqual(['resv-1', 'resv-2', 'resv-3'], result)
 
     def test_reserve_int_expire(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self._stub_quota_reserve()
         result = self.driver.reserve(FakeContext('test_project', 'test_class'),
                                      quota.QUOTAS._resources,
                                      dict(shares=2), expire=3600)
 
         expire = timeutils.utcnow() + datetime.timedelta(seconds=3600)
-        self.assertEqual(['get_project_quotas',
+        self.assertEqual(['quota_get_all_limits',
                           ('quota_reserve', expire, 0, 0), ], self.calls)
         self.assertEqual(['resv-1', 'resv-2', 'resv-3'], result)
 
     def test_reserve_timedelta_expire(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self._stub_quota_reserve()
         expire_delta = datetime.timedelta(seconds=60)
         result = self.driver.reserve(FakeContext('test_project', 'test_class'),
@@ -1054,24 +1175,24 @@ class DbQuotaDriverTestCase(test.TestCase):
                                      dict(shares=2), expire=expire_delta)
 
         expire = timeutils.utcnow() + expire_delta
-        self.assertEqual(['get_project_quotas',
+        self.assertEqual(['quota_get_all_limits',
                           ('quota_reserve', expire, 0, 0), ], self.calls)
         self.assertEqual(['resv-1', 'resv-2', 'resv-3'], result)
 
     def test_reserve_datetime_expire(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self._stub_quota_reserve()
         expire = timeutils.utcnow() + datetime.timedelta(seconds=120)
         result = self.driver.reserve(FakeContext('test_project', 'test_class'),
                                      quota.QUOTAS._resources,
                                      dict(shares=2), expire=expire)
 
-        self.assertEqual(['get_project_quotas',
+        self.assertEqual(['quota_get_all_limits',
                           ('quota_reserve', expire, 0, 0), ], self.calls)
         self.assertEqual(['resv-1', 'resv-2', 'resv-3'], result)
 
     def test_reserve_until_refresh(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self._stub_quota_reserve()
         self.flags(until_refresh=500)
         expire = timeutils.utcnow() + datetime.timedelta(seconds=120)
@@ -1079,12 +1200,12 @@ class DbQuotaDriverTestCase(test.TestCase):
                                      quota.QUOTAS._resources,
                                      dict(shares=2), expire=expire)
 
-        self.assertEqual(['get_project_quotas',
+        self.assertEqual(['quota_get_all_limits',
                           ('quota_reserve', expire, 500, 0), ], self.calls)
         self.assertEqual(['resv-1', 'resv-2', 'resv-3'], result)
 
     def test_reserve_max_age(self):
-        self._stub_get_project_quotas()
+        self._stub_quota_get_all_limits()
         self._stub_quota_reserve()
         self.flags(max_age=86400)
         expire = timeutils.utcnow() + datetime.timedelta(seconds=120)
@@ -1092,10 +1213,19 @@ class DbQuotaDriverTestCase(test.TestCase):
                                      quota.QUOTAS._resources,
                                      dict(shares=2), expire=expire)
 
-        self.assertEqual(['get_project_quotas',
+        self.assertEqual(['quota_get_all_limits',
                           ('quota_reserve', expire, 0, 86400), ], self.calls)
         self.assertEqual(['resv-1', 'resv-2', 'resv-3'], result)
 
+    def test_expire(self):
+        self.flags(reservation_expire_batch_size=500)
+        self.mock_object(db, 'reservation_expire')
+        context = FakeContext('test_project', 'test_class')
+
+        self.driver.expire(context)
+
+        db.reservation_expire.assert_called_once_with(context, batch_size=500)
+
     def _stub_quota_delete_all_by_project(self):
         def fake_quota_delete_all_by_project(context, project_id):
             self.calls.append(('quota_destroy_all_by_project', project_id))
@@ -1105,11 +1235,14 @@ class DbQuotaDriverTestCase(test.TestCase):
 
     def test_delete_by_project(self):
         self._stub_quota_delete_all_by_project()
+        self.mock_object(self.driver, 'invalidate_limits_cache')
         self.driver.destroy_all_by_project(FakeContext('test_project',
                                                        'test_class'),
                                            'test_project')
         self.assertEqual([('quota_destroy_all_by_project',
                            ('test_project')), ], self.calls)
+        self.driver.invalidate_limits_cache.assert_called_once_with(
+            'test_project')
 
 
 class FakeSession(object):
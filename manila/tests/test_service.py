@@ -158,6 +158,23 @@ class ServiceTestCase(test.TestCase):
             utils.IsAMatcher(context.RequestContext),
             raise_on_error=raise_on_error)
 
+    @ddt.data((0, 'FixedIntervalLoopingCall'), (4, 'DynamicLoopingCall'))
+    @ddt.unpack
+    def test_start_periodic_tasks_timer(self, concurrency, timer_name):
+        self.flags(periodic_tasks_concurrency=concurrency)
+        serv = service.Service(host, binary, topic, CONF.fake_manager,
+                               report_interval=0, periodic_interval=60,
+                               periodic_fuzzy_delay=0)
+        self.mock_object(service.db, 'service_get_by_args',
+                         mock.Mock(return_value=service_ref))
+        self.mock_object(service.rpc, 'get_server')
+        timer = self.mock_object(service.loopingcall, timer_name)
+
+        serv.start()
+
+        timer.assert_called_once_with(serv.periodic_tasks)
+        self.assertEqual([timer.return_value], serv.timers)
+
     @mock.patch.object(service.db, 'service_get_by_args',
                        mock.Mock(side_effect=fake_service_get_by_args))
     @mock.patch.object(service.db, 'service_create',
@@ -199,6 +216,59 @@ class ServiceTestCase(test.TestCase):
         service.db.service_update.assert_called_once_with(
             mock.ANY, service_ref['id'], mock.ANY)
 
+    def test_report_state_lightweight_heartbeat(self):
+        self.flags(lightweight_service_heartbeat=True)
+        serv = service.Service(host, binary, topic, CONF.fake_manager)
+        serv.service_id = service_ref['id']
+        serv.availability_zone = CONF.storage_availability_zone
+        self.mock_object(service.db, 'service_heartbeat')
+        self.mock_object(service.db, 'service_get')
+        self.mock_object(service.db, 'service_update')
+
+        serv.report_state()
+
+        service.db.service_heartbeat.assert_called_once_with(
+            mock.ANY, service_ref['id'])
+        self.assertFalse(service.db.service_get.called)
+        self.assertFalse(service.db.service_update.called)
+
+    def test_report_state_lightweight_heartbeat_zone_changed(self):
+        self.flags(lightweight_service_heartbeat=True,
+                   storage_availability_zone='new_zone')
+        serv = service.Service(host, binary, topic, CONF.fake_manager)
+        serv.service_id = service_ref['id']
+        serv.availability_zone = 'nova'
+        self.mock_object(service.db, 'service_heartbeat')
+        self.mock_object(service.db, 'service_get',
+                         mock.Mock(return_value=service_ref))
+        self.mock_object(service.db, 'service_update')
+
+        serv.report_state()
+
+        self.assertFalse(service.db.service_heartbeat.called)
+        service.db.service_update.assert_called_once_with(
+            mock.ANY, service_ref['id'],
+            {'report_count': service_ref['report_count'] + 1,
+             'availability_zone': 'new_zone'})
+        self.assertEqual('new_zone', serv.availability_zone)
+
+    def test_report_state_lightweight_heartbeat_service_disappeared(self):
+        self.flags(lightweight_service_heartbeat=True)
+        serv = service.Service(host, binary, topic, CONF.fake_manager)
+        serv.service_id = service_ref['id']
+        serv.availability_zone = CONF.storage_availability_zone
+        self.mock_object(service.db, 'service_heartbeat',
+                         mock.Mock(side_effect=exception.ServiceNotFound(
+                             service_id=service_ref['id'])))
+        self.mock_object(service.db, 'service_create',
+                         mock.Mock(return_value=service_ref))
+
+        serv.report_state()
+
+        service.db.service_create.assert_called_once_with(
+            mock.ANY, service_create)
+        self.assertEqual(service_ref['id'], serv.service_id)
+
 
 class TestWSGIService(test.TestCase):
 
@@ -20,6 +20,7 @@ import socket
 import time
 
 import ddt
+import eventlet
 import mock
 from oslo_config import cfg
 from oslo_utils import timeutils
@@ -680,6 +681,43 @@ class RequireDriverInitializedTestCase(test.TestCase):
         self.assertRaises(expected_exception, FakeManager().call_me)
 
 
+class ResourceChangeWaiterTestCase(test.TestCase):
+
+    def test_wait_woken_up_by_notification(self):
+        with utils.ResourceChangeWaiter('fake_type', 'fake_id') as waiter:
+            eventlet.spawn_n(utils.notify_resource_change,
+                             'fake_type', 'fake_id')
+            start = time.time()
+
+            self.assertTrue(waiter.wait(30))
+
+            self.assertLess(time.time() - start, 30)
+            # The waiter can be woken up again.
+            utils.notify_resource_change('fake_type', 'fake_id')
+            self.assertTrue(waiter.wait(30))
+
+        self.assertEqual({}, dict(utils._resource_change_events))
+
+    def test_wait_not_missing_notification_before_wait(self):
+        with utils.ResourceChangeWaiter('fake_type', 'fake_id') as waiter:
+            utils.notify_resource_change('fake_type', 'fake_id')
+
+            self.assertTrue(waiter.wait(30))
+
+    def test_wait_timeout(self):
+        with utils.ResourceChangeWaiter('fake_type', 'fake_id') as waiter:
+            utils.notify_resource_change('fake_type', 'other_fake_id')
+
+            self.assertFalse(waiter.wait(0.01))
+
+        self.assertEqual({}, dict(utils._resource_change_events))
+
+    def test_notify_resource_change_without_waiters(self):
+        utils.notify_resource_change('fake_type', 'fake_id')
+
+        self.assertEqual({}, dict(utils._resource_change_events))
+
+
 @ddt.ddt
 class ShareMigrationHelperTestCase(test.TestCase):
     """Tests DataMigrationHelper."""
@@ -701,7 +739,7 @@ class ShareMigrationHelperTestCase(test.TestCase):
             },
         ]
 
-        self.mock_object(time, 'sleep')
+        self.mock_object(utils.ResourceChangeWaiter, 'wait')
         self.mock_object(db, 'share_instance_get',
                          mock.Mock(side_effect=fake_share_instances))
 
@@ -711,7 +749,25 @@ class ShareMigrationHelperTestCase(test.TestCase):
         db.share_instance_get.assert_has_calls(
             [mock.call(mock.ANY, sid), mock.call(mock.ANY, sid)]
         )
-        time.sleep.assert_called_once_with(1)
+        utils.ResourceChangeWaiter.wait.assert_called_once_with(1)
+
+    def test_wait_for_access_update_poll_interval_is_capped(self):
+        sid = 1
+        syncing = {
+            'id': sid,
+            'access_rules_status': constants.SHARE_INSTANCE_RULES_SYNCING,
+        }
+        active = {'id': sid, 'access_rules_status': constants.STATUS_ACTIVE}
+        self.mock_object(utils.ResourceChangeWaiter, 'wait')
+        self.mock_object(db, 'share_instance_get',
+                         mock.Mock(side_effect=[syncing] * 4 + [active]))
+
+        utils.wait_for_access_update(self.context, db, syncing, 1000)
+
+        utils.ResourceChangeWaiter.wait.assert_has_calls([
+            mock.call(1), mock.call(4),
+            mock.call(utils.RESOURCE_CHANGE_MAX_POLL_INTERVAL),
+            mock.call(utils.RESOURCE_CHANGE_MAX_POLL_INTERVAL)])
 
     @ddt.data(
         (
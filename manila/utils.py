@@ -17,6 +17,7 @@
 
 """Utilities and helper functions."""
 
+import collections
 import contextlib
 import functools
 import inspect
@@ -30,7 +31,9 @@ import sys
 import tempfile
 import time
 
+from eventlet import event
 from eventlet import pools
+from eventlet import timeout as eventlet_timeout
 import netaddr
 from oslo_concurrency import lockutils
 from oslo_concurrency import processutils
@@ -55,6 +58,13 @@ LOG = log.getLogger(__name__)
 
 synchronized = lockutils.synchronized_with_prefix('manila-')
 
+# Longest time, in seconds, a ResourceChangeWaiter user waits before it
+# checks the resource again, in case it was changed by another process.
+RESOURCE_CHANGE_MAX_POLL_INTERVAL = 5
+
+# Events of ResourceChangeWaiters, by resource type and ID.
+_resource_change_events = collections.defaultdict(set)
+
 
 def _get_root_helper():
     return 'sudo manila-rootwrap %s' % CONF.rootwrap_config
@@ -562,31 +572,91 @@ def translate_string_size_to_float(string, multiplier='G'):
             return value * multiplier
 
 
+def notify_resource_change(resource_type, resource_id):
+    """Wakes up the ResourceChangeWaiters of a resource in this process."""
+    for change_event in _resource_change_events.pop(
+            (resource_type, resource_id), ()):
+        change_event.send()
+
+
+class ResourceChangeWaiter(object):
+    """Waits for changes of a resource notified in this process.
+
+    Changes made by other processes are not notified, so waits are bounded
+    and the resource has to be checked again after each of them::
+
+        with ResourceChangeWaiter('share_instance', instance_id) as waiter:
+            while not is_ready(db.share_instance_get(context, instance_id)):
+                waiter.wait(RESOURCE_CHANGE_MAX_POLL_INTERVAL)
+
+    The waiter is registered before the resource is checked, so a change
+    made between the check and the wait is not missed.
+    """
+
+    def __init__(self, resource_type, resource_id):
+        self._key = (resource_type, resource_id)
+        self._event = None
+
+    def __enter__(self):
+        self._register()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._unregister()
+
+    def _register(self):
+        self._event = event.Event()
+        _resource_change_events[self._key].add(self._event)
+
+    def _unregister(self):
+        change_events = _resource_change_events.get(self._key)
+        if change_events is not None:
+            change_events.discard(self._event)
+            if not change_events:
+                del _resource_change_events[self._key]
+
+    def wait(self, timeout):
+        """Waits for a change of the resource for up to timeout seconds.
+
+        :returns: True if a change was notified, False otherwise.
+        """
+        with eventlet_timeout.Timeout(timeout, False):
+            self._event.wait()
+        changed = self._event.ready()
+        if changed:
+            # The notified event was removed by notify_resource_change.
+            self._register()
+        return changed
+
+
 def wait_for_access_update(context, db, share_instance,
                            migration_wait_access_rules_timeout):
     starttime = time.time()
     deadline = starttime + migration_wait_access_rules_timeout
     tries = 0
 
-    while True:
-        instance = db.share_instance_get(context, share_instance['id'])
-
-        if instance['access_rules_status'] == constants.STATUS_ACTIVE:
-            break
-
-        tries += 1
-        now = time.time()
-        if (instance['access_rules_status'] ==
-                constants.SHARE_INSTANCE_RULES_ERROR):
-            msg = _("Failed to update access rules"
-                    " on share instance %s") % share_instance['id']
-            raise exception.ShareMigrationFailed(reason=msg)
-        elif now > deadline:
-            msg = _("Timeout trying to update access rules"
-                    " on share instance %(share_id)s. Timeout "
-                    "was %(timeout)s seconds.") % {
-                'share_id': share_instance['id'],
-                'timeout': migration_wait_access_rules_timeout}
-            raise exception.ShareMigrationFailed(reason=msg)
-        else:
-            time.sleep(tries ** 2)
+    with ResourceChangeWaiter('share_instance',
+                              share_instance['id']) as waiter:
+        while True:
+            instance = db.share_instance_get(context, share_instance['id'])
+
+            if instance['access_rules_status'] == constants.STATUS_ACTIVE:
+                break
+
+            tries += 1
+            now = time.time()
+            if (instance['access_rules_status'] ==
+                    constants.SHARE_INSTANCE_RULES_ERROR):
+                msg = _("Failed to update access rules"
+                        " on share instance %s") % share_instance['id']
+                raise exception.ShareMigrationFailed(reason=msg)
+            elif now > deadline:
+                msg = _("Timeout trying to update access rules"
+                        " on share instance %(share_id)s. Timeout "
+                        "was %(timeout)s seconds.") % {
+                    'share_id': share_instance['id'],
+                    'timeout': migration_wait_access_rules_timeout}
+                raise exception.ShareMigrationFailed(reason=msg)
+            else:
+                waiter.wait(min(tries ** 2,
+                                RESOURCE_CHANGE_MAX_POLL_INTERVAL))